@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Usage: depenv_benchmark [-n <rounds>] <R package file|DESCRIPTION file>...
+#
+#  Compares parsing the dependency strings of the given R packages
+#  (e.g. a CRAN mirror's src/contrib/*.tar.gz) with and without the
+#  DepEnv cache that is used by dependency resolution channels.
+#
+from __future__ import print_function
+
+import sys
+import time
+
+import roverlay.core
+
+
+def setup():
+   roverlay.core.force_console_logging()
+
+   config_file = roverlay.core.locate_config_file ( False )
+   return roverlay.core.load_config_file (
+      config_file, setup_logger=False,
+      extraconf={
+         'installed': False,
+         'DESCRIPTION': { 'descfiles_dir': None, }
+      },
+   )
+# --- end of setup (...) ---
+
+def get_dep_strings ( files ):
+   """Returns a list of ( dep_str, deptype_mask ) for all dependency fields
+   of the given packages (in the order used by ebuild creation).
+
+   arguments:
+   * files --
+   """
+   import roverlay.ebuild.depres
+   import roverlay.rpackage.descriptionreader
+
+   FIELDS = roverlay.ebuild.depres.FIELDS
+   D      = roverlay.rpackage.descriptionreader.DescriptionReader
+
+   dep_strings = list()
+   for result in D.parse_files ( *files ):
+      if result is not None:
+         desc = result[1]
+         for desc_field, deptype_mask in FIELDS.items():
+            if desc_field in desc:
+               for dep_str in desc [desc_field]:
+                  dep_strings.append ( ( dep_str, deptype_mask ) )
+   return dep_strings
+# --- end of get_dep_strings (...) ---
+
+def measure ( parse, dep_strings, rounds ):
+   """Returns the time (in seconds) needed for parsing all dep strings
+   <rounds> times.
+
+   arguments:
+   * parse       -- function ( dep_str, deptype_mask ) -> list of DepEnvs
+   * dep_strings --
+   * rounds      --
+   """
+   t_start = time.time()
+   for n in range ( rounds ):
+      for dep_str, deptype_mask in dep_strings:
+         parse ( dep_str, deptype_mask )
+   return time.time() - t_start
+# --- end of measure (...) ---
+
+def main():
+   args   = sys.argv[1:]
+   rounds = 1
+   if args and args[0] == '-n':
+      rounds = int ( args[1] )
+      args   = args[2:]
+
+   if not args:
+      sys.exit ( "Usage: depenv_benchmark [-n <rounds>] <file>..." )
+
+   setup()
+
+   import roverlay.stats.base
+   import roverlay.depres.depenv
+
+   DepEnv = roverlay.depres.depenv.DepEnv
+
+   dep_strings = get_dep_strings ( args )
+   num_deps    = rounds * len ( dep_strings )
+   print (
+      "{:d} dependency strings ({:d} unique), {:d} round(s)".format (
+         len ( dep_strings ), len ( set ( dep_strings ) ), rounds
+      )
+   )
+   if not dep_strings:
+      return
+
+   cache = roverlay.depres.depenv.DepEnvCache()
+   cache.stats = roverlay.stats.base.DepresStats()
+
+   t_uncached = measure (
+      lambda dep_str, deptype_mask: list (
+         DepEnv.from_str ( dep_str, deptype_mask )
+      ),
+      dep_strings, rounds
+   )
+   t_cached = measure ( cache.from_str, dep_strings, rounds )
+
+   for name, t in ( ( "uncached", t_uncached ), ( "cached", t_cached ) ):
+      print (
+         "{name:<10} {t:8.3f}s {us:8.2f}us/dep".format (
+            name=name, t=t, us=( 1000000.0 * t / num_deps )
+         )
+      )
+
+   print (
+      "cache entries: {n:d}, hit rate: {r:.2%}, speedup: {s:.2f}x".format (
+         n=len ( cache ), r=cache.get_hit_rate(),
+         s=( t_uncached / t_cached if t_cached else 0.0 )
+      )
+   )
+# --- end of main (...) ---
+
+
+if __name__ == '__main__':
+   main()
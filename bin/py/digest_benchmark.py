@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Usage: digest_benchmark [-j <jobs>] [-d <digest types>] <file|dir>...
+#
+#  Compares the digest backends of roverlay.util.hashpool by hashing the
+#  given package files (e.g. a CRAN mirror's src/contrib/*.tar.gz) with each
+#  backend. Directories are searched for *.tar.gz files (non-recursive).
+#  Digest types default to the ones used by Manifest files.
+#
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import roverlay.digest
+import roverlay.util.hashpool
+
+
+def get_files ( args ):
+   """Returns a list of files, searching directories for *.tar.gz files.
+
+   arguments:
+   * args --
+   """
+   files = list()
+   for arg in args:
+      if os.path.isdir ( arg ):
+         files.extend (
+            os.path.join ( arg, name )
+            for name in sorted ( os.listdir ( arg ) )
+               if name.endswith ( '.tar.gz' )
+         )
+      else:
+         files.append ( arg )
+   return files
+# --- end of get_files (...) ---
+
+def read_files ( files ):
+   """Reads all files once (so that each backend finds them in the page
+   cache) and returns the total size in bytes.
+
+   arguments:
+   * files --
+   """
+   size = 0
+   for filepath in files:
+      with open ( filepath, 'rb' ) as fh:
+         block = fh.read ( roverlay.digest.DEFAULT_BLOCKSIZE )
+         while block:
+            size += len ( block )
+            block = fh.read ( roverlay.digest.DEFAULT_BLOCKSIZE )
+   return size
+# --- end of read_files (...) ---
+
+def measure ( backend, files, digest_types, jobs ):
+   """Returns the time (in seconds) needed for hashing all files.
+
+   arguments:
+   * backend      -- backend name
+   * files        --
+   * digest_types --
+   * jobs         -- max number of worker threads/processes
+   """
+   hash_pool = roverlay.util.hashpool.HashPool (
+      digest_types, jobs, backend=backend
+   )
+   for filepath in files:
+      hash_pool.add ( filepath, filepath )
+
+   t_start = time.time()
+   hash_pool.run()
+   return time.time() - t_start
+# --- end of measure (...) ---
+
+def main():
+   args         = sys.argv[1:]
+   jobs         = None
+   digest_types = ( 'sha256', 'sha512', 'whirlpool', )
+
+   while len ( args ) > 1 and args[0] in { '-j', '-d' }:
+      if args[0] == '-j':
+         jobs = int ( args[1] )
+      else:
+         digest_types = args[1].replace ( ',', ' ' ).split()
+      args = args[2:]
+
+   files = get_files ( args )
+   if not files:
+      sys.exit (
+         "Usage: digest_benchmark [-j <jobs>] [-d <digest types>] <file>..."
+      )
+
+   # hash all files with each backend
+   roverlay.digest.set_digest_store ( None )
+
+   size_mib = read_files ( files ) / float ( 1024 * 1024 )
+   print (
+      "{n:d} files ({s:.1f} MiB), digest types: {d}, slow: {slow}".format (
+         n=len ( files ), s=size_mib, d=' '.join ( digest_types ),
+         slow=(
+            ' '.join ( sorted ( roverlay.digest.SLOW_DIGEST_TYPES ) )
+            or '<none>'
+         )
+      )
+   )
+
+   results = [
+      ( name, measure ( name, files, digest_types, jobs ) )
+      for name in sorted ( roverlay.util.hashpool.DIGEST_BACKENDS )
+   ]
+   t_inline = dict ( results ).get ( 'inline' )
+
+   for name, t in results:
+      print (
+         "{name:<10} {t:8.3f}s {mibs:8.2f}MiB/s {s:6.2f}x".format (
+            name=name, t=t, mibs=( size_mib / t if t else 0.0 ),
+            s=( t_inline / t if t and t_inline else 0.0 )
+         )
+      )
+# --- end of main (...) ---
+
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,135 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Usage: memory_benchmark [count]
+#
+#  Compares the memory usage of distmap entries and package info objects
+#  with a dict-based layout (as used before __slots__ were introduced).
+#
+from __future__ import print_function
+
+import gc
+import sys
+import tracemalloc
+
+import roverlay.core
+import roverlay.util.objects
+
+
+class DictDistMapInfo ( object ):
+   """dict-based distmap entry (previous layout)."""
+
+   def __init__ ( self, distfile, repo_name, repo_file, sha256 ):
+      super ( DictDistMapInfo, self ).__init__()
+      self.backrefs    = set()
+      self.add_backref = self.backrefs.add
+      self.repo_name   = repo_name
+      self.sha256      = sha256
+      self.volatile    = None
+      self.repo_file   = repo_file
+
+# --- end of DictDistMapInfo ---
+
+
+class DictPackageInfo ( object ):
+   """dict-based package info (previous layout)."""
+
+   def __init__ ( self ):
+      super ( DictPackageInfo, self ).__init__()
+      self._cached_selfref = roverlay.util.objects.SafeWeakRef ( self )
+      self.get_ref         = self._get_cached_ref
+      self._info           = dict()
+      self.readonly        = False
+      self.logger          = None
+      self.selfdeps        = None
+      self.hashdict        = dict()
+      self.depconf         = None
+      self.overlay_addition_override = None
+
+   def _get_cached_ref ( self ):
+      return self._cached_selfref
+
+# --- end of DictPackageInfo ---
+
+
+def setup():
+   roverlay.core.force_console_logging()
+
+   config_file = roverlay.core.locate_config_file ( False )
+   return roverlay.core.load_config_file (
+      config_file, setup_logger=False, extraconf={ 'installed': False, },
+   )
+# --- end of setup (...) ---
+
+def measure ( create, count ):
+   """Returns the number of bytes allocated per object.
+
+   arguments:
+   * create -- function that creates an object, gets the object index
+   * count  -- number of objects to create
+   """
+   gc.collect()
+   tracemalloc.start()
+   snapshot_before = tracemalloc.take_snapshot()
+   objects = [ create ( k ) for k in range ( count ) ]
+   snapshot_after = tracemalloc.take_snapshot()
+   tracemalloc.stop()
+
+   size = sum (
+      stat.size_diff for stat in
+         snapshot_after.compare_to ( snapshot_before, 'filename' )
+   )
+   del objects
+   return float ( size ) / count
+# --- end of measure (...) ---
+
+def print_result ( name, old_size, new_size ):
+   print (
+      "{name:<12} {old:8.1f} {new:8.1f} {saving:8.1f} bytes/object".format (
+         name=name, old=old_size, new=new_size, saving=( old_size - new_size )
+      )
+   )
+# --- end of print_result (...) ---
+
+def main():
+   count = int ( sys.argv[1] ) if len ( sys.argv ) > 1 else 100000
+   setup()
+
+   import roverlay.db.distmap
+   import roverlay.packageinfo
+
+   DistMapInfo = roverlay.db.distmap.DistMapInfo
+   PackageInfo = roverlay.packageinfo.PackageInfo
+
+   # keys/values are created in advance,
+   #  only the objects themselves are measured
+   distfiles  = [ "pkg{:d}_1.0.tar.gz".format ( k ) for k in range ( count ) ]
+   digest     = 64 * '0'
+
+   print ( "{:<12} {:>8} {:>8} {:>8}".format (
+      "", "dict", "slots", "saving"
+   ) )
+
+   print_result (
+      "DistMapInfo",
+      measure (
+         lambda k: DictDistMapInfo (
+            distfiles[k], 'CRAN', distfiles[k], digest
+         ),
+         count
+      ),
+      measure (
+         lambda k: DistMapInfo ( distfiles[k], 'CRAN', distfiles[k], digest ),
+         count
+      )
+   )
+
+   print_result (
+      "PackageInfo",
+      measure ( lambda k: DictPackageInfo(), count ),
+      measure ( lambda k: PackageInfo(), count )
+   )
+# --- end of main (...) ---
+
+
+if __name__ == '__main__':
+   main()
@@ -2,9 +2,45 @@
 
 import unittest
 
+import tests.changejournal
+import tests.depcache
+import tests.depenv
 import tests.depres
+import tests.depresbatch
+import tests.digeststore
+import tests.distmap
+import tests.distscan
+import tests.dryrun
+import tests.dynpool
+import tests.hashpool
+import tests.packagerules
+import tests.pkgindex
+import tests.repochanges
+import tests.repolist
+import tests.scanindex
+import tests.selfdepgraph
+import tests.streaming
+import tests.websync
+import tests.writeindex
+import tests.writequeue
 
 
 if __name__ == '__main__':
-   tests = tests.depres.suite()
+   tests = unittest.TestSuite (
+      (
+         tests.changejournal.suite(), tests.depcache.suite(),
+         tests.depenv.suite(),
+         tests.depres.suite(), tests.depresbatch.suite(),
+         tests.digeststore.suite(),
+         tests.distmap.suite(), tests.distscan.suite(),
+         tests.dryrun.suite(), tests.dynpool.suite(),
+         tests.hashpool.suite(),
+         tests.packagerules.suite(),
+         tests.pkgindex.suite(), tests.repochanges.suite(),
+         tests.repolist.suite(),
+         tests.scanindex.suite(), tests.selfdepgraph.suite(),
+         tests.streaming.suite(), tests.websync.suite(),
+         tests.writeindex.suite(), tests.writequeue.suite(),
+      )
+   )
    unittest.TextTestRunner ( verbosity=2 ).run ( tests )
@@ -426,6 +426,113 @@ class RoverlayArgumentParserBase ( roverlay.argutil.ArgumentParserProxy ):
          help="disable revbump feature (saves time)",
       )
 
+      arg (
+         '--paranoid-revbump', dest='paranoid_revbump',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help=(
+            'always compare checksums when checking for revbumps, even if '
+            'a package file\'s size, mtime and inode did not change'
+         ),
+      )
+
+      arg (
+         '--desc-cache', dest='desc_cache', default=True,
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help="cache DESCRIPTION data of unchanged package files",
+      )
+      arg (
+         '--no-desc-cache', dest='desc_cache',
+         flags=self.ARG_SHARED_INVERSE|self.ARG_OPT_OUT,
+         help="always read DESCRIPTION data from package files",
+      )
+      arg (
+         '--rebuild-desc-cache', dest='rebuild_desc_cache',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help="discard cached DESCRIPTION data and recreate the cache",
+      )
+
+      arg (
+         '--scan-index', dest='scan_index', default=True,
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help="do not parse unchanged ebuilds when scanning the overlay",
+      )
+      arg (
+         '--no-scan-index', dest='scan_index',
+         flags=self.ARG_SHARED_INVERSE|self.ARG_OPT_OUT,
+         help="parse all existing ebuilds when scanning the overlay",
+      )
+      arg (
+         '--rebuild-scan-index', dest='rebuild_scan_index',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help="parse all existing ebuilds and recreate the scan index",
+      )
+
+      arg (
+         '--digest-store', dest='digest_store',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help=(
+            'remember the digests of package files and distfiles and '
+            'do not hash unchanged files again'
+         ),
+      )
+      arg (
+         '--rebuild-digest-store', dest='rebuild_digest_store',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help="hash all files again and recreate the digest store",
+      )
+
+      arg (
+         '--write-index', dest='write_index', default=True,
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help=(
+            'do not rewrite ebuild, metadata.xml and Manifest files whose '
+            'content did not change'
+         ),
+      )
+      arg (
+         '--no-write-index', dest='write_index',
+         flags=self.ARG_SHARED_INVERSE|self.ARG_OPT_OUT,
+         help="always rewrite ebuild, metadata.xml and Manifest files",
+      )
+      arg (
+         '--rebuild-write-index', dest='rebuild_write_index',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help="rewrite all files and recreate the write index",
+      )
+
+      arg (
+         '--change-journal', dest='change_journal',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help=(
+            'skip package files that did not change since the last '
+            'incremental run (and packages not affected by them)'
+         ),
+      )
+      arg (
+         '--rebuild-change-journal', dest='rebuild_change_journal',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help="process all package files and recreate the change journal",
+      )
+
+      arg (
+         '--sync-changes-only', dest='sync_changes_only',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help=(
+            'check only package files that have been added or updated by '
+            'syncing since the last run with this option (rsync repos), '
+            'enables --change-journal'
+         ),
+      )
+
+      arg (
+         '--stream', dest='stream',
+         flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
+         help=(
+            'start ebuild creation while packages are being added '
+            '(requires EBUILD.jobcount > 0)'
+         ),
+      )
+
       arg (
          '--immediate-ebuild-writes', dest='immediate_ebuild_writes',
          flags=self.ARG_WITH_DEFAULT|self.ARG_OPT_IN,
@@ -946,6 +1053,33 @@ class RoverlayMainArgumentParser ( RoverlayArgumentParser ):
          ),
       )
 
+      arg (
+         '--dump-format', dest='dump_format', default='text',
+         flags=self.ARG_WITH_DEFAULT, choices=( 'text', 'jsonl' ),
+         help=(
+            'output format of the \'apply_rules\' command '
+            '(human-readable text or one JSON record per package)'
+         ),
+      )
+
+      arg (
+         '--dump-diff', dest='dump_diff', default=None,
+         flags=self.ARG_META_FILE, type=is_fs_file,
+         help=(
+            'compare the \'apply_rules\' results with a previous jsonl '
+            'output file and dump changed packages only (implies jsonl)'
+         ),
+      )
+
+      arg (
+         '--apply-rules-jobs', dest='apply_rules_jobs', default=1,
+         flags=self.ARG_WITH_DEFAULT, type=int, metavar='<jobs>',
+         help=(
+            'number of worker processes for evaluating package rules in '
+            'jsonl mode, 0 means one per CPU'
+         ),
+      )
+
       return arg
    # --- end of setup_additional_actions (...) ---
 # --- end of RoverlayMainArgumentParser ---
@@ -56,6 +56,12 @@ _CONSTANTS = dict (
       # otherwise => use N threads
       jobcount = 0,
 
+      # number of worker processes used for reading DESCRIPTION data
+      # when 0    => read DESCRIPTION data in the ebuild creation workers
+      # otherwise => read DESCRIPTION data of all queued packages
+      #              using N processes before creating ebuilds
+      process_jobs = 0,
+
       USE_EXPAND = dict (
          name   = 'R_SUGGESTS',
       ),
@@ -89,6 +95,22 @@ _CONSTANTS = dict (
 
    REPO = dict (
       websync_timeout = 10,
+      # max number of parallel downloads per websync repo
+      websync_jobs    = 4,
+      # max number of repos that are synced in parallel
+      sync_jobs       = 2,
+      # max number of directories that are read in parallel (distdir scan)
+      scan_jobs       = 4,
+   ),
+
+   DIGEST = dict (
+      # threads for hashlib digests, processes for slow digests
+      backend = 'auto',
+   ),
+
+   DIGEST_STORE = dict (
+      # digest types used by the distmap and Manifest files
+      digest_types = [ 'sha256', 'sha512', 'whirlpool', ],
    ),
 
    LICENSEMAP = dict (
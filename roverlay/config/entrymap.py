@@ -343,6 +343,73 @@ CONFIG_ENTRY_MAP = dict (
       want_dir_create = WANT_PRIVATE_FILEDIR | WANT_USERDIR,
    ),
 
+   overlay_distmap_backend = dict (
+      path        = [ 'OVERLAY', 'DISTMAP', 'backend', ],
+      description = 'distmap storage backend (file, sqlite)',
+      choices     = frozenset (( 'file', 'sqlite', )),
+   ),
+
+   overlay_distmap_sqlite_file = dict (
+      path        = [ 'OVERLAY', 'DISTMAP', 'sqlite_file', ],
+      value_type  = 'fs_file',
+      description = (
+         'distmap sqlite database (defaults to <cachedir>/distmap.sqlite)'
+      ),
+      want_dir_create = WANT_PRIVATE_FILEDIR | WANT_USERDIR,
+   ),
+
+   overlay_change_journal_compression = dict (
+      path        = [ 'OVERLAY', 'CHANGE_JOURNAL', 'compression', ],
+      description = 'change journal compression format ({})'.format (
+         ', '.join ( COMP_FORMATS )
+      ),
+      choices     = COMP_FORMATS,
+   ),
+
+   overlay_change_journal_file = dict (
+      path        = [ 'OVERLAY', 'CHANGE_JOURNAL', 'file', ],
+      value_type  = 'fs_file',
+      description = (
+         'package file change journal (defaults to '
+         '<cachedir>/change_journal.db)'
+      ),
+      want_dir_create = WANT_PRIVATE_FILEDIR | WANT_USERDIR,
+   ),
+
+   overlay_scan_index_compression = dict (
+      path        = [ 'OVERLAY', 'SCAN_INDEX', 'compression', ],
+      description = 'overlay scan index compression format ({})'.format (
+         ', '.join ( COMP_FORMATS )
+      ),
+      choices     = COMP_FORMATS,
+   ),
+
+   overlay_scan_index_file = dict (
+      path        = [ 'OVERLAY', 'SCAN_INDEX', 'file', ],
+      value_type  = 'fs_file',
+      description = (
+         'overlay scan index file (defaults to <cachedir>/scan_index.db)'
+      ),
+      want_dir_create = WANT_PRIVATE_FILEDIR | WANT_USERDIR,
+   ),
+
+   overlay_write_index_compression = dict (
+      path        = [ 'OVERLAY', 'WRITE_INDEX', 'compression', ],
+      description = 'overlay file write index compression format ({})'.format (
+         ', '.join ( COMP_FORMATS )
+      ),
+      choices     = COMP_FORMATS,
+   ),
+
+   overlay_write_index_file = dict (
+      path        = [ 'OVERLAY', 'WRITE_INDEX', 'file', ],
+      value_type  = 'fs_file',
+      description = (
+         'overlay file write index (defaults to <cachedir>/write_index.db)'
+      ),
+      want_dir_create = WANT_PRIVATE_FILEDIR | WANT_USERDIR,
+   ),
+
    overlay_masters = dict (
       path        = [ 'OVERLAY', 'masters', ],
       value_type  = 'list:str',
@@ -361,6 +428,11 @@ CONFIG_ENTRY_MAP = dict (
    distdir_verify            = 'overlay_distdir_verify',
    distmap_compression       = 'overlay_distmap_compression',
    distmap_file              = 'overlay_distmap_file',
+   distmap_backend           = 'overlay_distmap_backend',
+   distmap_sqlite_file       = 'overlay_distmap_sqlite_file',
+   change_journal_file       = 'overlay_change_journal_file',
+   scan_index_file           = 'overlay_scan_index_file',
+   write_index_file          = 'overlay_write_index_file',
 
    # --- overlay
 
@@ -371,6 +443,14 @@ CONFIG_ENTRY_MAP = dict (
       value_type  = str,
    ),
 
+   ebuild_process_jobs = dict (
+      path        = [ 'EBUILD', 'process_jobs', ],
+      description = (
+         'number of processes for reading DESCRIPTION data (0: disable)'
+      ),
+      value_type  = int,
+   ),
+
    ebuild_use_expand_desc = dict (
       path        = [ 'EBUILD', 'USE_EXPAND', 'desc_file', ],
       description = "USE_EXPAND flag description file",
@@ -394,6 +474,7 @@ CONFIG_ENTRY_MAP = dict (
 
    # * alias
    eapi              = 'ebuild_eapi',
+   process_jobs      = 'ebuild_process_jobs',
    use_expand_desc   = 'ebuild_use_expand_desc',
    use_expand_name   = 'ebuild_use_expand_name',
    use_expand_rename = 'ebuild_use_expand_rename',
@@ -436,10 +517,61 @@ CONFIG_ENTRY_MAP = dict (
       description = "timeout for websync repo connections (in seconds)"
    ),
 
+   websync_jobs = dict (
+      path        = [ 'REPO', 'websync_jobs' ],
+      value_type  = 'int',
+      description = "max number of parallel downloads per websync repo"
+   ),
+
+   repo_sync_jobs = dict (
+      path        = [ 'REPO', 'sync_jobs' ],
+      value_type  = 'int',
+      description = "max number of repos that are synced in parallel"
+   ),
+
+   repo_scan_jobs = dict (
+      path        = [ 'REPO', 'scan_jobs' ],
+      value_type  = 'int',
+      description = (
+         "max number of directories that are read in parallel "
+         "when scanning a repo's distfiles dir"
+      ),
+   ),
+
+   repo_listing_cache = dict (
+      path        = [ 'REPO', 'LISTING_CACHE', 'enabled' ],
+      value_type  = yesno,
+      description = (
+         'cache the directory listings of the repos\' distfiles dirs '
+         'and read only directories that have been modified'
+      ),
+   ),
+
+   repo_listing_cache_compression = dict (
+      path        = [ 'REPO', 'LISTING_CACHE', 'compression', ],
+      description = 'directory listing cache compression format ({})'.format (
+         ', '.join ( COMP_FORMATS )
+      ),
+      choices     = COMP_FORMATS,
+   ),
+
+   repo_listing_cache_file = dict (
+      path        = [ 'REPO', 'LISTING_CACHE', 'file', ],
+      value_type  = 'fs_file',
+      description = (
+         'directory listing cache file '
+         '(defaults to <cachedir>/distdir_listing.db)'
+      ),
+      want_dir_create = WANT_PRIVATE_FILEDIR | WANT_USERDIR,
+   ),
+
    # * alias
    distfiles        = 'distfiles_root',
    repo_config      = 'repo_config_files',
    repo_config_file = 'repo_config_files',
+   sync_jobs        = 'repo_sync_jobs',
+   scan_jobs        = 'repo_scan_jobs',
+   listing_cache    = 'repo_listing_cache',
 
    # --- remote
 
@@ -480,9 +612,37 @@ CONFIG_ENTRY_MAP = dict (
       want_dir_create = WANT_PRIVATE_FILEDIR | WANT_USERDIR,
    ),
 
+   description_cache_file = dict (
+      path        = [ 'DESCRIPTION', 'cache_file' ],
+      value_type  = 'fs_file',
+      description = (
+         'DESCRIPTION data cache file (defaults to <cachedir>/desc_cache.db)'
+      ),
+      want_dir_create = WANT_PRIVATE_FILEDIR,
+   ),
+
+   description_cache_compression = dict (
+      path        = [ 'DESCRIPTION', 'cache_compression' ],
+      description = 'DESCRIPTION data cache compression format ({})'.format (
+         ', '.join ( COMP_FORMATS )
+      ),
+      choices     = COMP_FORMATS,
+   ),
+
+   description_use_package_index = dict (
+      path        = [ 'DESCRIPTION', 'use_package_index' ],
+      value_type  = yesno,
+      description = (
+         'read DESCRIPTION data from the repos\' PACKAGES files '
+         '(if possible) instead of extracting it from package files'
+      ),
+   ),
+
    # * alias
    description_dir = 'description_descfiles_dir',
+   desc_cache_file = 'description_cache_file',
    field_definition = 'field_definition_file',
+   use_package_index = 'description_use_package_index',
 
    # --- description reader
 
@@ -616,6 +776,50 @@ CONFIG_ENTRY_MAP = dict (
       want_dir_create = WANT_PRIVATE_DIR | WANT_USERDIR,
    ),
 
+   digest_backend = dict (
+      path        = [ 'DIGEST', 'backend', ],
+      description = (
+         'digest backend for calculating digests of many files '
+         '(auto, inline, thread, process)'
+      ),
+      choices     = frozenset (( 'auto', 'inline', 'thread', 'process', )),
+   ),
+
+   digest_jobs = dict (
+      path        = [ 'DIGEST', 'jobs', ],
+      value_type  = 'int',
+      description = (
+         'max number of worker threads/processes for calculating the '
+         'digests of package files before writing Manifest files'
+      ),
+   ),
+
+   digest_store_compression = dict (
+      path        = [ 'DIGEST_STORE', 'compression', ],
+      description = 'digest store compression format ({})'.format (
+         ', '.join ( COMP_FORMATS )
+      ),
+      choices     = COMP_FORMATS,
+   ),
+
+   digest_store_digest_types = dict (
+      path        = [ 'DIGEST_STORE', 'digest_types', ],
+      value_type  = 'list:str',
+      description = (
+         'digest types that are always calculated when a file has to be '
+         'read (digest store)'
+      ),
+   ),
+
+   digest_store_file = dict (
+      path        = [ 'DIGEST_STORE', 'file', ],
+      value_type  = 'fs_file',
+      description = (
+         'digest store file (defaults to <cachedir>/digest_store.db)'
+      ),
+      want_dir_create = WANT_PRIVATE_FILEDIR | WANT_USERDIR,
+   ),
+
    nosync = dict (
       value_type  = yesno,
       description = 'forbid/allow syncing with remotes',
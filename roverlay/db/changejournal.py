@@ -0,0 +1,388 @@
+# R overlay -- db, package file change journal
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""package file change journal
+
+This module provides a persistent journal that remembers the package files
+processed in previous (incremental) runs, which allows to skip unchanged
+package files whose ebuilds (if any) are already in the overlay.
+
+A journal entry consists of the package file's stat key (device, inode,
+size, mtime) and digest (if known), its package name, whether ebuild
+creation failed, the path to its ebuild file (if any) and the names of the
+packages it depends on. A package file has to be processed again if
+* it is new or its stat key changed (and, if known, its digest)
+* its ebuild file does not exist anymore
+* the journal's fingerprint (package rules, dependency rules, config)
+  does not match
+* a package file with the same package name is new, changed or removed
+* it depends on a package that has to be processed again (reverse selfdeps)
+* ebuild creation failed and a package that depends on it has to be
+  processed again
+"""
+
+import collections
+import os
+
+import roverlay.digest
+import roverlay.db.distmap
+import roverlay.util.common
+import roverlay.util.fileio
+
+
+__all__ = [ 'ChangeJournal', ]
+
+
+class ChangeJournalEntry ( object ):
+
+   __slots__ = [
+      'stat_key', 'digest', 'name', 'failed', 'ebuild_file', 'depnames'
+   ]
+
+   @classmethod
+   def from_file ( cls, filepath, name ):
+      """Creates a new entry for the given file.
+      Returns None if the file cannot be stat'ed.
+
+      arguments:
+      * filepath --
+      * name     -- package name
+      """
+      stat_key = roverlay.util.common.get_file_stat_key ( filepath )
+      return None if stat_key is None else cls ( stat_key, None, name )
+   # --- end of from_file (...) ---
+
+   def __init__ ( self,
+      stat_key, digest, name, failed=False, ebuild_file=None, depnames=None
+   ):
+      super ( ChangeJournalEntry, self ).__init__()
+      self.stat_key    = stat_key
+      self.digest      = digest
+      self.name        = name
+      self.failed      = failed
+      self.ebuild_file = ebuild_file
+      self.depnames    = depnames or frozenset()
+   # --- end of __init__ (...) ---
+
+   def same_file_key ( self, other ):
+      return self.stat_key == other.stat_key
+   # --- end of same_file_key (...) ---
+
+   def has_ebuild ( self ):
+      """Returns False if this entry refers to an ebuild file that does
+      not exist (anymore), else True."""
+      return (
+         self.failed or not self.ebuild_file
+         or os.path.isfile ( self.ebuild_file )
+      )
+   # --- end of has_ebuild (...) ---
+
+   def to_str ( self, filepath, field_delimiter ):
+      return field_delimiter.join ((
+         filepath, self.stat_key, ( self.digest or '' ), self.name,
+         ( '1' if self.failed else '0' ), ( self.ebuild_file or '' ),
+         ','.join ( sorted ( self.depnames ) )
+      ))
+   # --- end of to_str (...) ---
+
+# --- end of ChangeJournalEntry ---
+
+
+class ChangeJournal ( roverlay.util.fileio.TextFile ):
+   """A package file change journal that is read from / written to a file."""
+
+   DIGEST_TYPE     = roverlay.db.distmap.DistMapInfo.DIGEST_TYPE
+
+   FIELD_DELIMITER = '\t'
+   HEADER_PREFIX   = '# change journal'
+
+   # file format (increase this when changing the entry format)
+   FILE_FORMAT     = '1'
+
+   @classmethod
+   def get_default_compression ( cls ):
+      return "gzip" if cls.check_compression_supported ( "gzip" ) else None
+   # --- end of get_default_compression (...) ---
+
+   @classmethod
+   def normalize_path ( cls, filepath ):
+      return os.path.normpath ( filepath )
+   # --- end of normalize_path (...) ---
+
+   def __init__ ( self,
+      journal_file, journal_compression=None, name_separator='_',
+      read_now=True
+   ):
+      """Constructor for a package file change journal.
+
+      arguments:
+      * journal_file        -- journal file
+      * journal_compression -- journal file compression format
+      * name_separator      -- package name, version separator
+                               in package file names
+      * read_now            -- read the journal file now (defaults to True),
+                               set to False to process all package files
+      """
+      super ( ChangeJournal, self ).__init__ (
+         filepath=journal_file, compression=journal_compression
+      )
+      self.name_separator = name_separator
+
+      # the fingerprint of the journal file and the current one
+      self.old_fingerprint = None
+      self.fingerprint     = None
+
+      # map: package file => entry, as read from the journal file
+      self._entries     = dict()
+      # map: package file => entry, entries for the current run
+      #  (set up in prepare())
+      self._new_entries = None
+      # set of package files that can be skipped (set up in prepare())
+      self._unchanged   = frozenset()
+
+      if read_now:
+         self.try_read()
+      self.set_dirty()
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._entries )
+   # --- end of __len__ (...) ---
+
+   def get_header ( self ):
+      return "{prefix} {fmt} {fingerprint}".format (
+         prefix=self.HEADER_PREFIX, fmt=self.FILE_FORMAT,
+         fingerprint=self.fingerprint
+      )
+   # --- end of get_header (...) ---
+
+   def parse_header_line ( self, line ):
+      prefix, sepa, fingerprint = line.rpartition ( ' ' )
+      if sepa and prefix == (
+         self.HEADER_PREFIX + ' ' + self.FILE_FORMAT
+      ):
+         self.old_fingerprint = fingerprint
+      else:
+         self.old_fingerprint = None
+   # --- end of parse_header_line (...) ---
+
+   def parse_line ( self, line ):
+      if self.old_fingerprint is not None:
+         filepath, stat_key, digest, name, failed, efile, depnames = (
+            line.split ( self.FIELD_DELIMITER, 6 )
+         )
+         self._entries [filepath] = ChangeJournalEntry (
+            stat_key, ( digest or None ), name, ( failed == '1' ),
+            ( efile or None ),
+            frozenset ( depnames.split ( ',' ) ) if depnames else None
+         )
+   # --- end of parse_line (...) ---
+
+   def gen_lines ( self ):
+      """Generator that creates journal file text lines.
+
+      Only entries of package files that have been seen in the current run
+      are written.
+      """
+      delim = self.FIELD_DELIMITER
+
+      yield self.get_header()
+      if self._new_entries:
+         for filepath, entry in sorted ( self._new_entries.items() ):
+            yield entry.to_str ( filepath, delim )
+   # --- end of gen_lines (...) ---
+
+   def get_package_name ( self, filepath ):
+      """Returns the (lowercase) package name of the given package file.
+
+      arguments:
+      * filepath --
+      """
+      return os.path.basename ( filepath ).partition (
+         self.name_separator
+      )[0].lower()
+   # --- end of get_package_name (...) ---
+
+   def get_package_files ( self, fingerprint ):
+      """Returns a list of all package files listed in the journal file
+      if it has been created with the given fingerprint, else None.
+
+      arguments:
+      * fingerprint -- fingerprint of the package rules, dependency rules
+                       and config (str)
+      """
+      if self.old_fingerprint is None or self.old_fingerprint != fingerprint:
+         return None
+      else:
+         return list ( self._entries )
+   # --- end of get_package_files (...) ---
+
+   def _check_digest ( self, filepath, old_entry, new_entry ):
+      """Compares the digest of a package file whose stat key changed
+      with the journal entry's digest.
+
+      Returns True if the digest is known and did not change, else False.
+      Updates new_entry's digest (if known).
+      """
+      if not old_entry.digest:
+         return False
+
+      digest = roverlay.digest.get_file_digest ( filepath, self.DIGEST_TYPE )
+      new_entry.digest = digest
+      return digest == old_entry.digest
+   # --- end of _check_digest (...) ---
+
+   def prepare ( self, fingerprint, package_files ):
+      """Determines which package files have to be processed.
+
+      Returns the number of package files that can be skipped.
+
+      arguments:
+      * fingerprint   -- fingerprint of the package rules, dependency rules
+                         and config (str)
+      * package_files -- iterable with all package files of this run
+      """
+      self.fingerprint = fingerprint
+      if self.old_fingerprint != fingerprint:
+         self._entries.clear()
+
+      old_entries   = self._entries
+      new_entries   = dict()
+      # set of package names that have to be processed again
+      changed_names = set()
+      # map: package name => names of packages it depends on
+      #  (as known from the previous run)
+      deps          = collections.defaultdict ( set )
+      # map: dep name => names of packages that depend on it
+      rdeps         = collections.defaultdict ( set )
+      # set of package names whose ebuild creation failed (unchanged files)
+      failed_names  = set()
+
+      for filepath in package_files:
+         filepath  = self.normalize_path ( filepath )
+         name      = self.get_package_name ( filepath )
+         old_entry = old_entries.get ( filepath )
+         new_entry = ChangeJournalEntry.from_file ( filepath, name )
+
+         if new_entry is None:
+            # file vanished
+            changed_names.add ( name )
+            continue
+
+         if old_entry is None:
+            changed_names.add ( name )
+            new_entries [filepath] = new_entry
+            continue
+
+         deps [name].update ( old_entry.depnames )
+         for depname in old_entry.depnames:
+            rdeps [depname].add ( name )
+
+         if not old_entry.has_ebuild():
+            # ebuild file removed from the overlay
+            changed_names.add ( name )
+
+         elif (
+            old_entry.same_file_key ( new_entry )
+            or self._check_digest ( filepath, old_entry, new_entry )
+         ):
+            # unchanged, keep entry (except for the stat key)
+            new_entry.digest      = old_entry.digest
+            new_entry.failed      = old_entry.failed
+            new_entry.ebuild_file = old_entry.ebuild_file
+            new_entry.depnames    = old_entry.depnames
+
+            if old_entry.failed:
+               failed_names.add ( name )
+
+         else:
+            changed_names.add ( name )
+
+         new_entries [filepath] = new_entry
+      # -- end for
+
+      # removed package files
+      for filepath, old_entry in old_entries.items():
+         if filepath not in new_entries:
+            changed_names.add ( old_entry.name )
+
+      # add reverse selfdeps and failed selfdeps of packages
+      #  that have to be processed again
+      todo = list ( changed_names )
+      while todo:
+         name = todo.pop()
+
+         more_names = set ( rdeps.get ( name, () ) )
+         more_names.update ( failed_names & deps.get ( name, set() ) )
+
+         for more_name in more_names:
+            if more_name not in changed_names:
+               changed_names.add ( more_name )
+               todo.append ( more_name )
+      # -- end while
+
+      self._new_entries = new_entries
+      self._unchanged   = frozenset (
+         filepath for filepath, entry in new_entries.items()
+         if entry.name not in changed_names and filepath in old_entries
+      )
+      self._entries     = dict()
+      self.set_dirty()
+
+      return len ( self._unchanged )
+   # --- end of prepare (...) ---
+
+   def is_unchanged ( self, filepath ):
+      """Returns True if the given package file can be skipped, else False.
+
+      arguments:
+      * filepath --
+      """
+      return self.normalize_path ( filepath ) in self._unchanged
+   # --- end of is_unchanged (...) ---
+
+   def get_changed_files ( self ):
+      """Returns a set of all package files that have to be processed
+      (see prepare())."""
+      return set ( self._new_entries or () ) - self._unchanged
+   # --- end of get_changed_files (...) ---
+
+   def record ( self,
+      filepath, failed, depnames, digest=None, ebuild_file=None
+   ):
+      """Updates the entry of a package file that has been processed.
+
+      arguments:
+      * filepath    -- package file
+      * failed      -- whether ebuild creation failed
+      * depnames    -- iterable with (lowercase) names of packages that this
+                       package depends on
+      * digest      -- package file digest or None (unknown)
+      * ebuild_file -- path to the package's ebuild file in the overlay
+                       or None (no ebuild)
+      """
+      filepath = self.normalize_path ( filepath )
+      entry    = self._new_entries.get ( filepath )
+
+      if entry is None:
+         entry = ChangeJournalEntry.from_file (
+            filepath, self.get_package_name ( filepath )
+         )
+         if entry is None:
+            return False
+         self._new_entries [filepath] = entry
+
+      entry.failed      = bool ( failed )
+      entry.ebuild_file = ebuild_file
+      entry.depnames    = frozenset ( depnames )
+      if digest:
+         entry.digest = digest
+
+      self.set_dirty()
+      return True
+   # --- end of record (...) ---
+
+# --- end of ChangeJournal ---
@@ -0,0 +1,252 @@
+# R overlay -- db, ( package file ) => ( DESCRIPTION data ) cache
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""DESCRIPTION data cache
+
+This module provides a persistent cache for the data read from
+R package files (DESCRIPTION data), which saves the costly tarball
+decompression for unchanged package files.
+
+Cache entries are keyed by the package file path and are valid as long as
+the file's size and mtime (and, if known, its distmap digest) match.
+The cache file header stores a fingerprint of the description reader's
+configuration (field definition, license map, ...). All entries get
+discarded if the fingerprint does not match.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import roverlay.db.distmap
+import roverlay.util.common
+import roverlay.util.fileio
+import roverlay.stats.collector
+
+
+__all__ = [ 'DescriptionCache', 'make_fingerprint', ]
+
+
+def make_fingerprint ( values, files ):
+   """Returns a str that identifies the given config values and files.
+
+   arguments:
+   * values -- iterable of config values (str, list of str, None, ...)
+   * files  -- iterable of file paths (or None).
+               A file's stat key (see roverlay.util.common) is part of
+               the fingerprint.
+   """
+   fingerprint = hashlib.md5()
+
+   for value in values:
+      fingerprint.update ( repr ( value ).encode ( 'utf-8' ) )
+
+   for filepath in files:
+      if filepath:
+         fstr = "{}:{}".format (
+            filepath,
+            roverlay.util.common.get_file_stat_key ( filepath ) or 'missing'
+         )
+         fingerprint.update ( fstr.encode ( 'utf-8' ) )
+
+   return fingerprint.hexdigest()
+# --- end of make_fingerprint (...) ---
+
+
+class DescriptionCache ( roverlay.util.fileio.TextFile ):
+   """A DESCRIPTION data cache that is read from / written to a file."""
+
+   STATS = roverlay.stats.collector.static.desc_cache
+
+   DIGEST_TYPE     = roverlay.db.distmap.DistMapInfo.DIGEST_TYPE
+
+   FIELD_DELIMITER = '\t'
+   HEADER_PREFIX   = '# desc cache'
+
+   # file format (increase this when changing the desc data format)
+   FILE_FORMAT     = '1'
+
+   @classmethod
+   def get_default_compression ( cls ):
+      return "gzip" if cls.check_compression_supported ( "gzip" ) else None
+   # --- end of get_default_compression (...) ---
+
+   def __init__ ( self,
+      cache_file, fingerprint, cache_compression=None, ignore_missing=True,
+      read_now=True
+   ):
+      """Constructor for a DESCRIPTION data cache.
+
+      arguments:
+      * cache_file        -- cache file
+      * fingerprint       -- description reader config fingerprint (str),
+                             see make_fingerprint()
+      * cache_compression -- cache file compression format (None: disable)
+      * ignore_missing    -- do not fail if cache file does not exist
+      * read_now          -- read the cache file now (defaults to True),
+                             set to False to rebuild the cache
+      """
+      super ( DescriptionCache, self ).__init__ (
+         filepath=cache_file, compression=cache_compression
+      )
+      self.fingerprint = fingerprint
+      self.stats       = self.__class__.STATS
+
+      # map: package file => ( file stat key, digest, data str )
+      self._entries    = dict()
+      self._lock       = threading.Lock()
+      self._ignore_all = False
+
+      if not read_now:
+         self.set_dirty()
+      elif ignore_missing:
+         if not self.try_read():
+            self.set_dirty()
+      else:
+         self.read()
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._entries )
+   # --- end of __len__ (...) ---
+
+   def get_header ( self ):
+      return "{prefix} {fmt} {fingerprint}".format (
+         prefix=self.HEADER_PREFIX, fmt=self.FILE_FORMAT,
+         fingerprint=self.fingerprint
+      )
+   # --- end of get_header (...) ---
+
+   def start_reading ( self ):
+      self._ignore_all = False
+   # --- end of start_reading (...) ---
+
+   def done_reading ( self ):
+      if self._ignore_all:
+         # outdated cache file, has to be rewritten
+         self._ignore_all = False
+         self.set_dirty()
+   # --- end of done_reading (...) ---
+
+   def parse_header_line ( self, line ):
+      if line != self.get_header():
+         self._ignore_all = True
+   # --- end of parse_header_line (...) ---
+
+   def parse_line ( self, line ):
+      if not self._ignore_all:
+         filepath, stat_key, digest, data = line.split (
+            self.FIELD_DELIMITER, 3
+         )
+         self._entries [filepath] = ( stat_key, digest or None, data )
+   # --- end of parse_line (...) ---
+
+   def gen_lines ( self ):
+      """Generator that creates cache file text lines.
+
+      Entries whose package file does not exist anymore are dropped.
+      """
+      delim = self.FIELD_DELIMITER
+
+      yield self.get_header()
+      with self._lock:
+         for filepath, entry in sorted ( self._entries.items() ):
+            if os.path.isfile ( filepath ):
+               yield delim.join ( (
+                  filepath, entry[0], ( entry[1] or '' ), entry[2]
+               ) )
+   # --- end of gen_lines (...) ---
+
+   def _get_package_digest ( self, package_info ):
+      hashdict = getattr ( package_info, 'hashdict', None )
+      return hashdict.get ( self.DIGEST_TYPE ) if hashdict else None
+   # --- end of _get_package_digest (...) ---
+
+   def _get_valid_entry ( self, package_info ):
+      """Returns the cache entry for the given package if it is still valid,
+      else None.
+
+      arguments:
+      * package_info --
+      """
+      filepath = package_info ['package_file']
+
+      with self._lock:
+         entry = self._entries.get ( filepath )
+
+      if entry is not None:
+         digest = self._get_package_digest ( package_info )
+
+         if (
+            entry[0] == roverlay.util.common.get_file_stat_key ( filepath )
+            and ( not digest or not entry[1] or digest == entry[1] )
+         ):
+            return entry
+
+      return None
+   # --- end of _get_valid_entry (...) ---
+
+   def has_valid_entry ( self, package_info ):
+      """Returns True if DESCRIPTION data is cached for the given package,
+      else False. Does not count as cache hit/miss.
+
+      arguments:
+      * package_info --
+      """
+      return self._get_valid_entry ( package_info ) is not None
+   # --- end of has_valid_entry (...) ---
+
+   def lookup ( self, package_info ):
+      """Returns the cached DESCRIPTION data for the given package,
+      or None if not cached / outdated.
+
+      The returned data are not shared with the cache (a new dict is
+      created for each lookup).
+
+      arguments:
+      * package_info --
+      """
+      entry = self._get_valid_entry ( package_info )
+
+      if entry is None:
+         self.stats.cache_misses.inc()
+         return None
+      else:
+         self.stats.cache_hits.inc()
+         return json.loads ( entry[2] )
+   # --- end of lookup (...) ---
+
+   def store ( self, package_info, desc_data ):
+      """Adds DESCRIPTION data to the cache.
+
+      Returns True if the data has been added, else False (package file
+      does not exist).
+
+      arguments:
+      * package_info --
+      * desc_data    -- DESCRIPTION data (dict)
+      """
+      filepath = package_info ['package_file']
+      stat_key = roverlay.util.common.get_file_stat_key ( filepath )
+
+      if stat_key is None:
+         return False
+
+      entry = (
+         stat_key,
+         self._get_package_digest ( package_info ),
+         json.dumps ( desc_data, sort_keys=True )
+      )
+
+      with self._lock:
+         self._entries [filepath] = entry
+         self.set_dirty()
+
+      return True
+   # --- end of store (...) ---
+
+# --- end of DescriptionCache ---
@@ -0,0 +1,198 @@
+# R overlay -- db, digest store
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""digest store
+
+This module provides a persistent store of file digests. Entries are keyed
+by the file's device, inode, size and mtime (in nanoseconds) and hold every
+digest type that has been calculated for the file, so that a file has to be
+read at most once as long as it does not change, no matter which part of
+roverlay (distmap, Manifest, websync) requests which digest type.
+
+The store is accessed via roverlay.digest (see get_file_digests()).
+"""
+
+import threading
+
+import roverlay.util.common
+import roverlay.util.fileio
+
+
+__all__ = [ 'DigestStore', ]
+
+
+class DigestStoreEntry ( object ):
+
+   __slots__ = [ 'filepath', 'hashdict' ]
+
+   def __init__ ( self, filepath, hashdict ):
+      super ( DigestStoreEntry, self ).__init__()
+      self.filepath = filepath
+      self.hashdict = hashdict
+   # --- end of __init__ (...) ---
+
+# --- end of DigestStoreEntry ---
+
+
+class DigestStore ( roverlay.util.fileio.TextFile ):
+   """A digest store that is read from / written to a file."""
+
+   FIELD_DELIMITER = '\t'
+   HEADER_PREFIX   = '# digest store'
+
+   # file format (increase this when changing the entry format)
+   FILE_FORMAT     = '0'
+
+   @classmethod
+   def get_default_compression ( cls ):
+      return "gzip" if cls.check_compression_supported ( "gzip" ) else None
+   # --- end of get_default_compression (...) ---
+
+   def __init__ ( self,
+      store_file, store_compression=None, digest_types=None, read_now=True
+   ):
+      """Constructor for a digest store.
+
+      arguments:
+      * store_file        -- store file
+      * store_compression -- store file compression format
+      * digest_types      -- digest types that should be calculated whenever
+                             a file has to be read (in addition to the
+                             requested ones). Defaults to None (none).
+      * read_now          -- read the store file now (defaults to True),
+                             set to False to hash all files again
+      """
+      super ( DigestStore, self ).__init__ (
+         filepath=store_file, compression=store_compression
+      )
+
+      self.digest_types = frozenset ( digest_types or () )
+
+      # whether the store file's format is supported
+      self._format_ok = False
+      # map: stat key => entry
+      self._entries   = dict()
+      # stat keys of entries that have been accessed in this run
+      self._used      = set()
+      # the store is accessed by hash worker threads
+      self._lock      = threading.Lock()
+
+      if read_now:
+         self.try_read()
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._entries )
+   # --- end of __len__ (...) ---
+
+   def get_header ( self ):
+      return self.HEADER_PREFIX + ' ' + self.FILE_FORMAT
+   # --- end of get_header (...) ---
+
+   def parse_header_line ( self, line ):
+      self._format_ok = ( line == self.get_header() )
+   # --- end of parse_header_line (...) ---
+
+   def parse_line ( self, line ):
+      if self._format_ok:
+         stat_key, sep, remainder = line.partition ( self.FIELD_DELIMITER )
+         filepath, sep, hashes    = remainder.rpartition (
+            self.FIELD_DELIMITER
+         )
+         hashdict = dict()
+         for item in hashes.split():
+            digest_type, sep, digest = item.partition ( '=' )
+            if sep:
+               hashdict [digest_type] = digest
+
+         self._entries [stat_key] = DigestStoreEntry ( filepath, hashdict )
+   # --- end of parse_line (...) ---
+
+   def gen_lines ( self ):
+      """Generator that creates store file text lines.
+
+      Entries that have not been accessed in this run are only written
+      if their file did not change.
+      """
+      delim             = self.FIELD_DELIMITER
+      get_file_stat_key = roverlay.util.common.get_file_stat_key
+
+      yield self.get_header()
+      for stat_key, entry in sorted ( self._entries.items() ):
+         if (
+            stat_key in self._used
+            or get_file_stat_key ( entry.filepath ) == stat_key
+         ):
+            yield delim.join ((
+               stat_key, entry.filepath,
+               ' '.join (
+                  k + '=' + v for k, v in sorted ( entry.hashdict.items() )
+               )
+            ))
+   # --- end of gen_lines (...) ---
+
+   def lookup ( self, filepath ):
+      """Returns a 2-tuple ( stat key, hashdict ) for the given file,
+      where hashdict is a (new) dict containing all known digests of the
+      file. The stat key is None if the file cannot be stat'ed.
+
+      arguments:
+      * filepath --
+      """
+      stat_key = roverlay.util.common.get_file_stat_key ( filepath )
+      if stat_key is None:
+         return ( None, dict() )
+
+      with self._lock:
+         entry = self._entries.get ( stat_key )
+         if entry is None:
+            return ( stat_key, dict() )
+         else:
+            self._used.add ( stat_key )
+            return ( stat_key, dict ( entry.hashdict ) )
+   # --- end of lookup (...) ---
+
+   def record ( self, stat_key, filepath, hashdict ):
+      """Adds digests of a file.
+
+      arguments:
+      * stat_key -- stat key of the file before it has been read
+                    (see lookup()), does nothing if None
+      * filepath --
+      * hashdict -- dict ( digest type => hex digest )
+      """
+      if stat_key is None or not hashdict:
+         return
+
+      with self._lock:
+         entry = self._entries.get ( stat_key )
+         if entry is None:
+            self._entries [stat_key] = DigestStoreEntry (
+               filepath, dict ( hashdict )
+            )
+         else:
+            entry.filepath = filepath
+            entry.hashdict.update ( hashdict )
+         self._used.add ( stat_key )
+
+      self.set_dirty()
+   # --- end of record (...) ---
+
+   def record_file ( self, filepath, hashdict ):
+      """Adds digests of a file that has not been modified since
+      calculating the digests (e.g. a file that has just been written).
+
+      arguments:
+      * filepath --
+      * hashdict -- dict ( digest type => hex digest )
+      """
+      self.record (
+         roverlay.util.common.get_file_stat_key ( filepath ),
+         filepath, hashdict
+      )
+   # --- end of record_file (...) ---
+
+# --- end of DigestStore ---
@@ -0,0 +1,178 @@
+# R overlay -- db, directory listing cache
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""directory listing cache
+
+This module provides a persistent cache of directory listings, which is
+used when scanning the distfiles dirs of repos. Each entry maps a directory
+to its stat info (device, inode, size, mtime), the names of the
+files in it and the names of its (non-symlink) subdirectories.
+A directory whose stat info did not change does not have to be read again.
+
+Note that a directory's mtime only reflects changes of its direct entries,
+so subdirectories have to be checked individually.
+"""
+
+import os
+import threading
+
+import roverlay.util.common
+import roverlay.util.fileio
+
+
+__all__ = [ 'DirListingCache', ]
+
+
+class DirListingCache ( roverlay.util.fileio.TextFile ):
+   """A directory listing cache that is read from / written to a file."""
+
+   FIELD_DELIMITER = '\t'
+   # "/" cannot be part of a file name
+   NAME_DELIMITER  = '/'
+   HEADER_PREFIX   = '# dir listing cache'
+
+   # file format (increase this when changing the entry format)
+   FILE_FORMAT     = '0'
+
+   @classmethod
+   def get_default_compression ( cls ):
+      return "gzip" if cls.check_compression_supported ( "gzip" ) else None
+   # --- end of get_default_compression (...) ---
+
+   def __init__ ( self, cache_file, cache_compression=None, read_now=True ):
+      """Constructor for a directory listing cache.
+
+      arguments:
+      * cache_file        -- cache file
+      * cache_compression -- cache file compression format
+      * read_now          -- read the cache file now (defaults to True),
+                             set to False to read all directories
+      """
+      super ( DirListingCache, self ).__init__ (
+         filepath=cache_file, compression=cache_compression
+      )
+
+      # whether the cache file's format is supported
+      self._format_ok = False
+      # map: dirpath => 3-tuple ( stat key, filenames, subdirs )
+      self._entries   = dict()
+      # entries are looked up/recorded by the scanner's worker threads
+      self._lock      = threading.Lock()
+
+      if read_now:
+         self.try_read()
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._entries )
+   # --- end of __len__ (...) ---
+
+   def get_header ( self ):
+      return self.HEADER_PREFIX + ' ' + self.FILE_FORMAT
+   # --- end of get_header (...) ---
+
+   def parse_header_line ( self, line ):
+      self._format_ok = ( line == self.get_header() )
+   # --- end of parse_header_line (...) ---
+
+   def parse_line ( self, line ):
+      if self._format_ok:
+         dirpath, stat_key, filenames, subdirs = (
+            line.rsplit ( self.FIELD_DELIMITER, 3 )
+         )
+         self._entries [dirpath] = (
+            stat_key,
+            tuple ( filenames.split ( self.NAME_DELIMITER ) )
+               if filenames else (),
+            tuple ( subdirs.split ( self.NAME_DELIMITER ) )
+               if subdirs else (),
+         )
+   # --- end of parse_line (...) ---
+
+   def gen_lines ( self ):
+      """Generator that creates cache file text lines."""
+      delim      = self.FIELD_DELIMITER
+      name_delim = self.NAME_DELIMITER
+
+      yield self.get_header()
+      for dirpath, entry in sorted ( self._entries.items() ):
+         stat_key, filenames, subdirs = entry
+         yield delim.join ((
+            dirpath, stat_key,
+            name_delim.join ( filenames ), name_delim.join ( subdirs )
+         ))
+   # --- end of gen_lines (...) ---
+
+   def get_stat_key ( self, dirpath ):
+      """Returns the stat key of a directory (or None).
+
+      arguments:
+      * dirpath --
+      """
+      return roverlay.util.common.get_file_stat_key ( dirpath )
+   # --- end of get_stat_key (...) ---
+
+   def lookup ( self, dirpath, stat_key ):
+      """Returns the listing of a directory as 2-tuple of lists
+      ( filenames, subdirs ) if the directory did not change since it has
+      been cached, else None.
+
+      arguments:
+      * dirpath  --
+      * stat_key -- current stat key of the directory, see get_stat_key()
+      """
+      with self._lock:
+         entry = self._entries.get ( dirpath )
+
+      if entry is None or stat_key is None or entry[0] != stat_key:
+         return None
+      else:
+         # copy, callers may modify the lists
+         return ( list ( entry[1] ), list ( entry[2] ) )
+   # --- end of lookup (...) ---
+
+   def record ( self, dirpath, stat_key, filenames, subdirs ):
+      """Adds/replaces the listing of a directory.
+
+      arguments:
+      * dirpath   --
+      * stat_key  -- stat key of the directory before reading it
+      * filenames -- names of the files in the directory
+      * subdirs   -- names of the subdirectories that should be visited
+      """
+      if stat_key is not None:
+         with self._lock:
+            self._entries [dirpath] = (
+               stat_key, tuple ( filenames ), tuple ( subdirs )
+            )
+         self.set_dirty()
+   # --- end of record (...) ---
+
+   def retain_subtree ( self, root, dirpaths ):
+      """Removes the entries of all directories in the given tree
+      that are not listed in dirpaths (e.g. deleted directories).
+
+      arguments:
+      * root     -- root directory of the tree
+      * dirpaths -- set of directories that should be kept
+      """
+      prefix = os.path.join ( root, '' )
+      with self._lock:
+         stale = [
+            dirpath for dirpath in self._entries
+            if (
+               ( dirpath == root or dirpath.startswith ( prefix ) )
+               and dirpath not in dirpaths
+            )
+         ]
+         for dirpath in stale:
+            del self._entries [dirpath]
+
+      if stale:
+         self.set_dirty()
+   # --- end of retain_subtree (...) ---
+
+# --- end of DirListingCache ---
@@ -6,15 +6,27 @@
 
 import errno
 import logging
+import os
+import shutil
+import threading
+
+try:
+   import sqlite3
+except ImportError:
+   # python built without sqlite support
+   sqlite3 = None
 
 import roverlay.digest
+import roverlay.strutil
 import roverlay.util.common
 import roverlay.util.fileio
 import roverlay.util.objects
 import roverlay.stats.collector
 
 
-__all__ = [ 'DistMapInfo', 'FileDistMap', ]
+__all__ = [
+   'DistMapInfo', 'FileDistMap', 'SqliteDistMap', 'convert_file_distmap',
+]
 
 
 
@@ -25,13 +37,25 @@ class DistMapException ( Exception ):
 
 class VirtualDistMapInfo ( object ):
 
+   __slots__ = ( 'backrefs', )
+
+   # shared by all entries without backrefs
+   _NO_BACKREFS = frozenset()
+
    def __init__ ( self ):
       super ( VirtualDistMapInfo, self ).__init__()
       # references to objects that "own" (use, ...) this distfile
-      self.backrefs    = set()
-      self.add_backref = self.backrefs.add
+      #  (created on demand)
+      self.backrefs = self._NO_BACKREFS
    # --- end of __init__ (...) ---
 
+   def add_backref ( self, ref ):
+      if self.backrefs:
+         self.backrefs.add ( ref )
+      else:
+         self.backrefs = { ref, }
+   # --- end of add_backref (...) ---
+
    def is_volatile ( self ):
       return True
 
@@ -41,8 +65,6 @@ class VirtualDistMapInfo ( object ):
    def deref_volatile ( self ):
       raise NotImplementedError()
 
-   #def add_backref ( self, ref ): self.backrefs.add ( ref )
-
    def has_backref_to ( self, obj ):
       return any ( ref.deref_unsafe() is obj for ref in self.backrefs )
    # --- end of has_backref_to (...) ---
@@ -65,6 +87,10 @@ class VirtualDistMapInfo ( object ):
 class DistMapInfo ( VirtualDistMapInfo ):
    """Distmap entry"""
 
+   __slots__ = (
+      'repo_name', 'repo_file', 'sha256', 'filestat', 'volatile',
+   )
+
    DIGEST_TYPE           = 'sha256'
    RESTORE_FROM_DISTFILE = '_'
    UNSET                 = 'U'
@@ -85,7 +111,8 @@ class DistMapInfo ( VirtualDistMapInfo ):
    # --- end of volatile_from_package_info (...) ---
 
    def __init__ (
-      self, distfile, repo_name, repo_file, sha256, volatile=None
+      self, distfile, repo_name, repo_file, sha256, filestat=None,
+      volatile=None
    ):
       """Distmap entry constructor.
 
@@ -94,6 +121,9 @@ class DistMapInfo ( VirtualDistMapInfo ):
       * repo_name -- name of the repo that owns the package file
       * repo_file -- path of the package file relative to the repo
       * sha256    -- file checksum
+      * filestat  -- stat key of the package file at the time its checksum
+                     was created (see roverlay.util.common.get_file_stat_key)
+                     or None
       * volatile  -- a reference to a PackageInfo instance or None
                      None indicates that this entry should be persistent,
                      whereas "not None" indicates a "volatile" entry.
@@ -101,8 +131,12 @@ class DistMapInfo ( VirtualDistMapInfo ):
       """
       super ( DistMapInfo, self ).__init__()
 
-      self.repo_name = repo_name if repo_name is not None else self.UNSET
+      self.repo_name = (
+         roverlay.strutil.intern_str ( repo_name )
+         if repo_name is not None else self.UNSET
+      )
       self.sha256    = sha256
+      self.filestat  = filestat or None
       self.volatile  = volatile
 
       if repo_file == self.RESTORE_FROM_DISTFILE:
@@ -122,6 +156,7 @@ class DistMapInfo ( VirtualDistMapInfo ):
    def make_volatile ( self, p_info, backref=None ):
       self.volatile = p_info.get_ref()
       self.sha256   = None
+      self.filestat = None
       if backref is not None:
          self.add_backref ( backref )
       return self
@@ -129,6 +164,7 @@ class DistMapInfo ( VirtualDistMapInfo ):
 
    def make_persistent ( self ):
       p_info        = self.volatile.deref_safe()
+      self.filestat = p_info.get_file_stat_key()
       self.sha256   = p_info.make_distmap_hash()
       self.volatile = None
       return self
@@ -195,7 +231,8 @@ class DistMapInfo ( VirtualDistMapInfo ):
             self.RESTORE_FROM_DISTFILE if self.repo_file == distfile
             else self.repo_file
          ),
-         self.sha256
+         self.sha256,
+         ( self.filestat or '' )
       )) )
    # --- end of to_str (...) ---
 
@@ -226,6 +263,10 @@ class _DistMapBase ( roverlay.util.objects.PersistentContent ):
 
       self._VIRTUAL_ENTRY = None
 
+      # whether check_revbump_necessary() may skip hashing package files
+      #  whose size, mtime and inode did not change
+      self.use_file_stat = True
+
       self._rebind_distmap()
 
       self.update_only = True
@@ -283,6 +324,10 @@ class _DistMapBase ( roverlay.util.objects.PersistentContent ):
       self.set_dirty()
    # --- end of _file_removed (...) ---
 
+   def _entry_modified ( self, distfile ):
+      self.set_dirty()
+   # --- end of _entry_modified (...) ---
+
    def _iter_persistent ( self ):
       for distfile, info in self._distmap.items():
          if info.is_persistent():
@@ -408,14 +453,53 @@ class _DistMapBase ( roverlay.util.objects.PersistentContent ):
          # don't revbump if repo names don't match, this likely results in
          # infinite revbumps if a package is available from more than one repo
          return False
+      elif self.check_file_unchanged ( package_info, info ):
+         # same file as before, no revbump
+         return False
       elif info.compare_digest ( package_info ) [0] is True:
          # old digest == new digest, no revbump
          #  (package_info should be filtered out)
+         #
+         # remember the file's stat info for the next run
+         filestat = package_info.get_file_stat_key()
+         if filestat != info.filestat:
+            info.filestat = filestat
+            self._entry_modified ( distfile )
          return False
       else:
          # digest mismatch => diff
          return True
-   # --- end of compare_digest (...) ---
+   # --- end of check_revbump_necessary (...) ---
+
+   def check_file_unchanged ( self, package_info, info=None ):
+      """Returns True if package_info's package file has the same size,
+      mtime and inode as it had when its distmap entry has been created,
+      else False. Always returns False if use_file_stat is disabled.
+
+      The distmap entry's digest gets copied to package_info's hashdict if
+      the file is unchanged, so that the file does not have to be hashed.
+
+      arguments:
+      * package_info --
+      * info         -- package_info's distmap entry or None (look it up)
+      """
+      if not self.use_file_stat:
+         return False
+      elif info is None:
+         info = self._distmap.get ( package_info.get_distmap_key(), None )
+
+      filestat = getattr ( info, 'filestat', None )
+      if (
+         not filestat or not info.digest
+         or info.repo_name != package_info['origin'].name
+      ):
+         return False
+      elif filestat == package_info.get_file_stat_key():
+         package_info.hashdict.setdefault ( info.DIGEST_TYPE, info.digest )
+         return True
+      else:
+         return False
+   # --- end of check_file_unchanged (...) ---
 
    def get_hash_type ( self ):
       return DistMapInfo.DIGEST_TYPE
@@ -427,7 +511,7 @@ class _DistMapBase ( roverlay.util.objects.PersistentContent ):
       arguments:
       * f --
       """
-      return roverlay.digest.dodigest_file ( f, DistMapInfo.DIGEST_TYPE )
+      return roverlay.digest.get_file_digest ( f, DistMapInfo.DIGEST_TYPE )
    # --- end of get_file_digest (...) ---
 
    def check_digest_integrity ( self, distfile, digest ):
@@ -706,8 +790,10 @@ class FileDistMap ( roverlay.util.fileio.TextFile, _DistMapBase ):
    FIELD_DELIMITER = '|'
    #FIELD_DELIMITER = ' '
 
-   # file format (reserved for future usage)
-   FILE_FORMAT = '0'
+   # file format
+   #  0: distfile, repo name, repo file, digest
+   #  1: distfile, repo name, repo file, digest, filestat
+   FILE_FORMAT = '1'
 
    @classmethod
    def get_default_compression ( cls ):
@@ -739,7 +825,7 @@ class FileDistMap ( roverlay.util.fileio.TextFile, _DistMapBase ):
 
    def get_header ( self ):
       return "<{d}<{fmt}".format (
-         d=self.FIELD_DELIMITER, fmt=self.FILE_FORMAT
+         d=self.FIELD_DELIMITER, fmt=self.__class__.FILE_FORMAT
       )
    # --- end of get_header (...) ---
 
@@ -801,3 +887,435 @@ class FileDistMap ( roverlay.util.fileio.TextFile, _DistMapBase ):
    # --- end of parse_header_line (...) ---
 
 # --- end of FileDistMap ---
+
+
+
+class _SqliteDistMapStore ( object ):
+   """dict-like distmap entry storage that reads entries from a sqlite
+   database on demand.
+
+   Entries that have been read are kept in memory. Added, replaced and
+   removed entries are remembered until the changes get committed.
+   """
+
+   def __init__ ( self, connection, lock ):
+      super ( _SqliteDistMapStore, self ).__init__()
+      self._db         = connection
+      self._lock       = lock
+      # map: distfile => entry, entries that have been read or added
+      self._loaded     = dict()
+      # set of distfiles that have been removed
+      self._removed    = set()
+      # set of distfiles whose entries have been added/modified/removed
+      self._changed    = set()
+      # whether all entries have been read from the database
+      self._all_loaded = False
+   # --- end of __init__ (...) ---
+
+   def _make_entry ( self, row ):
+      distfile, repo_name, repo_file, digest, filestat = row
+      return DistMapInfo ( distfile, repo_name, repo_file, digest, filestat )
+   # --- end of _make_entry (...) ---
+
+   def _query ( self, sql, params=() ):
+      with self._lock:
+         return self._db.execute ( sql, params ).fetchall()
+   # --- end of _query (...) ---
+
+   def _db_count ( self ):
+      return self._query ( "SELECT COUNT(*) FROM distmap" ) [0][0]
+   # --- end of _db_count (...) ---
+
+   def _db_has ( self, distfile ):
+      return bool ( self._query (
+         "SELECT 1 FROM distmap WHERE distfile = ?", ( distfile, )
+      ) )
+   # --- end of _db_has (...) ---
+
+   def _load_all ( self ):
+      if not self._all_loaded:
+         loaded  = self._loaded
+         removed = self._removed
+         for row in self._query (
+            "SELECT distfile, repo_name, repo_file, digest, filestat "
+            "FROM distmap"
+         ):
+            if row[0] not in loaded and row[0] not in removed:
+               loaded [row[0]] = self._make_entry ( row )
+         self._all_loaded = True
+      return self._loaded
+   # --- end of _load_all (...) ---
+
+   def get ( self, distfile, fallback=None ):
+      entry = self._loaded.get ( distfile, None )
+      if entry is not None:
+         return entry
+      elif self._all_loaded or distfile in self._removed:
+         return fallback
+
+      rows = self._query (
+         "SELECT distfile, repo_name, repo_file, digest, filestat "
+         "FROM distmap WHERE distfile = ?", ( distfile, )
+      )
+      if rows:
+         entry = self._make_entry ( rows[0] )
+         self._loaded [distfile] = entry
+         return entry
+      else:
+         return fallback
+   # --- end of get (...) ---
+
+   def lookup ( self, repo_name, repo_file ):
+      """Tries to find an entry by its repo name and repo file.
+      Returns a 2-tuple ( distfile, entry ) or None.
+
+      arguments:
+      * repo_name --
+      * repo_file --
+      """
+      # modified entries take precedence over the database
+      for distfile in self._changed:
+         entry = self._loaded.get ( distfile, None )
+         if (
+            entry is not None and entry.repo_name == repo_name
+            and entry.repo_file == repo_file
+         ):
+            return ( distfile, entry )
+
+      for row in self._query (
+         "SELECT distfile FROM distmap "
+         "WHERE repo_name = ? AND repo_file = ?", ( repo_name, repo_file )
+      ):
+         distfile = row[0]
+         if distfile not in self._changed:
+            entry = self.get ( distfile )
+            # loaded entries may have been modified in-place
+            if (
+               entry is not None and entry.repo_name == repo_name
+               and entry.repo_file == repo_file
+            ):
+               return ( distfile, entry )
+
+      return None
+   # --- end of lookup (...) ---
+
+   def mark_changed ( self, distfile ):
+      self._changed.add ( distfile )
+   # --- end of mark_changed (...) ---
+
+   def __contains__ ( self, distfile ):
+      return self.get ( distfile ) is not None
+   # --- end of __contains__ (...) ---
+
+   def __getitem__ ( self, distfile ):
+      entry = self.get ( distfile )
+      if entry is None:
+         raise KeyError ( distfile )
+      return entry
+   # --- end of __getitem__ (...) ---
+
+   def __setitem__ ( self, distfile, entry ):
+      self._loaded [distfile] = entry
+      self._removed.discard ( distfile )
+      self._changed.add ( distfile )
+   # --- end of __setitem__ (...) ---
+
+   def __delitem__ ( self, distfile ):
+      if self.get ( distfile ) is None:
+         raise KeyError ( distfile )
+      del self._loaded [distfile]
+      self._removed.add ( distfile )
+      self._changed.add ( distfile )
+   # --- end of __delitem__ (...) ---
+
+   def __len__ ( self ):
+      if self._all_loaded:
+         return len ( self._loaded )
+
+      count = self._db_count()
+      for distfile in self._changed:
+         in_db = self._db_has ( distfile )
+         if distfile in self._loaded:
+            if not in_db:
+               count += 1
+         elif in_db:
+            count -= 1
+      return count
+   # --- end of __len__ (...) ---
+
+   def __iter__ ( self ):
+      return iter ( self._load_all() )
+   # --- end of __iter__ (...) ---
+
+   def keys ( self ):
+      return self._load_all().keys()
+   # --- end of keys (...) ---
+
+   def items ( self ):
+      return self._load_all().items()
+   # --- end of items (...) ---
+
+   def values ( self ):
+      return self._load_all().values()
+   # --- end of values (...) ---
+
+   def commit ( self ):
+      """Writes all changes to the database.
+
+      Only persistent entries are stored, entries that have been removed or
+      replaced by volatile/virtual entries get deleted.
+      """
+      insert = list()
+      delete = list()
+
+      for distfile in self._changed:
+         entry = self._loaded.get ( distfile, None )
+         if entry is not None and entry.is_persistent():
+            insert.append ((
+               distfile, entry.get_repo_name(), entry.get_repo_file(),
+               entry.digest, entry.filestat
+            ))
+         else:
+            delete.append ( ( distfile, ) )
+
+      with self._lock:
+         with self._db:
+            self._db.executemany (
+               "DELETE FROM distmap WHERE distfile = ?", delete
+            )
+            self._db.executemany (
+               "INSERT OR REPLACE INTO distmap "
+               "( distfile, repo_name, repo_file, digest, filestat ) "
+               "VALUES ( ?, ?, ?, ?, ? )", insert
+            )
+
+      self._changed.clear()
+      self._removed.clear()
+      return len ( insert ) + len ( delete )
+   # --- end of commit (...) ---
+
+# --- end of _SqliteDistMapStore ---
+
+
+class SqliteDistMap ( _DistMapBase ):
+   """A distmap that is stored in a sqlite database.
+
+   Entries are read on demand, and writing the distmap only updates
+   entries that have been modified.
+   """
+
+   # database schema version (increase this when changing the schema)
+   #  1: distfile, repo_name, repo_file, digest
+   #  2: + filestat
+   SCHEMA_VERSION = 2
+
+   def __init__ ( self, distmap_file, ignore_missing=False ):
+      """Constructor for a distmap that stores its information in a sqlite
+      database.
+
+      arguments:
+      * distmap_file   -- sqlite database file
+      * ignore_missing -- do not fail if distmap file does not exist?
+
+      raises:
+      * DistMapException if sqlite is not available or the database
+        has an unknown schema version
+      * IOError if the database does not exist and ignore_missing is False
+      """
+      if sqlite3 is None:
+         raise DistMapException ( "sqlite3 module is not available." )
+
+      super ( SqliteDistMap, self ).__init__()
+      self._filepath = distmap_file
+
+      if not os.path.isfile ( distmap_file ):
+         if not ignore_missing:
+            raise IOError (
+               errno.ENOENT, os.strerror ( errno.ENOENT ), distmap_file
+            )
+
+         roverlay.util.common.dodir (
+            os.path.dirname ( distmap_file ), mkdir_p=True
+         )
+
+      self._lock = threading.RLock()
+      self._db   = sqlite3.connect ( distmap_file, check_same_thread=False )
+      self._init_schema()
+
+      self._distmap = _SqliteDistMapStore ( self._db, self._lock )
+      self._rebind_distmap()
+
+      self.stats.pkg_count.inc ( step=self._distmap._db_count() )
+   # --- end of __init__ (...) ---
+
+   def _init_schema ( self ):
+      with self._lock:
+         version = self._db.execute ( "PRAGMA user_version" ).fetchone()[0]
+         if version == 0:
+            with self._db:
+               self._db.execute (
+                  "CREATE TABLE IF NOT EXISTS distmap ( "
+                  "distfile TEXT PRIMARY KEY, repo_name TEXT, "
+                  "repo_file TEXT, digest TEXT, filestat TEXT )"
+               )
+               self._db.execute (
+                  "CREATE INDEX IF NOT EXISTS distmap_repo_file "
+                  "ON distmap ( repo_name, repo_file )"
+               )
+               self._db.execute (
+                  "PRAGMA user_version = {:d}".format ( self.SCHEMA_VERSION )
+               )
+         elif version == 1:
+            with self._db:
+               self._db.execute (
+                  "ALTER TABLE distmap ADD COLUMN filestat TEXT"
+               )
+               self._db.execute (
+                  "PRAGMA user_version = {:d}".format ( self.SCHEMA_VERSION )
+               )
+         elif version != self.SCHEMA_VERSION:
+            raise DistMapException (
+               "{f}: unknown distmap schema version {v:d}".format (
+                  f=self._filepath, v=version
+               )
+            )
+   # --- end of _init_schema (...) ---
+
+   def _file_added ( self, distfile ):
+      self._distmap.mark_changed ( distfile )
+      super ( SqliteDistMap, self )._file_added ( distfile )
+   # --- end of _file_added (...) ---
+
+   def _file_removed ( self, distfile ):
+      self._distmap.mark_changed ( distfile )
+      super ( SqliteDistMap, self )._file_removed ( distfile )
+   # --- end of _file_removed (...) ---
+
+   def _entry_modified ( self, distfile ):
+      self._distmap.mark_changed ( distfile )
+      super ( SqliteDistMap, self )._entry_modified ( distfile )
+   # --- end of _entry_modified (...) ---
+
+   def lookup ( self, repo_name, repo_file ):
+      """Tries to find a repo file in distroot.
+      Returns a 2-tuple ( <relative distfile path>, <distmap entry> ) if
+      repo file found, else None.
+
+      Uses the database index unless a reverse distmap has been created.
+
+      arguments:
+      * repo_name -- name of the repo that owns repo_file
+      * repo_file -- repo file (relative to repo directory)
+      """
+      if hasattr ( self, '_reverse_distmap' ):
+         return self._reverse_distmap.get ( ( repo_name, repo_file ), None )
+      else:
+         return self._distmap.lookup ( repo_name, repo_file )
+   # --- end of lookup (...) ---
+
+   def import_distmap ( self, distmap ):
+      """Adds all persistent entries of another distmap to this distmap.
+
+      arguments:
+      * distmap -- distmap to import (e.g. a FileDistMap)
+      """
+      for distfile, info in distmap._iter_persistent():
+         self.add_entry ( distfile, info )
+   # --- end of import_distmap (...) ---
+
+   def backup_file ( self, destfile=None, move=False, ignore_missing=False ):
+      """Creates a backup copy of the database file.
+
+      arguments:
+      * destfile       -- backup file path
+                          Defaults to <dfile> + '.bak'.
+      * move           -- ignored, the database is always copied
+      * ignore_missing -- return False if file does not exist instead of
+                          raising an exception. Defaults to False.
+      """
+      dest = destfile or ( self._filepath + '.bak' )
+      try:
+         roverlay.util.common.dodir ( os.path.dirname ( dest ), mkdir_p=True )
+         with self._lock:
+            shutil.copyfile ( self._filepath, dest )
+         return True
+      except IOError as ioerr:
+         if ignore_missing and ioerr.errno == errno.ENOENT:
+            return False
+         else:
+            raise
+   # --- end of backup_file (...) ---
+
+   def backup_and_write ( self,
+      destfile=None, backup_file=None,
+      force=False, move=False, ignore_missing=True
+   ):
+      """Creates a backup copy of the database and writes the modified
+      entries afterwards.
+
+      arguments:
+      * destfile       -- must be None
+      * backup_file    -- backup file path (see backup_file())
+      * force          -- enforce writing even if not modified
+      * move           -- ignored
+      * ignore_missing -- do not fail if the file does not exist when
+                          creating a backup copy.
+                          Defaults to True.
+      """
+      if force or self.dirty:
+         self.backup_file (
+            destfile=backup_file, ignore_missing=ignore_missing
+         )
+         return self.write ( filepath=destfile, force=True )
+      else:
+         return True
+   # --- end of backup_and_write (...) ---
+
+   def write ( self, filepath=None, force=False ):
+      """Writes all modified entries to the database.
+
+      arguments:
+      * filepath -- must be None (the database is updated in-place)
+      * force    -- enforce writing even if not modified
+      """
+      if filepath is not None:
+         raise DistMapException (
+            "cannot write a sqlite distmap to another file."
+         )
+      elif force or self.dirty:
+         self._distmap.commit()
+         self.reset_dirty()
+         return True
+      else:
+         return False
+   # --- end of write (...) ---
+
+   def close ( self ):
+      """Closes the database connection. Unwritten changes are lost."""
+      with self._lock:
+         self._db.close()
+   # --- end of close (...) ---
+
+# --- end of SqliteDistMap ---
+
+
+def convert_file_distmap (
+   distmap_file, sqlite_file, distmap_compression=None
+):
+   """Converts a (text) distmap file to a sqlite distmap.
+
+   Returns the sqlite distmap.
+
+   arguments:
+   * distmap_file        -- distmap file to read
+   * sqlite_file         -- sqlite database file
+   * distmap_compression -- distmap file compression format
+   """
+   file_distmap = FileDistMap (
+      distmap_file, distmap_compression=distmap_compression
+   )
+   distmap = SqliteDistMap ( sqlite_file, ignore_missing=True )
+   distmap.import_distmap ( file_distmap )
+   distmap.write()
+   return distmap
+# --- end of convert_file_distmap (...) ---
@@ -0,0 +1,165 @@
+# R overlay -- db, overlay scan index
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""overlay scan index
+
+This module provides a persistent index of the ebuilds found when scanning
+the overlay in incremental mode. Each entry maps an ebuild file to its
+file stat info (device, inode, size, mtime), its version ($PVR), its
+distfiles and the name of the repo its distfiles belong to. Ebuilds whose
+stat info did not change since the last scan do not have to be parsed
+again.
+"""
+
+import roverlay.util.common
+import roverlay.util.fileio
+
+
+__all__ = [ 'ScanIndex', ]
+
+
+class ScanIndexEntry ( object ):
+
+   __slots__ = [ 'filestat', 'pvr', 'repo_name', 'distfiles' ]
+
+   def __init__ ( self, filestat, pvr, repo_name, distfiles ):
+      super ( ScanIndexEntry, self ).__init__()
+      self.filestat  = filestat
+      self.pvr       = pvr
+      self.repo_name = repo_name
+      self.distfiles = distfiles
+   # --- end of __init__ (...) ---
+
+   def to_str ( self, efile, field_delimiter ):
+      return field_delimiter.join ((
+         efile, self.filestat, self.pvr, ( self.repo_name or '' ),
+         ' '.join ( self.distfiles )
+      ))
+   # --- end of to_str (...) ---
+
+# --- end of ScanIndexEntry ---
+
+
+class ScanIndex ( roverlay.util.fileio.TextFile ):
+   """An overlay scan index that is read from / written to a file."""
+
+   FIELD_DELIMITER = '\t'
+   HEADER_PREFIX   = '# scan index'
+
+   # file format (increase this when changing the entry format)
+   FILE_FORMAT     = '0'
+
+   @classmethod
+   def get_default_compression ( cls ):
+      return "gzip" if cls.check_compression_supported ( "gzip" ) else None
+   # --- end of get_default_compression (...) ---
+
+   def __init__ ( self, index_file, index_compression=None, read_now=True ):
+      """Constructor for an overlay scan index.
+
+      arguments:
+      * index_file        -- index file
+      * index_compression -- index file compression format
+      * read_now          -- read the index file now (defaults to True),
+                             set to False to parse all ebuilds
+      """
+      super ( ScanIndex, self ).__init__ (
+         filepath=index_file, compression=index_compression
+      )
+
+      # whether the index file's format is supported
+      self._format_ok   = False
+      # map: ebuild file => entry, as read from the index file
+      self._entries     = dict()
+      # map: ebuild file => entry, entries for the current scan
+      self._new_entries = dict()
+
+      if read_now:
+         self.try_read()
+      self.set_dirty()
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._entries )
+   # --- end of __len__ (...) ---
+
+   def get_header ( self ):
+      return self.HEADER_PREFIX + ' ' + self.FILE_FORMAT
+   # --- end of get_header (...) ---
+
+   def parse_header_line ( self, line ):
+      self._format_ok = ( line == self.get_header() )
+   # --- end of parse_header_line (...) ---
+
+   def parse_line ( self, line ):
+      if self._format_ok:
+         efile, filestat, pvr, repo_name, distfiles = (
+            line.split ( self.FIELD_DELIMITER, 4 )
+         )
+         self._entries [efile] = ScanIndexEntry (
+            filestat, pvr, ( repo_name or None ),
+            tuple ( distfiles.split() )
+         )
+   # --- end of parse_line (...) ---
+
+   def gen_lines ( self ):
+      """Generator that creates index file text lines.
+
+      Only entries of ebuilds that have been seen in the current scan
+      are written.
+      """
+      delim = self.FIELD_DELIMITER
+
+      yield self.get_header()
+      for efile, entry in sorted ( self._new_entries.items() ):
+         yield entry.to_str ( efile, delim )
+   # --- end of gen_lines (...) ---
+
+   def lookup ( self, efile, pvr ):
+      """Returns the entry of an ebuild file if the file did not change
+      since it has been indexed, else None.
+
+      The entry is kept for the next index file (if any).
+
+      arguments:
+      * efile -- ebuild file
+      * pvr   -- version ($PVR) of the ebuild
+      """
+      entry = self._entries.get ( efile )
+      if entry is None or entry.pvr != pvr:
+         return None
+      elif entry.filestat != roverlay.util.common.get_file_stat_key ( efile ):
+         return None
+      else:
+         self._new_entries [efile] = entry
+         return entry
+   # --- end of lookup (...) ---
+
+   def record ( self, efile, pvr, repo_name, distfiles ):
+      """Adds/replaces the entry of an ebuild file that has been parsed.
+
+      Returns True if the entry has been added, else False (ebuild file
+      cannot be stat'ed).
+
+      arguments:
+      * efile     -- ebuild file
+      * pvr       -- version ($PVR) of the ebuild
+      * repo_name -- name of the repo the ebuild's distfiles belong to
+                     (or None)
+      * distfiles -- iterable with the ebuild's distfiles
+      """
+      filestat = roverlay.util.common.get_file_stat_key ( efile )
+      if filestat is None:
+         return False
+
+      self._new_entries [efile] = ScanIndexEntry (
+         filestat, pvr, ( repo_name or None ), tuple ( distfiles )
+      )
+      self.set_dirty()
+      return True
+   # --- end of record (...) ---
+
+# --- end of ScanIndex ---
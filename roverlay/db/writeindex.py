@@ -0,0 +1,176 @@
+# R overlay -- db, overlay file write index
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""overlay file write index
+
+This module provides a persistent index of the overlay files written by
+roverlay (ebuilds, metadata.xml and Manifest files). Each entry maps a file
+to the digest of its content and its file stat info (device, inode, size,
+mtime) after writing it. Writing a file is skipped if its new content has the
+same digest and the file has not been modified since it has been written,
+which keeps the file's mtime (and thus rsync mirrors etc.) unaffected.
+"""
+
+import hashlib
+import os
+import threading
+
+import roverlay.util.common
+import roverlay.util.fileio
+import roverlay.stats.collector
+
+
+__all__ = [ 'WriteIndex', ]
+
+
+class WriteIndex ( roverlay.util.fileio.TextFile ):
+   """An overlay file write index that is read from / written to a file."""
+
+   STATS = roverlay.stats.collector.static.write_index
+
+   FIELD_DELIMITER = '\t'
+   HEADER_PREFIX   = '# write index'
+
+   # file format (increase this when changing the entry format)
+   FILE_FORMAT     = '0'
+
+   @classmethod
+   def get_default_compression ( cls ):
+      return "gzip" if cls.check_compression_supported ( "gzip" ) else None
+   # --- end of get_default_compression (...) ---
+
+   @classmethod
+   def get_content_digest ( cls, content ):
+      """Returns the digest of a file's content.
+
+      arguments:
+      * content -- file content (str)
+      """
+      return hashlib.sha256 ( content.encode ( 'utf-8' ) ).hexdigest()
+   # --- end of get_content_digest (...) ---
+
+   def __init__ ( self, index_file, index_compression=None, read_now=True ):
+      """Constructor for an overlay file write index.
+
+      arguments:
+      * index_file        -- index file
+      * index_compression -- index file compression format
+      * read_now          -- read the index file now (defaults to True),
+                             set to False to write all files
+      """
+      super ( WriteIndex, self ).__init__ (
+         filepath=index_file, compression=index_compression
+      )
+      self.stats      = self.__class__.STATS
+
+      # map: file => ( file stat info, content digest )
+      self._entries   = dict()
+      self._lock      = threading.Lock()
+      self._format_ok = False
+
+      if read_now:
+         self.try_read()
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._entries )
+   # --- end of __len__ (...) ---
+
+   def get_header ( self ):
+      return self.HEADER_PREFIX + ' ' + self.FILE_FORMAT
+   # --- end of get_header (...) ---
+
+   def parse_header_line ( self, line ):
+      self._format_ok = ( line == self.get_header() )
+      if not self._format_ok:
+         self.set_dirty()
+   # --- end of parse_header_line (...) ---
+
+   def parse_line ( self, line ):
+      if self._format_ok:
+         filepath, filestat, digest = line.split ( self.FIELD_DELIMITER, 2 )
+         self._entries [filepath] = ( filestat, digest )
+   # --- end of parse_line (...) ---
+
+   def gen_lines ( self ):
+      """Generator that creates index file text lines.
+
+      Entries whose file does not exist anymore are dropped.
+      """
+      delim = self.FIELD_DELIMITER
+
+      yield self.get_header()
+      with self._lock:
+         for filepath, entry in sorted ( self._entries.items() ):
+            if os.path.isfile ( filepath ):
+               yield delim.join ( ( filepath, entry[0], entry[1] ) )
+   # --- end of gen_lines (...) ---
+
+   def check_unchanged ( self, filepath, digest ):
+      """Returns True if the given file exists and its content matches the
+      given digest (according to the index), else False.
+
+      arguments:
+      * filepath --
+      * digest   -- content digest, see get_content_digest()
+      """
+      with self._lock:
+         entry = self._entries.get ( filepath )
+
+      return bool (
+         entry is not None and entry[1] == digest and (
+            entry[0] == roverlay.util.common.get_file_stat_key ( filepath )
+         )
+      )
+   # --- end of check_unchanged (...) ---
+
+   def record ( self, filepath, digest ):
+      """Adds/replaces the entry of a file that has been written.
+
+      arguments:
+      * filepath --
+      * digest   -- content digest, see get_content_digest()
+      """
+      filestat = roverlay.util.common.get_file_stat_key ( filepath )
+
+      with self._lock:
+         if filestat is None:
+            self._entries.pop ( filepath, None )
+         else:
+            self._entries [filepath] = ( filestat, digest )
+         self.set_dirty()
+   # --- end of record (...) ---
+
+   def write_file ( self, filepath, content, filetype ):
+      """Writes a text file unless it already has the given content.
+
+      Returns True if the file has been written, and False if writing has
+      been skipped.
+
+      arguments:
+      * filepath --
+      * content  -- file content (str)
+      * filetype -- file type used for stats (e.g. "ebuild")
+
+      raises: passes IOError
+      """
+      digest = self.get_content_digest ( content )
+
+      if self.check_unchanged ( filepath, digest ):
+         with self._lock:
+            self.stats.files_unchanged.inc ( filetype )
+         return False
+
+      with open ( filepath, 'w' ) as fh:
+         fh.write ( content )
+
+      self.record ( filepath, digest )
+      with self._lock:
+         self.stats.files_written.inc ( filetype )
+      return True
+   # --- end of write_file (...) ---
+
+# --- end of WriteIndex ---
@@ -17,6 +17,7 @@ import roverlay.console.depres
 import roverlay.hook
 import roverlay.overlay.creator
 import roverlay.overlay.pkgdir.distroot.static
+import roverlay.packagerules.dryrun
 import roverlay.packagerules.rules
 import roverlay.recipe.distmap
 import roverlay.remote.repolist
@@ -64,6 +65,7 @@ def main ( installed, *args, **kw ):
    else:
       roverlay.hook.setup()
       main_env.setup_database()
+      main_env.setup_digest_store()
 
       retcode = os.EX_OK
 
@@ -74,6 +76,7 @@ def main ( installed, *args, **kw ):
       else:
          die ( "unknown command: {!r}".format ( main_env.command ) )
 
+      main_env.write_digest_store()
       main_env.write_database()
       main_env.dump_stats()
       sys.exit ( retcode )
@@ -148,6 +151,7 @@ def run_distmap_rebuild ( env ):
    roverlay.core.force_console_logging ( logging.INFO )
 
    roverlay.recipe.distmap.setup()
+   env.setup_digest_store()
    distroot = None
    try:
       distroot = roverlay.overlay.pkgdir.distroot.static.get_configured()
@@ -155,6 +159,7 @@ def run_distmap_rebuild ( env ):
    finally:
       if distroot is not None:
          distroot.finalize()
+   env.write_digest_store()
 
    return os.EX_OK
 # --- end of run_distmap_rebuild (...) ---
@@ -220,7 +225,33 @@ def run_overlay_create ( env ):
          nosync    = ebuild_import_nosync,
       )
 
-      repo_list.add_packages ( overlay_creator.add_package )
+      # in streaming mode, ebuild creation workers read DESCRIPTION data
+      # while packages are being added
+      overlay_creator.start_streaming()
+
+      # rsync repos: check only package files changed by syncing and
+      #  package files listed in the change journal (which decides whether
+      #  they have to be processed), instead of scanning the distfiles dirs
+      sync_changes_only = bool (
+         env.options ['sync_changes_only']
+         and overlay_creator.change_journal is not None
+      )
+
+      if overlay_creator.change_journal is not None:
+         package_files = overlay_creator.prepare_change_journal (
+            repo_list.iter_package_files,
+            extra_values=( env.options ['revbump'], ),
+            changed_files=(
+               repo_list.get_changed_files() if sync_changes_only else None
+            ),
+         )
+         repo_list.add_packages (
+            overlay_creator.add_package,
+            file_filter=overlay_creator.want_package_file,
+            package_files=package_files
+         )
+      else:
+         repo_list.add_packages ( overlay_creator.add_package )
       if env.options ['revbump']:
          overlay_creator.enqueue_postponed()
       else:
@@ -239,6 +270,9 @@ def run_overlay_create ( env ):
 
       if env.options ['write_overlay']:
          overlay_creator.write_overlay()
+         overlay_creator.commit_change_journal()
+         if sync_changes_only:
+            repo_list.commit_changesets()
 
       if env.options ['show_overlay']:
          overlay_creator.show_overlay()
@@ -288,6 +322,9 @@ def run_apply_package_rules ( env ):
    # track package rules
    prules.add_trace_actions()
 
+   if env.option ( "dump_format" ) == "jsonl" or env.option ( "dump_diff" ):
+      return run_apply_package_rules_jsonl ( env, prules, dump_file )
+
    NUM_MODIFIED = 0
 
 
@@ -432,3 +469,64 @@ def run_apply_package_rules ( env ):
          FH.close()
 
 # --- end of run_apply_package_rules (...) ---
+
+def run_apply_package_rules_jsonl ( env, prules, dump_file ):
+   """apply_rules command, machine-readable variant.
+
+   Evaluates the package rules (possibly in parallel) and writes one
+   JSON record per package, sorted by package id. Writes only the records
+   of packages whose outcome has changed if a previous output file has
+   been given (--dump-diff).
+
+   arguments:
+   * env       --
+   * prules    -- package rules (prepared)
+   * dump_file -- output file or "-" (stdout)
+   """
+   dryrun   = roverlay.packagerules.dryrun
+   packages = list()
+   env.get_repo_list().add_packages ( packages.append )
+   packages.sort ( key=dryrun.get_package_id )
+
+   diff_file = env.option ( "dump_diff" )
+   if diff_file:
+      with open ( diff_file, 'rt' ) as fh:
+         old_records = dryrun.read_records ( fh )
+   else:
+      old_records = None
+
+   status_count = dict()
+
+   def count_records ( records ):
+      for record in records:
+         status_count [record ['status']] = (
+            status_count.get ( record ['status'], 0 ) + 1
+         )
+         yield record
+   # --- end of count_records (...) ---
+
+   records = count_records ( dryrun.evaluate (
+      prules, packages, jobs=env.option ( "apply_rules_jobs", 1 )
+   ) )
+   if old_records is not None:
+      records = dryrun.iter_diff ( old_records, records )
+
+   FH = None
+   try:
+      FH = sys.stdout if dump_file == "-" else open ( dump_file, 'wt' )
+      dryrun.write_records ( FH, records )
+   finally:
+      if FH and FH is not sys.stdout:
+         FH.close()
+
+   # stdout may be used for the records
+   sys.stderr.write (
+      '{p} packages processed in total, out of which\n'
+      '{m} have been modified and '
+      '{n} have been filtered out\n'.format (
+         p = len ( packages ),
+         m = status_count.get ( dryrun.STATUS_MODIFIED, 0 ),
+         n = status_count.get ( dryrun.STATUS_FILTERED, 0 ),
+      )
+   )
+# --- end of run_apply_package_rules_jsonl (...) ---
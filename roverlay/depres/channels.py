@@ -17,11 +17,14 @@ import logging
 import roverlay.depres.depresult
 
 from roverlay.depres               import deptype
-from roverlay.depres.depenv        import DepEnv
+from roverlay.depres.depenv        import DepEnvCache
 from roverlay.depres.communication import DependencyResolverChannel
 
 COMLINK = logging.getLogger ( "depres.com" )
 
+# parsed dependency strings, shared by all channels
+DEP_ENV_CACHE = DepEnvCache()
+
 class _EbuildJobChannelBase ( DependencyResolverChannel ):
    """The EbuildJobChannel is an interface to the dependency resolver used
    in EbuildJobs.
@@ -60,6 +63,10 @@ class _EbuildJobChannelBase ( DependencyResolverChannel ):
       # the count of dep strings ever assigned to this channel
       self._depcount = 0
 
+      # deps that have not been submitted to the resolver so far,
+      #  they're sent as one batch when processing the request
+      self._depbatch = list()
+
       _logger = logger if logger is not None else COMLINK
       if name:
          self.name   = name
@@ -75,7 +82,7 @@ class _EbuildJobChannelBase ( DependencyResolverChannel ):
 
          super ( _EbuildJobChannelBase, self ).close()
          self.err_queue.remove_queue ( self._depres_queue )
-         del self._collected_deps, self._depres_queue
+         del self._collected_deps, self._depres_queue, self._depbatch
          del self.logger
 
          self._depdone = -1
@@ -100,8 +107,8 @@ class _EbuildJobChannelBase ( DependencyResolverChannel ):
 
    def add_dependency ( self, dep_str, deptype_mask ):
       """Adds a dependency string that should be looked up.
-      This channel will create a "dependency environment" for it and enqueues
-      that in the dep resolver.
+      This channel will create a "dependency environment" for it, which
+      will be sent to the dep resolver when processing the request.
 
       arguments:
       * dep_str --
@@ -115,12 +122,9 @@ class _EbuildJobChannelBase ( DependencyResolverChannel ):
             "This channel is 'done', it doesn't accept new dependencies."
          )
       else:
-         for dep_env in DepEnv.from_str (
-            dep_str=dep_str, deptype_mask=deptype_mask
-         ):
-            self._depcount += 1
-            self._depres_master.enqueue ( dep_env, self.ident )
-
+         dep_envs = DEP_ENV_CACHE.from_str ( dep_str, deptype_mask )
+         self._depcount += len ( dep_envs )
+         self._depbatch.extend ( dep_envs )
    # --- end of add_dependency (...) ---
 
    def add_dependencies ( self, dep_list, deptype_mask ):
@@ -165,6 +169,30 @@ class _EbuildJobChannelBase ( DependencyResolverChannel ):
    # --- end of add_dependencies_filtered (...) ---
 
 
+   def _iter_results ( self ):
+      """Generator that submits all pending deps to the resolver (as one
+      batch) and yields the processed dep envs in the order they've been
+      added, until all deps have been processed.
+
+      Yields None and stops if the channel's queue got unblocked
+      (on-error mode).
+      """
+      if self._depbatch:
+         batch          = self._depbatch
+         self._depbatch = list()
+         self._depres_master.enqueue_batch ( batch, self.ident )
+
+      while self._depdone < self._depcount and self.err_queue.empty:
+         batch = self._depres_queue.get()
+         self._depres_queue.task_done()
+         if batch is None:
+            yield None
+            return
+         else:
+            for dep_env in batch:
+               yield dep_env
+   # --- end of _iter_results (...) ---
+
    def collect_dependencies ( self ):
       """Returns a list that contains all resolved deps,
       including ignored deps that resolve to None.
@@ -234,7 +262,6 @@ class EbuildJobChannel ( _EbuildJobChannelBase ):
             ret = True
          # else failed
 
-         self._depres_queue.task_done()
          return ret
       # --- end of handle_queue_item (...) ---
 
@@ -244,19 +271,11 @@ class EbuildJobChannel ( _EbuildJobChannelBase ):
       #  (a) at least one required dependency could not be resolved or
       #  (b) all deps processed or
       #  (c) error queue not empty
-      while self._depdone < self._depcount and \
-         satisfiable and self.err_queue.empty \
-      :
-         # tell the resolver to start
-         self._depres_master.start()
-
-         # wait for one result at least
-         satisfiable = handle_queue_item ( self._depres_queue.get() )
-
-         # and process all available results
-         while satisfiable and not self._depres_queue.empty():
-            satisfiable = handle_queue_item ( self._depres_queue.get_nowait() )
-      # --- end while
+      for dep_env in self._iter_results():
+         satisfiable = handle_queue_item ( dep_env )
+         if not satisfiable:
+            break
+      # --- end for
 
       if satisfiable and self.err_queue.empty:
          # using a set allows easy difference() operations between
@@ -336,7 +355,6 @@ class NonGreedyDepresChannel ( _EbuildJobChannelBase ):
             unresolvable ( dep_env.dep_str )
             ret = bool ( deptype.mandatory & ~dep_env.deptype_mask )
 
-         self._depres_queue.task_done()
          return ret
       # --- end of handle_queue_item (...) ---
 
@@ -347,30 +365,14 @@ class NonGreedyDepresChannel ( _EbuildJobChannelBase ):
       #  (a) satisfiable is None (= on_error mode) or
       #  (b) all deps processed or
       #  (c) error queue not empty
-      while (
-         ( satisfiable is not None ) and
-         self._depdone < self._depcount and self.err_queue.empty
-      ):
-         # tell the resolver to start
-         self._depres_master.start()
-
-         # wait for one result at least
-         process_dep_result = handle_queue_item ( self._depres_queue.get() )
+      for dep_env in self._iter_results():
+         process_dep_result = handle_queue_item ( dep_env )
          if process_dep_result is None:
             satisfiable = None
+            break
          elif process_dep_result is False:
             satisfiable = False
-
-         # and process all available results
-         while ( satisfiable is not None ) and not self._depres_queue.empty():
-            process_dep_result = handle_queue_item (
-               self._depres_queue.get_nowait()
-            )
-            if process_dep_result is None:
-               satisfiable = None
-            elif process_dep_result is False:
-               satisfiable = False
-      # --- end while
+      # --- end for
 
       if allow_close and (
          not self.err_queue.empty or satisfiable is None
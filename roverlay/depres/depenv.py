@@ -10,14 +10,21 @@ This module implements DepEnv, a dependency environment that is used during
 dependency resolution. Typically, a DepEnv instance contains the original
 dependency string to be looked up, its resolution progess ("to be resolved",
 "is resolved, resolved by <>", "unresolvable") and some calculated data.
+
+It also provides DepEnvCache, a table of already parsed DepEnv objects
+that is used to avoid parsing the same dependency strings over and over.
 """
 
-__all__ = [ 'DepEnv', ]
+__all__ = [ 'DepEnv', 'DepEnvCache', ]
 
+import collections
+import copy
 import re
 import string
+import threading
 
 import roverlay.versiontuple
+import roverlay.stats.collector
 
 from roverlay import strutil
 
@@ -327,4 +334,103 @@ class DepEnv ( object ):
       return self.resolved_by
    # --- end of get_resolved (...) ---
 
+   def copy_template ( self ):
+      """Returns a new, unresolved DepEnv that shares the parsed data
+      (dep_str, fuzzy, ...) with this one, which is used as template
+      (see DepEnvCache).
+
+      The parsed data must not be modified.
+      """
+      dep_env = copy.copy ( self )
+      dep_env.zap()
+      return dep_env
+   # --- end of copy_template (...) ---
+
 # --- end of DepEnv ---
+
+
+class DepEnvCache ( object ):
+   """A bounded, thread-safe table of parsed dependency strings.
+
+   Maps ( dep_str, deptype_mask ) to a tuple of DepEnv objects as created by
+   DepEnv.from_str(), which are used as templates for new DepEnv objects.
+   The oldest entries are removed when the table is full.
+
+   Only dep envs without package reference can be cached.
+   """
+
+   STATS = roverlay.stats.collector.static.depres
+
+   # max number of cached dependency strings
+   DEFAULT_MAX_SIZE = 20000
+
+   def __init__ ( self, max_size=None ):
+      """Initializes a DepEnv cache.
+
+      arguments:
+      * max_size -- max number of cached dependency strings,
+                    defaults to DEFAULT_MAX_SIZE
+      """
+      super ( DepEnvCache, self ).__init__()
+      self.max_size = (
+         self.DEFAULT_MAX_SIZE if max_size is None else max_size
+      )
+      self.stats     = self.__class__.STATS
+      self._lock     = threading.Lock()
+      # map: ( dep_str, deptype_mask ) => tuple of DepEnv templates
+      self._entries  = collections.OrderedDict()
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._entries )
+   # --- end of __len__ (...) ---
+
+   def clear ( self ):
+      """Removes all entries."""
+      with self._lock:
+         self._entries.clear()
+   # --- end of clear (...) ---
+
+   def get_hit_rate ( self ):
+      """Returns the ratio of cache hits to lookups (0.0 if no lookups)."""
+      hits   = int ( self.stats.parse_cache_hits )
+      misses = int ( self.stats.parse_cache_misses )
+      lookups = hits + misses
+      return ( float ( hits ) / lookups ) if lookups else 0.0
+   # --- end of get_hit_rate (...) ---
+
+   def from_str ( self, dep_str, deptype_mask ):
+      """Returns a list of new DepEnv objects for the given dependency
+      string. See DepEnv.from_str() for details.
+
+      arguments:
+      * dep_str      --
+      * deptype_mask --
+      """
+      key = ( dep_str, deptype_mask )
+
+      with self._lock:
+         templates = self._entries.get ( key, None )
+         if templates is None:
+            self.stats.parse_cache_misses.inc()
+         else:
+            self.stats.parse_cache_hits.inc()
+
+      if templates is None:
+         # parsing is done without holding the lock,
+         #  concurrent lookups of the same dep_str parse it twice
+         templates = tuple ( DepEnv.from_str ( dep_str, deptype_mask ) )
+
+         with self._lock:
+            entries = self._entries
+            if key not in entries:
+               if self.max_size > 0:
+                  while len ( entries ) >= self.max_size:
+                     entries.popitem ( last=False )
+                  entries [key] = templates
+            # -- end if
+
+      return [ dep_env.copy_template() for dep_env in templates ]
+   # --- end of from_str (...) ---
+
+# --- end of DepEnvCache ---
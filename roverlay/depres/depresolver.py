@@ -8,6 +8,7 @@
 
 __all__ = [ 'DependencyResolver', ]
 
+import copy
 import logging
 import threading
 
@@ -22,20 +23,33 @@ from roverlay        import config
 from roverlay.depres import communication, deptype, events
 import roverlay.depres.simpledeprule.reader
 import roverlay.depres.simpledeprule.dynpool
+import roverlay.stats.collector
 
 
 # if false: do not use the "negative" result caching which stores
 # unresolvable deps in a set for should-be faster lookups
 USING_DEPRES_CACHE = True
 
+# if false: do not use the "positive" result caching which stores
+# dep results of resolved deps in a dict for faster lookups
+USING_RESULT_CACHE = True
+
 # if True: verify that channels are unique for a resolver instance
 SAFE_CHANNEL_IDS = True
 
 class DependencyResolver ( object ):
    """Main object for dependency resolution."""
 
-   def __init__ ( self, err_queue ):
-      """Initializes a DependencyResolver."""
+   STATS = roverlay.stats.collector.static.depres
+
+   def __init__ ( self, err_queue, jobcount=None ):
+      """Initializes a DependencyResolver.
+
+      arguments:
+      * err_queue --
+      * jobcount  -- number of resolver threads,
+                     defaults to None (-> DEPRES.jobcount)
+      """
 
       self.logger              = logging.getLogger ( self.__class__.__name__ )
       self.logger_unresolvable = self.logger.getChild ( "UNRESOLVABLE" )
@@ -46,7 +60,9 @@ class DependencyResolver ( object ):
          'RESOLVED', 'UNRESOLVABLE'
       )
 
-      self._jobs = config.get ( "DEPRES.jobcount", 0 )
+      self._jobs = (
+         config.get ( "DEPRES.jobcount", 0 ) if jobcount is None else jobcount
+      )
 
       # used to lock the run methods,
       self._runlock = threading.Lock()
@@ -58,8 +74,19 @@ class DependencyResolver ( object ):
          self._mainthread = None
          self._thread_close = False
 
+         # worker threads for batch resolution, started on demand
+         self._batch_threads     = None
+         self._batch_thread_lock = threading.Lock()
+
       self.err_queue = err_queue
 
+      # fifo queue for batch dep resolution,
+      #  items are 2-tuples ( channel id, list of dep envs ) or None
+      #  (which tells a batch worker thread to exit)
+      self._batchqueue = queue.Queue()
+      if err_queue is not None:
+         err_queue.attach_queue ( self._batchqueue, None )
+
       # the list of registered listener modules
       self.listeners = list ()
 
@@ -77,6 +104,24 @@ class DependencyResolver ( object ):
       if USING_DEPRES_CACHE:
          self._dep_unresolvable = set ()
 
+      # the 'positive' result cache,
+      #  map: dep_str_low -> ( deptype_mask, repo_id ) -> dep result
+      # has to be cleared whenever the rule pools change
+      #
+      # The repo id is part of the key because dynamic selfdep pools
+      # prefer rules of the dep's own repo.
+      if USING_RESULT_CACHE:
+         self._dep_resolved = dict()
+
+      # map: name -> set of dep_str_low,
+      #  where name is a dep's lowercase dep string or fuzzy name
+      # used for invalidating the cache entries of deps whose resolution
+      # might have changed after (incrementally) reloading dynamic pools
+      if USING_DEPRES_CACHE or USING_RESULT_CACHE:
+         self._dep_cache_names = dict()
+         # the names are registered by the resolver threads
+         self._dep_cache_names_lock = threading.Lock()
+
       # map: channel identifier -> queue of done deps (resolved/unresolvable)
       # this serves two purposes:
       # (a) channels can do a blocking call on this queue
@@ -112,9 +157,64 @@ class DependencyResolver ( object ):
          self._dep_unresolvable.clear()
    # --- end of _reset_unresolvable (...) ---
 
+   def _reset_resolved ( self ):
+      if USING_RESULT_CACHE:
+         self._dep_resolved.clear()
+   # --- end of _reset_resolved (...) ---
+
+   def _reset_caches ( self ):
+      """Clears the 'negative' and 'positive' result caches."""
+      self._reset_unresolvable()
+      self._reset_resolved()
+      if USING_DEPRES_CACHE or USING_RESULT_CACHE:
+         with self._dep_cache_names_lock:
+            self._dep_cache_names.clear()
+   # --- end of _reset_caches (...) ---
+
+   def _add_cache_names ( self, dep_env ):
+      """Registers the names of a dep env whose result is cached.
+
+      arguments:
+      * dep_env --
+      """
+      dep_str_low = dep_env.dep_str_low
+      cache_names = self._dep_cache_names
+
+      names = [ dep_str_low ]
+      fuzzy_splits = getattr ( dep_env, 'fuzzy', None )
+      if fuzzy_splits:
+         names.extend ( fuzzy ['name_low'] for fuzzy in fuzzy_splits )
+
+      with self._dep_cache_names_lock:
+         for name in names:
+            cache_names.setdefault ( name, set() ).add ( dep_str_low )
+   # --- end of _add_cache_names (...) ---
+
+   def _reset_caches_for ( self, names ):
+      """Removes the cached results of all deps whose dep string or fuzzy
+      name is in the given list of (lowercase) names.
+
+      arguments:
+      * names --
+      """
+      if USING_DEPRES_CACHE or USING_RESULT_CACHE:
+         cache_names = self._dep_cache_names
+         with self._dep_cache_names_lock:
+            dep_strs = [
+               dep_str_low for name in names
+                  for dep_str_low in cache_names.pop ( name, () )
+            ]
+
+         for dep_str_low in dep_strs:
+            if USING_DEPRES_CACHE:
+               self._dep_unresolvable.discard ( dep_str_low )
+            if USING_RESULT_CACHE:
+               self._dep_resolved.pop ( dep_str_low, None )
+   # --- end of _reset_caches_for (...) ---
+
    def _new_rulepools_added ( self ):
       """Called after adding new rool pools."""
-      self._reset_unresolvable()
+      self._reset_caches()
       self._sort()
    # --- end of _new_rulepools_added (...) ---
 
@@ -160,14 +260,34 @@ class DependencyResolver ( object ):
    # --- end of need_reload (...) ---
 
    def reload_pools ( self, only_if_required=False ):
+      """Reloads the dynamic rule pools.
+
+      Pools that support incremental updates only recreate rules that have
+      changed, and only the cached results of deps that could be affected
+      by these rules are dropped.
+
+      arguments:
+      * only_if_required -- reload only if need_reload() has been called
+                            since the last reload
+      """
       if not only_if_required or self._need_reload:
-         one = False
+         full_reload   = False
+         changed_names = set()
          for pool in self.dynamic_rule_pools:
-            one = True
-            pool.reload()
+            names = pool.reload_incremental()
+            if names is None:
+               full_reload = True
+            else:
+               changed_names.update ( names )
 
-         if one:
+         if full_reload:
             self._new_rulepools_added()
+         elif changed_names:
+            self._reset_caches_for ( changed_names )
+            # rule weights of dynamic pools may have changed
+            self.dynamic_rule_pools.sort (
+               key=lambda pool : ( pool.priority, pool.rule_weight )
+            )
 
          self._need_reload = False
    # --- end of reload_pools (...) ---
@@ -372,6 +492,27 @@ class DependencyResolver ( object ):
       # drop dep if channel closed
       if not channel_id in self._depqueue_done: return
 
+      if self._resolve_dep ( dep_env ):
+         try:
+            self._depqueue_done [channel_id].put ( dep_env )
+         except KeyError:
+            # channel gone while resolving
+            pass
+      else:
+         self._depqueue_failed.put ( queue_item )
+   # --- end of _process_dep (...) ---
+
+   def _resolve_dep ( self, dep_env ):
+      """Tries to resolve a single dependency.
+
+      Marks the dep env as resolved (and reports a RESOLVED event) if
+      successful. Unresolvable deps are not marked, this is up to the caller.
+
+      Returns True if the dep has been resolved, else False.
+
+      arguments:
+      * dep_env --
+      """
       self.logger.debug (
          "Trying to resolve {!r}.".format ( dep_env.dep_str )
       )
@@ -384,11 +525,32 @@ class DependencyResolver ( object ):
       #  2 -> resolved
       is_resolved = 0
 
-      if USING_DEPRES_CACHE and dep_env.dep_str_low in self._dep_unresolvable:
+      if USING_RESULT_CACHE:
+         cache_key = ( dep_env.deptype_mask, dep_env.repo_id )
+         resolved  = self._dep_resolved.get (
+            dep_env.dep_str_low, {}
+         ).get ( cache_key, None )
+      # -- end if
+
+      if resolved is not None:
+         # cached result
+         #  selfdep results get modified during selfdep reduction,
+         #  so they must not be shared
+         self.STATS.cache_hits.inc()
+         if resolved.is_selfdep:
+            resolved = copy.copy ( resolved )
+         is_resolved = 2
+
+      elif (
+         USING_DEPRES_CACHE and dep_env.dep_str_low in self._dep_unresolvable
+      ):
          # cannot resolve
          is_resolved = 1
 
       else:
+         if USING_RESULT_CACHE:
+            self.STATS.cache_misses.inc()
+
          for rulepool in (
             p for p in self.dynamic_rule_pools if p.accepts ( dep_env )
          ):
@@ -425,23 +587,27 @@ class DependencyResolver ( object ):
                   break
          # --
 
+         if USING_RESULT_CACHE and is_resolved == 2:
+            self._dep_resolved.setdefault (
+               dep_env.dep_str_low, {}
+            ) [cache_key] = (
+               copy.copy ( resolved ) if resolved.is_selfdep else resolved
+            )
+            self._add_cache_names ( dep_env )
       # -- done with resolving
 
       if is_resolved != 2:
          # could not resolve dep_env
-         self._depqueue_failed.put ( queue_item )
          if USING_DEPRES_CACHE:
             # does not work when adding new rules is possible
+            #  (except for dynamic pools, see reload_pools())
             self._dep_unresolvable.add ( dep_env.dep_str_low )
+            self._add_cache_names ( dep_env )
+         return False
       else:
          # successfully resolved
          dep_env.set_resolved ( resolved, append=False )
          self._report_event ( 'RESOLVED', dep_env )
-         try:
-            self._depqueue_done [channel_id].put ( dep_env )
-         except KeyError:
-            # channel gone while resolving
-            pass
 
          """
          ## only useful if new rules can be created
@@ -452,7 +618,34 @@ class DependencyResolver ( object ):
             if USING_DEPRES_CACHE:
                self._dep_unresolvable.clear() #?
          """
-   # --- end of _process_dep (...) ---
+         return True
+   # --- end of _resolve_dep (...) ---
+
+   def _process_batch ( self, channel_id, dep_envs ):
+      """Resolves a batch of dependencies and delivers it to the channel's
+      queue as a whole, after marking unresolvable deps as such.
+
+      Unlike _process_dep(), this does not involve the failed deps queue,
+      a batch is done as soon as all of its deps have been looked up.
+
+      arguments:
+      * channel_id -- identifier of the channel that submitted the batch
+      * dep_envs   -- list of dep envs
+      """
+      # drop batch if channel closed
+      if not channel_id in self._depqueue_done: return
+
+      for dep_env in dep_envs:
+         if not self._resolve_dep ( dep_env ):
+            dep_env.set_unresolvable()
+            self._report_event ( 'UNRESOLVABLE', dep_env )
+
+      try:
+         self._depqueue_done [channel_id].put ( dep_envs )
+      except KeyError:
+         # channel gone while resolving
+         pass
+   # --- end of _process_batch (...) ---
 
    def _run_resolver ( self ):
       # single-threaded variant of run
@@ -562,6 +755,67 @@ class DependencyResolver ( object ):
          pass
    # --- end of _thread_resolve (...) ---
 
+   def _thread_resolve_batches ( self ):
+      """batch worker thread"""
+      try:
+         while self.err_queue.empty:
+            batch = self._batchqueue.get()
+            if batch is None:
+               break
+            self._process_batch ( *batch )
+      except ( Exception, KeyboardInterrupt ) as e:
+         # unblocks the channels' queues
+         self.err_queue.push ( id ( self ), e )
+
+      if not self.err_queue.empty:
+         # on-error code, let the other batch threads exit, too
+         self._batchqueue.put ( None )
+   # --- end of _thread_resolve_batches (...) ---
+
+   def _start_batch_threads ( self ):
+      """Starts the batch worker threads if not already done."""
+      with self._batch_thread_lock:
+         if self._batch_threads is None:
+            self.logger.debug (
+               "Starting {} batch resolver threads.".format ( self._jobs )
+            )
+            self._batch_threads = tuple (
+               threading.Thread ( target=self._thread_resolve_batches )
+               for n in range ( self._jobs )
+            )
+            for t in self._batch_threads: t.start()
+   # --- end of _start_batch_threads (...) ---
+
+   def enqueue_batch ( self, dep_envs, channel_id ):
+      """Submits a list of DepEnvs for resolution. The deps are resolved
+      as a whole (by one thread) and delivered to the channel's queue as
+      one item, the list itself, after all deps have been marked as
+      resolved or unresolvable. The order of the deps is kept.
+
+      In single-threaded mode, the batch is resolved before this method
+      returns.
+
+      arguments:
+      * dep_envs   -- list of dep envs
+      * channel_id -- identifier of the channel associated with the dep envs
+
+      returns: None (implicit)
+      """
+      if self._jobs < 2:
+         try:
+            self._runlock.acquire()
+            if self.err_queue.empty:
+               self._process_batch ( channel_id, dep_envs )
+         except ( Exception, KeyboardInterrupt ) as e:
+            self.err_queue.push ( id ( self ), e )
+            raise e
+         finally:
+            self._runlock.release()
+      else:
+         self._start_batch_threads()
+         self._batchqueue.put ( ( channel_id, dep_envs ) )
+   # --- end of enqueue_batch (...) ---
+
    def enqueue ( self, dep_env, channel_id ):
       """Adds a DepEnv to the queue of deps to resolve.
 
@@ -579,6 +833,10 @@ class DependencyResolver ( object ):
          self._thread_close = True
          if self._mainthread:
             self._mainthread.join()
+         if self._batch_threads:
+            for t in self._batch_threads: self._batchqueue.put ( None )
+            for t in self._batch_threads: t.join()
+            self._batch_threads = None
       for lis in self.listeners: lis.close()
       del self.listeners
       if SAFE_CHANNEL_IDS:
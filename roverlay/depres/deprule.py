@@ -327,4 +327,16 @@ class DynamicDependencyRulePool ( DependencyRulePoolBase ):
       self.sort()
    # --- end of reload (...) ---
 
+   def reload_incremental ( self ):
+      """Reloads this pool's rules.
+
+      Pools that are able to update their rules incrementally override this
+      method and return the lowercase dependency strings/names whose
+      resolution might have changed. Returns None, which means that all
+      rules have been recreated.
+      """
+      self.reload()
+      return None
+   # --- end of reload_incremental (...) ---
+
 # --- end of DynamicDependencyRulePool ---
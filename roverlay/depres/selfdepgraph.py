@@ -0,0 +1,168 @@
+# R overlay -- dependency resolution, selfdep reduction graph
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""selfdep reduction graph
+
+This module provides the SelfdepGraph class that performs selfdep
+reduction ("reduce" step of the selfdep validation) for a list of linked
+selfdeps (dep results).
+
+A selfdep is satisfiable as long as it has at least one valid candidate,
+and a package (candidate) stays valid as long as all of its selfdeps are
+satisfiable. Instead of calling do_reduce() for all selfdeps until nothing
+changes, the graph keeps track of which selfdeps have to be revisited when
+a selfdep runs out of candidates, i.e. when the packages owning it
+become invalid. The result is identical to the fixed-point iteration.
+"""
+
+__all__ = [ 'SelfdepGraph', ]
+
+import collections
+
+
+def _get_package_str ( p ):
+   """Returns a string representation of a package (info) object
+   suitable for dumping the graph.
+
+   arguments:
+   * p -- package info
+   """
+   try:
+      return "{}-{}".format ( p['name'], p['ebuild_verstr'] )
+   except ( KeyError, TypeError ):
+      return str ( p )
+# --- end of _get_package_str (...) ---
+
+
+class SelfdepGraph ( object ):
+   """Reverse dependency graph for selfdep reduction.
+
+   Edges:
+   * selfdep -> candidate                (selfdep.candidates)
+   * candidate -> selfdep                (candidate.selfdeps)
+   * selfdep -> dependent selfdeps       (reverse edges, computed)
+
+   A selfdep's "dependents" are the selfdeps that list at least one package
+   owning that selfdep as candidate. Only these have to be reduced again
+   when the selfdep becomes unsatisfiable.
+   """
+
+   def __init__ ( self, selfdeps ):
+      """Initializes a selfdep reduction graph.
+
+      The selfdeps have to be linked (see Overlay.link_selfdeps()) before
+      creating the graph.
+
+      arguments:
+      * selfdeps -- list of selfdep dep results
+      """
+      super ( SelfdepGraph, self ).__init__()
+      self.selfdeps    = selfdeps
+      # map: id(selfdep) => ordered list of selfdeps depending on it
+      self._dependents = None
+      self.build()
+   # --- end of __init__ (...) ---
+
+   def build ( self ):
+      """(Re-)creates the reverse dependency graph."""
+      # dep results compare equal if their dep strings are equal,
+      # so the graph is keyed by object identity (id())
+      #
+      # map: id(package) => list of selfdeps having that package as candidate
+      rdeps      = dict()
+      packages   = list()
+      dependents = dict()
+
+      for selfdep in self.selfdeps:
+         dependents [id ( selfdep )] = list()
+         for p in selfdep.candidates:
+            rdep_list = rdeps.get ( id ( p ) )
+            if rdep_list is None:
+               packages.append ( p )
+               rdeps [id ( p )] = [ selfdep ]
+            else:
+               rdep_list.append ( selfdep )
+
+      for p in packages:
+         if p.selfdeps:
+            for owned_selfdep in p.selfdeps:
+               dep_list = dependents.get ( id ( owned_selfdep ) )
+               if dep_list is not None:
+                  known = set ( id ( rdep ) for rdep in dep_list )
+                  for rdep in rdeps [id ( p )]:
+                     if id ( rdep ) not in known:
+                        known.add ( id ( rdep ) )
+                        dep_list.append ( rdep )
+
+      self._dependents = dependents
+   # --- end of build (...) ---
+
+   def get_dependents ( self, selfdep ):
+      """Returns the selfdeps that need to be reduced again when the given
+      selfdep becomes unsatisfiable.
+
+      arguments:
+      * selfdep --
+      """
+      return self._dependents.get ( id ( selfdep ), () )
+   # --- end of get_dependents (...) ---
+
+   def reduce ( self ):
+      """Eliminates invalid candidates from all selfdeps.
+
+      Returns the number of removed candidates.
+      """
+      selfdeps    = self.selfdeps
+      dependents  = self._dependents
+      # all selfdeps have to be visited at least once
+      work_queue  = collections.deque ( selfdeps )
+      queued      = set ( id ( selfdep ) for selfdep in selfdeps )
+      num_removed = 0
+
+      while work_queue:
+         selfdep = work_queue.popleft()
+         queued.discard ( id ( selfdep ) )
+
+         n = selfdep.do_reduce()
+         if n:
+            num_removed += n
+            if not selfdep.candidates:
+               # the packages owning this selfdep are no longer valid
+               for rdep in dependents [id ( selfdep )]:
+                  if id ( rdep ) not in queued:
+                     queued.add ( id ( rdep ) )
+                     work_queue.append ( rdep )
+      # -- end while;
+
+      return num_removed
+   # --- end of reduce (...) ---
+
+   def iter_dump_lines ( self ):
+      """Generator that yields text lines describing the graph
+      (for debugging).
+      """
+      for selfdep in self.selfdeps:
+         yield "selfdep {!s} (satisfiable={!r})".format (
+            selfdep.dep, bool ( selfdep.candidates )
+         )
+         for p in selfdep.candidates:
+            yield "  candidate {}".format ( _get_package_str ( p ) )
+         for rdep in self.get_dependents ( selfdep ):
+            yield "  dependent {!s}".format ( rdep.dep )
+   # --- end of iter_dump_lines (...) ---
+
+   def dump ( self, fh ):
+      """Writes the graph to a file-like object (for debugging).
+
+      arguments:
+      * fh --
+      """
+      for line in self.iter_dump_lines():
+         fh.write ( line )
+         fh.write ( '\n' )
+   # --- end of dump (...) ---
+
+# --- end of SelfdepGraph ---
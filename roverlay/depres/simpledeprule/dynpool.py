@@ -13,6 +13,9 @@ The rules are created by using a rule generator, typically provided by the
 overlay.
 The DynamicSelfdepRulePool is strict about matches; it only matches strings
 whose dependency type contains deptype.internal.
+Rule lookups are accelerated by per-repo inverted indexes (see ruleindex).
+After the initial load, the pool is updated incrementally: only the rules of
+package dirs that have been modified are recreated (see reload_incremental()).
 """
 
 __all__ = [ 'DynamicSelfdepRulePool', 'get' ]
@@ -20,10 +23,14 @@ __all__ = [ 'DynamicSelfdepRulePool', 'get' ]
 from roverlay.depres import deptype
 from roverlay.depres.deprule import DynamicDependencyRulePool
 from roverlay.depres.simpledeprule.rules import SimpleFuzzyDependencyRule
+from roverlay.depres.simpledeprule.ruleindex import DynamicRuleIndex
 
 class DynamicSelfdepRulePool ( DynamicDependencyRulePool ):
    """A rule pool that gets its rules from a function."""
 
+   # key of the rule index for rules without repo
+   NO_REPO_ID = '_'
+
    def __init__ ( self, rule_generator, rule_class, priority=120, **kwargs ):
       super ( DynamicSelfdepRulePool, self ). __init__ (
          name='dynamic selfdeps', priority=priority,
@@ -31,13 +38,19 @@ class DynamicSelfdepRulePool ( DynamicDependencyRulePool ):
          **kwargs
       )
 
-      self.rules           = None
+      # map: repo id => rule index
+      self._rule_index     = None
+      # repo ids, ordered (rules without repo first)
+      self._repo_order     = None
       self._rule_generator = rule_generator
       self.set_rule_class ( rule_class )
    # --- end of __init__ (...) ---
 
    def get_rule_count ( self ):
-      return len ( self.rules )
+      if self._rule_index:
+         return sum ( len ( index ) for index in self._rule_index.values() )
+      else:
+         return 0
    # --- end of get_rule_count (...) ---
 
    def sort_rules ( self ):
@@ -46,21 +59,23 @@ class DynamicSelfdepRulePool ( DynamicDependencyRulePool ):
    # --- end of sort_rules (...) ---
 
    def iter_rules ( self ):
-      if self.rules:
-         for rules in self.rules.values():
-            for rule in rules:
+      if self._rule_index:
+         for repo_id in self._repo_order:
+            for rule in self._rule_index [repo_id].iter_rules():
                yield rule
    # --- end of iter_rules (...) ---
 
    def iter_rules_resolving ( self, dep_env ):
-      specific_rules = self.rules.get ( dep_env.repo_id, None )
-      if specific_rules is not None:
-         for rule in specific_rules:
+      rule_index     = self._rule_index
+      specific_index = rule_index.get ( dep_env.repo_id, None )
+      if specific_index is not None:
+         for rule in specific_index.iter_candidates ( dep_env ):
             yield rule
 
-      for rules in self.rules.values():
-         if rules is not specific_rules:
-            for rule in rules:
+      for repo_id in self._repo_order:
+         index = rule_index [repo_id]
+         if index is not specific_index:
+            for rule in index.iter_candidates ( dep_env ):
                yield rule
    # --- end of iter_rules_resolving (...) ---
 
@@ -73,10 +88,73 @@ class DynamicSelfdepRulePool ( DynamicDependencyRulePool ):
       return False
    # --- end of accepts_other (...) ---
 
+   def _update_rules ( self ):
+      """Applies the rule changes reported by the rule generator.
+
+      Returns the lowercase aliases of all added/removed rules.
+      """
+      rule_index      = self._rule_index
+      no_repo_id      = self.NO_REPO_ID
+      get_aliases     = DynamicRuleIndex.get_rule_aliases
+      new_repo        = False
+      changed_aliases = set()
+      weight_diff     = 0
+
+      for key, old_entry, new_entry in (
+         self._rule_generator.get_rule_changes()
+      ):
+         if old_entry is not None:
+            repo_ids, rule = old_entry
+            for repo_id in ( repo_ids or ( no_repo_id, ) ):
+               rule_index [repo_id].remove ( key )
+               weight_diff -= rule.priority
+            changed_aliases.update ( get_aliases ( rule ) )
+
+         if new_entry is not None:
+            repo_ids, rule = new_entry
+            for repo_id in ( repo_ids or ( no_repo_id, ) ):
+               index = rule_index.get ( repo_id, None )
+               if index is None:
+                  index = DynamicRuleIndex()
+                  rule_index [repo_id] = index
+                  new_repo = True
+               index.add ( key, rule )
+               weight_diff += rule.priority
+            changed_aliases.update ( get_aliases ( rule ) )
+      # -- end for
+
+      if new_repo:
+         self._repo_order = sorted (
+            rule_index,
+            key=lambda k: ( ( 0, 0 ) if k == no_repo_id else ( 1, k ) )
+         )
+
+      self.rule_weight += weight_diff
+      return changed_aliases
+   # --- end of _update_rules (...) ---
+
    def reload_rules ( self ):
-      self.rules = self._rule_generator.make_ordered_rule_dict()
+      self._rule_generator.reset()
+      self._rule_index = { self.NO_REPO_ID: DynamicRuleIndex() }
+      self._repo_order = [ self.NO_REPO_ID ]
+      self.rule_weight = 0
+      self._update_rules()
    # --- end of reload_rules (...) ---
 
+   def reload_incremental ( self ):
+      """Updates the rules of package dirs that have been modified since
+      the last (incremental) reload.
+
+      Returns the lowercase aliases of all added/removed rules,
+      or None if all rules have been recreated.
+      """
+      if self._rule_index is None:
+         self.reload()
+         return None
+      else:
+         return self._update_rules()
+   # --- end of reload_incremental (...) ---
+
 # --- end of DynamicSelfdepRulePool ---
 
 
@@ -8,12 +8,14 @@
 
 This module provides a class, SimpleDependencyRulePool, that extends the
 usual rule pool by the possibility to export all rules to text/file.
+Rule lookups are accelerated by an inverted index (see ruleindex).
 """
 
 __all__ = [ 'SimpleDependencyRulePool', ]
 
 from roverlay.depres import deprule
 from roverlay.depres.simpledeprule.abstractrules import SimpleRule
+from roverlay.depres.simpledeprule.ruleindex import SimpleRuleIndex
 
 class SimpleDependencyRulePool ( deprule.DependencyRulePool ):
 
@@ -29,8 +31,32 @@ class SimpleDependencyRulePool ( deprule.DependencyRulePool ):
       super ( SimpleDependencyRulePool, self ) . __init__ (
          name, priority, **kw
       )
+      # the rule index gets (re-)created on demand
+      self._rule_index = None
    # --- end of __init__ (...) ---
 
+   def get_rule_index ( self ):
+      """Returns the rule index of this pool. Creates a new one if necessary.
+
+      Rules may be added directly to self.rules (followed by sort()),
+      so the index is also recreated if the rule count has changed.
+      """
+      rule_index = self._rule_index
+      if rule_index is None or rule_index.rule_count != len ( self.rules ):
+         rule_index       = SimpleRuleIndex ( self.rules )
+         self._rule_index = rule_index
+      return rule_index
+   # --- end of get_rule_index (...) ---
+
+   def iter_rules_resolving ( self, dep_env ):
+      return self.get_rule_index().iter_candidates ( dep_env )
+   # --- end of iter_rules_resolving (...) ---
+
+   def sort_rules ( self ):
+      super ( SimpleDependencyRulePool, self ).sort_rules()
+      self._rule_index = None
+   # --- end of sort_rules (...) ---
+
    def add ( self, rule ):
       """Adds a rule to this pool.
       Its class has to be SimpleIgnoreDependencyRule or derived from it.
@@ -41,6 +67,7 @@ class SimpleDependencyRulePool ( deprule.DependencyRulePool ):
       # trust in proper usage
       if isinstance ( rule, SimpleRule ):
          self._rule_add ( rule )
+         self._rule_index = None
       else:
          raise Exception ( "bad usage (simple dependency rule expected)." )
    # --- end of add (...) ---
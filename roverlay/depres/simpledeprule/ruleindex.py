@@ -0,0 +1,249 @@
+# R overlay -- simple dependency rules, rule index
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""simple dependency rule index
+
+This module provides a class, SimpleRuleIndex, that maps lowercase
+dependency strings to the (simple) dependency rules that could possibly
+match them. Rule pools use it to look up candidate rules instead of
+iterating over all rules.
+
+Simple rules match a dependency string if its lowercase form is one of the
+rule's aliases ("dep_alias_low"). Fuzzy rules additionally match if the
+(lowercase) name of any fuzzy split of the dependency string is an alias.
+Since rule pools return the first matching rule, the candidates are always
+yielded in rule list order.
+
+DynamicRuleIndex is a variant for rule pools whose rules change at runtime
+(e.g. the dynamic selfdep pool). It identifies rules by key and supports
+adding/removing single rules.
+"""
+
+__all__ = [ 'SimpleRuleIndex', 'DynamicRuleIndex', ]
+
+from roverlay.depres.simpledeprule.abstractrules import \
+   SimpleRule, FuzzySimpleRule
+
+
+class SimpleRuleIndex ( object ):
+   """An inverted index  <lowercase alias> => <rule positions>."""
+
+   def __init__ ( self, rules ):
+      """Initializes a SimpleRuleIndex.
+
+      The rule list must not be modified afterwards (the index has to be
+      recreated in that case).
+
+      arguments:
+      * rules -- list of (ordered) dependency rules
+      """
+      super ( SimpleRuleIndex, self ).__init__()
+      self.rules      = rules
+      self.rule_count = len ( rules )
+
+      # map: alias => list of rule positions
+      #  * _exact contains all simple rules,
+      #  * _fuzzy contains fuzzy rules only
+      self._exact     = dict()
+      self._fuzzy     = dict()
+      # positions of rules that cannot be indexed (always candidates)
+      self._unindexed = list()
+
+      self._build()
+   # --- end of __init__ (...) ---
+
+   @classmethod
+   def get_rule_aliases ( cls, rule ):
+      """Returns the lowercase aliases of a simple rule.
+
+      arguments:
+      * rule --
+      """
+      aliases = getattr ( rule, 'dep_alias_low', None )
+      if aliases is None:
+         aliases = frozenset ( alias.lower() for alias in rule.dep_alias )
+      return aliases
+   # --- end of get_rule_aliases (...) ---
+
+   def _build ( self ):
+      exact = self._exact
+      fuzzy = self._fuzzy
+
+      for index, rule in enumerate ( self.rules ):
+         if isinstance ( rule, SimpleRule ):
+            is_fuzzy = isinstance ( rule, FuzzySimpleRule )
+
+            for alias in self.get_rule_aliases ( rule ):
+               if alias in exact:
+                  exact [alias].append ( index )
+               else:
+                  exact [alias] = [ index ]
+
+               if not is_fuzzy:
+                  pass
+               elif alias in fuzzy:
+                  fuzzy [alias].append ( index )
+               else:
+                  fuzzy [alias] = [ index ]
+         else:
+            self._unindexed.append ( index )
+   # --- end of _build (...) ---
+
+   def get_candidate_indexes ( self, dep_env ):
+      """Returns a sorted list of rule positions that could match dep_env.
+
+      arguments:
+      * dep_env --
+      """
+      indexes = set ( self._unindexed )
+      indexes.update ( self._exact.get ( dep_env.dep_str_low, () ) )
+
+      fuzzy_splits = getattr ( dep_env, 'fuzzy', None )
+      if fuzzy_splits:
+         for fuzzy in fuzzy_splits:
+            indexes.update ( self._fuzzy.get ( fuzzy ['name_low'], () ) )
+
+      return sorted ( indexes )
+   # --- end of get_candidate_indexes (...) ---
+
+   def iter_candidates ( self, dep_env ):
+      """Generator that yields all rules that could match dep_env,
+      ordered by their position in the rule list.
+
+      arguments:
+      * dep_env --
+      """
+      rules = self.rules
+      for index in self.get_candidate_indexes ( dep_env ):
+         yield rules [index]
+   # --- end of iter_candidates (...) ---
+
+# --- end of SimpleRuleIndex ---
+
+
+class DynamicRuleIndex ( object ):
+   """An inverted index <lowercase alias> => <rule keys> that supports
+   adding and removing rules.
+
+   Each rule is identified by a unique, sortable key (e.g. the package
+   resolved by a selfdep rule). Candidates are yielded ordered by
+   ( rule priority, key ), which does not depend on the order in which
+   rules have been added.
+   """
+
+   get_rule_aliases = SimpleRuleIndex.get_rule_aliases
+
+   def __init__ ( self ):
+      super ( DynamicRuleIndex, self ).__init__()
+      # map: key => rule
+      self._rules     = dict()
+      # map: alias => set of keys (see SimpleRuleIndex)
+      self._exact     = dict()
+      self._fuzzy     = dict()
+      # keys of rules that cannot be indexed (always candidates)
+      self._unindexed = set()
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._rules )
+   # --- end of __len__ (...) ---
+
+   def _get_sort_key ( self, key ):
+      return ( self._rules [key].priority, key )
+   # --- end of _get_sort_key (...) ---
+
+   def get ( self, key ):
+      """Returns the rule identified by key (or None)."""
+      return self._rules.get ( key, None )
+   # --- end of get (...) ---
+
+   def add ( self, key, rule ):
+      """Adds a rule. Replaces the existing rule with the same key, if any.
+
+      Returns the replaced rule (or None).
+
+      arguments:
+      * key  -- unique rule key
+      * rule --
+      """
+      old_rule = self.remove ( key )
+      self._rules [key] = rule
+
+      if isinstance ( rule, SimpleRule ):
+         is_fuzzy = isinstance ( rule, FuzzySimpleRule )
+
+         for alias in self.get_rule_aliases ( rule ):
+            self._exact.setdefault ( alias, set() ).add ( key )
+            if is_fuzzy:
+               self._fuzzy.setdefault ( alias, set() ).add ( key )
+      else:
+         self._unindexed.add ( key )
+
+      return old_rule
+   # --- end of add (...) ---
+
+   def remove ( self, key ):
+      """Removes a rule.
+
+      Returns the removed rule (or None if there was no such rule).
+
+      arguments:
+      * key --
+      """
+      rule = self._rules.pop ( key, None )
+      if rule is None:
+         pass
+      elif isinstance ( rule, SimpleRule ):
+         for alias in self.get_rule_aliases ( rule ):
+            for alias_map in ( self._exact, self._fuzzy ):
+               keys = alias_map.get ( alias )
+               if keys is not None:
+                  keys.discard ( key )
+                  if not keys:
+                     del alias_map [alias]
+      else:
+         self._unindexed.discard ( key )
+
+      return rule
+   # --- end of remove (...) ---
+
+   def iter_rules ( self ):
+      """Generator that yields all rules (ordered by priority, key)."""
+      rules = self._rules
+      for key in sorted ( rules, key=self._get_sort_key ):
+         yield rules [key]
+   # --- end of iter_rules (...) ---
+
+   def get_candidate_keys ( self, dep_env ):
+      """Returns an ordered list of keys of rules that could match dep_env.
+
+      arguments:
+      * dep_env --
+      """
+      keys = set ( self._unindexed )
+      keys.update ( self._exact.get ( dep_env.dep_str_low, () ) )
+
+      fuzzy_splits = getattr ( dep_env, 'fuzzy', None )
+      if fuzzy_splits:
+         for fuzzy in fuzzy_splits:
+            keys.update ( self._fuzzy.get ( fuzzy ['name_low'], () ) )
+
+      return sorted ( keys, key=self._get_sort_key )
+   # --- end of get_candidate_keys (...) ---
+
+   def iter_candidates ( self, dep_env ):
+      """Generator that yields all rules that could match dep_env,
+      ordered by ( rule priority, key ).
+
+      arguments:
+      * dep_env --
+      """
+      rules = self._rules
+      for key in self.get_candidate_keys ( dep_env ):
+         yield rules [key]
+   # --- end of iter_candidates (...) ---
+
+# --- end of DynamicRuleIndex ---
@@ -12,6 +12,9 @@ __all__ = [
    'multihash', 'multihash_file',
    'md5sum_file', 'sha1_file', 'sha256_file', 'sha512_file',
    'whirlpool_file',
+   'set_digest_store', 'get_digest_store',
+   'get_file_digests', 'get_file_digest', 'record_file_digests',
+   'lookup_file_digests', 'store_file_digests', 'SLOW_DIGEST_TYPES',
 ]
 
 DEFAULT_BLOCKSIZE=16384
@@ -66,12 +69,20 @@ def hashlib_supports ( name ):
 
 if hashlib_supports ( 'whirlpool' ):
    _HASH_CREATE_MAP ['whirlpool'] = hashlib_wrap ( "whirlpool" )
+   SLOW_DIGEST_TYPES = frozenset()
 else:
    import portage.util.whirlpool
    _HASH_CREATE_MAP ['whirlpool'] = portage.util.whirlpool.new
+   # portage's whirlpool implementation is pure python, which is
+   # orders of magnitude slower than hashlib and holds the GIL
+   SLOW_DIGEST_TYPES = frozenset ({ 'whirlpool', })
 
 # -- end of imports / HASH_CREATE_MAP
 
+# digest store (roverlay.db.digeststore.DigestStore) or None,
+#  see set_digest_store()
+_DIGEST_STORE = None
+
 
 def _generic_obj_hash (
    hashobj, fh, binary_digest=False, blocksize=DEFAULT_BLOCKSIZE
@@ -189,3 +200,136 @@ digest_comparator = (
       )
    )
 )
+
+def set_digest_store ( digest_store ):
+   """Sets the digest store that is used by get_file_digests() etc.
+
+   arguments:
+   * digest_store -- digest store or None (disable)
+   """
+   global _DIGEST_STORE
+   _DIGEST_STORE = digest_store
+# --- end of set_digest_store (...) ---
+
+def get_digest_store():
+   """Returns the digest store (or None)."""
+   return _DIGEST_STORE
+# --- end of get_digest_store (...) ---
+
+def get_store_digest_types ( digest_types=() ):
+   """Returns a set of the given digest types and the digest types that
+   should be calculated whenever a file has to be read (as configured for
+   the digest store), restricted to supported digest types.
+
+   arguments:
+   * digest_types --
+   """
+   digest_store = _DIGEST_STORE
+   if digest_store is None:
+      return set ( digest_types )
+   else:
+      return set ( digest_types ) | {
+         h for h in digest_store.digest_types if h in _HASH_CREATE_MAP
+      }
+# --- end of get_store_digest_types (...) ---
+
+def lookup_file_digests ( filepath, digest_types ):
+   """Looks up the requested digests of a file in the digest store (if set)
+   and returns a 3-tuple ( stat key, hashdict, missing digest types ).
+
+   missing is an empty set if all requested digests are known, else it
+   contains all digest types that should be calculated when reading the
+   file (including those configured for the digest store).
+   The stat key is None if no digest store is set.
+
+   arguments:
+   * filepath     --
+   * digest_types -- iterable with digest types (e.g. md5)
+   """
+   digest_store = _DIGEST_STORE
+   if digest_store is None:
+      return ( None, dict(), set ( digest_types ) )
+
+   stat_key, hashdict = digest_store.lookup ( filepath )
+   if any ( h not in hashdict for h in digest_types ):
+      missing = get_store_digest_types ( digest_types ) - set ( hashdict )
+   else:
+      missing = set()
+
+   return ( stat_key, hashdict, missing )
+# --- end of lookup_file_digests (...) ---
+
+def store_file_digests ( stat_key, filepath, hashdict ):
+   """Adds digests that have been calculated after looking up a file
+   (see lookup_file_digests()) to the digest store. Does nothing if no
+   digest store is set.
+
+   arguments:
+   * stat_key -- stat key returned by lookup_file_digests()
+   * filepath --
+   * hashdict -- dict ( digest type => hex digest )
+   """
+   digest_store = _DIGEST_STORE
+   if digest_store is not None:
+      digest_store.record ( stat_key, filepath, hashdict )
+# --- end of store_file_digests (...) ---
+
+def get_file_digests ( filepath, digest_types ):
+   """Returns a dict ( digest type => hex digest ) with the requested
+   digests of a file.
+
+   Known digests are taken from the digest store (if set). The file is only
+   read if any digest is missing, in which case all missing digest types
+   (including those configured for the digest store) are calculated in a
+   single read pass and added to the digest store.
+
+   arguments:
+   * filepath     --
+   * digest_types -- iterable with digest types (e.g. md5)
+   """
+   if _DIGEST_STORE is None:
+      return multihash_file ( filepath, digest_types )
+
+   stat_key, hashdict, missing = lookup_file_digests (
+      filepath, digest_types
+   )
+   if missing:
+      new_hashes = multihash_file ( filepath, missing )
+      store_file_digests ( stat_key, filepath, new_hashes )
+      hashdict.update ( new_hashes )
+
+   return { h: hashdict [h] for h in digest_types }
+# --- end of get_file_digests (...) ---
+
+def get_file_digest ( filepath, digest_type ):
+   """Returns a single digest of a file, see get_file_digests().
+
+   arguments:
+   * filepath    --
+   * digest_type --
+   """
+   return get_file_digests ( filepath, ( digest_type, ) ) [digest_type]
+# --- end of get_file_digest (...) ---
+
+def record_file_digests ( filepath, hashdict ):
+   """Adds digests that have been calculated for a file (e.g. while
+   downloading it) to the digest store. Does nothing if no digest store
+   is set. The file must not be modified after calculating the digests.
+
+   arguments:
+   * filepath --
+   * hashdict -- dict ( digest type => hex digest )
+   """
+   digest_store = _DIGEST_STORE
+   if digest_store is not None:
+      digest_store.record_file ( filepath, hashdict )
+# --- end of record_file_digests (...) ---
+
+def new_hash_objects ( digest_types ):
+   """Returns a dict ( digest type => new hash object ).
+
+   arguments:
+   * digest_types --
+   """
+   return { h: _HASH_CREATE_MAP [h]() for h in digest_types }
+# --- end of new_hash_objects (...) ---
@@ -29,13 +29,18 @@ FALLBACK_DESCRIPTION = evars.DESCRIPTION ( "<none>" )
 class EbuildCreation ( object ):
    """Used to create an ebuild using DESCRIPTION data."""
 
-   def __init__ ( self, package_info, err_queue, depres_channel_spawner=None ):
+   def __init__ ( self,
+      package_info, err_queue, depres_channel_spawner=None, depres_gate=None
+   ):
       """Initializes the creation of an ebuild.
 
       arguments:
       * package_info           --
       * depres_channel_spawner -- function that returns a communication
                                    channel to the resolver
+      * depres_gate            -- if set and not None: pause after reading
+                                   DESCRIPTION data until this gate has been
+                                   opened (see roverlay.overlay.worker.JobGate)
       """
       self.package_info = package_info
       self.package_info.set_readonly()
@@ -49,6 +54,7 @@ class EbuildCreation ( object ):
       self.paused  = False
 
       self.depres_channel_spawner = depres_channel_spawner
+      self.depres_gate            = depres_gate
 
       self.err_queue = err_queue
 
@@ -66,6 +72,13 @@ class EbuildCreation ( object ):
    def success ( self ) : return self.status == 0
    def fail    ( self ) : return self.status  < 0
 
+   def waiting_for_depres ( self ):
+      """Returns True if this job has been paused before dependency
+      resolution (i.e. it is waiting for its depres gate), else False.
+      """
+      return self.paused and self._resume == self._run_depres
+   # --- end of waiting_for_depres (...) ---
+
    def run ( self, stats ):
       """Creates an ebuild and stores it directly in the assigned PackageInfo
       instance. Returns None (implicit).
@@ -114,10 +127,25 @@ class EbuildCreation ( object ):
    def _run_prepare ( self, stats ):
       self.status = 2
 
+      # read DESCRIPTION data
+      self.package_info.update_now ( make_desc_data=True )
+
+      if self.depres_gate is not None and not self.depres_gate.is_open:
+         # dependency resolution requires that all packages have been
+         # added to the overlay, wait for the gate.
+         #
+         # Empty desc data is handled in _run_depres(), too, since
+         # giving up now would modify the overlay while adding packages.
+         self.paused  = True
+         self._resume = self._run_depres
+         return True
+      else:
+         return self._run_depres ( stats )
+   # --- end of _run_prepare (...) ---
+
+   def _run_depres ( self, stats ):
       p_info = self.package_info
 
-      # read DESCRIPTION data
-      p_info.update_now ( make_desc_data=True )
       if p_info ['desc_data'] is None:
          self.logger.warning (
             'desc empty - cannot create an ebuild for this package.'
@@ -156,7 +184,7 @@ class EbuildCreation ( object ):
          else:
             stats.pkg_fail.inc_details ( "unresolved_deps" )
             return False
-   # --- end of _run_prepare (...) ---
+   # --- end of _run_depres (...) ---
 
    def _run_create ( self, stats ):
       self.status    = 3
@@ -124,7 +124,7 @@ class DepresInterface ( roverlay.interface.generic.RoverlaySubInterface ):
       Returns: None (implicit)
       """
       # sort() should be called on a per-pool basis
-      self._resolver._reset_unresolvable()
+      self._resolver._reset_caches()
    # --- end of _update_resolver (...) ---
 
    def close ( self ):
@@ -16,68 +16,17 @@ __all__ = [ 'Category', ]
 
 import threading
 import os
-import sys
-
-try:
-   import queue
-except ImportError:
-   import Queue as queue
 
 
 import roverlay.stats.collector
 
 import roverlay.overlay.pkgdir.base
 import roverlay.overlay.base
+import roverlay.overlay.writequeue
 ##import roverlay.overlay.pkgdir.packagedir_ebuildmanifest
 ##import roverlay.overlay.pkgdir.packagedir_newmanifest
 
 
-class WriteQueueJob ( object ):
-
-   def __init__ ( self, write_queue, write_kw, catref, additions_dir ):
-      super ( WriteQueueJob, self ).__init__()
-      self.write_queue   = write_queue
-      self.write_kw      = write_kw
-      self.catref        = catref
-      self.additions_dir = additions_dir
-      self.stats         = catref.STATS.get_new()
-   # --- end of __init__ (...) ---
-
-   def run ( self ):
-      """Calls <package>.write for every <package> received from the queue.
-
-      arguments:
-      * q        -- queue
-      * write_kw -- keywords for write(...)
-      """
-      q             = self.write_queue
-      write_kw      = self.write_kw
-      stats         = self.stats
-      catref        = self.catref
-      additions_dir = self.additions_dir
-
-      while not q.empty() and not hasattr ( catref, 'RERAISE' ):
-         try:
-            pkg = q.get_nowait()
-            # remove manifest writing from threaded writing since it's
-            # single-threaded
-            pkg.write (
-               additions_dir = additions_dir.get_obj_subdir ( pkg ),
-               stats         = stats,
-               **write_kw
-            )
-            stats.ebuild_count.inc (
-               len ( list ( pkg.iter_packages_with_efile() ) )
-            )
-         except queue.Empty:
-            break
-         except ( Exception, KeyboardInterrupt ) as err:
-            catref.logger.exception ( err )
-            catref.RERAISE = sys.exc_info()
-   # --- end of run (...) ---
-
-# --- end of WriteQueueJob ---
-
 class Category ( roverlay.overlay.base.OverlayObject ):
 
    def add ( self, *a, **b ):
@@ -161,6 +110,19 @@ class Category ( roverlay.overlay.base.OverlayObject ):
       p.fs_destroy()
    # --- end of drop_package (...) ---
 
+   def get_ebuild_file ( self, package_info ):
+      """Returns the path to the ebuild file of the given package
+      (as known by this category) or None.
+
+      arguments:
+      * package_info --
+      """
+      subdir = self._subdirs.get ( package_info ['name'], None )
+      return (
+         None if subdir is None else subdir.get_ebuild_file ( package_info )
+      )
+   # --- end of get_ebuild_file (...) ---
+
    def empty ( self ):
       """Returns True if this category contains 0 ebuilds."""
       return (
@@ -203,6 +165,12 @@ class Category ( roverlay.overlay.base.OverlayObject ):
             yield p_info
    # --- end of iter_package_info (...) ---
 
+   def iter_manifest_package_info ( self ):
+      for subdir in self._subdirs.values():
+         for p_info in subdir.iter_manifest_package_info():
+            yield p_info
+   # --- end of iter_manifest_package_info (...) ---
+
    def list_packages ( self, name_only=False ):
       """Lists all packages in this category.
       Yields <category>/<package name> or a dict (see for_deprules below).
@@ -283,6 +251,34 @@ class Category ( roverlay.overlay.base.OverlayObject ):
          package.show ( **show_kw )
    # --- end of show (...) ---
 
+   def enqueue_write ( self, scheduler, additions_dir ):
+      """Adds all package dirs of this category to a write scheduler.
+
+      arguments:
+      * scheduler     -- WriteScheduler object
+      * additions_dir -- AdditionsDir object for this category
+      """
+      for package in self._subdirs.values():
+         scheduler.add ( package, additions_dir )
+   # --- end of enqueue_write (...) ---
+
+   def finalize_write ( self, write_manifest ):
+      """Removes empty package dirs and writes Manifest files (if requested)
+      after writing the package dirs of this category.
+
+      arguments:
+      * write_manifest -- whether to write Manifest files
+                          (not thread safe manifest writing)
+      """
+      self.remove_empty()
+
+      # write manifest files
+      if write_manifest:
+         self.logger.debug ( "Writing Manifest files ..." )
+         for package in self._subdirs.values():
+            package.write_manifest ( ignore_empty=True )
+   # --- end of finalize_write (...) ---
+
    def write ( self,
       overwrite_ebuilds,
       keep_n_ebuilds,
@@ -292,6 +288,9 @@ class Category ( roverlay.overlay.base.OverlayObject ):
    ):
       """Writes this category to its filesystem location.
 
+      Overlay.write() uses enqueue_write() and finalize_write() instead,
+      which allows to write all categories with a single write scheduler.
+
       returns: None (implicit)
       """
       if len ( self._subdirs ) == 0: return
@@ -299,93 +298,26 @@ class Category ( roverlay.overlay.base.OverlayObject ):
       stats = self.STATS
       stats.write_time.begin ( self.name )
 
-      # determine write keyword args
-      write_kwargs = dict (
-         overwrite_ebuilds = overwrite_ebuilds,
-         keep_n_ebuilds    = keep_n_ebuilds,
-         cautious          = cautious,
-         write_manifest    = write_manifest,
+      manifest_threadsafe = self.supports_threadsafe_manifest_writing (
+         unsafe=True
       )
 
-      # start writing:
-
-      max_jobs = self.__class__.WRITE_JOBCOUNT
-
-      # What's an reasonable number of min package dirs to
-      # start threaded writing?
-      # Ignoring it for now (and expecting enough pkg dirs)
-      if max_jobs > 1:
-
-         # writing <=max_jobs package dirs at once
-
-         # don't create more workers than write jobs available
-         max_jobs = min ( max_jobs, len ( self._subdirs ) )
-
-         manifest_threadsafe = self.supports_threadsafe_manifest_writing (
-            unsafe=True
-         )
-
-         write_queue = queue.Queue()
-         for package in self._subdirs.values():
-            write_queue.put_nowait ( package )
-
-         write_kwargs ['write_manifest'] = (
-            write_manifest and manifest_threadsafe
-         )
-
-         jobs = frozenset (
-            WriteQueueJob ( write_queue, write_kwargs, self, additions_dir )
-            for n in range ( max_jobs )
-         )
-
-         workers = frozenset (
-            threading.Thread ( target=job.run ) for job in jobs
+      # writing <=WRITE_JOBCOUNT package dirs at once
+      scheduler = roverlay.overlay.writequeue.WriteScheduler (
+         self.logger, stats, self.__class__.WRITE_JOBCOUNT
+      )
+      self.enqueue_write ( scheduler, additions_dir )
+
+      scheduler.run (
+         dict (
+            overwrite_ebuilds = overwrite_ebuilds,
+            keep_n_ebuilds    = keep_n_ebuilds,
+            cautious          = cautious,
+            write_manifest    = write_manifest and manifest_threadsafe,
          )
+      )
 
-         for w in workers: w.start()
-         for w in workers: w.join()
-
-         if hasattr ( self, 'RERAISE' ) and self.RERAISE:
-            # ref: PEP 3109
-            #  results in correct traceback when running python 3.x
-            #  and inaccurate traceback with python 2.x,
-            #  which can be tolerated since the exception has been logged
-            try:
-               reraise = self.RERAISE[0] ( self.RERAISE[1] )
-            except TypeError:
-               # "portage.exception.FileNotFound is not subscriptable"
-               reraise = self.RERAISE[1]
-
-            reraise.__traceback__ = self.RERAISE [2]
-            raise reraise
-         # --- end RERAISE;
-
-         self.remove_empty()
-
-         # write manifest files
-         # fixme: debug print
-         if write_manifest and ( not manifest_threadsafe ):
-            print ( "[{}] Writing Manifest files ...".format ( self.name ) )
-            for package in self._subdirs.values():
-               package.write_manifest ( ignore_empty=True )
-
-
-         # merge stats from threads with self.(__class__.)STATS
-         for job in jobs:
-            stats.merge_with ( job.stats )
-      else:
-         for package in self._subdirs.values():
-            package.write (
-               additions_dir = additions_dir.get_obj_subdir ( package ),
-               stats         = stats,
-               **write_kwargs
-            )
-            stats.ebuild_count.inc (
-               len ( list ( package.iter_packages_with_efile() ) )
-            )
-
-         self.remove_empty()
-      # -- end if;
+      self.finalize_write ( write_manifest and not manifest_threadsafe )
 
       stats.write_time.end ( self.name )
    # --- end of write (...) ---
@@ -14,6 +14,7 @@ __all__ = [ 'OverlayCreator', ]
 
 import collections
 import logging
+import re
 import threading
 import sys
 
@@ -30,8 +31,10 @@ import roverlay.errorqueue
 import roverlay.packageinfo
 
 import roverlay.depres.channels
+import roverlay.depres.selfdepgraph
 
 import roverlay.ebuild.creation
+import roverlay.ebuild.depres
 
 import roverlay.overlay.root
 import roverlay.overlay.worker
@@ -42,9 +45,16 @@ import roverlay.packagerules.rules
 import roverlay.packagerules.generators.addition_control
 
 
+import roverlay.recipe.changejournal
+import roverlay.recipe.desccache
 import roverlay.recipe.distmap
+import roverlay.recipe.scanindex
+import roverlay.recipe.writeindex
 import roverlay.recipe.easyresolver
 
+import roverlay.rpackage.descpool
+import roverlay.rpackage.descriptionreader
+
 import roverlay.stats.collector
 
 import roverlay.util.hashpool
@@ -53,7 +63,7 @@ import roverlay.util.hashpool
 from roverlay                    import config, errorqueue
 
 from roverlay.overlay.root       import Overlay
-from roverlay.overlay.worker     import OverlayWorker
+from roverlay.overlay.worker     import JobGate, OverlayWorker
 from roverlay.packageinfo        import PackageInfo
 from roverlay.packagerules.rules import PackageRules
 
@@ -70,9 +80,17 @@ class OverlayCreator ( object ):
 
    HASHPOOL_WORKER_COUNT = 0
 
+   # DESCRIPTION fields whose package names are stored in the change journal
+   JOURNAL_DEP_FIELDS = tuple ( roverlay.ebuild.depres.FIELDS )
+   JOURNAL_DEP_NAME_REGEX = re.compile ( r'^\s*([a-zA-Z0-9._]+)' )
+
    def __init__ ( self,
       skip_manifest, incremental, immediate_ebuild_writes,
       logger=None, allow_write=True, greedy_depres=True, repo_id_map=None,
+      desc_cache=True, rebuild_desc_cache=False, stream=False,
+      change_journal=False, rebuild_change_journal=False,
+      paranoid_revbump=False, scan_index=True, rebuild_scan_index=False,
+      write_index=True, rebuild_write_index=False,
    ):
       if logger is None:
          self.logger = self.__class__.LOGGER
@@ -87,8 +105,52 @@ class OverlayCreator ( object ):
 
       # create distmap and distroot here
       self.distmap  = roverlay.recipe.distmap.setup()
+      # hash all postponed package files when checking for revbumps,
+      #  even if their size, mtime and inode did not change
+      self.distmap.use_file_stat = not paranoid_revbump
       self.distroot = roverlay.overlay.pkgdir.distroot.static.get_configured()
 
+      # DESCRIPTION data cache
+      if desc_cache:
+         self.desc_cache = roverlay.recipe.desccache.setup (
+            rebuild=rebuild_desc_cache
+         )
+      else:
+         self.desc_cache = None
+
+      # package file change journal (incremental mode only)
+      if (
+         ( change_journal or rebuild_change_journal )
+         and incremental and allow_write
+      ):
+         self.change_journal = roverlay.recipe.changejournal.setup (
+            rebuild=rebuild_change_journal
+         )
+      else:
+         self.change_journal = None
+
+      # packages that have been passed to add_package() / queued
+      #  (only used if the change journal is enabled)
+      self._journal_packages = list()
+      self._journal_queued   = set()
+
+      # overlay scan index (incremental mode only)
+      if ( scan_index or rebuild_scan_index ) and incremental:
+         scan_index_obj = roverlay.recipe.scanindex.setup (
+            rebuild=rebuild_scan_index
+         )
+      else:
+         scan_index_obj = None
+
+      # overlay file write index
+      #  (has to be set up before creating the overlay)
+      if ( write_index or rebuild_write_index ) and allow_write:
+         self.write_index = roverlay.recipe.writeindex.setup (
+            rebuild=rebuild_write_index
+         )
+      else:
+         self.write_index = None
+
       # addition control
 # *** pkg<->overlay-dependent addition control is NOT IMPLEMENTEND ***
 #      self.addition_control = (
@@ -104,6 +166,7 @@ class OverlayCreator ( object ):
          skip_manifest       = skip_manifest,
          runtime_incremental = immediate_ebuild_writes,
          rsuggests_flags     = self.rsuggests_flags,
+         scan_index          = scan_index_obj,
       )
 
       self.depresolver = roverlay.recipe.easyresolver.setup ( self._err_queue )
@@ -124,12 +187,39 @@ class OverlayCreator ( object ):
 
       self.NUMTHREADS  = config.get ( 'EBUILD.jobcount', 0 )
 
+      # streaming mode: ebuild creation workers get started before adding
+      #  packages and read DESCRIPTION data while packages are being added.
+      #  Jobs wait at the depres gate until run() opens it.
+      if stream and self.NUMTHREADS < 1:
+         self.logger.warning (
+            "streaming mode requires EBUILD.jobcount > 0 - disabled."
+         )
+         self._depres_gate = None
+      elif stream:
+         self._depres_gate = JobGate()
+      else:
+         self._depres_gate = None
+
+      self.PROCESS_JOBS = config.get ( 'EBUILD.process_jobs', 0 )
+      if (
+         self._depres_gate is None
+         and self.PROCESS_JOBS > 0
+         and roverlay.rpackage.descpool.HAVE_CONCURRENT_FUTURES
+      ):
+         # list of queued packages whose DESCRIPTION data should be read
+         #  by worker processes
+         self._desc_queue = list()
+      else:
+         self._desc_queue = None
+
       self._pkg_queue           = queue.Queue()
       self._pkg_queue_postponed = list()
       self._err_queue.attach_queue ( self._pkg_queue, None )
 
       self._workers   = None
       self._runlock   = threading.RLock()
+      # graph of the most recent selfdep reduction (for debugging)
+      self.selfdep_graph = None
       self._work_done = threading.Event()
       self._work_done.set()
 
@@ -162,12 +252,262 @@ class OverlayCreator ( object ):
       )
    # --- end of _get_resolver_channel (...) ---
 
+   def _queue_package ( self, package_info ):
+      """Creates an ebuild creation job for the given package and adds it
+      to the package queue.
+
+      arguments:
+      * package_info --
+      """
+      ejob = roverlay.ebuild.creation.EbuildCreation (
+         package_info,
+         depres_channel_spawner = self._get_resolver_channel,
+         err_queue              = self._err_queue,
+         depres_gate            = self._depres_gate,
+      )
+      if self._desc_queue is not None:
+         self._desc_queue.append ( package_info )
+      if self.change_journal is not None:
+         self._journal_queued.add ( id ( package_info ) )
+      self._pkg_queue.put ( ejob )
+      self.stats.pkg_queued.inc()
+   # --- end of _queue_package (...) ---
+
+   def _read_desc_data ( self ):
+      """Reads the DESCRIPTION data of all queued packages using worker
+      processes (if enabled).
+
+      Packages whose DESCRIPTION data is cached or can be taken from the
+      package index are skipped, as well as packages that could not be
+      read by the workers (the ebuild creation
+      jobs will read these packages and log any errors).
+      """
+      if not self._desc_queue:
+         return
+
+      # worker processes must not be forked while other threads are running
+      #  (e.g. batch resolver threads in subsequent runs), use threads then
+      use_threads = threading.active_count() > 1
+      if use_threads:
+         self.logger.warning (
+            "other threads are running, reading DESCRIPTION data "
+            "using threads instead of processes"
+         )
+
+      desc_pool = roverlay.rpackage.descpool.DescriptionPool (
+         self.PROCESS_JOBS, use_threads=use_threads
+      )
+      packages  = dict()
+
+      for p_info in self._desc_queue:
+         if roverlay.rpackage.descriptionreader.has_package_index_entry (
+            p_info
+         ):
+            # read from the package index by the ebuild creation job
+            pass
+         elif self.desc_cache is None or (
+            not self.desc_cache.has_valid_entry ( p_info )
+         ):
+            packages [id ( p_info )] = p_info
+            desc_pool.add (
+               id ( p_info ),
+               p_info ['package_file'], p_info ['package_name']
+            )
+
+      self._desc_queue [:] = []
+
+      if packages:
+         self.logger.info (
+            "Reading DESCRIPTION data of {:d} packages "
+            "using {:d} {}".format (
+               len ( packages ), self.PROCESS_JOBS,
+               ( "threads" if use_threads else "processes" )
+            )
+         )
+
+         for backref, read_data in desc_pool.run_as_completed():
+            if read_data is not None:
+               packages [backref].update_now ( desc_read_data=read_data )
+   # --- end of _read_desc_data (...) ---
+
+   def is_streaming ( self ):
+      """Returns True if this overlay creator runs in streaming mode,
+      else False."""
+      return self._depres_gate is not None
+   # --- end of is_streaming (...) ---
+
+   def start_streaming ( self ):
+      """Starts the ebuild creation workers so that they process packages
+      as soon as they get added. Does nothing if not in streaming mode.
+
+      The workers read DESCRIPTION data only. All other steps start when
+      calling run(), after adding all packages, since dependency resolution
+      needs the complete overlay (selfdeps).
+
+      Returns True if the workers have been started, else False.
+      """
+      if self._depres_gate is None:
+         return False
+
+      with self._runlock:
+         if self._depres_gate.is_open:
+            raise AssertionError ( "cannot restart streaming mode." )
+         elif self._workers is None:
+            self.logger.info (
+               "Streaming mode: starting workers before adding packages."
+            )
+            self._make_workers ( start_now=True )
+
+      return True
+   # --- end of start_streaming (...) ---
+
+   def prepare_change_journal ( self,
+      get_package_files, extra_values=(), changed_files=None
+   ):
+      """Determines which package files have to be processed in this run.
+      Has to be called after setting up the package rules (including
+      addition control) and before adding packages.
+
+      Returns a set of all package files that have to be processed if
+      changed_files could be used, else None (all package files have to be
+      added, see want_package_file()).
+
+      arguments:
+      * get_package_files -- function that returns an iterable with all
+                              package files of this run
+      * extra_values      -- additional values that affect ebuild creation
+                              (e.g. cmdline options)
+      * changed_files     -- None or iterable with all package files that
+                              have been added or updated since the last run
+                              (e.g. by syncing). If set and the journal's
+                              fingerprint did not change, only the package
+                              files listed in the journal and the changed
+                              files are checked (instead of calling
+                              get_package_files()). Defaults to None.
+      """
+      if self.change_journal is None:
+         return None
+
+      fingerprint   = roverlay.recipe.changejournal.get_fingerprint (
+         self.package_rules, extra_values
+      )
+      package_files = None
+
+      if changed_files is not None:
+         package_files = self.change_journal.get_package_files (
+            fingerprint
+         )
+         if package_files is None:
+            self.logger.info (
+               "Change journal: fingerprint changed, "
+               "checking all package files"
+            )
+         else:
+            package_files = set ( package_files )
+            package_files.update ( changed_files )
+
+      num_unchanged = self.change_journal.prepare (
+         fingerprint,
+         get_package_files() if package_files is None else package_files
+      )
+      self.logger.info (
+         "Change journal: skipping {:d} unchanged package files".format (
+            num_unchanged
+         )
+      )
+
+      if package_files is None:
+         return None
+      else:
+         return self.change_journal.get_changed_files()
+   # --- end of prepare_change_journal (...) ---
+
+   def want_package_file ( self, package_file ):
+      """Returns False if the given package file can be skipped because
+      it (and packages affecting it) did not change since the last run,
+      else True.
+
+      arguments:
+      * package_file --
+      """
+      return (
+         self.change_journal is None
+         or not self.change_journal.is_unchanged ( package_file )
+      )
+   # --- end of want_package_file (...) ---
+
+   def _get_journal_dep_names ( self, package_info ):
+      """Returns the (lowercase) names of all packages that the given
+      package depends on, according to its DESCRIPTION data.
+
+      arguments:
+      * package_info --
+      """
+      names    = set()
+      desc     = package_info.get ( 'desc_data', do_fallback=True )
+      name_re  = self.JOURNAL_DEP_NAME_REGEX
+
+      if desc:
+         for field in self.JOURNAL_DEP_FIELDS:
+            deps = desc.get ( field )
+            if deps:
+               for dep_str in (
+                  ( deps, ) if isinstance ( deps, str ) else deps
+               ):
+                  match = name_re.match ( dep_str )
+                  if match:
+                     names.add ( match.group ( 1 ).lower() )
+      return names
+   # --- end of _get_journal_dep_names (...) ---
+
+   def commit_change_journal ( self ):
+      """Records the results of this run in the change journal and writes
+      it. Should be called after writing the overlay.
+      """
+      if self.change_journal is None:
+         return False
+
+      queued = self._journal_queued
+      for p_info in self._journal_packages:
+         if id ( p_info ) in queued:
+            failed = not p_info.is_valid() or (
+               p_info.get ( 'ebuild' ) is None
+               and p_info.get ( 'ebuild_file' ) is None
+            )
+            depnames    = self._get_journal_dep_names ( p_info )
+            ebuild_file = p_info.get ( 'ebuild_file' )
+         else:
+            # filtered, dropped or not revbumped
+            #  (ebuild file, if any, has been found by the overlay scan)
+            failed      = False
+            depnames    = ()
+            ebuild_file = self.overlay.get_ebuild_file ( p_info )
+
+         hashdict = getattr ( p_info, 'hashdict', None )
+         self.change_journal.record (
+            p_info ['package_file'], failed, depnames,
+            digest=(
+               hashdict.get ( PackageInfo.DISTMAP_DIGEST_TYPE )
+               if hashdict else None
+            ),
+            ebuild_file=ebuild_file
+         )
+
+      self._journal_packages = list()
+      self._journal_queued   = set()
+
+      return self.change_journal.write()
+   # --- end of commit_change_journal (...) ---
+
    def add_package ( self, package_info, allow_postpone=True ):
       """Adds a PackageInfo to the package queue.
 
       arguments:
       * package_info --
       """
+      if self.change_journal is not None:
+         self._journal_packages.append ( package_info )
+
       if self.package_rules.apply_actions ( package_info ):
          add_result = self.overlay.add_package (
             package_info, self.addition_control,
@@ -175,13 +515,7 @@ class OverlayCreator ( object ):
          )
 
          if add_result is True:
-            ejob = roverlay.ebuild.creation.EbuildCreation (
-               package_info,
-               depres_channel_spawner = self._get_resolver_channel,
-               err_queue              = self._err_queue
-            )
-            self._pkg_queue.put ( ejob )
-            self.stats.pkg_queued.inc()
+            self._queue_package ( package_info )
 
          elif add_result is False:
             self.stats.pkg_dropped.inc()
@@ -241,12 +575,25 @@ class OverlayCreator ( object ):
                hashes, self.HASHPOOL_WORKER_COUNT
             )
 
+            unchanged_count = 0
             for p_info, pkgdir_ref in self._pkg_queue_postponed:
-               my_hashpool.add (
-                  id ( p_info ),
-                  p_info.get ( "package_file" ), p_info.hashdict
-               )
+               if (
+                  not prehash_manifest
+                  and self.distmap.check_file_unchanged ( p_info )
+               ):
+                  # distmap digest is still valid, no need to hash the file
+                  unchanged_count += 1
+               else:
+                  my_hashpool.add (
+                     id ( p_info ),
+                     p_info.get ( "package_file" ), p_info.hashdict
+                  )
 
+            self.logger.debug (
+               "{:d} of {:d} postponed package files are unchanged".format (
+                  unchanged_count, len ( self._pkg_queue_postponed )
+               )
+            )
             qtime.end ( "setup_hashpool" )
 
             qtime.begin ( "make_hashes" )
@@ -265,13 +612,7 @@ class OverlayCreator ( object ):
             )
 
             if add_result is True:
-               ejob = roverlay.ebuild.creation.EbuildCreation (
-                  p_info,
-                  depres_channel_spawner = self._get_resolver_channel,
-                  err_queue              = self._err_queue
-               )
-               self._pkg_queue.put ( ejob )
-               self.stats.pkg_queued.inc()
+               self._queue_package ( p_info )
 
             elif add_result is False:
                self.stats.pkg_dropped.inc()
@@ -293,6 +634,8 @@ class OverlayCreator ( object ):
          self.overlay.write()
          # debug message here as it's already logged by the overlay
          self.logger.debug ( "overlay written" )
+         if self.write_index is not None:
+            self.write_index.write()
       else:
          self.logger.warning ( "Not allowed to write overlay!" )
    # --- end of write_overlay (...) ---
@@ -310,10 +653,31 @@ class OverlayCreator ( object ):
       self.stats.creation_time.begin ( "setup" )
       allow_reraise = True
       try:
-         self._work_done.wait()
-         self.depresolver.reload_pools()
+         streaming = self._depres_gate is not None and (
+            self._workers is not None
+         )
+
+         if streaming:
+            # workers are already running,
+            #  let the held jobs continue after reloading the selfdep pool
+            self.depresolver.reload_pools()
+            self.logger.debug (
+               "Opening depres gate, {:d} jobs are waiting".format (
+                  len ( self._depres_gate )
+               )
+            )
+            self._depres_gate.open ( self._pkg_queue.put_nowait )
+         else:
+            self._work_done.wait()
+            self.depresolver.reload_pools()
+            self._read_desc_data()
+
+            if self._depres_gate is not None:
+               # start_streaming() has not been called
+               self._depres_gate.open ( self._pkg_queue.put_nowait )
+
+            self._make_workers ( start_now=False )
 
-         self._make_workers ( start_now=False )
          workers    = self._workers
          work_queue = self._pkg_queue
 
@@ -337,10 +701,11 @@ class OverlayCreator ( object ):
                "Running ebuild creation, passno={:d}".format ( passno )
             )
 
-            for worker in workers:
-               # assumption: worker not running when calling reset()
-               worker.reset()
-               worker.start()
+            if passno > 1 or not streaming:
+               for worker in workers:
+                  # assumption: worker not running when calling reset()
+                  worker.reset()
+                  worker.start()
 
             self._waitfor_workers ( do_close=False, delete_workers=False )
 
@@ -426,28 +791,36 @@ class OverlayCreator ( object ):
       #
       # "reduce"
       #
-      ## num_removed <- 1
+      ## link selfdeps with their candidates, create the reduction graph
+      ##
+      ## Q <- S
       ##
-      ## while num_removed > 0 loop
-      ##    num_removed <- 0
+      ## while Q not empty loop
+      ##    selfdep <- pop(Q)
       ##
-      ##    foreach selfdep in S loop
-      ##        num_removed += selfdep.reduce()
-      ##    end loop
+      ##    if selfdep.reduce() removed candidates
+      ##       and selfdep has no candidates left
+      ##    then
+      ##       append dependents of selfdep to Q
+      ##    end if
       ##
       ## end loop
       ##
       self.overlay.link_selfdeps ( selfdeps )
 
-      num_removed = 1
-      num_removed_total = 0
+      graph = roverlay.depres.selfdepgraph.SelfdepGraph ( selfdeps )
+      self.selfdep_graph = graph
 
-      while num_removed > 0:
-         num_removed = 0
-         for selfdep in selfdeps:
-            num_removed += selfdep.do_reduce()
-         num_removed_total += num_removed
-      # -- end while num_removed;
+      num_removed_total = graph.reduce()
+
+      if self.logger.isEnabledFor ( logging.DEBUG ):
+         self.logger.debug (
+            "selfdep reduction removed {:d} candidates".format (
+               num_removed_total
+            )
+         )
+         for line in graph.iter_dump_lines():
+            self.logger.debug ( line )
 
       return num_removed_total
    # --- end of _selfdep_reduction (...) ---
@@ -465,6 +838,8 @@ class OverlayCreator ( object ):
             self.depresolver.close()
             del self.depresolver
             self.depresolver = None
+         if self.desc_cache is not None:
+            self.desc_cache.write()
          self.closed = True
    # --- end of close (...) ---
 
@@ -549,6 +924,7 @@ class OverlayCreator ( object ):
          use_threads = use_threads,
          err_queue   = self._err_queue,
          stats       = self.stats.get_new(),
+         depres_gate = self._depres_gate,
       )
       if start_now: w.start()
       return w
@@ -359,8 +359,7 @@ class DistrootBase ( object ):
       distmap = self.distmap
       if distmap is not None:
          hash_pool = roverlay.util.hashpool.HashPool (
-            ( distmap.get_hash_type(), ), self.HASHPOOL_JOB_COUNT,
-            use_threads=True
+            ( distmap.get_hash_type(), ), self.HASHPOOL_JOB_COUNT
          )
 
          for abspath, relpath in self.iter_distfiles ( False ):
@@ -398,7 +397,7 @@ class DistrootBase ( object ):
          self.logger.info ( "calculating file hashes" )
 
          hash_pool = roverlay.util.hashpool.HashPool (
-            ( distmap_hashtype, ), self.HASHPOOL_JOB_COUNT, use_threads=True
+            ( distmap_hashtype, ), self.HASHPOOL_JOB_COUNT
          )
 
          for abspath, relpath in self.iter_distfiles ( False ):
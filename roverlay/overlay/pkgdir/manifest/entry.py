@@ -108,9 +108,9 @@ class ManifestEntry ( object ):
       if allow_hash_create:
          missing_hashes = self.get_missing_hashes()
          if missing_hashes:
-            self.add_hashes (
-               roverlay.digest.multihash_file ( self.filepath, missing_hashes )
-            )
+            self.add_hashes ( roverlay.digest.get_file_digests (
+               self.filepath, missing_hashes
+            ) )
 
       if not self.filesize and self.filesize != 0:
          self.filesize = roverlay.util.getsize ( self.filepath )
@@ -238,17 +238,27 @@ class ManifestFile ( object ):
       )
    # --- end of __repr__ (...) ---
 
-   def write ( self, force=False ):
+   def write ( self, force=False, write_index=None ):
       """Writes the Manifest file.
 
       arguments:
-      * force -- enforce writing even if no changes made
+      * force       -- enforce writing even if no changes made
+      * write_index -- overlay file write index or None. The file does not
+                       get rewritten if its content did not change.
+                       Defaults to None.
       """
       if force or self.dirty:
-         with open ( self.filepath, 'wt' ) as FH:
-            for line in self.gen_lines():
-               FH.write ( line )
-               FH.write ( '\n' )
+         if write_index is not None:
+            write_index.write_file (
+               self.filepath,
+               ''.join ( line + '\n' for line in self.gen_lines() ),
+               'Manifest'
+            )
+         else:
+            with open ( self.filepath, 'wt' ) as FH:
+               for line in self.gen_lines():
+                  FH.write ( line )
+                  FH.write ( '\n' )
 
          self.dirty = False
          return True
@@ -40,6 +40,9 @@ class MetadataJob ( object ):
       self._package_info   = None
       self.filepath        = filepath
       self.last_write_code = -1
+      # set to True by write() if the file has not been rewritten
+      #  because its content did not change
+      self.last_write_skipped = False
 
       # no longer storing self._metadata, which will only be created twice
       # when running show() (expected 1x write per PackageInfo instance)
@@ -126,13 +129,27 @@ class MetadataJob ( object ):
          return False
    # --- end of show (...) ---
 
-   def write ( self ):
+   def write ( self, write_index=None ):
+      """Writes the metadata file.
+
+      returns: success (True/False)
+
+      arguments:
+      * write_index -- overlay file write index or None. The metadata file
+                       does not get rewritten if its content did not change
+                       (see last_write_skipped). Defaults to None.
+      """
       retcode = self.METADATA_SUCCESS
+      self.last_write_skipped = False
       if self._package_info is not None:
          # succeed if metadata empty or written
          mref = self._create()
          if mref.empty():
             retcode |= self.METADATA_EMPTY
+         elif write_index is not None:
+            self.last_write_skipped = not write_index.write_file (
+               self.filepath, mref.get_file_str(), 'metadata'
+            )
          else:
             with open ( self.filepath, 'w' ) as fh:
                if not mref.write_file ( fh ):
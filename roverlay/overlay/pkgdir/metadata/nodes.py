@@ -66,6 +66,11 @@ class MetadataRoot ( MetadataNodeNamedAccess ):
       return use_node
    # --- end of add_useflag (...) ---
 
+   def get_file_str ( self ):
+      """Returns the metadata file content (str)."""
+      return MetadataRoot.HEADER + '\n' + self.to_str() + '\n'
+   # --- end of get_file_str (...) ---
+
    def write_file ( self, fh ):
       """Writes the metadata to a file.
 
@@ -77,10 +82,7 @@ class MetadataRoot ( MetadataNodeNamedAccess ):
       raises: *passes IOError
       """
       if not self.empty():
-         fh.write ( MetadataRoot.HEADER )
-         fh.write ( '\n' )
-         fh.write ( self.to_str() )
-         fh.write ( '\n' )
+         fh.write ( self.get_file_str() )
          return True
       else:
          return False
@@ -33,6 +33,7 @@ import roverlay.util.portage_regex.default
 from roverlay.util.portage_regex.default import RE_PF
 
 import roverlay.recipe.distmap
+import roverlay.recipe.writeindex
 
 import roverlay.tools.ebuild
 import roverlay.tools.ebuildenv
@@ -56,6 +57,7 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
    #DISTMAP  =
    #FETCH_ENV =
    #MANIFEST_ENV =
+   #WRITE_INDEX =
 
    EBUILD_SUFFIX = '.ebuild'
 
@@ -116,6 +118,8 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
       cls.DISTMAP      = roverlay.recipe.distmap.access()
       cls.FETCH_ENV    = fetch_env
       cls.MANIFEST_ENV = mf_env
+      # overlay file write index (or None)
+      cls.WRITE_INDEX  = roverlay.recipe.writeindex.access()
    # --- end of init_cls (...) ---
 
    def __init__ ( self,
@@ -172,6 +176,18 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
       self.set_parent ( category )
    # --- end of set_category (...) ---
 
+   def _packages_changed ( self ):
+      """Reports that packages have been added to or removed from this
+      package dir to the overlay (which tracks changes for updating the
+      dynamic selfdep rules incrementally).
+      """
+      category = self.get_parent()
+      if category is not None:
+         overlay = category.get_parent()
+         if overlay is not None:
+            overlay.package_dir_changed ( category.name, self.name )
+   # --- end of _packages_changed (...) ---
+
    def iter_package_info ( self, pkg_filter=None ):
       if pkg_filter is None:
          return self._packages.values()
@@ -179,12 +195,34 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
          return ( p for p in self._packages.values() if pkg_filter ( p ) )
    # --- end of iter_package_info (...) --
 
+   def iter_manifest_package_info ( self ):
+      """Generator that yields all PackageInfo objects whose package file
+      will be listed in the Manifest file, if the Manifest file has to be
+      (re-)written.
+      """
+      if self._need_manifest:
+         for p in self._packages.values():
+            if p.has ( 'package_file' ):
+               yield p
+   # --- end of iter_manifest_package_info (...) ---
+
    def iter_packages_with_efile ( self ):
       return (
          p for p in self._packages.values() if p.has ( 'ebuild_file' )
       )
    # --- end of iter_packages_with_efile (...) ---
 
+   def get_ebuild_file ( self, package_info ):
+      """Returns the path to the ebuild file of the package that has the
+      same version as the given package or None.
+
+      arguments:
+      * package_info --
+      """
+      existing = self._packages.get ( package_info ['ebuild_verstr'], None )
+      return None if existing is None else existing.get ( 'ebuild_file' )
+   # --- end of get_ebuild_file (...) ---
+
    def _remove_ebuild_file ( self, pkg_info ):
       """Removes the ebuild file of a pkg_info object.
       Returns True on success, else False.
@@ -201,42 +239,60 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
          return False
    # --- end of remove_ebuild_file (...) ---
 
-   def _scan_add_package ( self, efile, pvr ):
+   def _scan_add_package ( self, efile, pvr, scan_index=None ):
       """Called for each ebuild that is found during scan().
       Creates a PackageInfo for the ebuild and adds it to self._packages.
 
       PackageInfo objects added this way are not affected by package rules.
 
       arguments:
-      * efile -- full path to the ebuild file
-      * pvr   -- version ($PVR) of the ebuild
+      * efile      -- full path to the ebuild file
+      * pvr        -- version ($PVR) of the ebuild
+      * scan_index -- overlay scan index or None. Unchanged ebuilds are not
+                      parsed if an index is given. Defaults to None.
       """
       p = roverlay.packageinfo.PackageInfo (
          physical_only=True, pvr=pvr, ebuild_file=efile, name=self.name
       )
 
+      index_entry = (
+         None if scan_index is None else scan_index.lookup ( efile, pvr )
+      )
 
+      if index_entry is not None:
+         # ebuild did not change since the last scan, relink its distfiles
+         repo_name = index_entry.repo_name
+         for distfile in index_entry.distfiles:
+            self.DISTROOT.set_distfile_owner ( self.get_ref(), distfile )
 
-      # link distfiles to the distmap
-      #
-      #  currently, only one repo name is supported
-      repo_name = None
-      #else repo_names = set() ...
-      #
+      else:
+         # link distfiles to the distmap
+         #
+         #  currently, only one repo name is supported
+         repo_name = None
+         #else repo_names = set() ...
+         #
+         distfiles = list()
 
-      for distfile in p.parse_ebuild_distfiles ( self.get_parent().name ):
-         distmap_entry = (
-            self.DISTROOT.set_distfile_owner ( self.get_ref(), distfile )
-         )
-         if distmap_entry is not None:
-            entry_repo_name = distmap_entry.get_repo_name()
-            if entry_repo_name is not None:
-               repo_name = entry_repo_name if repo_name is None else False
+         for distfile in p.parse_ebuild_distfiles ( self.get_parent().name ):
+            distfiles.append ( distfile )
+            distmap_entry = (
+               self.DISTROOT.set_distfile_owner ( self.get_ref(), distfile )
+            )
+            if distmap_entry is not None:
+               entry_repo_name = distmap_entry.get_repo_name()
+               if entry_repo_name is not None:
+                  repo_name = entry_repo_name if repo_name is None else False
+
+         if scan_index is not None:
+            scan_index.record ( efile, pvr, repo_name, distfiles )
+      # -- end if
 
       if repo_name:
          p.set_direct_unsafe ( 'repo_name', repo_name )
 
       self._packages [ p ['ebuild_verstr'] ] = p
+      self._packages_changed()
       return p
    # --- end of _scan_add_package (...) ---
 
@@ -329,6 +385,7 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
          self.DISTMAP.pkgdir_make_distfile_volatile ( self, package_info )
 
          self._packages [shortver] = package_info
+         self._packages_changed()
 
          # FIXME: remove existing ebuild file now? (++ stats-counter)
 
@@ -459,6 +516,7 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
 
          elif self.DISTROOT.handle_file_collision ( self, package_info ):
             self._packages [shortver] = package_info
+            self._packages_changed()
             return True
 
          else:
@@ -519,6 +577,7 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
             "removing {PVR} from {PN}".format ( PVR=pvr, PN=self.name )
          )
          del self._packages [pvr]
+         self._packages_changed()
          self.generate_metadata ( skip_if_existent=False )
       except KeyError:
          pass
@@ -647,7 +706,10 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
 
    def new_ebuild ( self ):
       """Called when a new ebuild has been created for this PackageDir."""
-      self._need_manifest = True
+      if self.WRITE_INDEX is None:
+         self._need_manifest = True
+      # else write_ebuilds() decides whether the Manifest file has to be
+      #  recreated (the ebuild file might be unchanged)
       self._need_metadata = True
       self.modified       = True
       if self.runtime_incremental:
@@ -665,6 +727,7 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
       try:
          p = self._packages [pvr]
          del self._packages [pvr]
+         self._packages_changed()
          self._remove_ebuild_file ( p )
          self._need_metadata = True
          return p
@@ -683,9 +746,14 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
       self.fs_cleanup()
    # --- end of fs_destroy (...) ---
 
-   def scan ( self, stats, **kw ):
+   def scan ( self, stats, scan_index=None, **kw ):
       """Scans the filesystem location of this package for existing
       ebuilds and adds them.
+
+      arguments:
+      * stats      -- stats collector
+      * scan_index -- overlay scan index or None (see _scan_add_package())
+      * **kw       -- ignored
       """
       def scan_ebuilds():
          """Searches for ebuilds in self.physical_location."""
@@ -741,7 +809,7 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
          for pvr, efile in scan_ebuilds():
             if pvr not in self._packages:
                try:
-                  self._scan_add_package ( efile, pvr )
+                  self._scan_add_package ( efile, pvr, scan_index )
                except ValueError as ve:
                   self.logger.error (
                      "Failed to add ebuild {!r} due to {!r}.".format (
@@ -782,6 +850,7 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
          for pvr in tuple ( self._packages.keys() ):
             if self._packages [pvr] ['ebuild_file'] is None:
                del self._packages [pvr]
+               self._packages_changed()
       # -- lock
    # --- end of virtual_cleanup (...) ---
 
@@ -1000,6 +1069,7 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
                imported=True, pvr=pvr, ebuild_file=efile_dest, name=self.name
             )
             self._packages [ p ['ebuild_verstr'] ] = p
+            self._packages_changed()
 
             # manifest needs to be rewritten
             self._need_manifest = True
@@ -1114,20 +1184,37 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
       def write_ebuild ( efile, ebuild ):
          """Writes an ebuild.
 
+         Returns a 2-tuple ( success, file modified ). The ebuild file
+         is not modified if a write index is used and the file already has
+         the ebuild's content.
+
          arguments:
          * efile  -- file to write
          * ebuild -- ebuild object to write (has to have a __str__ method)
          * (shared_fh from write_ebuilds())
          """
-         _success = False
-         fh       = None
+         _success  = False
+         _modified = True
+         fh        = None
          try:
-            fh = open ( efile, 'w' ) if shared_fh is None else shared_fh
-            if ebuild_header is not None:
-               fh.write ( str ( ebuild_header ) )
-               fh.write ( '\n\n' )
-            fh.write ( str ( ebuild ) )
-            fh.write ( '\n' )
+            if shared_fh is None and self.WRITE_INDEX is not None:
+               if ebuild_header is not None:
+                  content = (
+                     str ( ebuild_header ) + '\n\n' + str ( ebuild ) + '\n'
+                  )
+               else:
+                  content = str ( ebuild ) + '\n'
+
+               _modified = self.WRITE_INDEX.write_file (
+                  efile, content, 'ebuild'
+               )
+            else:
+               fh = open ( efile, 'w' ) if shared_fh is None else shared_fh
+               if ebuild_header is not None:
+                  fh.write ( str ( ebuild_header ) )
+                  fh.write ( '\n\n' )
+               fh.write ( str ( ebuild ) )
+               fh.write ( '\n' )
 
             _success = True
          except IOError as e:
@@ -1136,7 +1223,7 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
             if shared_fh is None and fh:
                fh.close()
 
-         return _success
+         return ( _success, _modified )
       # --- end of write_ebuild (...) ---
 
       def patch_ebuild ( efile, pvr, patches ):
@@ -1228,14 +1315,19 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
             roverlay.util.dodir ( self.physical_location, mkdir_p=True )
             hasdir = True
 
-         if (
-            write_ebuild ( efile, p_info ['ebuild'] )
-         ) and (
-            not haspatch
-            or patch_ebuild ( efile, pvr, patchview.get_patches ( pvr ) )
-         ):
+         patches = patchview.get_patches ( pvr ) if haspatch else None
+         success, modified = write_ebuild ( efile, p_info ['ebuild'] )
 
-            self._need_manifest = True
+         if success and (
+            not patches or patch_ebuild ( efile, pvr, patches )
+         ):
+            if (
+               modified or patches
+               or not self._check_manifest_distfile ( p_info )
+            ):
+               self._need_manifest = True
+            else:
+               modified = False
 
             # update metadata for each successfully written ebuild
             #  (self._metadata knows how to handle this request)
@@ -1247,9 +1339,13 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
                   ebuild_file=efile,
                   remove_auto='ebuild_written'
                )
-               ebuild_written ( p_info )
-
-               self.logger.info ( "Wrote ebuild {}.".format ( efile ) )
+               if modified:
+                  ebuild_written ( p_info )
+                  self.logger.info ( "Wrote ebuild {}.".format ( efile ) )
+               else:
+                  self.logger.debug (
+                     "ebuild {} is unchanged.".format ( efile )
+                  )
          else:
             all_ebuilds_written = False
             self.logger.error (
@@ -1260,6 +1356,22 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
       return all_ebuilds_written
    # --- end of write_ebuilds (...) ---
 
+   def _check_manifest_distfile ( self, package_info ):
+      """Returns True if package_info's package file is known to be
+      unchanged since its Manifest entry has been created, else False.
+
+      Used for deciding whether the Manifest file has to be recreated after
+      skipping an unchanged ebuild.
+
+      arguments:
+      * package_info --
+      """
+      if self.DISTMAP is None or not package_info.has ( 'package_file' ):
+         return False
+      else:
+         return self.DISTMAP.check_file_unchanged ( package_info )
+   # --- end of _check_manifest_distfile (...) ---
+
    def _write_manifest ( self, pkgs_for_manifest ):
       """Generates and writes the Manifest file for the given PackageInfo
       objects.
@@ -1335,9 +1447,10 @@ class PackageDirBase ( roverlay.overlay.base.OverlayObject ):
 
          if shared_fh is None:
             roverlay.util.dodir ( self.physical_location, mkdir_p=True )
-            if self._metadata.write():
+            if self._metadata.write ( self.WRITE_INDEX ):
                self._need_metadata = False
-               self._need_manifest = True
+               if not self._metadata.last_write_skipped:
+                  self._need_manifest = True
                success = True
             else:
                self.logger.error (
@@ -94,7 +94,7 @@ class PackageDir ( roverlay.overlay.pkgdir.packagedir_base.PackageDirBase ):
 
       #return (...)
       if (
-         manifest.write ( force=True )
+         manifest.write ( force=True, write_index=self.WRITE_INDEX )
          and self._write_import_manifest ( _manifest=manifest )
       ):
          return True
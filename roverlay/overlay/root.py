@@ -32,6 +32,8 @@ import roverlay.overlay.category
 import roverlay.overlay.header
 import roverlay.overlay.pkgdir.base
 import roverlay.overlay.pkgdir.distroot.static
+import roverlay.overlay.writequeue
+import roverlay.util.hashpool
 
 
 class Overlay ( roverlay.overlay.base.OverlayObject ):
@@ -39,6 +41,9 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
       'byte-compile - enable byte compiling\n'
    )
 
+   # max number of threads for writing package dirs (of all categories)
+   WRITE_JOBCOUNT = roverlay.overlay.category.Category.WRITE_JOBCOUNT
+
    def add ( self, *a, **b ):
       raise Exception ( "add() has been renamed to add_package()" )
    # -- end of add (...) ---
@@ -105,6 +110,7 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
       runtime_incremental=False,
       keep_n_ebuilds=None,
       masters=None,
+      scan_index=None,
    ):
       """Initializes an overlay.
 
@@ -138,6 +144,10 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
                                 Defaults to False (saves memory but costs time)
       * keep_n_ebuilds      -- number of ebuilds to keep (per package),
                                any "false" Value (None, 0, ...) disables this
+      * scan_index          -- overlay scan index that is used when scanning
+                               the overlay for existing ebuilds (incremental
+                               mode), unchanged ebuilds are not parsed again.
+                               Defaults to None (parse all ebuilds).
       """
       super ( Overlay, self ).__init__ ( name, logger, directory, None )
 
@@ -152,10 +162,17 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
       self._catlock             = threading.Lock()
       self._categories          = dict()
 
+      # package dirs whose packages have been added/removed since the
+      # last pop_changed_package_dirs() call (used for incremental updates
+      # of the dynamic selfdep rules), set of ( category, package dir )
+      self._changed_pkgdirs_lock = threading.Lock()
+      self._changed_pkgdirs      = set()
+
       self._masters             = masters
       self._rsuggests_flags     = rsuggests_flags
 
       self.skip_manifest        = skip_manifest
+      self.scan_index           = scan_index
 
       self._header   = roverlay.overlay.header.EbuildHeader (
          ebuild_header, eapi
@@ -641,6 +658,22 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
       )
    # --- end of add_package_to_category (...) ---
 
+   def get_ebuild_file ( self, package_info ):
+      """Returns the path to the ebuild file of the given package
+      (as known by this overlay) or None.
+
+      arguments:
+      * package_info --
+      """
+      category = self._categories.get (
+         package_info.get ( "category", self.default_category )
+      )
+      return (
+         None if category is None
+         else category.get_ebuild_file ( package_info )
+      )
+   # --- end of get_ebuild_file (...) ---
+
    def has_dir ( self, _dir ):
       return os.path.isdir ( self.physical_location + os.sep + _dir )
    # --- end of has_category (...) ---
@@ -773,6 +806,28 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
             yield p_info
    # --- end of iter_package_info (...) ---
 
+   def package_dir_changed ( self, category_name, pkgdir_name ):
+      """Records that packages have been added to or removed from a
+      package dir. Called by package dirs.
+
+      arguments:
+      * category_name --
+      * pkgdir_name   --
+      """
+      with self._changed_pkgdirs_lock:
+         self._changed_pkgdirs.add ( ( category_name, pkgdir_name ) )
+   # --- end of package_dir_changed (...) ---
+
+   def pop_changed_package_dirs ( self ):
+      """Returns the ( category name, package dir name ) pairs of all
+      package dirs that have been changed since the last call.
+      """
+      with self._changed_pkgdirs_lock:
+         changed = self._changed_pkgdirs
+         self._changed_pkgdirs = set()
+      return changed
+   # --- end of pop_changed_package_dirs (...) ---
+
    def link_selfdeps ( self, selfdeps ):
       ##
       ## link:
@@ -851,7 +906,7 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
       if os.path.isdir ( self.physical_location ):
          for cat in scan_categories():
             try:
-               cat.scan ( **kw )
+               cat.scan ( scan_index=self.scan_index, **kw )
             except ( RuntimeError, SystemError, KeyboardInterrupt, ):
                raise
             except Exception as e:
@@ -859,6 +914,9 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
                # changed on 2014-07-17: reraise exception,
                #  scan() should not fail
                raise
+
+         if self.scan_index is not None and self._writeable:
+            self.scan_index.write()
    # --- end of scan (...) ---
 
    def show ( self, **show_kw ):
@@ -880,6 +938,52 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
       return self._writeable
    # --- end of writeable (...) ---
 
+   def prehash_manifest ( self, categories ):
+      """Calculates the digests of all package files that will be listed
+      in Manifest files (as DIST entries) in advance, using a hash pool.
+
+      Package files are usually hashed by the Manifest writer threads,
+      which is slow if a pure-python digest implementation has to be used
+      (whirlpool), see roverlay.util.hashpool.AutoDigestBackend.
+
+      arguments:
+      * categories -- categories whose Manifest files will be written
+
+      Has to be called after writing the ebuilds, which decides whether
+      a Manifest file has to be (re-)written.
+      """
+      hashes = roverlay.overlay.pkgdir.base.get_class().HASH_TYPES
+      if hashes:
+         hash_pool = roverlay.util.hashpool.HashPool (
+            hashes, roverlay.config.get ( 'DIGEST.jobs', None )
+         )
+         hash_pool.extend_with_hashdict (
+            ( id ( p_info ), p_info ['package_file'], p_info.hashdict )
+            for cat in categories
+               for p_info in cat.iter_manifest_package_info()
+         )
+         hash_pool.run()
+   # --- end of prehash_manifest (...) ---
+
+   def _run_write_scheduler ( self, categories, stats, **write_kw ):
+      """Writes the package dirs of the given categories using a single
+      write scheduler.
+
+      arguments:
+      * categories -- categories to write
+      * stats      -- overlay stats
+      * **write_kw -- keywords for <package dir>.write(...)
+      """
+      scheduler = roverlay.overlay.writequeue.WriteScheduler (
+         self.logger, stats, self.WRITE_JOBCOUNT
+      )
+      for cat in categories:
+         cat.enqueue_write (
+            scheduler, self.additions_dir.get_obj_subdir ( cat )
+         )
+      scheduler.run ( write_kw )
+   # --- end of _run_write_scheduler (...) ---
+
    def write ( self ):
       """Writes the overlay to its physical location (filesystem), including
       metadata and Manifest files as well as cleanup actions.
@@ -898,15 +1002,47 @@ class Overlay ( roverlay.overlay.base.OverlayObject ):
       if self._writeable:
          self._init_overlay ( reimport_eclass=True )
 
-         for cat in self._categories.values():
-            cat.write (
-               overwrite_ebuilds = False,
-               keep_n_ebuilds    = getattr ( self, 'keep_n_ebuilds', None ),
-               cautious          = True,
-               write_manifest    = not self.skip_manifest,
-               additions_dir     = self.additions_dir.get_obj_subdir ( cat ),
+         categories = list ( self._categories.values() )
+
+         # all package dirs are written by write schedulers,
+         #  regardless of their category
+         stats = roverlay.overlay.category.Category.STATS
+         stats.write_time.begin ( self.name )
+
+         manifest_threadsafe = all (
+            cat.supports_threadsafe_manifest_writing ( unsafe=True )
+            for cat in categories
+         )
+
+         # write ebuilds and metadata first, write_ebuilds() decides
+         #  which Manifest files have to be recreated
+         self._run_write_scheduler (
+            categories, stats,
+            overwrite_ebuilds = False,
+            keep_n_ebuilds    = getattr ( self, 'keep_n_ebuilds', None ),
+            cautious          = True,
+            write_manifest    = False,
+         )
+
+         if not self.skip_manifest:
+            self.prehash_manifest ( categories )
+
+            if manifest_threadsafe:
+               # Manifest files only
+               self._run_write_scheduler (
+                  categories, stats,
+                  write_ebuilds  = False,
+                  write_metadata = False,
+                  cleanup        = False,
+               )
+
+         for cat in categories:
+            cat.finalize_write (
+               not ( manifest_threadsafe or self.skip_manifest )
             )
 
+         stats.write_time.end ( self.name )
+
          # assumption: distroot exists
          self.access_distroot().finalize()
       else:
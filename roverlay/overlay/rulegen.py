@@ -4,6 +4,13 @@
 # Distributed under the terms of the GNU General Public License;
 # either version 2 of the License, or (at your option) any later version.
 
+"""depres rule generator
+
+This module provides the DepresRuleGenerator class that creates dynamic
+selfdep rules for the package dirs of an overlay, either all at once or
+incrementally for package dirs that have been modified (get_rule_changes()).
+"""
+
 import collections
 
 class DepresRuleGenerator ( object ):
@@ -13,6 +20,9 @@ class DepresRuleGenerator ( object ):
       self.overlay_ref = overlay.get_ref()
       self.rule_class  = None
       self.repo_id_map = repo_id_map
+      # rules created by get_rule_changes(),
+      #  map: resolving package => ( repo ids, rule, rule keywords )
+      self._rules      = None
    # --- end of __init__ (...) ---
 
    def lookup_repo_id ( self, repo_name ):
@@ -22,6 +32,57 @@ class DepresRuleGenerator ( object ):
          return None
    # --- end of lookup_repo_id (...) ---
 
+   def reset ( self ):
+      """Forgets all rules created by get_rule_changes(), which recreates
+      all rules when being called the next time.
+      """
+      self._rules = None
+   # --- end of reset (...) ---
+
+   def _make_pkgdir_rule_args (
+      self, cat_name, pkgdir_name, pkgdir, is_default_category
+   ):
+      """Returns a 2-tuple ( repo ids, rule keywords ) for a package dir.
+
+      arguments:
+      * cat_name            -- name of the package dir's category
+      * pkgdir_name         -- name of the package dir
+      * pkgdir              -- package dir (must not be empty)
+      * is_default_category -- whether the category is the default one
+      """
+      repo_ids      = set()
+      package_names = set()
+      for p_info in pkgdir.iter_package_info():
+         package_name = p_info.get ( 'package_name', do_fallback=True )
+         if package_name:
+            package_names.add ( package_name )
+         else:
+            package_names.add ( pkgdir_name.replace('_','.') )
+
+         repo = p_info.get ( 'origin', do_fallback=True )
+         if repo is not None:
+            repo_ids.add ( repo.get_identifier() )
+         else:
+            repo_id = self.lookup_repo_id (
+               p_info.get ( 'repo_name', do_fallback=True )
+            )
+            if repo_id is not None:
+               repo_ids.add ( repo_id )
+      # -- end for <get repo ids / package names>
+
+      return (
+         repo_ids,
+         dict (
+            dep_str               = pkgdir_name,
+            resolving_package     = ( cat_name + '/' + pkgdir_name ),
+            is_selfdep            = 2 if is_default_category else 1,
+            priority              = 90,
+            finalize              = True,
+            selfdep_package_names = package_names,
+         )
+      )
+   # --- end of _make_pkgdir_rule_args (...) ---
+
    def make_rule_args ( self ):
       overlay               = self.overlay_ref.deref_safe()
       default_category_name = overlay.default_category
@@ -32,43 +93,78 @@ class DepresRuleGenerator ( object ):
 
          for pkgdir_name, pkgdir in cat._subdirs.items():
             if not pkgdir.empty():
-               repo_ids      = set()
-               package_names = set()
-               for p_info in pkgdir.iter_package_info():
-                  package_name = p_info.get (
-                     'package_name', do_fallback=True
-                  )
-                  if package_name:
-                     package_names.add ( package_name )
-                  else:
-                     package_names.add ( pkgdir_name.replace('_','.') )
-
-                  repo = p_info.get ( 'origin', do_fallback=True )
-                  if repo is not None:
-                     repo_ids.add ( repo.get_identifier() )
-                  else:
-                     repo_id = self.lookup_repo_id (
-                        p_info.get ( 'repo_name', do_fallback=True )
-                     )
-                     if repo_id is not None:
-                        repo_ids.add ( repo_id )
-               # -- end for <get repo ids / package names>
-
-               yield (
-                  repo_ids,
-                  dict (
-                     dep_str               = pkgdir_name,
-                     resolving_package     = ( cat_name + '/' + pkgdir_name ),
-                     is_selfdep            = 2 if is_default_category else 1,
-                     priority              = 90,
-                     finalize              = True,
-                     selfdep_package_names = package_names,
-                  )
+               yield self._make_pkgdir_rule_args (
+                  cat_name, pkgdir_name, pkgdir, is_default_category
                )
          # -- end for pkgdir
       # -- end for category
    # --- end of make_rule_args (...) ---
 
+   def get_rule_changes ( self ):
+      """Creates rules for package dirs that have been modified since the
+      last call and returns a list of changes.
+
+      All rules are created on the first call (or after reset()),
+      subsequent calls only consider package dirs reported by the overlay
+      (see Overlay.pop_changed_package_dirs()).
+
+      Each change is a 3-tuple ( key, old entry, new entry ), where key is
+      the resolving package ("<category>/<package dir>") and each entry is
+      either None (no rule) or a 2-tuple ( repo ids, rule ).
+      """
+      overlay               = self.overlay_ref.deref_safe()
+      default_category_name = overlay.default_category
+      changed_pkgdirs       = overlay.pop_changed_package_dirs()
+
+      if self._rules is None:
+         self._rules = dict()
+         # COULDFIX: direct access to "private" attributes
+         changed_pkgdirs = [
+            ( cat_name, pkgdir_name )
+            for cat_name, cat in overlay._categories.items()
+               for pkgdir_name in cat._subdirs
+         ]
+
+      rules   = self._rules
+      changes = list()
+
+      for cat_name, pkgdir_name in changed_pkgdirs:
+         key = cat_name + '/' + pkgdir_name
+         cat = overlay._categories.get ( cat_name, None )
+         pkgdir = (
+            None if cat is None else cat.get_nonempty ( pkgdir_name )
+         )
+
+         old_entry = rules.get ( key, None )
+
+         if pkgdir is None:
+            if old_entry is not None:
+               del rules [key]
+               changes.append ( ( key, old_entry[:2], None ) )
+         else:
+            repo_ids, rule_kwargs = self._make_pkgdir_rule_args (
+               cat_name, pkgdir_name, pkgdir,
+               cat_name == default_category_name
+            )
+
+            if (
+               old_entry is None
+               or old_entry[0] != repo_ids or old_entry[2] != rule_kwargs
+            ):
+               new_entry = (
+                  repo_ids, self.rule_class ( **rule_kwargs ), rule_kwargs
+               )
+               rules [key] = new_entry
+               changes.append ( (
+                  key,
+                  ( None if old_entry is None else old_entry[:2] ),
+                  new_entry[:2]
+               ) )
+      # -- end for
+
+      return changes
+   # --- end of get_rule_changes (...) ---
+
    def make_rules ( self ):
       for repo_ids, rule_kwargs in self.make_rule_args():
          yield ( repo_ids, self.rule_class ( **rule_kwargs ) )
@@ -7,10 +7,11 @@
 """overlay worker
 
 This module provides OverlayWorker, a class that handles threaded ebuild
-creation for PackageInfo instances.
+creation for PackageInfo instances, and JobGate, which holds back ebuild
+creation jobs until dependency resolution can start.
 """
 
-__all__ = [ 'OverlayWorker', ]
+__all__ = [ 'JobGate', 'OverlayWorker', ]
 
 import sys
 import threading
@@ -19,10 +20,62 @@ import threading
 # to stderr or suppressed
 DEBUG = True
 
+class JobGate ( object ):
+   """Collects ebuild creation jobs that are waiting for something
+   (e.g. dependency resolution) until the gate gets opened."""
+
+   def __init__ ( self ):
+      super ( JobGate, self ).__init__()
+      self._lock    = threading.Lock()
+      self._held    = list()
+      self.is_open  = False
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._held )
+   # --- end of __len__ (...) ---
+
+   def hold ( self, job ):
+      """Keeps a job until the gate gets opened.
+
+      Returns True if the job is held, and False if the gate is already
+      open, in which case the caller has to continue with the job.
+
+      arguments:
+      * job --
+      """
+      with self._lock:
+         if self.is_open:
+            return False
+         else:
+            self._held.append ( job )
+            return True
+   # --- end of hold (...) ---
+
+   def open ( self, put_job ):
+      """Opens the gate and passes all held jobs to put_job().
+
+      arguments:
+      * put_job -- function that accepts a job, e.g. queue.put_nowait
+      """
+      with self._lock:
+         self.is_open = True
+         held         = self._held
+         self._held   = list()
+
+      for job in held:
+         put_job ( job )
+   # --- end of open (...) ---
+
+# --- end of JobGate ---
+
+
 class OverlayWorker ( object ):
    """Overlay package queue worker."""
 
-   def __init__ ( self, pkg_queue, logger, use_threads, err_queue, stats ):
+   def __init__ ( self,
+      pkg_queue, logger, use_threads, err_queue, stats, depres_gate=None
+   ):
       """Initializes a worker.
 
       arguments:
@@ -32,9 +85,12 @@ class OverlayWorker ( object ):
       * use_threads -- whether to run this worker as a thread or not
       * err_queue   --
       * stats       --
+      * depres_gate -- JobGate for jobs waiting for dependency resolution,
+                        or None. Defaults to None.
       """
       self.logger      = logger
       self.pkg_queue   = pkg_queue
+      self.depres_gate = depres_gate
 
       self.err_queue   = err_queue
       self.stats       = stats
@@ -91,6 +147,15 @@ class OverlayWorker ( object ):
       p_info = ejob.package_info
       ejob.run ( self.stats )
 
+      if self.depres_gate is not None:
+         # the gate may have been opened in the meantime,
+         #  in which case the job has to be continued here
+         while ejob.waiting_for_depres():
+            if self.depres_gate.hold ( ejob ):
+               return
+            else:
+               ejob.run ( self.stats )
+
       if ejob.busy():
          self.pkg_waiting.append ( ejob )
       elif p_info.get ( 'ebuild' ) is None:
@@ -0,0 +1,156 @@
+# R overlay -- overlay package, threaded package dir writing
+# -*- coding: utf-8 -*-
+# Copyright (C) 2012-2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""overlay <-> filesystem interface (threaded writing)
+
+This module provides the WriteScheduler class that writes package dirs
+(possibly from several categories) using a bounded number of threads.
+"""
+
+__all__ = [ 'WriteScheduler', ]
+
+import sys
+import threading
+
+try:
+   import queue
+except ImportError:
+   import Queue as queue
+
+
+class WriteQueueJob ( object ):
+
+   def __init__ ( self, scheduler, write_kw ):
+      super ( WriteQueueJob, self ).__init__()
+      self.scheduler = scheduler
+      self.write_kw  = write_kw
+      self.stats     = scheduler.stats.get_new()
+   # --- end of __init__ (...) ---
+
+   def run ( self ):
+      """Calls <package>.write for every <package> received from the
+      scheduler's queue.
+      """
+      scheduler = self.scheduler
+      q         = scheduler.write_queue
+      write_kw  = self.write_kw
+      stats     = self.stats
+
+      while not q.empty() and scheduler.RERAISE is None:
+         try:
+            pkg, additions_dir = q.get_nowait()
+            # remove manifest writing from threaded writing since it's
+            # single-threaded
+            pkg.write (
+               additions_dir = additions_dir.get_obj_subdir ( pkg ),
+               stats         = stats,
+               **write_kw
+            )
+            if write_kw.get ( 'write_ebuilds', True ):
+               stats.ebuild_count.inc (
+                  len ( list ( pkg.iter_packages_with_efile() ) )
+               )
+         except queue.Empty:
+            break
+         except ( Exception, KeyboardInterrupt ) as err:
+            scheduler.logger.exception ( err )
+            scheduler.RERAISE = sys.exc_info()
+   # --- end of run (...) ---
+
+# --- end of WriteQueueJob ---
+
+
+class WriteScheduler ( object ):
+   """Writes package dirs using a bounded number of threads.
+
+   Package dirs of all categories are fed into a single queue, so that
+   small categories do not have to wait for large ones.
+   """
+
+   def __init__ ( self, logger, stats, max_jobs ):
+      """Initializes a write scheduler.
+
+      arguments:
+      * logger   -- logger for write errors
+      * stats    -- overlay stats, thread stats will be merged with it
+      * max_jobs -- max number of write threads
+      """
+      super ( WriteScheduler, self ).__init__()
+      self.logger      = logger
+      self.stats       = stats
+      self.max_jobs    = max_jobs
+      self.write_queue = queue.Queue()
+      self.RERAISE     = None
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return self.write_queue.qsize()
+   # --- end of __len__ (...) ---
+
+   def add ( self, pkg, additions_dir ):
+      """Adds a package dir to the write queue.
+
+      arguments:
+      * pkg           -- package dir
+      * additions_dir -- AdditionsDir object for the package dir's category
+      """
+      self.write_queue.put_nowait ( ( pkg, additions_dir ) )
+   # --- end of add (...) ---
+
+   def reraise ( self ):
+      """Reraises the exception of a write thread (if any)."""
+      if self.RERAISE:
+         # ref: PEP 3109
+         #  results in correct traceback when running python 3.x
+         #  and inaccurate traceback with python 2.x,
+         #  which can be tolerated since the exception has been logged
+         try:
+            reraise = self.RERAISE[0] ( self.RERAISE[1] )
+         except TypeError:
+            # "portage.exception.FileNotFound is not subscriptable"
+            reraise = self.RERAISE[1]
+
+         reraise.__traceback__ = self.RERAISE [2]
+         raise reraise
+   # --- end of reraise (...) ---
+
+   def run ( self, write_kw ):
+      """Writes all queued package dirs and waits until writing is done.
+
+      arguments:
+      * write_kw -- keywords for <package dir>.write(...)
+
+      raises: passes exceptions from write threads
+      """
+      # don't create more workers than write jobs available
+      num_jobs = min ( self.max_jobs, len ( self ) )
+
+      if num_jobs < 1:
+         return
+
+      jobs = frozenset (
+         WriteQueueJob ( self, write_kw ) for n in range ( num_jobs )
+      )
+
+      if num_jobs == 1:
+         # no need to start a thread
+         for job in jobs: job.run()
+      else:
+         workers = frozenset (
+            threading.Thread ( target=job.run ) for job in jobs
+         )
+
+         for w in workers: w.start()
+         for w in workers: w.join()
+
+      self.reraise()
+
+      # merge stats from threads with self.stats
+      for job in jobs:
+         self.stats.merge_with ( job.stats )
+   # --- end of run (...) ---
+
+# --- end of WriteScheduler ---
@@ -21,6 +21,7 @@ import logging
 import roverlay.digest
 import roverlay.versiontuple
 import roverlay.db.distmap
+import roverlay.util.common
 import roverlay.util.objects
 import roverlay.util.ebuildparser
 import roverlay.util.portage_regex.default
@@ -151,8 +152,19 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
    * _REMOVE_KEYS_EBUILD         -- a set of keys that will be removed when
                                     _remove_auto ( 'ebuild_written' ) is
                                     called.
+   * _INTERN_KEYS                -- a set of keys whose (str) values are
+                                    shared by many package infos and
+                                    therefore get interned
    """
 
+   __slots__ = (
+      '__weakref__', '_cached_selfref',
+      '_info', 'readonly', '_readonly_final', 'logger',
+      'selfdeps', 'selfdeps_valid', 'hashdict', 'depconf',
+      'overlay_addition_override', 'overlay_package_ref',
+      'modified_by_package_rules', '_evars', '_lazy_actions',
+   )
+
    CACHE_REF = True
 
    EBUILDVER_REGEX = re.compile ( '[-]{1,}' )
@@ -183,6 +195,10 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
       'ebuild'
    ))
 
+   _INTERN_KEYS                = frozenset ((
+      'category', 'name', 'package_name', 'repo_name',
+   ))
+
    # bind DIGEST_TYPE to this class
    DISTMAP_DIGEST_TYPE = roverlay.db.distmap.DistMapInfo.DIGEST_TYPE
 
@@ -565,14 +581,20 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
          return v
    # --- end of get_create (...) ---
 
-   def get_desc_data ( self ):
+   def get_desc_data ( self, read_data=None ):
       """Returns the DESCRIPTION data for this PackageInfo (by reading the
       R package file if necessary).
+
+      arguments:
+      * read_data -- DESCRIPTION data that has already been read from
+                     the package file (see descriptionreader.read())
       """
       if 'desc_data' not in self._info:
          self._check_readonly()
          if 'desc_data' not in self._info:
-            self._info ['desc_data'] = descriptionreader.read ( self )
+            self._info ['desc_data'] = descriptionreader.read (
+               self, read_data=read_data
+            )
       # -- end if;
 
       return self._info ['desc_data']
@@ -581,11 +603,14 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
    def get_distmap_item ( self, allow_digest_create=False, no_digest=False ):
       """Returns a 2-tuple ( key, info ) for the distmap."""
       if no_digest:
-         digest = None
-      elif allow_digest_create:
-         digest = self.make_distmap_hash()
+         digest   = None
+         filestat = None
       else:
-         digest = self.hashdict [self.DISTMAP_DIGEST_TYPE]
+         filestat = self.get_file_stat_key()
+         if allow_digest_create:
+            digest = self.make_distmap_hash()
+         else:
+            digest = self.hashdict [self.DISTMAP_DIGEST_TYPE]
 
       distfile = self.get ( "package_src_destpath" )
       repo     = self.get ( "origin" )
@@ -595,7 +620,8 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
             distfile,
             repo.name,
             os.path.relpath ( self.get ( "package_file" ), repo.distdir ),
-            digest
+            digest,
+            filestat
          )
       )
    # --- end of get_distmap_item (...) ---
@@ -619,6 +645,14 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
       return self.get_distmap_item ( allow_digest_create, no_digest ) [1]
    # --- end of get_distmap_value (...) ---
 
+   def get_file_stat_key ( self ):
+      """Returns a str that identifies the current state of the package
+      file (see roverlay.util.common.get_file_stat_key())."""
+      return roverlay.util.common.get_file_stat_key (
+         self.get ( "package_file" )
+      )
+   # --- end of get_file_stat_key (...) ---
+
    def make_distmap_hash ( self ):
       """Creates (and returns) the distmap package file hash."""
       return self.make_hashes (
@@ -645,7 +679,7 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
 
       if new_hashes:
          self.hashdict.update (
-            roverlay.digest.multihash_file ( pkgfile, new_hashes )
+            roverlay.digest.get_file_digests ( pkgfile, new_hashes )
          )
 
       return self.hashdict
@@ -708,9 +742,16 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
       raises: Exception when readonly
       """
       self._check_readonly()
-      self._info [key] = value
+      self._set_info ( key, value )
    # --- end of __setitem__ (...) ---
 
+   def _set_info ( self, key, value ):
+      if key in self.__class__._INTERN_KEYS and isinstance ( value, str ):
+         self._info [key] = strutil.intern_str ( value )
+      else:
+         self._info [key] = value
+   # --- end of _set_info (...) ---
+
    def set_direct_unsafe ( self, key, value ):
       """Sets an item. This operation is unsafe (write-accessibility won't
       be checked, data won't be validated).
@@ -719,7 +760,7 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
       * key   --
       * value --
       """
-      self._info [key] = value
+      self._set_info ( key, value )
    # --- end of set_direct_unsafe (...) ---
 
    def update_now ( self, **info ):
@@ -817,7 +858,7 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
          if key in self.__class__._UPDATE_KEYS_SIMPLE or (
             initial and key in self.__class__._UPDATE_KEYS_SIMPLE_INITIAL
          ):
-            self._info [key] = value
+            self._set_info ( key, value )
 
          elif key in self.__class__._UPDATE_KEYS_FILTER_NONE:
             if value is not None:
@@ -851,6 +892,9 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
             if value:
                self.get_desc_data()
 
+         elif key == 'desc_read_data':
+            self.get_desc_data ( read_data=value )
+
          else:
             self.logger.error (
                "in _update(): unknown info key {!r}!".format ( key )
@@ -908,9 +952,9 @@ class PackageInfo ( roverlay.util.objects.Referenceable ):
       ebuild_name = strutil.fix_ebuild_name ( package_name )
 
       # for DescriptionReader
-      self._info ['package_name']       = package_name
+      self._info ['package_name']       = strutil.intern_str ( package_name )
       self._info ['rev']                = 0
-      self._info ['name']               = ebuild_name
+      self._info ['name']               = strutil.intern_str ( ebuild_name )
       self._info ['ebuild_verstr']      = version_str
       self._info ['package_filename']   = filename_with_ext
       self._info ['package_filename_x'] = filename
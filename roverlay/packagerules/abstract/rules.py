@@ -6,6 +6,8 @@
 
 import roverlay.util
 
+import roverlay.packagerules.dispatch
+
 __all__ = [ 'PackageRule', 'NestedPackageRule', 'IgnorePackageRule', ]
 
 
@@ -265,6 +267,10 @@ class NestedPackageRule ( PackageRule ):
       super ( NestedPackageRule, self ).__init__ ( priority )
       self._rules     = list()
       self._alt_rules = list()
+
+      # rule dispatchers (or None), see compile()
+      self._rules_dispatch     = None
+      self._alt_rules_dispatch = None
    # --- end of __init__ (...) ---
 
    def has_rules ( self ):
@@ -329,8 +335,46 @@ class NestedPackageRule ( PackageRule ):
          rule.prepare()
       self._rules     = roverlay.util.priosort ( self._rules )
       self._alt_rules = roverlay.util.priosort ( self._alt_rules )
+      self.compile()
    # --- end of prepare (...) ---
 
+   def compile ( self ):
+      """Creates the dispatch tables for the (sorted) nested rules,
+      which are used to evaluate only those rules that could match
+      a PackageInfo instance.
+
+      Called by prepare(). Does not compile nested rules.
+      """
+      self._rules_dispatch = (
+         roverlay.packagerules.dispatch.RuleDispatcher.create ( self._rules )
+      )
+      self._alt_rules_dispatch = (
+         roverlay.packagerules.dispatch.RuleDispatcher.create (
+            self._alt_rules
+         )
+      )
+   # --- end of compile (...) ---
+
+   def _apply_rules ( self, rules, dispatcher, p_info ):
+      """Applies the actions of all matching rules and the 'alternative'
+      actions of all other rules.
+
+      arguments:
+      * rules      -- list of rules
+      * dispatcher -- rule dispatcher for the rules list or None
+      * p_info     --
+      """
+      for rule in (
+         rules if dispatcher is None else dispatcher.iter_rules ( p_info )
+      ):
+         if rule.accepts ( p_info ):
+            if not rule.apply_actions ( p_info ):
+               return False
+         elif not rule.apply_alternative_actions ( p_info ):
+            return False
+      return True
+   # --- end of _apply_rules (...) ---
+
    def apply_actions ( self, p_info ):
       """Applies all actions to the given PackageInfo.
 
@@ -341,13 +385,9 @@ class NestedPackageRule ( PackageRule ):
       * p_info -- PackageInfo object that will be modified
       """
       if super ( NestedPackageRule, self ).apply_actions ( p_info ):
-         for rule in self._rules:
-            if rule.accepts ( p_info ):
-               if not rule.apply_actions ( p_info ):
-                  return False
-            elif not rule.apply_alternative_actions ( p_info ):
-               return False
-         return True
+         return self._apply_rules (
+            self._rules, self._rules_dispatch, p_info
+         )
       else:
          return False
    # --- end of apply_actions (...) ---
@@ -361,14 +401,9 @@ class NestedPackageRule ( PackageRule ):
       if ( super (
          NestedPackageRule, self ).apply_alternative_actions ( p_info )
       ):
-         for rule in self._alt_rules:
-            if rule.accepts ( p_info ):
-               if not rule.apply_actions ( p_info ):
-                  return False
-            elif not rule.apply_alternative_actions ( p_info ):
-               return False
-
-         return True
+         return self._apply_rules (
+            self._alt_rules, self._alt_rules_dispatch, p_info
+         )
       else:
          return False
    # --- end of apply_alternative_actions (...) ---
@@ -380,6 +415,7 @@ class NestedPackageRule ( PackageRule ):
       * rule --
       """
       self._rules.append ( rule )
+      self._rules_dispatch = None
    # --- end of add_rule (...) ---
 
    def add_alternative_rule ( self, rule ):
@@ -389,6 +425,7 @@ class NestedPackageRule ( PackageRule ):
       * rule --
       """
       self._alt_rules.append ( rule )
+      self._alt_rules_dispatch = None
    # --- end of add_alternative_rule (...) ---
 
 # --- end of NestedPackageRule ---
@@ -0,0 +1,370 @@
+# R overlay -- package rules, compiled rule dispatch
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""compiled rule dispatch
+
+This module provides the RuleDispatcher class, which selects the rules
+of a nested rule that could possibly match a PackageInfo instance,
+so that only those rules have to be evaluated.
+
+For each rule, a "guard" is derived from its match block. A guard is a
+necessary condition for the rule to match, expressed as list of
+alternatives "<value getter>(p_info) == <value>" (exact or case-insensitive)
+or "<value getter>(p_info) ~ <regex>". Rules without guard (e.g. "none of"
+match blocks or rules with else-blocks) are always evaluated.
+
+The guards are compiled into hash tables (exact values) and combined
+regular expressions (regex alternatives of the same value getter).
+Candidate rules are evaluated in the original order, and the candidates
+are recalculated whenever the values used for dispatching change while
+applying rules (e.g. after setting a package's category).
+"""
+
+__all__ = [ 'RuleDispatcher', ]
+
+import re
+
+import roverlay.packagerules.acceptors.trivial
+import roverlay.packagerules.acceptors.util
+
+from roverlay.packagerules.abstract.acceptors import \
+   Acceptor_AND, Acceptor_OR, Acceptor_XOR1
+
+from roverlay.packagerules.acceptors.stringmatch import \
+   ValueAcceptor, StringAcceptor, NocaseStringAcceptor, \
+   RegexAcceptor, ExactRegexAcceptor
+
+
+# don't compile rule lists with less rules
+DISPATCH_MIN_RULES = 4
+
+# value getters that can be used for dispatching
+#  (the values are strings, and getting them is cheap)
+DISPATCH_GETTERS = frozenset ({
+   roverlay.packagerules.acceptors.util.get_repo_name,
+   roverlay.packagerules.acceptors.util.get_package,
+   roverlay.packagerules.acceptors.util.get_package_name,
+   roverlay.packagerules.acceptors.util.get_ebuild_name,
+   roverlay.packagerules.acceptors.util.get_category,
+})
+
+GUARD_EXACT  = 1
+GUARD_NOCASE = 2
+GUARD_REGEX  = 3
+
+# flags of a regex compiled without any flags
+_DEFAULT_REGEX_FLAGS = re.compile ( '' ).flags
+
+# placeholder for values that could not be retrieved
+_UNKNOWN = object()
+
+
+def get_acceptor_guard ( acceptor ):
+   """Returns the guard of an acceptor, which is a list of
+   ( guard type, value getter, value|regex ) tuples.
+   At least one of these conditions must be true for the given acceptor
+   to match a PackageInfo instance.
+
+   Returns None if no such list could be created ("always true").
+   An empty list means that the acceptor never matches.
+
+   arguments:
+   * acceptor --
+   """
+   # subclasses may implement other matching behavior,
+   #  so the acceptor's class has to match exactly
+   cls = acceptor.__class__
+
+   if cls is roverlay.packagerules.acceptors.trivial.FalseAcceptor:
+      return []
+
+   elif cls is Acceptor_OR or cls is Acceptor_XOR1:
+      # at least one sub-acceptor has to match
+      guard = []
+      for sub_acceptor in acceptor._acceptors:
+         sub_guard = get_acceptor_guard ( sub_acceptor )
+         if sub_guard is None:
+            return None
+         guard.extend ( sub_guard )
+      return guard
+
+   elif cls is Acceptor_AND:
+      # all sub-acceptors have to match, use the most specific guard
+      #  (no regexes, least number of alternatives)
+      best_guard = None
+      best_key   = None
+      for sub_acceptor in acceptor._acceptors:
+         sub_guard = get_acceptor_guard ( sub_acceptor )
+         if sub_guard is not None:
+            key = (
+               sum ( 1 for item in sub_guard if item[0] == GUARD_REGEX ),
+               len ( sub_guard )
+            )
+            if best_key is None or key < best_key:
+               best_guard = sub_guard
+               best_key   = key
+      return best_guard
+
+   elif getattr ( acceptor, '_get_value', None ) not in DISPATCH_GETTERS:
+      return None
+
+   elif cls is ValueAcceptor or cls is StringAcceptor:
+      try:
+         hash ( acceptor._value )
+      except TypeError:
+         return None
+      return [ ( GUARD_EXACT, acceptor._get_value, acceptor._value ) ]
+
+   elif cls is NocaseStringAcceptor:
+      return [ ( GUARD_NOCASE, acceptor._get_value, acceptor._value ) ]
+
+   elif cls is RegexAcceptor or cls is ExactRegexAcceptor:
+      # ExactRegexAcceptor: re.match("^...$") is equivalent to re.search()
+      return [ ( GUARD_REGEX, acceptor._get_value, acceptor._regex ) ]
+
+   else:
+      return None
+# --- end of get_acceptor_guard (...) ---
+
+def get_rule_guard ( rule ):
+   """Returns the guard of a package rule (see get_acceptor_guard()).
+
+   Rules with else-block actions or rules have no guard, because
+   they need to be evaluated in any case.
+
+   arguments:
+   * rule --
+   """
+   if (
+      rule.has_alternative_actions() or rule.has_alternative_rules()
+      or rule._acceptor is None
+   ):
+      return None
+   else:
+      return get_acceptor_guard ( rule._acceptor )
+# --- end of get_rule_guard (...) ---
+
+def is_mergeable_regex ( regex ):
+   """Returns True if the given regex can be part of a combined alternation
+   regex, else False.
+
+   arguments:
+   * regex -- compiled regex
+   """
+   return (
+      regex.groups == 0 and regex.flags == _DEFAULT_REGEX_FLAGS
+      # inline flags, lookaheads etc.
+      and '(?' not in regex.pattern.replace ( '(?:', '' )
+   )
+# --- end of is_mergeable_regex (...) ---
+
+
+class _GetterTable ( object ):
+   """Dispatch tables for a single value getter."""
+
+   def __init__ ( self, get_value ):
+      super ( _GetterTable, self ).__init__()
+      self.get_value = get_value
+      # map: value => list of rule indices
+      self.exact     = dict()
+      # map: lowercase value => list of rule indices
+      self.nocase    = dict()
+      # regexes that are part of the combined regex,
+      #  list of ( regex, rule index )
+      self.regex     = list()
+      # regexes that are checked individually
+      self.regex_ext = list()
+      # combined regex (or None)
+      self.combined  = None
+      # all rule indices that are guarded by this table
+      self.indices   = set()
+   # --- end of __init__ (...) ---
+
+   def add ( self, guard_type, value, index ):
+      self.indices.add ( index )
+      if guard_type == GUARD_EXACT:
+         self.exact.setdefault ( value, [] ).append ( index )
+      elif guard_type == GUARD_NOCASE:
+         self.nocase.setdefault ( value, [] ).append ( index )
+      elif is_mergeable_regex ( value ):
+         self.regex.append ( ( value, index ) )
+      else:
+         self.regex_ext.append ( ( value, index ) )
+   # --- end of add (...) ---
+
+   def compile ( self ):
+      """Creates the combined regex."""
+      self.combined = None
+      if len ( self.regex ) > 1:
+         patterns = list()
+         known    = set()
+         for regex, index in self.regex:
+            if regex.pattern not in known:
+               known.add ( regex.pattern )
+               patterns.append ( regex.pattern )
+         try:
+            self.combined = re.compile (
+               '|'.join ( '(?:' + p + ')' for p in patterns )
+            )
+         except re.error:
+            self.regex_ext.extend ( self.regex )
+            self.regex = list()
+      else:
+         self.regex_ext.extend ( self.regex )
+         self.regex = list()
+   # --- end of compile (...) ---
+
+   def add_candidates ( self, value, candidates ):
+      """Adds the indices of all rules whose guard matches the given value
+      to the candidates set.
+
+      arguments:
+      * value      -- value as returned by self.get_value()
+      * candidates -- set of rule indices
+      """
+      if value is _UNKNOWN or not isinstance ( value, str ):
+         # value cannot be checked, rules have to be evaluated
+         candidates.update ( self.indices )
+         return
+
+      if self.exact:
+         candidates.update ( self.exact.get ( value, () ) )
+
+      if self.nocase:
+         candidates.update ( self.nocase.get ( value.lower(), () ) )
+
+      if self.combined is not None and self.combined.search ( value ):
+         for regex, index in self.regex:
+            if index not in candidates and regex.search ( value ):
+               candidates.add ( index )
+
+      for regex, index in self.regex_ext:
+         if index not in candidates and regex.search ( value ):
+            candidates.add ( index )
+   # --- end of add_candidates (...) ---
+
+# --- end of _GetterTable ---
+
+
+class RuleDispatcher ( object ):
+   """Selects candidate rules from a list of (prepared) package rules."""
+
+   @classmethod
+   def create ( cls, rules ):
+      """Returns a RuleDispatcher for the given rules if dispatching
+      is worthwhile, else None.
+
+      arguments:
+      * rules -- list of package rules (in order of evaluation)
+      """
+      if len ( rules ) < DISPATCH_MIN_RULES:
+         return None
+
+      dispatcher = cls ( rules )
+      if len ( dispatcher._always ) == len ( rules ):
+         return None
+      else:
+         return dispatcher
+   # --- end of create (...) ---
+
+   def __init__ ( self, rules ):
+      """Initializes a RuleDispatcher.
+
+      arguments:
+      * rules -- list of package rules (in order of evaluation)
+      """
+      super ( RuleDispatcher, self ).__init__()
+      self.rules    = rules
+      # list of rule indices that are always evaluated
+      self._always  = None
+      # list of _GetterTable objects
+      self._tables  = None
+      self.compile()
+   # --- end of __init__ (...) ---
+
+   def compile ( self ):
+      """(Re-)creates the dispatch tables."""
+      always = list()
+      tables = dict()
+
+      for index, rule in enumerate ( self.rules ):
+         guard = get_rule_guard ( rule )
+         if guard is None:
+            always.append ( index )
+         else:
+            for guard_type, get_value, value in guard:
+               table = tables.get ( get_value )
+               if table is None:
+                  table = _GetterTable ( get_value )
+                  tables [get_value] = table
+               table.add ( guard_type, value, index )
+      # -- end for
+
+      for table in tables.values():
+         table.compile()
+
+      self._always = always
+      self._tables = tuple ( tables.values() )
+   # --- end of compile (...) ---
+
+   def get_values ( self, p_info ):
+      """Returns the values of the given PackageInfo that are used for
+      dispatching (as tuple).
+
+      arguments:
+      * p_info --
+      """
+      values = list()
+      for table in self._tables:
+         try:
+            values.append ( table.get_value ( p_info ) )
+         except ( KeyError, AttributeError, TypeError ):
+            values.append ( _UNKNOWN )
+      return tuple ( values )
+   # --- end of get_values (...) ---
+
+   def get_candidates ( self, values ):
+      """Returns a sorted list of rule indices that need to be evaluated.
+
+      arguments:
+      * values -- values as returned by get_values()
+      """
+      candidates = set ( self._always )
+      for table, value in zip ( self._tables, values ):
+         table.add_candidates ( value, candidates )
+      return sorted ( candidates )
+   # --- end of get_candidates (...) ---
+
+   def iter_rules ( self, p_info ):
+      """Generator that yields the rules that need to be evaluated for
+      the given PackageInfo, in order.
+
+      The candidate rules are recalculated after each rule if the
+      PackageInfo has been modified in a way that affects dispatching.
+
+      arguments:
+      * p_info --
+      """
+      rules      = self.rules
+      values     = self.get_values ( p_info )
+      candidates = self.get_candidates ( values )
+      k          = 0
+
+      while k < len ( candidates ):
+         index = candidates [k]
+         yield rules [index]
+         k += 1
+
+         new_values = self.get_values ( p_info )
+         if new_values != values:
+            values     = new_values
+            candidates = [
+               i for i in self.get_candidates ( values ) if i > index
+            ]
+            k          = 0
+   # --- end of iter_rules (...) ---
+
+# --- end of RuleDispatcher ---
@@ -0,0 +1,237 @@
+# R overlay -- package rules, dry-run evaluation
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""package rules dry-run
+
+This module evaluates package rules for a list of packages (without creating
+any ebuilds) and creates one record (dict) per package that describes the
+outcome. Records can be written to files in JSON lines format (one JSON
+object per line) and compared with the records of a previous run.
+
+Package rules only modify the package they're applied to, so packages can
+be evaluated in parallel worker processes. The workers are forked after
+loading the packages and rules, only package indices and records are
+transferred between processes.
+"""
+
+__all__ = [
+   'get_package_id', 'get_package_record', 'evaluate',
+   'write_records', 'read_records', 'iter_diff',
+]
+
+import json
+import os
+
+try:
+   import multiprocessing
+except ImportError:
+   HAVE_MULTIPROCESSING = False
+else:
+   HAVE_MULTIPROCESSING = True
+
+
+# status of a package after applying the rules
+STATUS_FILTERED  = 'filtered'
+STATUS_MODIFIED  = 'modified'
+STATUS_UNCHANGED = 'unchanged'
+
+# ( package rules, list of packages ) used by worker processes,
+#  inherited when forking
+_WORKER_DATA = None
+
+
+def get_package_id ( p_info ):
+   """Returns a string that identifies a package (file) across runs.
+
+   arguments:
+   * p_info --
+   """
+   return "{}/{}".format (
+      p_info.get ( 'repo_name', None, do_fallback=True ),
+      p_info.get ( 'package_filename', None, do_fallback=True )
+   )
+# --- end of get_package_id (...) ---
+
+def get_package_record ( p_info, accepted ):
+   """Returns a dict that describes the outcome of applying package rules
+   to a package.
+
+   arguments:
+   * p_info   -- package info (after applying the rules)
+   * accepted -- return value of PackageRules.apply_actions()
+   """
+   get = lambda k: p_info.get ( k, None, do_fallback=True )
+
+   record = {
+      'id'       : get_package_id ( p_info ),
+      'name'     : get ( 'name' ),
+      'version'  : get ( 'ebuild_verstr' ),
+      'repo'     : get ( 'repo_name' ),
+   }
+
+   trace = getattr ( p_info, 'modified_by_package_rules', None )
+
+   if not accepted:
+      record ['status'] = STATUS_FILTERED
+
+   elif trace:
+      record ['status'] = STATUS_MODIFIED
+
+      evars = p_info.get_evars()
+      record ['evars'] = sorted ( str ( evar ) for evar in evars or () )
+
+      depconf = dict()
+      if p_info.depconf:
+         for root_key, subdict in p_info.depconf.items():
+            if subdict:
+               depconf [root_key] = dict (
+                  ( key, [ str ( dep ) for dep in deplist ] )
+                  for key, deplist in subdict.items()
+               )
+      record ['depconf'] = depconf
+
+      if trace is True:
+         record ['trace'] = []
+      else:
+         record ['trace'] = [ str ( s ) for s in trace if s is not True ]
+
+      record ['category']     = get ( 'category' )
+      record ['src_uri_dest'] = get ( 'src_uri_dest' )
+      record ['add_policy']   = getattr (
+         p_info, 'overlay_addition_override', None
+      )
+
+   else:
+      record ['status'] = STATUS_UNCHANGED
+
+   return record
+# --- end of get_package_record (...) ---
+
+def _evaluate_package ( prules, p_info ):
+   return get_package_record ( p_info, prules.apply_actions ( p_info ) )
+# --- end of _evaluate_package (...) ---
+
+def _worker_evaluate ( index ):
+   """Evaluates a single package in a worker process.
+
+   arguments:
+   * index -- package index
+   """
+   prules, packages = _WORKER_DATA
+   return _evaluate_package ( prules, packages [index] )
+# --- end of _worker_evaluate (...) ---
+
+def _get_fork_context():
+   """Returns a multiprocessing context that forks worker processes,
+   or None if not available.
+   """
+   if not HAVE_MULTIPROCESSING or not hasattr ( os, 'fork' ):
+      return None
+   elif hasattr ( multiprocessing, 'get_context' ):
+      try:
+         return multiprocessing.get_context ( 'fork' )
+      except ValueError:
+         return None
+   else:
+      # python 2: always fork()s
+      return multiprocessing
+# --- end of _get_fork_context (...) ---
+
+def evaluate ( prules, packages, jobs=1 ):
+   """Generator that applies package rules to the given packages and yields
+   the package records, in order.
+
+   arguments:
+   * prules   -- package rules (prepared)
+   * packages -- list of package infos
+   * jobs     -- max. number of worker processes,
+                 0 or None means "number of CPUs". Defaults to 1.
+   """
+   global _WORKER_DATA
+
+   fork_context = _get_fork_context()
+
+   if fork_context is not None and not jobs:
+      jobs = fork_context.cpu_count()
+
+   if fork_context is None or jobs < 2 or len ( packages ) < 2:
+      for p_info in packages:
+         yield _evaluate_package ( prules, p_info )
+
+   else:
+      _WORKER_DATA = ( prules, packages )
+      pool         = fork_context.Pool ( jobs )
+      try:
+         for record in pool.imap (
+            _worker_evaluate, range ( len ( packages ) ),
+            max ( 1, len ( packages ) // ( 8 * jobs ) )
+         ):
+            yield record
+         pool.close()
+      finally:
+         pool.terminate()
+         pool.join()
+         _WORKER_DATA = None
+# --- end of evaluate (...) ---
+
+def write_records ( fh, records ):
+   """Writes records to a file-like object (JSON lines format).
+
+   arguments:
+   * fh      --
+   * records -- iterable of records
+   """
+   for record in records:
+      fh.write ( json.dumps ( record, sort_keys=True ) )
+      fh.write ( '\n' )
+# --- end of write_records (...) ---
+
+def read_records ( fh ):
+   """Reads records from a file-like object (JSON lines format).
+
+   Returns a dict ( package id -> record ).
+
+   arguments:
+   * fh --
+   """
+   records = dict()
+   for line in fh:
+      line = line.strip()
+      if line:
+         record = json.loads ( line )
+         if 'diff' in record:
+            if record ['diff'] == 'removed':
+               continue
+            del record ['diff']
+         records [record ['id']] = record
+   return records
+# --- end of read_records (...) ---
+
+def iter_diff ( old_records, records ):
+   """Generator that compares records with the records of a previous run
+   and yields the records of packages whose outcome changed.
+
+   The yielded records have an additional 'diff' key
+   ('added', 'changed' or 'removed'). Removed packages are reported
+   as { 'id': <package id>, 'diff': 'removed' } after all other records.
+
+   arguments:
+   * old_records -- dict ( package id -> record ), see read_records()
+   * records     -- iterable of records
+   """
+   seen = set()
+   for record in records:
+      seen.add ( record ['id'] )
+      old_record = old_records.get ( record ['id'] )
+      if old_record is None:
+         yield dict ( record, diff='added' )
+      elif old_record != json.loads ( json.dumps ( record ) ):
+         # ^ compare JSON representations (tuples vs lists etc.)
+         yield dict ( record, diff='changed' )
+
+   for package_id in sorted ( k for k in old_records if k not in seen ):
+      yield { 'id': package_id, 'diff': 'removed', }
+# --- end of iter_diff (...) ---
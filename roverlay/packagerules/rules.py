@@ -70,6 +70,8 @@ class PackageRules ( roverlay.packagerules.abstract.rules.NestedPackageRule ):
       if prepare_rule:
          rule.set_logger ( self.logger.getChild ( 'nested' ) )
          rule.prepare()
+         # add_rule() drops the dispatch tables
+         self.compile()
          # no need to sort self._rules
          #   len(self._rules) > 1:
          #     self._rules [-1].prio > self._rules [-2].prio
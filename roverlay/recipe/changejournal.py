@@ -0,0 +1,123 @@
+# R overlay -- recipe, changejournal
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os
+
+import roverlay.config
+import roverlay.db.changejournal
+import roverlay.db.desccache
+
+__all__ = [ 'access', 'get_fingerprint', 'setup', ]
+
+CHANGE_JOURNAL = None
+
+# config sections that affect ebuild creation
+FINGERPRINT_CONFIG_KEYS = (
+   'R_PACKAGE',
+   'DESCRIPTION',
+   'LICENSEMAP',
+   'EBUILD',
+   'OVERLAY',
+   'DISTFILES',
+   'DEPRES',
+   'PACKAGE_RULES',
+   'REPO',
+)
+
+# config entries that point to files affecting ebuild creation
+FINGERPRINT_CONFIG_FILES = (
+   'DESCRIPTION.field_definition_file',
+   'LICENSEMAP.file',
+   'LICENSEMAP.licenses_file',
+   'EBUILD.USE_EXPAND.rename_file',
+)
+
+# config entries that list files/directories affecting ebuild creation
+FINGERPRINT_CONFIG_FILE_LISTS = (
+   'DEPRES.simple_rules.files',
+   'PACKAGE_RULES.files',
+   'REPO.config_files',
+)
+
+def _iter_files ( paths ):
+   """Generator that yields all files from the given list of files and
+   directories (recursively, in sorted order).
+
+   arguments:
+   * paths --
+   """
+   if isinstance ( paths, str ):
+      paths = ( paths, )
+
+   for path in ( paths or () ):
+      if os.path.isdir ( path ):
+         for root, dirnames, filenames in os.walk ( path ):
+            dirnames.sort()
+            for filename in sorted ( filenames ):
+               yield root + os.sep + filename
+      else:
+         yield path
+# --- end of _iter_files (...) ---
+
+def get_fingerprint ( package_rules, extra_values=() ):
+   """Returns the fingerprint of the package rules, dependency rules and
+   config.
+
+   arguments:
+   * package_rules -- package rules (including addition control rules)
+   * extra_values  -- additional values that affect ebuild creation
+                      (e.g. cmdline options)
+   """
+   values = [
+      roverlay.config.get ( k, None ) for k in FINGERPRINT_CONFIG_KEYS
+   ]
+   values.append ( str ( package_rules ) )
+   values.extend ( extra_values )
+
+   files = [
+      roverlay.config.get ( k, None ) for k in FINGERPRINT_CONFIG_FILES
+   ]
+   for k in FINGERPRINT_CONFIG_FILE_LISTS:
+      files.extend ( _iter_files ( roverlay.config.get ( k, None ) ) )
+
+   return roverlay.db.desccache.make_fingerprint ( values, files )
+# --- end of get_fingerprint (...) ---
+
+def setup ( rebuild=False ):
+   """Creates the static change journal instance.
+
+   arguments:
+   * rebuild -- if True: do not read the journal file (process all package
+                files and recreate the journal)
+   """
+   global CHANGE_JOURNAL
+
+   journal_file = (
+      roverlay.config.get ( 'OVERLAY.CHANGE_JOURNAL.file', None )
+      or (
+         roverlay.config.get_or_fail ( 'CACHEDIR.root' )
+         + os.path.sep + "change_journal.db"
+      )
+   )
+
+   CHANGE_JOURNAL = roverlay.db.changejournal.ChangeJournal (
+      journal_file        = journal_file,
+      journal_compression = roverlay.config.get (
+         'OVERLAY.CHANGE_JOURNAL.compression', 'default'
+      ),
+      name_separator      = roverlay.config.get (
+         'R_PACKAGE.name_ver_separator', '_'
+      ),
+      read_now            = not rebuild,
+   )
+
+   return CHANGE_JOURNAL
+# --- end of setup (...) ---
+
+def access():
+   """Returns the static change journal instance (or None)."""
+   return CHANGE_JOURNAL
+# --- end of access (...) ---
@@ -0,0 +1,83 @@
+# R overlay -- recipe, desccache
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os.path
+
+import roverlay.config
+import roverlay.db.desccache
+
+__all__ = [ 'access', 'setup', 'write', ]
+
+DESC_CACHE = None
+
+# config entries that affect the DESCRIPTION data
+FINGERPRINT_CONFIG_KEYS = (
+   'DESCRIPTION.file_name',
+   'DESCRIPTION.field_separator',
+   'DESCRIPTION.list_split_regex',
+   'DESCRIPTION.comment_chars',
+   'LICENSEMAP.use_portdir',
+   'LICENSEMAP.licenses_file',
+)
+
+# config entries that point to files affecting the DESCRIPTION data
+FINGERPRINT_CONFIG_FILES = (
+   'DESCRIPTION.field_definition_file',
+   'LICENSEMAP.file',
+   'LICENSEMAP.licenses_file',
+)
+
+def get_fingerprint():
+   """Returns the fingerprint of the description reader's configuration."""
+   return roverlay.db.desccache.make_fingerprint (
+      [ roverlay.config.get ( k, None ) for k in FINGERPRINT_CONFIG_KEYS ],
+      [ roverlay.config.get ( k, None ) for k in FINGERPRINT_CONFIG_FILES ],
+   )
+# --- end of get_fingerprint (...) ---
+
+def setup ( rebuild=False ):
+   """Creates the static DESCRIPTION data cache instance.
+
+   arguments:
+   * rebuild -- if True: do not read the cache file (recreate all entries)
+   """
+   global DESC_CACHE
+
+   cache_file = (
+      roverlay.config.get ( 'DESCRIPTION.cache_file', None )
+      or (
+         roverlay.config.get_or_fail ( 'CACHEDIR.root' )
+         + os.path.sep + "desc_cache.db"
+      )
+   )
+
+   DESC_CACHE = roverlay.db.desccache.DescriptionCache (
+      cache_file        = cache_file,
+      fingerprint       = get_fingerprint(),
+      cache_compression = roverlay.config.get (
+         'DESCRIPTION.cache_compression', 'default'
+      ),
+      ignore_missing    = True,
+      read_now          = not rebuild,
+   )
+
+   return DESC_CACHE
+# --- end of setup (...) ---
+
+def access():
+   """Returns the static DESCRIPTION data cache instance (or None)."""
+   return DESC_CACHE
+# --- end of access (...) ---
+
+def write():
+   """Writes the static DESCRIPTION data cache instance if it exists and
+   has been modified.
+   """
+   if DESC_CACHE is not None:
+      return DESC_CACHE.write ( force=False )
+   else:
+      return None
+# --- end of write (...) ---
@@ -0,0 +1,53 @@
+# R overlay -- recipe, digeststore
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os.path
+
+import roverlay.config
+import roverlay.db.digeststore
+import roverlay.digest
+
+__all__ = [ 'access', 'setup', ]
+
+DIGEST_STORE = None
+
+def setup ( rebuild=False ):
+   """Creates the static digest store instance and makes it available
+   to roverlay.digest.
+
+   arguments:
+   * rebuild -- if True: do not read the store file (hash all files again
+                and recreate the store)
+   """
+   global DIGEST_STORE
+
+   store_file = (
+      roverlay.config.get ( 'DIGEST_STORE.file', None )
+      or (
+         roverlay.config.get_or_fail ( 'CACHEDIR.root' )
+         + os.path.sep + "digest_store.db"
+      )
+   )
+
+   DIGEST_STORE = roverlay.db.digeststore.DigestStore (
+      store_file        = store_file,
+      store_compression = roverlay.config.get (
+         'DIGEST_STORE.compression', 'default'
+      ),
+      digest_types      = roverlay.config.get (
+         'DIGEST_STORE.digest_types', None
+      ),
+      read_now          = not rebuild,
+   )
+
+   roverlay.digest.set_digest_store ( DIGEST_STORE )
+   return DIGEST_STORE
+# --- end of setup (...) ---
+
+def access():
+   """Returns the static digest store instance (or None)."""
+   return DIGEST_STORE
+# --- end of access (...) ---
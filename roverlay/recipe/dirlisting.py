@@ -0,0 +1,47 @@
+# R overlay -- recipe, dirlisting
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os.path
+
+import roverlay.config
+import roverlay.db.dirlisting
+
+__all__ = [ 'access', 'setup', ]
+
+DIR_LISTING_CACHE = None
+
+def setup ( rebuild=False ):
+   """Creates the static directory listing cache instance.
+
+   arguments:
+   * rebuild -- if True: do not read the cache file (read all directories
+                and recreate the cache)
+   """
+   global DIR_LISTING_CACHE
+
+   cache_file = (
+      roverlay.config.get ( 'REPO.LISTING_CACHE.file', None )
+      or (
+         roverlay.config.get_or_fail ( 'CACHEDIR.root' )
+         + os.path.sep + "distdir_listing.db"
+      )
+   )
+
+   DIR_LISTING_CACHE = roverlay.db.dirlisting.DirListingCache (
+      cache_file        = cache_file,
+      cache_compression = roverlay.config.get (
+         'REPO.LISTING_CACHE.compression', 'default'
+      ),
+      read_now          = not rebuild,
+   )
+
+   return DIR_LISTING_CACHE
+# --- end of setup (...) ---
+
+def access():
+   """Returns the static directory listing cache instance (or None)."""
+   return DIR_LISTING_CACHE
+# --- end of access (...) ---
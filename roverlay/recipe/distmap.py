@@ -13,28 +13,58 @@ __all__ = [ 'access', ]
 
 DISTMAP = None
 
-def setup():
-   """Creates the static distmap instance."""
-   global DISTMAP
-
-   distmap_file = (
+def _get_file_distmap_file():
+   return (
       roverlay.config.get ( 'OVERLAY.DISTMAP.dbfile', None )
       or (
          roverlay.config.get_or_fail ( 'CACHEDIR.root' )
          + os.path.sep + "distmap.db"
       )
    )
+# --- end of _get_file_distmap_file (...) ---
 
-   if distmap_file:
-      DISTMAP = roverlay.db.distmap.FileDistMap (
+def _setup_sqlite():
+   """Creates a sqlite distmap.
+
+   Converts the distmap file if the database does not exist, yet.
+   """
+   sqlite_file = (
+      roverlay.config.get ( 'OVERLAY.DISTMAP.sqlite_file', None )
+      or (
+         roverlay.config.get_or_fail ( 'CACHEDIR.root' )
+         + os.path.sep + "distmap.sqlite"
+      )
+   )
+   distmap_file = _get_file_distmap_file()
+
+   if not os.path.exists ( sqlite_file ) and os.path.isfile ( distmap_file ):
+      return roverlay.db.distmap.convert_file_distmap (
          distmap_file        = distmap_file,
+         sqlite_file         = sqlite_file,
          distmap_compression = roverlay.config.get (
             'OVERLAY.DISTMAP.compression', 'bz2'
          ),
-         ignore_missing=True
       )
    else:
-      DISTMAP = None
+      return roverlay.db.distmap.SqliteDistMap (
+         sqlite_file, ignore_missing=True
+      )
+# --- end of _setup_sqlite (...) ---
+
+def setup():
+   """Creates the static distmap instance."""
+   global DISTMAP
+
+   if roverlay.config.get ( 'OVERLAY.DISTMAP.backend', 'file' ) == 'sqlite':
+      DISTMAP = _setup_sqlite()
+   else:
+      DISTMAP = roverlay.db.distmap.FileDistMap (
+         distmap_file        = _get_file_distmap_file(),
+         distmap_compression = roverlay.config.get (
+            'OVERLAY.DISTMAP.compression', 'bz2'
+         ),
+         ignore_missing=True
+      )
 
    return DISTMAP
 # --- end of setup (...) ---
@@ -0,0 +1,47 @@
+# R overlay -- recipe, scanindex
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os.path
+
+import roverlay.config
+import roverlay.db.scanindex
+
+__all__ = [ 'access', 'setup', ]
+
+SCAN_INDEX = None
+
+def setup ( rebuild=False ):
+   """Creates the static overlay scan index instance.
+
+   arguments:
+   * rebuild -- if True: do not read the index file (parse all ebuilds and
+                recreate the index)
+   """
+   global SCAN_INDEX
+
+   index_file = (
+      roverlay.config.get ( 'OVERLAY.SCAN_INDEX.file', None )
+      or (
+         roverlay.config.get_or_fail ( 'CACHEDIR.root' )
+         + os.path.sep + "scan_index.db"
+      )
+   )
+
+   SCAN_INDEX = roverlay.db.scanindex.ScanIndex (
+      index_file        = index_file,
+      index_compression = roverlay.config.get (
+         'OVERLAY.SCAN_INDEX.compression', 'default'
+      ),
+      read_now          = not rebuild,
+   )
+
+   return SCAN_INDEX
+# --- end of setup (...) ---
+
+def access():
+   """Returns the static overlay scan index instance (or None)."""
+   return SCAN_INDEX
+# --- end of access (...) ---
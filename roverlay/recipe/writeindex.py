@@ -0,0 +1,47 @@
+# R overlay -- recipe, writeindex
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os.path
+
+import roverlay.config
+import roverlay.db.writeindex
+
+__all__ = [ 'access', 'setup', ]
+
+WRITE_INDEX = None
+
+def setup ( rebuild=False ):
+   """Creates the static overlay file write index instance.
+
+   arguments:
+   * rebuild -- if True: do not read the index file (write all files and
+                recreate the index)
+   """
+   global WRITE_INDEX
+
+   index_file = (
+      roverlay.config.get ( 'OVERLAY.WRITE_INDEX.file', None )
+      or (
+         roverlay.config.get_or_fail ( 'CACHEDIR.root' )
+         + os.path.sep + "write_index.db"
+      )
+   )
+
+   WRITE_INDEX = roverlay.db.writeindex.WriteIndex (
+      index_file        = index_file,
+      index_compression = roverlay.config.get (
+         'OVERLAY.WRITE_INDEX.compression', 'default'
+      ),
+      read_now          = not rebuild,
+   )
+
+   return WRITE_INDEX
+# --- end of setup (...) ---
+
+def access():
+   """Returns the static overlay file write index instance (or None)."""
+   return WRITE_INDEX
+# --- end of access (...) ---
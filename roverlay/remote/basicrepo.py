@@ -10,10 +10,13 @@ __all__ = [ 'BasicRepo', ]
 
 import os.path
 import logging
+import threading
 
 import roverlay.util.counter
+import roverlay.remote.pkgindex
 
 from roverlay.packageinfo import PackageInfo
+from roverlay.remote.distscan import DistdirScanner
 
 from . import status
 
@@ -23,6 +26,10 @@ DEFAULT_PROTOCOL = 'http'
 
 LOCALREPO_SRC_URI = 'http://localhost/R-Packages'
 
+# scanner that is used if none has been passed to scan_distdir() etc.
+#  (reads one directory after another, no listing cache)
+DEFAULT_SCANNER = DistdirScanner()
+
 SYNC_SUCCESS = status.SYNC_SUCCESS
 SYNC_FAIL    = status.SYNC_FAIL
 SYNC_DONE    = status.SYNC_DONE
@@ -102,6 +109,10 @@ class BasicRepo ( object ):
 
 
       self.sync_status = 0
+
+      # PACKAGES index, loaded on demand
+      self._package_index      = None
+      self._package_index_lock = threading.Lock()
    # --- end of __init__ (...) ---
 
    def get_identifier ( self ):
@@ -202,6 +213,55 @@ class BasicRepo ( object ):
    # get_src(...) -> get_src_uri(...)
    get_src = get_src_uri
 
+   def _load_package_index ( self ):
+      """Returns a new package index for this repo (read from the PACKAGES
+      file in the distfiles dir, if it exists)."""
+      package_index = roverlay.remote.pkgindex.PackageIndex()
+      try:
+         index_file = package_index.load_dir ( self.distdir )
+      except ( IOError, OSError ) as err:
+         self.logger.warning (
+            "failed to read package index: {}".format ( err )
+         )
+      else:
+         if index_file is not None:
+            self.logger.debug (
+               "read {:d} entries from package index {!r}".format (
+                  len ( package_index ), index_file
+               )
+            )
+      return package_index
+   # --- end of _load_package_index (...) ---
+
+   def get_package_index ( self ):
+      """Returns the package index of this repo (which may be empty)."""
+      if self._package_index is None:
+         with self._package_index_lock:
+            if self._package_index is None:
+               self._package_index = self._load_package_index()
+      return self._package_index
+   # --- end of get_package_index (...) ---
+
+   def set_package_index ( self, package_index ):
+      """Replaces the package index of this repo.
+
+      arguments:
+      * package_index -- PackageIndex or None (reload on demand)
+      """
+      with self._package_index_lock:
+         self._package_index = package_index
+   # --- end of set_package_index (...) ---
+
+   def get_package_index_entry ( self, package_filename ):
+      """Returns the package index entry of a package file
+      (as list of text lines), or None if there's no such entry.
+
+      arguments:
+      * package_filename --
+      """
+      return self.get_package_index().get ( package_filename )
+   # --- end of get_package_index_entry (...) ---
+
    def exists ( self ):
       """Returns True if this repo locally exists."""
       return os.path.isdir ( self.distdir )
@@ -265,8 +325,104 @@ class BasicRepo ( object ):
 
    # --- end of _package_nofail (...) ---
 
+   def iter_package_files ( self, is_package=None, scanner=None ):
+      """Generator that yields the paths of all package files in the local
+      distfiles dir of this repo (without creating PackageInfo instances).
+
+      arguments:
+      * is_package -- function returning True if the given file is a package
+                       or None which means that all files are packages.
+                       Defaults to None.
+      * scanner    -- distfiles dir scanner (DistdirScanner) or None
+                       (use DEFAULT_SCANNER). Defaults to None.
+      """
+      if scanner is None:
+         scanner = DEFAULT_SCANNER
+
+      for filepath in scanner.iter_files ( self.distdir ):
+         if is_package is None or is_package ( filepath ):
+            yield filepath
+   # --- end of iter_package_files (...) ---
+
+   def _get_distdir_and_srcuri_base ( self, dirpath ):
+      """Returns a 2-tuple ( distdir, SRC_URI base ) for package files in
+      the given directory, which is ( None, None ) for the distfiles dir
+      of this repo.
+
+      arguments:
+      * dirpath -- directory (the distfiles dir or a subdirectory of it)
+      """
+      if len ( dirpath ) > len ( self.distdir ):
+         # package is in a subdirectory,
+         #  get the relative path which is required for valid SRC_URIs
+         if os.sep == '/':
+            # a simple array slice does the job if os.sep is '/'
+            subdir = dirpath [ len ( self.distdir ) + 1 : ]
+         else:
+            subdir = os.path.relpath ( dirpath, self.distdir ).replace (
+               os.sep, '/'
+            )
+
+         return ( dirpath, self.src_uri + '/' + subdir )
+      else:
+         return ( None, None )
+   # --- end of _get_distdir_and_srcuri_base (...) ---
+
+   def get_changeset ( self ):
+      """Returns a changeset (roverlay.remote.changeset.RepoChangeset) that
+      lists the package files that have been added, updated or deleted
+      since the last call to commit_changeset(), or None if unknown.
+
+      Repos that don't record changes always return None
+      (and have to be scanned completely).
+      """
+      return None
+   # --- end of get_changeset (...) ---
+
+   def commit_changeset ( self ):
+      """Marks all changes as processed.
+      Returns True if changes are recorded for this repo, else False.
+      """
+      return False
+   # --- end of commit_changeset (...) ---
+
+   def scan_files ( self, filenames, is_package=None, log_bad=True ):
+      """Generator that creates PackageInfo instances for the given files
+      and yields them. Files that do not exist are ignored.
+
+      arguments:
+      * filenames  -- paths of package files, relative to the distfiles dir
+                      (using "/" as path separator)
+      * is_package -- function returning True if the given file is a package
+                       or None which means that all files are packages.
+                       Defaults to None.
+      * log_bad    -- log files that failed the PackageInfo creation step
+                       Defaults to True.
+      """
+      for filename in filenames:
+         filepath = self.distdir + os.sep + filename.replace ( '/', os.sep )
+
+         if not os.path.isfile ( filepath ) or (
+            is_package is not None and not is_package ( filepath )
+         ):
+            continue
+
+         dirpath, basename = os.path.split ( filepath )
+         distdir, srcuri_base = self._get_distdir_and_srcuri_base ( dirpath )
+
+         pkg = self._package_nofail (
+            log_bad=log_bad,
+            filename=basename,
+            origin=self,
+            distdir=distdir,
+            src_uri_base=srcuri_base
+         )
+         if pkg is not None:
+            yield pkg
+   # --- end of scan_files (...) ---
+
    def scan_distdir ( self,
-      is_package=None, log_filtered=False, log_bad=True
+      is_package=None, log_filtered=False, log_bad=True, scanner=None
    ):
       """Generator that scans the local distfiles dir of this repo and
       yields PackageInfo instances.
@@ -279,6 +435,8 @@ class BasicRepo ( object ):
                          Defaults to False; no effect if is_package is None.
       * log_bad      -- log files that failed the PackageInfo creation step
                          Defaults to True.
+      * scanner      -- distfiles dir scanner (DistdirScanner) or None
+                         (use DEFAULT_SCANNER). Defaults to None.
 
       raises: AssertionError if is_package is neither None nor a callable.
       """
@@ -293,27 +451,17 @@ class BasicRepo ( object ):
          )
       # --- end of package_nofail (...) ---
 
-      def get_distdir_and_srcuri_base ( dirpath ):
-         if len ( dirpath ) > len ( self.distdir ):
-            # package is in a subdirectory,
-            #  get the relative path which is required for valid SRC_URIs
-            if os.sep == '/':
-               # a simple array slice does the job if os.sep is '/'
-               subdir = dirpath [ len ( self.distdir ) + 1 : ]
-            else:
-               subdir = os.path.relpath ( dirpath, self.distdir ).replace (
-                  os.sep, '/'
-               )
+      get_distdir_and_srcuri_base = self._get_distdir_and_srcuri_base
 
-            return ( dirpath, self.src_uri + '/' + subdir )
-         else:
-            return ( None, None )
-      # --- end of get_distdir_and_srcuri_base (...) ---
+      if scanner is None:
+         scanner = DEFAULT_SCANNER
 
+      # PackageInfo instances are created in this thread
+      #  (CPU-bound, would not benefit from threads)
       if is_package is None:
          # unfiltered variant
 
-         for dirpath, dirnames, filenames in os.walk ( self.distdir ):
+         for dirpath, filenames in scanner.walk ( self.distdir ):
             distdir, srcuri_base = get_distdir_and_srcuri_base ( dirpath )
             for filename in filenames:
                pkg = package_nofail ( filename, distdir, srcuri_base )
@@ -322,11 +470,13 @@ class BasicRepo ( object ):
 
       else:
          # filtered variant (adds an if is_package... before yield)
-         for dirpath, dirnames, filenames in os.walk ( self.distdir ):
+         for dirpath, filenames in scanner.walk ( self.distdir ):
             distdir, srcuri_base = get_distdir_and_srcuri_base ( dirpath )
+            # same as os.path.join ( dirpath, filename )
+            prefix = os.path.join ( dirpath, '' )
 
             for filename in filenames:
-               if is_package ( os.path.join ( dirpath, filename ) ):
+               if is_package ( prefix + filename ):
                   pkg = package_nofail ( filename, distdir, srcuri_base )
                   if pkg is not None:
                      yield pkg
@@ -0,0 +1,239 @@
+# R overlay -- remote, repo changesets
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""repo changesets
+
+This module provides the RepoChangeset class, which records the files
+of a repo's distfiles dir that have been added, updated or deleted by
+syncing, and functions for creating changesets from rsync's itemized
+output (--itemize-changes / --out-format='%i %n').
+
+Changesets are accumulated in a file until the changes have been
+processed, so that several syncs (and runs that did not process the
+changes) can be combined.
+"""
+
+__all__ = [
+   'RepoChangeset', 'parse_itemized_line', 'is_itemized_line',
+   'ItemizedParser',
+]
+
+import os
+import re
+
+import roverlay.util.common
+import roverlay.util.fileio
+
+
+CHANGE_ADDED   = 'A'
+CHANGE_UPDATED = 'U'
+CHANGE_DELETED = 'D'
+
+# %i %n: <update type><file type><attributes> <name>
+#  file types: f (file), d (dir), L (symlink), D (device), S (special file)
+ITEMIZED_REGEX = re.compile (
+   r'^(?P<update>[<>ch.])(?P<ftype>[fdLDS])(?P<attr>[.+ ?a-zA-Z]{7,9}) '
+   r'(?P<name>.+)$'
+)
+DELETING_REGEX = re.compile ( r'^[*]deleting +(?P<name>.+)$' )
+
+
+def parse_itemized_line ( line ):
+   """Parses a line of rsync's itemized output.
+
+   Returns a 2-tuple ( change type, relative file path ) or None if the line
+   does not describe a file change (directories, stats output etc.).
+
+   arguments:
+   * line --
+   """
+   line  = line.rstrip ( '\r\n' )
+   match = ITEMIZED_REGEX.match ( line )
+   if match is not None:
+      name = match.group ( 'name' )
+      if match.group ( 'ftype' ) not in 'fL' or name [-1] == '/':
+         return None
+      elif match.group ( 'attr' ).strip ( '+' ):
+         return ( CHANGE_UPDATED, name )
+      else:
+         # all attributes "+" => new file
+         return ( CHANGE_ADDED, name )
+
+   match = DELETING_REGEX.match ( line )
+   if match is not None:
+      name = match.group ( 'name' )
+      if name [-1] != '/':
+         return ( CHANGE_DELETED, name )
+
+   return None
+# --- end of parse_itemized_line (...) ---
+
+def is_itemized_line ( line ):
+   """Returns True if the given line is part of rsync's itemized output
+   (including lines that do not describe a file change), else False.
+
+   arguments:
+   * line --
+   """
+   line = line.rstrip ( '\r\n' )
+   return bool (
+      ITEMIZED_REGEX.match ( line ) or DELETING_REGEX.match ( line )
+   )
+# --- end of is_itemized_line (...) ---
+
+
+class RepoChangeset ( object ):
+   """Files that have been added, updated or deleted (relative paths)."""
+
+   def __init__ ( self ):
+      super ( RepoChangeset, self ).__init__()
+      self.added   = set()
+      self.updated = set()
+      self.deleted = set()
+   # --- end of __init__ (...) ---
+
+   def __bool__ ( self ):
+      return bool ( self.added or self.updated or self.deleted )
+   # --- end of __bool__ (...) ---
+
+   __nonzero__ = __bool__
+
+   def __eq__ ( self, other ):
+      return (
+         isinstance ( other, RepoChangeset )
+         and self.added   == other.added
+         and self.updated == other.updated
+         and self.deleted == other.deleted
+      )
+   # --- end of __eq__ (...) ---
+
+   def __ne__ ( self, other ):
+      return not self.__eq__ ( other )
+   # --- end of __ne__ (...) ---
+
+   def add_change ( self, change, name ):
+      """Records a change.
+
+      Changes are merged with the already recorded ones, e.g. a file that
+      has been added and deleted afterwards is not listed at all.
+
+      arguments:
+      * change -- change type (CHANGE_ADDED, CHANGE_UPDATED, CHANGE_DELETED)
+      * name   -- relative file path
+      """
+      if change == CHANGE_DELETED:
+         if name in self.added:
+            self.added.discard ( name )
+         else:
+            self.updated.discard ( name )
+            self.deleted.add ( name )
+
+      elif name in self.added:
+         pass
+
+      elif name in self.deleted:
+         # deleted, then recreated
+         self.deleted.discard ( name )
+         self.updated.add ( name )
+
+      elif change == CHANGE_ADDED:
+         if name not in self.updated:
+            self.added.add ( name )
+
+      elif change == CHANGE_UPDATED:
+         self.updated.add ( name )
+
+      else:
+         raise ValueError ( change )
+   # --- end of add_change (...) ---
+
+   def merge ( self, other ):
+      """Adds the changes of another (newer) changeset.
+
+      arguments:
+      * other --
+      """
+      for change, name in other.iter_changes():
+         self.add_change ( change, name )
+   # --- end of merge (...) ---
+
+   def iter_changes ( self ):
+      """Generator that yields 2-tuples ( change type, relative path ),
+      sorted by path."""
+      for change, names in (
+         ( CHANGE_ADDED,   self.added ),
+         ( CHANGE_UPDATED, self.updated ),
+         ( CHANGE_DELETED, self.deleted ),
+      ):
+         for name in sorted ( names ):
+            yield ( change, name )
+   # --- end of iter_changes (...) ---
+
+   def iter_changed ( self ):
+      """Generator that yields the relative paths of all files that have
+      been added or updated, in sorted order."""
+      return iter ( sorted ( self.added | self.updated ) )
+   # --- end of iter_changed (...) ---
+
+   def read_file ( self, filepath ):
+      """Adds the changes from a changeset file.
+
+      arguments:
+      * filepath --
+      """
+      for line in roverlay.util.fileio.read_text_file (
+         filepath, preparse=True
+      ):
+         change, sep, name = line.partition ( ' ' )
+         if sep and name:
+            self.add_change ( change, name )
+   # --- end of read_file (...) ---
+
+   def write_file ( self, filepath ):
+      """Writes this changeset to a file.
+
+      arguments:
+      * filepath --
+      """
+      roverlay.util.common.dodir_for_file ( filepath )
+      tmpfile = filepath + '.new'
+      roverlay.util.fileio.write_text_file (
+         tmpfile,
+         ( change + ' ' + name for change, name in self.iter_changes() )
+      )
+      os.rename ( tmpfile, filepath )
+   # --- end of write_file (...) ---
+
+# --- end of RepoChangeset ---
+
+
+class ItemizedParser ( object ):
+   """Creates a changeset from rsync's itemized output, line by line."""
+
+   def __init__ ( self, changeset=None ):
+      super ( ItemizedParser, self ).__init__()
+      self.changeset = RepoChangeset() if changeset is None else changeset
+   # --- end of __init__ (...) ---
+
+   def __call__ ( self, line ):
+      """Parses a single line.
+      Returns True if the line described a file change, else False.
+
+      arguments:
+      * line -- str or bytes
+      """
+      if not isinstance ( line, str ):
+         line = line.decode ( 'utf-8', 'replace' )
+
+      result = parse_itemized_line ( line )
+      if result is None:
+         return False
+      else:
+         self.changeset.add_change ( *result )
+         return True
+   # --- end of __call__ (...) ---
+
+# --- end of ItemizedParser ---
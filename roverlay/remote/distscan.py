@@ -0,0 +1,232 @@
+# R overlay -- remote, distfiles dir scanner
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""distfiles dir scanner
+
+This module provides the DistdirScanner class, which walks a repo's
+distfiles dir and yields the files found in each directory, in the same
+order as os.walk() (top-down, symlinks to directories are not followed).
+
+Directories are read with scandir() (if available), which provides the
+file type of each entry without having to stat() it. Subdirectories can be
+read in parallel (threads), which is beneficial for network filesystems,
+and directory listings can be cached (see roverlay.db.dirlisting).
+"""
+
+__all__ = [ 'DistdirScanner', 'list_dir', ]
+
+import os
+
+from roverlay.util.hashpool import HAVE_CONCURRENT_FUTURES
+
+if HAVE_CONCURRENT_FUTURES:
+   import concurrent.futures
+
+try:
+   _scandir = os.scandir
+except AttributeError:
+   try:
+      from scandir import scandir as _scandir
+   except ImportError:
+      _scandir = None
+
+HAVE_SCANDIR = _scandir is not None
+
+
+def list_dir ( dirpath ):
+   """Reads a directory and returns a 2-tuple ( filenames, subdirs ),
+   where filenames is a list of all entries that are not directories and
+   subdirs is a list of all directories that should be visited (i.e. not
+   symlinks). Symlinks to directories are not listed at all.
+
+   Raises OSError if the directory cannot be read.
+
+   arguments:
+   * dirpath --
+   """
+   filenames = list()
+   subdirs   = list()
+
+   if HAVE_SCANDIR:
+      for entry in _scandir ( dirpath ):
+         try:
+            is_dir = entry.is_dir()
+         except OSError:
+            is_dir = False
+
+         if not is_dir:
+            filenames.append ( entry.name )
+         else:
+            try:
+               is_symlink = entry.is_symlink()
+            except OSError:
+               is_symlink = True
+
+            if not is_symlink:
+               subdirs.append ( entry.name )
+
+   else:
+      for name in os.listdir ( dirpath ):
+         path = os.path.join ( dirpath, name )
+         if not os.path.isdir ( path ):
+            filenames.append ( name )
+         elif not os.path.islink ( path ):
+            subdirs.append ( name )
+
+   return ( filenames, subdirs )
+# --- end of list_dir (...) ---
+
+
+class DistdirScanner ( object ):
+   """Walks directories, reading subdirectories in parallel."""
+
+   def __init__ ( self, jobs=1, listing_cache=None ):
+      """Initializes a DistdirScanner.
+
+      arguments:
+      * jobs          -- max number of directories that are read in parallel
+                          Defaults to 1.
+      * listing_cache -- directory listing cache or None. Defaults to None.
+      """
+      super ( DistdirScanner, self ).__init__()
+      self.jobs          = jobs
+      self.listing_cache = listing_cache
+   # --- end of __init__ (...) ---
+
+   def is_concurrent ( self ):
+      """Returns True if directories are read in parallel, else False."""
+      return bool ( HAVE_CONCURRENT_FUTURES and self.jobs and self.jobs > 1 )
+   # --- end of is_concurrent (...) ---
+
+   def _list_dir ( self, dirpath ):
+      """Returns the listing of a directory (see list_dir()), possibly
+      from the listing cache, or None if the directory cannot be read.
+
+      arguments:
+      * dirpath --
+      """
+      cache = self.listing_cache
+      if cache is None:
+         stat_key = None
+      else:
+         # stat before reading the directory,
+         #  so that concurrent modifications invalidate the cache entry
+         stat_key = cache.get_stat_key ( dirpath )
+         if stat_key is None:
+            return None
+
+         listing = cache.lookup ( dirpath, stat_key )
+         if listing is not None:
+            return listing
+
+      try:
+         filenames, subdirs = list_dir ( dirpath )
+      except OSError:
+         return None
+
+      if cache is not None:
+         cache.record ( dirpath, stat_key, filenames, subdirs )
+      return ( filenames, subdirs )
+   # --- end of _list_dir (...) ---
+
+   def _iter_listings ( self, root ):
+      """Generator that yields 3-tuples ( dirpath, filenames, subdirs ),
+      in os.walk() order. Unreadable directories are skipped.
+
+      arguments:
+      * root --
+      """
+      stack = [ root ]
+      while stack:
+         dirpath = stack.pop()
+         listing = self._list_dir ( dirpath )
+         if listing is not None:
+            filenames, subdirs = listing
+            yield ( dirpath, filenames, subdirs )
+            stack.extend (
+               os.path.join ( dirpath, name ) for name in reversed ( subdirs )
+            )
+   # --- end of _iter_listings (...) ---
+
+   def _iter_listings_concurrent ( self, root ):
+      """Like _iter_listings(), but reads directories in parallel.
+
+      The subdirectories of a directory are submitted as soon as its
+      listing is available, while the results are still consumed in
+      os.walk() order.
+
+      arguments:
+      * root --
+      """
+      with concurrent.futures.ThreadPoolExecutor ( self.jobs ) as exe:
+         stack = [ ( root, exe.submit ( self._list_dir, root ) ) ]
+         try:
+            while stack:
+               dirpath, job = stack.pop()
+               listing = job.result()
+               if listing is not None:
+                  filenames, subdirs = listing
+                  jobs = [
+                     ( path, exe.submit ( self._list_dir, path ) )
+                     for path in (
+                        os.path.join ( dirpath, name ) for name in subdirs
+                     )
+                  ]
+                  yield ( dirpath, filenames, subdirs )
+                  stack.extend ( reversed ( jobs ) )
+         finally:
+            # does nothing if all jobs are done
+            for dirpath, job in stack:
+               job.cancel()
+   # --- end of _iter_listings_concurrent (...) ---
+
+   def walk ( self, root ):
+      """Generator that yields 2-tuples ( dirpath, filenames ) for the given
+      directory and all of its subdirectories, in os.walk() order.
+
+      arguments:
+      * root --
+      """
+      if self.is_concurrent():
+         listings = self._iter_listings_concurrent ( root )
+      else:
+         listings = self._iter_listings ( root )
+
+      if self.listing_cache is None:
+         for dirpath, filenames, subdirs in listings:
+            yield ( dirpath, filenames )
+
+      else:
+         visited = set()
+         for dirpath, filenames, subdirs in listings:
+            visited.add ( dirpath )
+            yield ( dirpath, filenames )
+
+         # forget about directories that do not exist anymore
+         #  (only after a complete walk)
+         self.listing_cache.retain_subtree ( root, visited )
+   # --- end of walk (...) ---
+
+   def iter_files ( self, root ):
+      """Generator that yields the paths of all files in the given directory
+      and all of its subdirectories, in os.walk() order.
+
+      arguments:
+      * root --
+      """
+      for dirpath, filenames in self.walk ( root ):
+         prefix = os.path.join ( dirpath, '' )
+         for filename in filenames:
+            yield prefix + filename
+   # --- end of iter_files (...) ---
+
+   def write_cache ( self ):
+      """Writes the directory listing cache, if any and if modified."""
+      if self.listing_cache is not None:
+         self.listing_cache.write()
+   # --- end of write_cache (...) ---
+
+# --- end of DistdirScanner ---
@@ -0,0 +1,280 @@
+# R overlay -- remote, http fetch
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""persistent http connections
+
+This module provides a connection pool that keeps one HTTP/1.1 (keep-alive)
+connection per host and thread, which saves the connection setup when
+fetching many files from the same host.
+
+Uris that are not http(s) uris are opened with urlopen().
+"""
+
+__all__ = [ 'HttpConnectionPool', 'get_header', ]
+
+import contextlib
+import errno
+import socket
+import sys
+import threading
+
+# py2 httplib/urllib2/urlparse vs py3 http.client/urllib.*
+if sys.hexversion >= 0x3000000:
+   import http.client    as _httplib
+   import urllib.request as _urllib
+   import urllib.error   as _urllib_error
+   import urllib.parse   as _urlparse
+else:
+   import httplib  as _httplib
+   import urllib2  as _urllib
+   import urllib2  as _urllib_error
+   import urlparse as _urlparse
+
+URLError  = _urllib_error.URLError
+HTTPError = _urllib_error.HTTPError
+
+
+# errors that indicate that a reused connection has been closed by the
+# remote end
+_STALE_CONNECTION_ERRNOS = frozenset ({
+   errno.ECONNRESET, errno.EPIPE, errno.ECONNABORTED,
+})
+
+
+def get_header ( response, name, fallback=None ):
+   """Returns a header of a response object (HTTPResponse or an object
+   returned by urlopen()).
+
+   arguments:
+   * response --
+   * name     -- header name
+   * fallback -- value returned if the header is not set
+   """
+   info = getattr ( response, 'info', None )
+   if info is None:
+      # python2 httplib
+      return response.msg.get ( name, fallback )
+   else:
+      return info().get ( name, fallback )
+# --- end of get_header (...) ---
+
+
+class HttpConnectionPool ( object ):
+   """Keeps persistent http(s) connections, one per (scheme, host) and
+   thread."""
+
+   MAX_REDIRECTS  = 5
+   REDIRECT_CODES = frozenset ({ 301, 302, 303, 307, 308 })
+
+   CONNECTION_CLS = {
+      'http'  : _httplib.HTTPConnection,
+      'https' : _httplib.HTTPSConnection,
+   }
+
+   def __init__ ( self, timeout=None ):
+      """Initializes a HttpConnectionPool.
+
+      arguments:
+      * timeout -- connection timeout in seconds (None: default timeout)
+      """
+      super ( HttpConnectionPool, self ).__init__()
+      self.timeout = timeout
+
+      self._local            = threading.local()
+      # all connections (of all threads), used by close()
+      self._all_connections  = set()
+      self._lock             = threading.Lock()
+   # --- end of __init__ (...) ---
+
+   def _get_thread_connections ( self ):
+      connections = getattr ( self._local, 'connections', None )
+      if connections is None:
+         connections = dict()
+         self._local.connections = connections
+      return connections
+   # --- end of _get_thread_connections (...) ---
+
+   def get_connection ( self, scheme, netloc ):
+      """Returns a connection to the given host (for the current thread).
+
+      arguments:
+      * scheme -- 'http' or 'https'
+      * netloc -- host[:port]
+      """
+      connections = self._get_thread_connections()
+      key         = ( scheme, netloc )
+      conn        = connections.get ( key )
+
+      if conn is None:
+         if self.timeout is None:
+            conn = self.CONNECTION_CLS [scheme] ( netloc )
+         else:
+            conn = self.CONNECTION_CLS [scheme] (
+               netloc, timeout=self.timeout
+            )
+
+         connections [key] = conn
+         with self._lock:
+            self._all_connections.add ( conn )
+
+      return conn
+   # --- end of get_connection (...) ---
+
+   def drop_connection ( self, scheme, netloc ):
+      """Closes and forgets the current thread's connection to the given
+      host.
+
+      arguments:
+      * scheme --
+      * netloc --
+      """
+      conn = self._get_thread_connections().pop ( ( scheme, netloc ), None )
+      if conn is not None:
+         with self._lock:
+            self._all_connections.discard ( conn )
+         conn.close()
+   # --- end of drop_connection (...) ---
+
+   def close ( self ):
+      """Closes all connections."""
+      with self._lock:
+         connections = list ( self._all_connections )
+         self._all_connections.clear()
+
+      for conn in connections:
+         conn.close()
+
+      # reset the current thread's connection map
+      #  (closed connections of other threads reconnect when used again)
+      self._local.connections = None
+   # --- end of close (...) ---
+
+   def _request ( self, scheme, netloc, method, path, headers ):
+      """Sends a request and returns the response.
+
+      Retries once with a new connection if a reused connection has been
+      closed by the remote end.
+      """
+      for attempt in ( 0, 1 ):
+         conn   = self.get_connection ( scheme, netloc )
+         reused = getattr ( conn, 'sock', None ) is not None
+
+         try:
+            conn.request ( method, path, headers=headers )
+            return conn.getresponse()
+
+         except socket.timeout:
+            self.drop_connection ( scheme, netloc )
+            raise
+
+         except ( _httplib.BadStatusLine, socket.error ) as err:
+            self.drop_connection ( scheme, netloc )
+
+            if reused and not attempt and (
+               isinstance ( err, _httplib.BadStatusLine )
+               or getattr ( err, 'errno', None ) in _STALE_CONNECTION_ERRNOS
+            ):
+               # retry with a new connection
+               pass
+            elif isinstance ( err, _httplib.HTTPException ):
+               raise
+            else:
+               raise URLError ( err )
+
+         except:
+            self.drop_connection ( scheme, netloc )
+            raise
+   # --- end of _request (...) ---
+
+   @contextlib.contextmanager
+   def urlopen ( self, uri, method='GET', headers=None ):
+      """Context manager that opens an uri and yields the response.
+
+      Follows redirects and raises HTTPError if the response status
+      indicates an error. The response can be read as usual,
+      unread data is discarded when leaving the context.
+
+      arguments:
+      * uri     --
+      * method  -- request method, e.g. 'GET' (the default) or 'HEAD'
+      * headers -- additional request headers (dict or None)
+      """
+      req_uri = uri
+      parsed  = _urlparse.urlsplit ( req_uri )
+
+      if parsed.scheme not in self.CONNECTION_CLS:
+         if method != 'GET':
+            raise ValueError (
+               "method {!r} not supported for uri {!r}".format ( method, uri )
+            )
+
+         with contextlib.closing (
+            _urllib.urlopen ( uri, None, self.timeout )
+         ) as webh:
+            yield webh
+         return
+      # -- end if
+
+      req_headers = { 'Connection': 'keep-alive', }
+      if headers:
+         req_headers.update ( headers )
+
+      redirects = 0
+      while True:
+         path = parsed.path or '/'
+         if parsed.query:
+            path += '?' + parsed.query
+
+         response = self._request (
+            parsed.scheme, parsed.netloc, method, path, req_headers
+         )
+         status   = response.status
+
+         # the body of responses that are not passed to the caller
+         #  is read so that the connection can be reused
+         if status in self.REDIRECT_CODES:
+            location = response.getheader ( 'location' )
+            response.read()
+
+            redirects += 1
+            if not location or redirects > self.MAX_REDIRECTS:
+               raise HTTPError (
+                  req_uri, status, response.reason, response.msg, None
+               )
+
+            req_uri = _urlparse.urljoin ( req_uri, location )
+            parsed  = _urlparse.urlsplit ( req_uri )
+
+            if parsed.scheme not in self.CONNECTION_CLS:
+               raise HTTPError (
+                  req_uri, status, "bad redirect", response.msg, None
+               )
+
+         elif status >= 400:
+            response.read()
+            raise HTTPError (
+               req_uri, status, response.reason, response.msg, None
+            )
+
+         else:
+            break
+      # -- end while
+
+      try:
+         yield response
+      except:
+         # response state is unknown, don't reuse the connection
+         self.drop_connection ( parsed.scheme, parsed.netloc )
+         raise
+      else:
+         if response.will_close:
+            self.drop_connection ( parsed.scheme, parsed.netloc )
+         elif not response.isclosed():
+            # discard unread data
+            response.read()
+   # --- end of urlopen (...) ---
+
+# --- end of HttpConnectionPool ---
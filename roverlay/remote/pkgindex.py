@@ -0,0 +1,174 @@
+# R overlay -- remote, repository package index
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""repository package index
+
+This module provides the PackageIndex class, which stores the stanzas of
+a repository's PACKAGES file (debian control file-like syntax, one stanza
+per package). A stanza has the same syntax as a DESCRIPTION file and can
+be used in place of it, which avoids extracting the DESCRIPTION file from
+the package tarball.
+"""
+
+__all__ = [ 'PackageIndex', 'iter_stanzas', ]
+
+import os
+
+import roverlay.util.fileio
+
+
+# default package file suffix,
+#  PACKAGES files don't list the actual file names
+PACKAGE_FILE_SUFFIX = '.tar.gz'
+
+
+def iter_stanzas ( lines ):
+   """Generator that splits the lines of a PACKAGES file into stanzas
+   and yields lists of (rstripped) text lines.
+
+   arguments:
+   * lines -- iterable of text lines
+   """
+   stanza = list()
+   for line in lines:
+      line = line.rstrip()
+      if line:
+         stanza.append ( line )
+      elif stanza:
+         yield stanza
+         stanza = list()
+
+   if stanza:
+      yield stanza
+# --- end of iter_stanzas (...) ---
+
+def get_stanza_fields ( stanza, field_names ):
+   """Returns a dict ( lowercase field name => value ) containing the given
+   fields of a stanza. Continuation lines are ignored.
+
+   arguments:
+   * stanza      -- list of text lines
+   * field_names -- lowercase field names
+   """
+   fields = dict()
+   for line in stanza:
+      if line and not line [0].isspace():
+         name, sep, value = line.partition ( ':' )
+         if sep:
+            name = name.strip().lower()
+            if name in field_names:
+               fields [name] = value.strip()
+   return fields
+# --- end of get_stanza_fields (...) ---
+
+
+class PackageIndex ( object ):
+   """Maps package file names to the stanzas of a PACKAGES file."""
+
+   # file names that are tried when loading a package index from a directory
+   #  (PACKAGES.rds cannot be read without R)
+   INDEX_FILE_NAMES = ( 'PACKAGES', 'PACKAGES.gz' )
+
+   def __init__ ( self ):
+      super ( PackageIndex, self ).__init__()
+      # map: package file name => list of text lines
+      self._stanzas = dict()
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._stanzas )
+   # --- end of __len__ (...) ---
+
+   def __contains__ ( self, package_filename ):
+      return package_filename in self._stanzas
+   # --- end of __contains__ (...) ---
+
+   def get ( self, package_filename, fallback=None ):
+      """Returns the stanza of a package file (as list of text lines).
+
+      arguments:
+      * package_filename -- name of the package file, e.g. "abc_1.0.tar.gz"
+      * fallback         -- returned if there's no such stanza
+      """
+      return self._stanzas.get ( package_filename, fallback )
+   # --- end of get (...) ---
+
+   def add_stanza ( self, stanza ):
+      """Adds a stanza.
+
+      Returns the name of the package file (or None if the stanza does not
+      describe a package, which means that is has been ignored).
+
+      arguments:
+      * stanza -- list of text lines
+      """
+      fields = get_stanza_fields ( stanza, ( 'package', 'version' ) )
+      if 'package' in fields and 'version' in fields:
+         package_filename = (
+            fields ['package'] + '_' + fields ['version'] + PACKAGE_FILE_SUFFIX
+         )
+         self._stanzas [package_filename] = stanza
+         return package_filename
+      else:
+         return None
+   # --- end of add_stanza (...) ---
+
+   def add_lines ( self, lines ):
+      """Adds all stanzas from the given text lines.
+
+      arguments:
+      * lines -- iterable of text lines
+      """
+      for stanza in iter_stanzas ( lines ):
+         self.add_stanza ( stanza )
+   # --- end of add_lines (...) ---
+
+   def load_file ( self, filepath ):
+      """Adds all stanzas from a (possibly compressed) PACKAGES file.
+
+      arguments:
+      * filepath --
+      """
+      self.add_lines (
+         roverlay.util.fileio.read_text_file ( filepath, preparse=True )
+      )
+   # --- end of load_file (...) ---
+
+   def load_dir ( self, dirpath ):
+      """Adds all stanzas from the first PACKAGES file found in the given
+      directory.
+
+      Returns the path to the PACKAGES file, or None if there's none.
+
+      arguments:
+      * dirpath --
+      """
+      for name in self.INDEX_FILE_NAMES:
+         filepath = dirpath + os.sep + name
+         if os.path.isfile ( filepath ):
+            self.load_file ( filepath )
+            return filepath
+      return None
+   # --- end of load_dir (...) ---
+
+   def write_file ( self, filepath ):
+      """Writes all stanzas to a PACKAGES file.
+
+      arguments:
+      * filepath --
+      """
+      tmpfile = filepath + '.new'
+      roverlay.util.fileio.write_text_file (
+         tmpfile,
+         (
+            '\n'.join ( stanza ) + '\n'
+            for stanza in self._stanzas.values()
+         )
+      )
+      os.rename ( tmpfile, filepath )
+   # --- end of write_file (...) ---
+
+# --- end of PackageIndex ---
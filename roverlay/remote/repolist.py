@@ -8,20 +8,29 @@
 
 __all__ = [ 'RepoList', ]
 
+import contextlib
 import re
 import logging
 import os.path
+import time
 
 from roverlay import config
 from roverlay.stats import collector
+from roverlay.util.hashpool import HAVE_CONCURRENT_FUTURES
 from roverlay.remote.repoloader import read_repofile
 from roverlay.remote.basicrepo import BasicRepo
+from roverlay.remote.distscan import DistdirScanner
+
+import roverlay.recipe.dirlisting
+
+if HAVE_CONCURRENT_FUTURES:
+   import concurrent.futures
 
 class RepoList ( object ):
    """Controls several Repo objects."""
 
    def __init__ ( self,
-      sync_enabled=True, force_distroot=False, distroot=None
+      sync_enabled=True, force_distroot=False, distroot=None, sync_jobs=None
    ):
       """Initializes a RepoList.
 
@@ -30,6 +39,8 @@ class RepoList ( object ):
       * force_distdir -- if set and True: put all distdirs into distroot,
                           ignoring repo-specific dirs
       * distroot      --
+      * sync_jobs     -- max number of repos that are synced in parallel
+                          Defaults to None (-> use config value)
       """
       # if True: use all repos when looking for packages, even those that
       #           could not be synced
@@ -40,6 +51,11 @@ class RepoList ( object ):
       self.logger           = logging.getLogger ( self.__class__.__name__ )
       self.force_distroot   = force_distroot
 
+      if sync_jobs is None:
+         self.sync_jobs = config.get ( 'REPO.sync_jobs', 1 )
+      else:
+         self.sync_jobs = sync_jobs
+
       if distroot is None:
          self.distroot = config.get_or_fail ( "DISTFILES.root" )
       else:
@@ -53,8 +69,34 @@ class RepoList ( object ):
          ),
          re.IGNORECASE
       )
+
+      # distfiles dir scanner, created on demand
+      self._scanner = None
    # --- end of __init__ (...) ---
 
+   def get_scanner ( self ):
+      """Returns the distfiles dir scanner (DistdirScanner) used by all repos.
+      Creates it if necessary.
+      """
+      if self._scanner is None:
+         if config.get ( 'REPO.LISTING_CACHE.enabled', False ):
+            listing_cache = roverlay.recipe.dirlisting.setup()
+         else:
+            listing_cache = None
+
+         self._scanner = DistdirScanner (
+            jobs          = config.get ( 'REPO.scan_jobs', 1 ),
+            listing_cache = listing_cache,
+         )
+      return self._scanner
+   # --- end of get_scanner (...) ---
+
+   def write_scan_cache ( self ):
+      """Writes the directory listing cache (if enabled and modified)."""
+      if self._scanner is not None:
+         self._scanner.write_cache()
+   # --- end of write_scan_cache (...) ---
+
    def _pkg_filter ( self, pkg_filename ):
       """Returns True if pkg_filename is a package, else False.
 
@@ -128,13 +170,60 @@ class RepoList ( object ):
          self.load_file ( f )
    # --- end of load (...) ---
 
-   def _queue_packages_from_repo ( self, repo, add_method ):
+   def _repo_usable ( self, repo ):
+      """Returns True if packages from the given repo can be used,
+      else False.
+
+      arguments:
+      * repo --
+      """
+      return bool ( repo.ready() or self.use_broken_repos )
+   # --- end of _repo_usable (...) ---
+
+   def _get_package_filter ( self, file_filter=None ):
+      """Returns a function that checks whether a file is a package that
+      should be added.
+
+      arguments:
+      * file_filter -- None or function that returns False for package files
+                       that should be ignored
+      """
+      if file_filter is None:
+         return self._pkg_filter
+      else:
+         pkg_filter = self._pkg_filter
+         return lambda f: pkg_filter ( f ) and file_filter ( f )
+   # --- end of _get_package_filter (...) ---
+
+   def iter_package_files ( self ):
+      """Generator that yields the paths of all package files from all
+      usable repos."""
+      for repo in self.repos:
+         if self._repo_usable ( repo ):
+            for package_file in repo.iter_package_files (
+               is_package=self._pkg_filter, scanner=self.get_scanner()
+            ):
+               yield package_file
+
+      self.write_scan_cache()
+   # --- end of iter_package_files (...) ---
+
+   def _queue_packages_from_repo ( self,
+      repo, add_method, file_filter=None, package_files=None
+   ):
       """Adds all packages from a repo using add_method.
 
       arguments:
-      * repo       --
-      * add_method -- method that is called for each package,
-                      has to accept exactly one arg, the package
+      * repo          --
+      * add_method    -- method that is called for each package,
+                         has to accept exactly one arg, the package
+      * file_filter   -- None or function that returns False for package
+                         files that should be ignored. Defaults to None.
+      * package_files -- None or a set of package files (absolute paths).
+                         If set, only the package files of this repo that
+                         are listed in package_files are added (instead of
+                         scanning the repo's distfiles dir).
+                         Defaults to None.
       """
       if not repo.ready():
          if self.use_broken_repos:
@@ -149,7 +238,27 @@ class RepoList ( object ):
             )
             return False
 
-      for p in repo.scan_distdir ( is_package=self._pkg_filter ):
+      if package_files is not None:
+         prefix    = os.path.normpath ( repo.distdir ) + os.sep
+         filenames = sorted (
+            f [len ( prefix ):].replace ( os.sep, '/' )
+            for f in package_files if f.startswith ( prefix )
+         )
+         self.logger.info (
+            "repo {name}: scanning {n:d} package files".format (
+               name=repo.name, n=len ( filenames )
+            )
+         )
+         packages = repo.scan_files (
+            filenames, is_package=self._get_package_filter ( file_filter )
+         )
+      else:
+         packages = repo.scan_distdir (
+            is_package=self._get_package_filter ( file_filter ),
+            scanner=self.get_scanner()
+         )
+
+      for p in packages:
          self.logger.debug (
             "adding package {p} from repo {r}".format ( p=p, r=repo )
          )
@@ -157,19 +266,122 @@ class RepoList ( object ):
          add_method ( p )
    # --- end of _queue_packages_from_repo (...) ---
 
-   def add_packages ( self, add_method ):
+   def add_packages ( self,
+      add_method, file_filter=None, package_files=None
+   ):
       """Adds packages from all repos using add_method.
 
       arguments:
-      * add_method -- method that is called for each package
+      * add_method    -- method that is called for each package
+      * file_filter   -- None or function that returns False for package
+                         files that should be ignored. Defaults to None.
+      * package_files -- None or a set of package files (absolute paths)
+                         that should be added instead of all package files
+                         of the repos (see get_changed_files()).
+                         Defaults to None.
       """
       addstats = self.repo_stats.queue_time
       for repo in self.repos:
          addstats.begin ( repo.name )
-         self._queue_packages_from_repo ( repo, add_method )
+         self._queue_packages_from_repo (
+            repo, add_method, file_filter, package_files
+         )
          addstats.end ( repo.name )
+
+      self.write_scan_cache()
    # --- end of add_packages (...) ---
 
+   def get_changed_files ( self ):
+      """Returns a set of all package files (absolute paths) of usable repos
+      that have been added or updated since the last commit_changesets()
+      call, or None if the changes of at least one usable repo are unknown.
+      """
+      changed_files = set()
+      for repo in self.repos:
+         if self._repo_usable ( repo ):
+            changeset = repo.get_changeset()
+            if changeset is None:
+               return None
+
+            prefix = os.path.normpath ( repo.distdir ) + os.sep
+            changed_files.update (
+               prefix + f.replace ( '/', os.sep )
+               for f in changeset.iter_changed()
+            )
+      return changed_files
+   # --- end of get_changed_files (...) ---
+
+   def commit_changesets ( self ):
+      """Marks the changes of all usable repos as processed.
+      Should be called after processing the packages of all changed files
+      (see get_changed_files()).
+      """
+      for repo in self.repos:
+         if self._repo_usable ( repo ):
+            repo.commit_changeset()
+   # --- end of commit_changesets (...) ---
+
+   def is_concurrent ( self ):
+      """Returns True if repos are synced in parallel, else False."""
+      return bool (
+         HAVE_CONCURRENT_FUTURES and self.sync_jobs and self.sync_jobs > 1
+         and len ( self.repos ) > 1
+      )
+   # --- end of is_concurrent (...) ---
+
+   def _sync_repo ( self, repo ):
+      """Syncs a single repo (possibly in a worker thread).
+
+      Returns a 3-tuple ( sync status, sync begin time, sync end time ).
+
+      arguments:
+      * repo --
+      """
+      t_begin = time.time()
+      status  = repo.sync ( sync_enabled=self.sync_enabled )
+      return ( status, t_begin, time.time() )
+   # --- end of _sync_repo (...) ---
+
+   def _iter_sync_repos ( self ):
+      """Generator that syncs all repos and yields 2-tuples
+      ( repo, sync status ) as soon as a repo sync has finished.
+
+      Up to sync_jobs repos are synced in parallel. The per-repo sync time
+      is recorded in repo_stats.sync_time. Closing the generator cancels
+      all repo syncs that have not been started yet.
+      """
+      sync_time = self.repo_stats.sync_time
+
+      self.logger.debug ( "Syncing repos ..." )
+
+      if not self.is_concurrent():
+         for repo in self.repos:
+            status, t_begin, t_end = self._sync_repo ( repo )
+            sync_time.add ( repo.name, t_begin, t_end )
+            yield ( repo, status )
+
+      else:
+         with concurrent.futures.ThreadPoolExecutor (
+            min ( self.sync_jobs, len ( self.repos ) )
+         ) as exe:
+            jobs = {
+               exe.submit ( self._sync_repo, repo ): repo
+               for repo in self.repos
+            }
+
+            try:
+               for job in concurrent.futures.as_completed ( jobs ):
+                  repo = jobs [job]
+                  status, t_begin, t_end = job.result()
+                  sync_time.add ( repo.name, t_begin, t_end )
+                  yield ( repo, status )
+            finally:
+               # does nothing if all jobs are done,
+               # running jobs are waited for when leaving the executor
+               for job in jobs:
+                  job.cancel()
+   # --- end of _iter_sync_repos (...) ---
+
    def _sync_all_repos_and_run (
       self,
       when_repo_success=None, when_repo_fail=None, when_repo_done=None,
@@ -178,6 +390,9 @@ class RepoList ( object ):
       """A method that syncs all repos and is able to call other methods
       on certain events (repo done/success/fail, all done).
 
+      The methods are called in the current thread, in the order in which
+      the repo syncs finish (see _iter_sync_repos()).
+
       arguments:
       * when_repo_success (pkg) -- called after a successful repo sync
       * when_repo_fail    (pkg) -- called after an unsuccessful repo sync
@@ -188,21 +403,16 @@ class RepoList ( object ):
       # try_call (f,*args,**kw) calls f (*args,**kw) unless f is None
       try_call = lambda f, *x, **z : None if f is None else f ( *x, **z )
 
-      self.logger.debug ( "Syncing repos ..." )
-      for repo in self.repos:
-         self.repo_stats.sync_time.begin ( repo.name )
-         if repo.sync ( sync_enabled=self.sync_enabled ):
-            self.repo_stats.sync_time.end ( repo.name )
-
-            # repo successfully synced
-            try_call ( when_repo_success, repo )
-         else:
-            self.repo_stats.sync_time.end ( repo.name )
-
-            # else log fail <>
-            try_call ( when_repo_fail, repo )
+      with contextlib.closing ( self._iter_sync_repos() ) as synced_repos:
+         for repo, sync_status in synced_repos:
+            if sync_status:
+               # repo successfully synced
+               try_call ( when_repo_success, repo )
+            else:
+               # else log fail <>
+               try_call ( when_repo_fail, repo )
 
-         try_call ( when_repo_done, repo )
+            try_call ( when_repo_done, repo )
 
       try_call ( when_all_done )
    # --- end of _sync_all_repos_and_run (...) ---
@@ -215,21 +425,17 @@ class RepoList ( object ):
       arguments:
       * fail_greedy -- abort on first sync failure (defaults to False)
                         "screws" up time stats since sync_time should
-                        include all repos
+                        include all repos. Repos that are being synced
+                        in parallel are still waited for.
       """
       all_success = True
-      self.logger.debug ( "Syncing repos ..." )
-      for repo in self.repos:
-         self.repo_stats.sync_time.begin ( repo.name )
-         if repo.sync ( sync_enabled=self.sync_enabled ):
-            self.repo_stats.sync_time.end ( repo.name )
-         elif fail_greedy:
-            self.repo_stats.sync_time.end ( repo.name )
-            return False
-         else:
-            self.repo_stats.sync_time.end ( repo.name )
-            all_success = False
-      # -- end for
+      with contextlib.closing ( self._iter_sync_repos() ) as synced_repos:
+         for repo, sync_status in synced_repos:
+            if not sync_status:
+               all_success = False
+               if fail_greedy:
+                  break
+      # -- end with
       return all_success
    # --- end of sync_all (...) ---
 
@@ -244,7 +450,9 @@ class RepoList ( object ):
       # in non-threaded execution
       qput = lambda r: self._queue_packages_from_repo ( r, add_method )
 
-      self._sync_all_repos_and_run ( when_repo_done=qput )
+      self._sync_all_repos_and_run (
+         when_repo_done=qput, when_all_done=self.write_scan_cache
+      )
 
    # --- end of sync_all (...) ---
 
@@ -87,6 +87,7 @@ def read_repofile ( repo_file, distroot, lenient=False, force_distroot=False ):
             pkglist_file = get ( 'pkglist_file', 'PACKAGES' ),
             pkglist_uri  = get ( 'pkglist_uri' ),
             digest_type  = get ( 'digest_type' ) or get ( 'digest' ),
+            max_jobs     = get ( 'jobs' ),
             **common_kwargs
          )
 
@@ -94,6 +95,7 @@ def read_repofile ( repo_file, distroot, lenient=False, force_distroot=False ):
          repo = websync.WebsyncPackageList (
             pkglist_file = get ( 'pkglist_file' ) or get ( 'pkglist' ),
             #digest_type  = get ( 'digest_type' ) or get ( 'digest' ),
+            max_jobs     = get ( 'jobs' ),
             **common_kwargs
          )
 
@@ -11,7 +11,7 @@ __all__ = [ 'RsyncRepo', ]
 import os
 import sys
 
-from roverlay import config, util
+from roverlay import config, strutil, util
 
 import roverlay.tools.subproc
 from roverlay.tools.subproc import create_subprocess as _create_subprocess
@@ -19,6 +19,8 @@ from roverlay.tools.subproc import stop_subprocess   as _stop_subprocess
 from roverlay.tools.subproc import \
    gracefully_stop_subprocess as _gracefully_stop_subprocess
 
+import roverlay.remote.changeset
+
 from roverlay.remote.basicrepo import BasicRepo
 
 RSYNC_ENV = util.keepenv (
@@ -60,7 +62,12 @@ DEFAULT_RSYNC_OPTS =  (
    '--chmod=ugo=r,u+w,Dugo+x', # 0755 for transferred dirs, 0644 for files
 )
 
-def run_rsync ( cmdv, env=RSYNC_ENV ):
+# rsync opts for repos that record changes
+CHANGESET_RSYNC_OPTS = (
+   '--out-format=%i %n',       # itemized changes (-> changeset)
+)
+
+def run_rsync ( cmdv, env=RSYNC_ENV, out_handler=None ):
    """Runs an rsync command and terminates/kills the process on error.
 
    Returns: the command's returncode
@@ -68,13 +75,24 @@ def run_rsync ( cmdv, env=RSYNC_ENV ):
    Raises: Passes all exceptions
 
    arguments:
-   * cmdv -- rsync command to (including the rsync executable!)
-   * env  -- environment dict, defaults to RSYNC_ENV
+   * cmdv        -- rsync command to (including the rsync executable!)
+   * env         -- environment dict, defaults to RSYNC_ENV
+   * out_handler -- if set and not None: function that is called for each
+                    line of rsync's output (stdout). Defaults to None.
    """
-   proc = _create_subprocess ( cmdv, env=env )
+   if out_handler is None:
+      proc = _create_subprocess ( cmdv, env=env )
+   else:
+      proc = _create_subprocess ( cmdv, env=env, stdout=True )
 
    try:
-      proc.communicate()
+      if out_handler is None:
+         proc.communicate()
+      else:
+         for line in proc.stdout:
+            out_handler ( line )
+         proc.stdout.close()
+         proc.wait()
 
    except KeyboardInterrupt:
       sys.stderr.write (
@@ -139,14 +157,102 @@ class RsyncRepo ( BasicRepo ):
             self.extra_opts.extend ( extra_opts )
       else:
          self.extra_opts = extra_opts
+
+      # file that accumulates the changes made by rsync
+      #  until they have been processed (None: don't keep changesets)
+      cachedir = config.get ( 'CACHEDIR.root', None )
+      if cachedir:
+         self.changeset_file = (
+            cachedir + os.sep + 'repo_changes' + os.sep
+            + self.name.replace ( '/', '_' )
+         )
+      else:
+         self.changeset_file = None
+
+      # changes made by rsync in this run
+      self._changeset = roverlay.remote.changeset.RepoChangeset()
    # --- end of __init__ (...) ---
 
+   def get_changeset ( self ):
+      """Returns a changeset that lists all files that have been added,
+      updated or deleted since the last call to commit_changeset(),
+      or None if unknown.
+      """
+      if not self.changeset_file or not os.path.isfile (
+         self.changeset_file
+      ):
+         # no changes have been processed so far
+         return None
+
+      changeset = roverlay.remote.changeset.RepoChangeset()
+      changeset.read_file ( self.changeset_file )
+      return changeset
+   # --- end of get_changeset (...) ---
+
+   def commit_changeset ( self ):
+      """Marks all changes as processed."""
+      if not self.changeset_file:
+         return False
+
+      roverlay.remote.changeset.RepoChangeset().write_file (
+         self.changeset_file
+      )
+      self._changeset = roverlay.remote.changeset.RepoChangeset()
+      return True
+   # --- end of commit_changeset (...) ---
+
+   def _add_changes ( self, changeset ):
+      """Adds the changes of an rsync run to the changeset file
+      (if it exists).
+
+      arguments:
+      * changeset --
+      """
+      self._changeset.merge ( changeset )
+
+      if changeset:
+         pending = self.get_changeset()
+         if pending is not None:
+            pending.merge ( changeset )
+            pending.write_file ( self.changeset_file )
+   # --- end of _add_changes (...) ---
+
+   def _run_rsync ( self, rsync_cmd ):
+      """Runs rsync and records the changes (if enabled).
+
+      arguments:
+      * rsync_cmd --
+      """
+      if not self.changeset_file:
+         return run_rsync ( rsync_cmd )
+
+      parser = roverlay.remote.changeset.ItemizedParser()
+      is_itemized_line = roverlay.remote.changeset.is_itemized_line
+
+      def out_handler ( line ):
+         line = strutil.bytes_try_decode ( line )
+         if not parser ( line ) and not is_itemized_line ( line ):
+            # stats etc.
+            sys.stdout.write ( line )
+            sys.stdout.flush()
+      # --- end of out_handler (...) ---
+
+      try:
+         return run_rsync ( rsync_cmd, out_handler=out_handler )
+      finally:
+         # files may have been transferred even if rsync failed
+         self._add_changes ( parser.changeset )
+   # --- end of _run_rsync (...) ---
+
    def _rsync_argv ( self ):
       """Returns an rsync command used for syncing."""
       argv = [ 'rsync' ]
 
       argv.extend ( DEFAULT_RSYNC_OPTS )
 
+      if self.changeset_file:
+         argv.extend ( CHANGESET_RSYNC_OPTS )
+
       max_bw = config.get ( 'REPO.rsync_bwlimit', None )
       if max_bw is not None:
          argv.append ( '--bwlimit=' + str ( max_bw ) )
@@ -172,7 +278,7 @@ class RsyncRepo ( BasicRepo ):
          util.dodir ( self.distdir, mkdir_p=True )
          self.logger.debug ( 'running rsync cmd: ' + ' '.join ( rsync_cmd ) )
 
-         retcode = run_rsync ( rsync_cmd )
+         retcode = self._run_rsync ( rsync_cmd )
 
          if retcode in RETRY_ON_RETCODE:
             for retry_count in range ( MAX_RSYNC_RETRY ):
@@ -185,7 +291,7 @@ class RsyncRepo ( BasicRepo ):
                   )
                )
 
-               retcode = run_rsync ( rsync_cmd )
+               retcode = self._run_rsync ( rsync_cmd )
                if retcode not in RETRY_ON_RETCODE: break
          # -- end if <want retry>
 
@@ -12,7 +12,6 @@ from __future__ import print_function
 __all__ = [ 'WebsyncPackageList', 'WebsyncRepo', ]
 
 import errno
-import contextlib
 import re
 import os
 import socket
@@ -30,10 +29,17 @@ urlopen   = _urllib.urlopen
 URLError  = _urllib_error.URLError
 HTTPError = _urllib_error.HTTPError
 
+import roverlay.remote.pkgindex
+
 from roverlay                  import config, digest, util
 from roverlay.remote.basicrepo import BasicRepo
+from roverlay.remote.httpfetch import HttpConnectionPool, get_header
+from roverlay.util.hashpool    import HAVE_CONCURRENT_FUTURES
 from roverlay.util.progressbar import DownloadProgressBar, NullProgressBar
 
+if HAVE_CONCURRENT_FUTURES:
+   import concurrent.futures
+
 # number of sync retries
 #  changed 2014-02-15: does no longer include the first run
 #
@@ -67,7 +73,8 @@ class WebsyncBase ( BasicRepo ):
       distroot,
       src_uri,
       directory=None,
-      digest_type=None
+      digest_type=None,
+      max_jobs=None
    ):
       """Initializes a WebsyncBase instance.
 
@@ -79,6 +86,8 @@ class WebsyncBase ( BasicRepo ):
       * digest_type -- if set and not None/"None":
                         verify packages using the given digest type
                         Supported digest types: 'md5'.
+      * max_jobs    -- max number of parallel downloads,
+                        defaults to None (-> REPO.websync_jobs)
       """
       super ( WebsyncBase, self ) . __init__ (
          name=name,
@@ -107,10 +116,44 @@ class WebsyncBase ( BasicRepo ):
 
       self.timeout = config.get_or_fail ( "REPO.websync_timeout" )
 
+      if max_jobs is None:
+         self.max_jobs = config.get ( "REPO.websync_jobs", 1 )
+      else:
+         self.max_jobs = int ( max_jobs )
+
+      # persistent http connections, created when syncing
+      self._http = None
+
       # download 8KiB per block
       self.transfer_blocksize = 8192
    # --- end of __init__ (...) ---
 
+   def is_concurrent ( self ):
+      """Returns True if packages are downloaded in parallel."""
+      return HAVE_CONCURRENT_FUTURES and self.max_jobs > 1
+   # --- end of is_concurrent (...) ---
+
+   def urlopen ( self, uri, method='GET', headers=None ):
+      """Opens an uri using a persistent connection (if possible).
+      Returns a context manager, see HttpConnectionPool.urlopen().
+
+      arguments:
+      * uri     --
+      * method  --
+      * headers --
+      """
+      if self._http is None:
+         self._http = HttpConnectionPool ( timeout=self.timeout )
+      return self._http.urlopen ( uri, method=method, headers=headers )
+   # --- end of urlopen (...) ---
+
+   def close_connections ( self ):
+      """Closes all persistent connections of this repo."""
+      if self._http is not None:
+         self._http.close()
+         self._http = None
+   # --- end of close_connections (...) ---
+
    def _fetch_package_list ( self ):
       """This function returns a list of packages to download."""
       raise Exception ( "method stub" )
@@ -132,121 +175,204 @@ class WebsyncBase ( BasicRepo ):
             print ( "Skipping fetch (early) for {f!r}".format ( f=distfile ) )
          return True
 
+      if not os.access ( distfile, os.F_OK ):
+         fetch_required = True
+      elif expected_digest is not None:
+         # package exists locally, verify it (digest)
+         fetch_required = not self._check_digest (
+            distfile, expected_digest, refetch=True
+         )
+      else:
+         # package exists locally, verify it (size)
+         fetch_required = not self._check_remote_size (
+            package_file, distfile, src_uri
+         )
 
-      with contextlib.closing (
-         urlopen ( src_uri, None, self.timeout )
-      ) as webh:
-         #web_info = webh.info()
+      if fetch_required:
+         fetch_result = self._fetch_package (
+            package_file, distfile, src_uri, expected_digest
+         )
+         if not fetch_result:
+            # None: package removed (bad digest), False: fetch failed
+            return fetch_result is None
 
-         expected_filesize = int ( webh.info().get ( 'content-length', -1 ) )
+      elif VERBOSE:
+         print ( "Skipping fetch for {f!r}".format ( f=distfile ) )
 
-         if os.access ( distfile, os.F_OK ):
-            # package exists locally, verify it (size, digest)
-            fetch_required = False
-            localsize      = os.path.getsize ( distfile )
+      return self._package_synced ( package_file, distfile, src_uri )
+   # --- end of get_package (...) ---
 
-            if localsize != expected_filesize:
-               # size mismatch
-               self.logger.info (
-                  'size mismatch for {f!r}: expected {websize} bytes '
-                  'but got {localsize}!'.format (
-                     f         = package_file,
-                     websize   = expected_filesize,
-                     localsize = localsize
-                  )
-               )
-               fetch_required = True
-
-            elif expected_digest is not None:
-               our_digest = digest.dodigest_file ( distfile, self._digest_type )
-
-               if our_digest != expected_digest:
-                  # digest mismatch
-                  self.logger.warning (
-                     '{dtype} mismatch for {f!r}: '
-                     'expected {theirs} but got {ours} - refetching.'.format (
-                        dtype  = self._digest_type,
-                        f      = distfile,
-                        theirs = expected_digest,
-                        ours   = our_digest
-                     )
-                  )
-                  fetch_required = True
+   def _check_digest ( self, distfile, expected_digest, refetch ):
+      """Returns True if the digest of a local package file matches the
+      expected one, else False.
 
-         else:
-            fetch_required = True
+      arguments:
+      * distfile        --
+      * expected_digest --
+      * refetch         -- whether the package would be refetched on
+                           mismatch (controls logging only)
+      """
+      our_digest = digest.get_file_digest ( distfile, self._digest_type )
 
-         if fetch_required:
-            blocksize     = self.transfer_blocksize
-            bytes_fetched = 0
-            assert blocksize
+      if our_digest == expected_digest:
+         return True
+
+      elif refetch:
+         # digest mismatch
+         self.logger.warning (
+            '{dtype} mismatch for {f!r}: '
+            'expected {theirs} but got {ours} - refetching.'.format (
+               dtype  = self._digest_type,
+               f      = distfile,
+               theirs = expected_digest,
+               ours   = our_digest
+            )
+         )
+      else:
+         # fetched package's digest does not match the expected one,
+         # refuse to use it
+         self.logger.warning (
+            'bad {dtype} digest for {f!r}, expected {theirs} but '
+            'got {ours} - removing this package.'.format (
+               dtype  = self._digest_type,
+               f      = distfile,
+               theirs = expected_digest,
+               ours   = our_digest
+            )
+         )
+      return False
+   # --- end of _check_digest (...) ---
+
+   def _check_remote_size ( self, package_file, distfile, src_uri ):
+      """Returns True if the size of a local package file matches the
+      remote file size, else False. Sends a HEAD request.
+
+      arguments:
+      * package_file --
+      * distfile     --
+      * src_uri      --
+      """
+      with self.urlopen ( src_uri, method='HEAD' ) as webh:
+         expected_filesize = int (
+            get_header ( webh, 'content-length', -1 )
+         )
+
+      localsize = os.path.getsize ( distfile )
+
+      if localsize == expected_filesize:
+         return True
+      else:
+         # size mismatch
+         self.logger.info (
+            'size mismatch for {f!r}: expected {websize} bytes '
+            'but got {localsize}!'.format (
+               f         = package_file,
+               websize   = expected_filesize,
+               localsize = localsize
+            )
+         )
+         return False
+   # --- end of _check_remote_size (...) ---
+
+   def _fetch_package ( self,
+      package_file, distfile, src_uri, expected_digest
+   ):
+      """Downloads a package file.
+
+      Returns True on success, None if the downloaded file has been
+      removed due to digest mismatch and False on failure.
+
+      arguments:
+      * package_file    --
+      * distfile        --
+      * src_uri         --
+      * expected_digest --
+      """
+      blocksize     = self.transfer_blocksize
+      bytes_fetched = 0
+      assert blocksize
 
-            # unlink the existing file first (if it exists)
-            #  this is necessary for keeping hardlinks intact (-> package mirror)
-            util.try_unlink ( distfile )
+      if self.is_concurrent():
+         # progress bars of parallel downloads would be garbled
+         progress_bar_cls = NullProgressBar
+      else:
+         progress_bar_cls = self.PROGRESS_BAR_CLS
+
+      if digest.get_digest_store() is not None:
+         # calculate digests while downloading,
+         #  so that the package file does not have to be read again
+         hashobj_dict = digest.new_hash_objects (
+            digest.get_store_digest_types (
+               () if self._digest_type is None else ( self._digest_type, )
+            )
+         )
+      else:
+         hashobj_dict = None
 
-            with \
-               open ( distfile, mode='wb' ) as fh, \
-               self.PROGRESS_BAR_CLS (
-                  package_file.ljust(50), expected_filesize
-            ) as progress_bar:
+      with self.urlopen ( src_uri ) as webh:
+         expected_filesize = int (
+            get_header ( webh, 'content-length', -1 )
+         )
 
-               progress_bar.update ( 0 )
+         # unlink the existing file first (if it exists)
+         #  this is necessary for keeping hardlinks intact (-> package mirror)
+         util.try_unlink ( distfile )
+
+         with \
+            open ( distfile, mode='wb' ) as fh, \
+            progress_bar_cls (
+               package_file.ljust(50), expected_filesize
+         ) as progress_bar:
+
+            progress_bar.update ( 0 )
+            block = webh.read ( blocksize )
+
+            while block:
+               # write block to file
+               fh.write ( block )
+               if hashobj_dict:
+                  for hashobj in hashobj_dict.values():
+                     hashobj.update ( block )
+               # ? bytelen
+               bytes_fetched += len ( block )
+
+               # update progress bar on every 4th block
+               #  blocks_fetched := math.ceil ( bytes_fetched / blocksize )
+               #
+               #  Usually, only the last block's size is <= blocksize,
+               #  so floordiv is sufficient here
+               #  (the progress bar gets updated for the last block anyway)
+               #
+               if 0 == ( bytes_fetched // blocksize ) % 4:
+                  progress_bar.update ( bytes_fetched )
+
+               # get the next block
                block = webh.read ( blocksize )
+            # -- end while
 
-               while block:
-                  # write block to file
-                  fh.write ( block )
-                  # ? bytelen
-                  bytes_fetched += len ( block )
-
-                  # update progress bar on every 4th block
-                  #  blocks_fetched := math.ceil ( bytes_fetched / blocksize )
-                  #
-                  #  Usually, only the last block's size is <= blocksize,
-                  #  so floordiv is sufficient here
-                  #  (the progress bar gets updated for the last block anyway)
-                  #
-                  if 0 == ( bytes_fetched // blocksize ) % 4:
-                     progress_bar.update ( bytes_fetched )
-
-                  # get the next block
-                  block = webh.read ( blocksize )
-               # -- end while
-
-               # final progress bar update (before closing the file)
-               progress_bar.update ( bytes_fetched )
-            # -- with
-
-            if bytes_fetched == expected_filesize:
-               if expected_digest is not None:
-                  our_digest = digest.dodigest_file ( distfile, self._digest_type )
-
-                  if our_digest != expected_digest:
-                     # fetched package's digest does not match the expected one,
-                     # refuse to use it
-                     self.logger.warning (
-                        'bad {dtype} digest for {f!r}, expected {theirs} but '
-                        'got {ours} - removing this package.'.format (
-                           dtype  = self._digest_type,
-                           f      = distfile,
-                           theirs = expected_digest,
-                           ours   = our_digest
-                        )
-                     )
-                     # package removed? -> return success (True/False)
-                     return util.try_unlink ( distfile )
-                  # -- end if <compare digest>
-               # -- end if <have digest?>
+            # final progress bar update (before closing the file)
+            progress_bar.update ( bytes_fetched )
+         # -- with
+      # -- with
 
-            else:
-               return False
-            # -- end if <enough bytes fetched?>
-         elif VERBOSE:
-            print ( "Skipping fetch for {f!r}".format ( f=distfile ) )
+      if bytes_fetched != expected_filesize:
+         return False
 
-      return self._package_synced ( package_file, distfile, src_uri )
-   # --- end of get_package (...) ---
+      if hashobj_dict:
+         digest.record_file_digests (
+            distfile,
+            { h: hashobj.hexdigest() for h, hashobj in hashobj_dict.items() }
+         )
+
+      if expected_digest is not None and not self._check_digest (
+         distfile, expected_digest, refetch=False
+      ):
+         # package removed? -> return None (success) / False
+         return None if util.try_unlink ( distfile ) else False
+
+      else:
+         return True
+   # --- end of _fetch_package (...) ---
 
    def _package_synced ( self, package_filename, distfile, src_uri ):
       """Called when a package has been synced (=exists locally when
@@ -278,29 +404,55 @@ class WebsyncBase ( BasicRepo ):
       if VERBOSE:
          print ( "{:d} files to consider.".format ( len(package_list) ) )
 
-      success = True
-
       if self._digest_type is not None:
-         for package_file, expected_digest in package_list:
-            src_uri  = self.get_src_uri ( package_file )
-
-            if not self._get_package (
-               package_file, src_uri, expected_digest
-            ):
-               success = False
-               break
+         return self._get_packages (
+            ( package_file, self.get_src_uri ( package_file ), pkg_digest )
+            for package_file, pkg_digest in package_list
+         )
       else:
-         for package_file in package_list:
-            src_uri  = self.get_src_uri ( package_file )
+         return self._get_packages (
+            ( package_file, self.get_src_uri ( package_file ), None )
+            for package_file in package_list
+         )
+   # --- end of _sync_packages (...) ---
 
-            if not self._get_package (
-               package_file, src_uri, expected_digest=None
+   def _get_packages ( self, package_jobs ):
+      """Gets packages, using up to max_jobs parallel downloads.
+
+      Returns True if all packages could be fetched, else False.
+      Stops at the first failure. Exceptions are passed to the caller.
+
+      arguments:
+      * package_jobs -- iterable of 3-tuples
+                        ( package file, src uri, expected digest or None )
+      """
+      if not self.is_concurrent():
+         for package_job in package_jobs:
+            if not self._get_package ( *package_job ):
+               return False
+         return True
+      # -- end if
+
+      with concurrent.futures.ThreadPoolExecutor ( self.max_jobs ) as exe:
+         running_jobs = [
+            exe.submit ( self._get_package, *package_job )
+            for package_job in package_jobs
+         ]
+
+         try:
+            for finished_job in (
+               concurrent.futures.as_completed ( running_jobs )
             ):
-               success = False
-               break
+               if not finished_job.result():
+                  return False
+         finally:
+            # cancel remaining jobs on failure/exception
+            for job in running_jobs:
+               job.cancel()
+      # -- end with
 
-      return success
-   # --- end of _sync_packages (...) ---
+      return True
+   # --- end of _get_packages (...) ---
 
    def _dosync ( self ):
       """Syncs this repo."""
@@ -310,6 +462,10 @@ class WebsyncBase ( BasicRepo ):
       retval      = None
       max_retry   = max ( MAX_WEBSYNC_RETRY, 0 ) + 1
 
+      # create the connection pool before starting any download threads
+      if self._http is None:
+         self._http = HttpConnectionPool ( timeout=self.timeout )
+
       while want_retry and retry_count < max_retry:
          retry_count += 1
          want_retry   = False
@@ -391,6 +547,8 @@ class WebsyncBase ( BasicRepo ):
             retval = retval_tmp
       # -- end while
 
+      self.close_connections()
+
       if want_retry:
          self.logger.error (
             'Repo {name} cannot be used for ebuild creation: '
@@ -487,11 +645,11 @@ class WebsyncRepo ( WebsyncBase ):
          List ::= [ package_file, ... ]
       """
 
-      def generate_pkglist ( fh ):
-         """Generates the package list using the given file handle.
+      def generate_pkglist ( lines ):
+         """Generates the package list using the given text lines.
 
          arguments:
-         * fh -- file handle to read from
+         * lines -- text lines of the package list file
          """
          info = dict()
 
@@ -501,10 +659,7 @@ class WebsyncRepo ( WebsyncBase ):
             filter (
                None,
                (
-                  self.FIELDREGEX.match (
-                     l if isinstance ( l, str ) else l.decode()
-                  )
-                  for l in fh.readlines()
+                  self.FIELDREGEX.match ( l ) for l in lines
                )
             )
          ):
@@ -527,22 +682,44 @@ class WebsyncRepo ( WebsyncBase ):
       # --- end of generate_pkglist (...) ---
 
       package_list = ()
-      with contextlib.closing (
-         urlopen ( self.pkglist_uri, None, self.timeout )
-      ) as webh:
-         content_type = webh.info().get ( 'content-type', None )
+      with self.urlopen ( self.pkglist_uri ) as webh:
+         content_type = get_header ( webh, 'content-type', None )
 
          if content_type != 'text/plain':
             print (
                "content type {!r} is not supported!".format ( content_type )
             )
          else:
-            package_list = list ( generate_pkglist ( webh ) )
+            lines = [
+               ( l if isinstance ( l, str ) else l.decode() )
+               for l in webh.readlines()
+            ]
+            package_list = list ( generate_pkglist ( lines ) )
+            self._update_package_index ( lines )
       # -- end with
 
       return package_list
    # --- end fetch_pkglist (...) ---
 
+   def _update_package_index ( self, lines ):
+      """Replaces the package index of this repo with the stanzas of
+      the remote package list file. Also writes the package list to the
+      distfiles dir if package index reading is enabled.
+
+      arguments:
+      * lines -- text lines of the package list file
+      """
+      package_index = roverlay.remote.pkgindex.PackageIndex()
+      package_index.add_lines ( lines )
+      self.set_package_index ( package_index )
+
+      if config.get ( 'DESCRIPTION.use_package_index', False ):
+         util.dodir ( self.distdir, mkdir_p=True )
+         package_index.write_file (
+            self.distdir + os.sep + package_index.INDEX_FILE_NAMES[0]
+         )
+   # --- end of _update_package_index (...) ---
+
    def skip_fetch ( self, package_filename, distfile, src_uri ):
       """Returns True if downloading of a package file should be skipped,
       else False. Called _before_ opening a web handle (urlopen()).
@@ -641,8 +818,20 @@ class WebsyncPackageList ( WebsyncBase ):
       return ( package_filename, distfile ) in self._synced_packages
    # --- end of skip_fetch (...) ---
 
-   def scan_distdir ( self, log_bad=True, **kwargs_ignored ):
+   def iter_package_files ( self, is_package=None, **kwargs_ignored ):
+      for package_filename, src_uri in self._synced_packages:
+         filepath = self.distdir + os.sep + package_filename
+         if is_package is None or is_package ( filepath ):
+            yield filepath
+   # --- end of iter_package_files (...) ---
+
+   def scan_distdir ( self, is_package=None, log_bad=True, **kwargs_ignored ):
       for package_filename, src_uri in self._synced_packages:
+         if is_package is not None and not is_package (
+            self.distdir + os.sep + package_filename
+         ):
+            continue
+
          pkg = self._package_nofail (
             log_bad,
             filename = package_filename,
@@ -678,17 +867,11 @@ class WebsyncPackageList ( WebsyncBase ):
 
       util.dodir ( self.distdir, mkdir_p=True )
 
-      success = True
-
       if VERBOSE:
          print ( "{:d} files to consider.".format ( len(package_list) ) )
 
-      for package_file, src_uri in package_list:
-         if not self._get_package (
-            package_file, src_uri, expected_digest=None
-         ):
-            success = False
-            break
-
-      return success
+      return self._get_packages (
+         ( package_file, src_uri, None )
+         for package_file, src_uri in package_list
+      )
    # --- end of _sync_packages (...) ---
@@ -0,0 +1,147 @@
+# R overlay -- rpackage, concurrent description reading
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+"""concurrent DESCRIPTION data reading
+
+This module provides a pool that reads DESCRIPTION data from package files
+using worker processes. The workers return the (unverified) read data of
+each package file as plain dict, which can then be passed to
+PackageInfo.update_now ( desc_read_data=... ) in the main process.
+
+The worker processes are fork()ed so that they inherit the config.
+Forking is only safe if no other threads are running (a thread could hold
+a lock, e.g. a logging handler's lock, which would never be released in
+the worker process). The pool has to be run before any other threads are
+started (e.g. ebuild creation workers or resolver threads), which is
+checked when creating the worker processes.
+"""
+
+__all__ = [ 'DescriptionPool', 'HAVE_CONCURRENT_FUTURES', ]
+
+import multiprocessing
+import sys
+import threading
+
+from roverlay.util.hashpool import HAVE_CONCURRENT_FUTURES
+
+from roverlay.rpackage import descriptionreader
+
+if HAVE_CONCURRENT_FUTURES:
+   import concurrent.futures
+
+
+def _read_package_file ( job ):
+   """Reads a package file (in a worker process).
+
+   arguments:
+   * job -- 2-tuple ( package file, package name )
+   """
+   return descriptionreader.read_package_file ( *job )
+# --- end of _read_package_file (...) ---
+
+def _read_package_files ( jobs ):
+   """Reads several package files (in a worker process).
+   Returns a list of 2-tuples ( backref, read data or None ).
+
+   arguments:
+   * jobs -- list of 2-tuples ( backref, job )
+   """
+   return [ ( backref, _read_package_file ( job ) ) for backref, job in jobs ]
+# --- end of _read_package_files (...) ---
+
+
+class DescriptionPool ( object ):
+
+   # number of package files per worker process job
+   CHUNKSIZE = 16
+
+   def __init__ ( self, max_workers, use_threads=False ):
+      """Initializes a DESCRIPTION data reader pool.
+
+      arguments:
+      * max_workers -- max number of worker processes (None: cpu count)
+      * use_threads -- use threads instead of processes (defaults to False)
+      """
+      super ( DescriptionPool, self ).__init__()
+      self._jobs       = dict()
+      self.max_workers = (
+         int ( max_workers ) if max_workers is not None else max_workers
+      )
+      self.use_threads = use_threads
+   # --- end of __init__ (...) ---
+
+   def __len__ ( self ):
+      return len ( self._jobs )
+   # --- end of __len__ (...) ---
+
+   def add ( self, backref, package_file, package_name ):
+      self._jobs [backref] = ( package_file, package_name )
+   # --- end of add (...) ---
+
+   def get_executor ( self ):
+      """Returns a new executor.
+
+      Raises an AssertionError if worker processes should be used and other
+      threads are running (see the module docstring).
+      """
+      if self.use_threads:
+         return concurrent.futures.ThreadPoolExecutor ( self.max_workers )
+
+      other_threads = [
+         t.name for t in threading.enumerate()
+         if t is not threading.current_thread()
+      ]
+      if other_threads:
+         raise AssertionError (
+            "cannot fork DESCRIPTION reader processes while other threads "
+            "are running: {}".format ( ', '.join ( other_threads ) )
+         )
+
+      if sys.version_info >= ( 3, 7 ):
+         # the workers rely on the config being inherited from the
+         # main process, so fork() them
+         return concurrent.futures.ProcessPoolExecutor (
+            self.max_workers, mp_context=multiprocessing.get_context ( 'fork' )
+         )
+      else:
+         return concurrent.futures.ProcessPoolExecutor ( self.max_workers )
+   # --- end of get_executor (...) ---
+
+   def is_concurrent ( self ):
+      return HAVE_CONCURRENT_FUTURES and (
+         self.max_workers is None or self.max_workers > 0
+      )
+   # --- end of is_concurrent (...) ---
+
+   def run_as_completed ( self ):
+      """Generator that reads all package files and
+      yields 2-tuples ( backref, read data or None ) as soon as they have
+      been read (in no particular order).
+      """
+      if self.is_concurrent() and self._jobs:
+         jobs      = list ( self._jobs.items() )
+         chunksize = self.CHUNKSIZE
+
+         with self.get_executor() as exe:
+            futures = [
+               exe.submit (
+                  _read_package_files, jobs [k:k+chunksize]
+               )
+               for k in range ( 0, len ( jobs ), chunksize )
+            ]
+            for future in concurrent.futures.as_completed ( futures ):
+               for item in future.result():
+                  yield item
+      else:
+         for backref, job in self._jobs.items():
+            yield ( backref, _read_package_file ( job ) )
+   # --- end of run_as_completed (...) ---
+
+   def reset ( self ):
+      self._jobs.clear()
+   # --- end of reset (...) ---
+
+# --- end of DescriptionPool ---
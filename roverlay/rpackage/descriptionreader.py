@@ -16,11 +16,15 @@ import tarfile
 import time
 import logging
 
+import roverlay.recipe.desccache
+
 from roverlay          import config, util, strutil
 from roverlay.rpackage import descriptionfields
 
 LOG_IGNORED_FIELDS = True
 
+LOGGER = logging.getLogger ( 'DescriptionReader' )
+
 STR_FORMATTER = string.Formatter()
 
 def make_desc_packageinfo ( filepath ):
@@ -50,6 +54,12 @@ class DescriptionReader ( object ):
    WRITE_DESCFILES_DIR = None
    RE_LIST_SPLIT       = None
    RE_SLIST_SPLIT      = None
+   USE_PACKAGE_INDEX   = None
+
+   # fields that must be present in a package index entry,
+   #  else the package file is read
+   #  (the PACKAGES files of most repos don't list the title)
+   INDEX_REQUIRED_FIELDS = frozenset ({ 'Title', })
 
    @classmethod
    def _setup_cls ( cls ):
@@ -71,13 +81,46 @@ class DescriptionReader ( object ):
          config.get_or_fail ( 'DESCRIPTION.list_split_regex' )
       )
       cls.RE_SLIST_SPLIT = re.compile ( '\s+' )
+
+      cls.USE_PACKAGE_INDEX = config.get (
+         'DESCRIPTION.use_package_index', False
+      )
    # --- end of _setup_cls (...) ---
 
-   def __new__ ( cls, *args, **kwargs ):
+   @classmethod
+   def _setup_cls_if_required ( cls ):
       if cls._NEEDS_SETUP:
          cls._setup_cls()
          cls._NEEDS_SETUP = False
+   # --- end of _setup_cls_if_required (...) ---
+
+   @classmethod
+   def is_usable_index_entry ( cls, index_lines ):
+      """Returns True if a package index entry provides all
+      INDEX_REQUIRED_FIELDS, else False.
 
+      arguments:
+      * index_lines -- package index entry (list of text lines)
+      """
+      cls._setup_cls_if_required()
+
+      field_names = set()
+      for line in index_lines:
+         if line and not line [0].isspace():
+            field_name, sep, value = line.partition ( cls.FIELD_SEPARATOR )
+            if sep:
+               field_def = cls.FIELD_DEFINITION.get ( field_name )
+               if (
+                  field_def is not None
+                  and not field_def.has_flag ( 'ignore' )
+               ):
+                  field_names.add ( field_def.get_name() )
+
+      return cls.INDEX_REQUIRED_FIELDS.issubset ( field_names )
+   # --- end of is_usable_index_entry (...) ---
+
+   def __new__ ( cls, *args, **kwargs ):
+      cls._setup_cls_if_required()
       return super ( DescriptionReader, cls ).__new__ ( cls )
    # --- end of __new__ (...) ---
 
@@ -325,24 +368,33 @@ class DescriptionReader ( object ):
          del fh, th
 
       if read_lines and self.write_desc_file is not None:
-         fh = None
-         try:
-            util.dodir ( DescriptionReader.WRITE_DESCFILES_DIR )
-            fh = open ( self.write_desc_file, 'w' )
-            fh.write (
-               '=== This is debug output ({date}) ===\n'.format (
-                  date=time.strftime ( '%F %H:%M:%S' )
-            ) )
-            fh.write ( '\n'.join ( read_lines ) )
-            fh.write ( '\n' )
-         finally:
-            if fh:
-               fh.close()
+         self._write_desc_lines ( read_lines )
 
       return read_lines
 
    # --- end of _get_desc_from_file (...) ---
 
+   def _write_desc_lines ( self, desc_lines ):
+      """Writes description data to the debug output file.
+
+      arguments:
+      * desc_lines -- text lines
+      """
+      fh = None
+      try:
+         util.dodir ( DescriptionReader.WRITE_DESCFILES_DIR )
+         fh = open ( self.write_desc_file, 'w' )
+         fh.write (
+            '=== This is debug output ({date}) ===\n'.format (
+               date=time.strftime ( '%F %H:%M:%S' )
+         ) )
+         fh.write ( '\n'.join ( desc_lines ) )
+         fh.write ( '\n' )
+      finally:
+         if fh:
+            fh.close()
+   # --- end of _write_desc_lines (...) ---
+
    def _get_raw_data ( self, desc_lines ):
       raw = dict()
 
@@ -469,13 +521,56 @@ class DescriptionReader ( object ):
       #return raw or None
    # --- end of _get_raw_data (...) ---
 
-   def run ( self ):
+   def read_package_file ( self, filepath, pkg_name ):
+      """Reads a package file and returns its (unverified) read data
+      if successful, else None.
+
+      arguments:
+      * filepath -- path to the package file
+      * pkg_name -- name of the package
+      """
+      try:
+         desc_lines = self._get_desc_from_file ( filepath, pkg_name )
+      except Exception as err:
+         #self.logger.exception ( err )
+         # error message should suffice
+         self.logger.warning ( err )
+      else:
+         if desc_lines is not None:
+            return self._make_read_data ( self._get_raw_data ( desc_lines ) )
+
+      return None
+   # --- end of read_package_file (...) ---
+
+   def read_package_index_entry ( self ):
+      """Returns the (unverified) read data of the package's entry in its
+      repo's package index, or None if there's no usable entry."""
+      index_lines = get_usable_package_index_entry ( self.fileinfo )
+      if index_lines is None:
+         return None
+
+      raw = self._get_raw_data ( index_lines )
+      if not raw:
+         return None
+
+      if self.write_desc_file is not None:
+         self._write_desc_lines ( index_lines )
+
+      return self._make_read_data ( raw )
+   # --- end of read_package_index_entry (...) ---
+
+   def run ( self, read_data=None ):
       """Reads a DESCRIPTION file and returns the read data if successful,
       else None.
 
       arguments:
-      * file -- path to the tarball file (containing the description file)
-                that should be read
+      * read_data -- read data that has already been created for the
+                     package file, e.g. by a worker process (optional).
+                     The package file is not read if this is set.
+
+      If DESCRIPTION.use_package_index is enabled, the package's entry
+      in its repo's PACKAGES file is used in place of the DESCRIPTION file
+      (if there's an entry that provides all INDEX_REQUIRED_FIELDS).
 
       It does some pre-parsing, inter alia
       -> assigning field identifiers from the file to real field names
@@ -486,21 +581,50 @@ class DescriptionReader ( object ):
       are "useless" (not suited to create an ebuild for it,
       e.g. if OS_TYPE is not unix).
       """
-      read_data = None
-      try:
-         desc_lines = self._get_desc_from_file (
-            self.fileinfo ['package_file'],
-            self.fileinfo ['package_name']
+      # the desc cache is bypassed if desc files should be written
+      if self.write_desc_file is None:
+         desc_cache = roverlay.recipe.desccache.access()
+      else:
+         desc_cache = None
+
+      if read_data is None and self.USE_PACKAGE_INDEX:
+         index_data = self.read_package_index_entry()
+      else:
+         index_data = None
+
+      if index_data is not None:
+         # not cached, the package index is kept in memory
+         self.logger.debug (
+            STR_FORMATTER.vformat (
+               "Using package index entry for file {package_file!r}.",
+               (), self.fileinfo
+            )
          )
-      except Exception as err:
-         #self.logger.exception ( err )
-         # error message should suffice
-         self.logger.warning ( err )
+         read_data = index_data
+
+      elif read_data is not None:
+         if desc_cache is not None:
+            desc_cache.store ( self.fileinfo, read_data )
+
       else:
-         if desc_lines is not None:
-            raw_data  = self._get_raw_data ( desc_lines )
-            read_data = self._make_read_data ( raw_data )
+         if desc_cache is not None:
+            read_data = desc_cache.lookup ( self.fileinfo )
+
+         if read_data is not None:
+            self.logger.debug (
+               STR_FORMATTER.vformat (
+                  "Using cached data for file {package_file!r}.",
+                  (), self.fileinfo
+               )
+            )
 
+         else:
+            read_data = self.read_package_file (
+               self.fileinfo ['package_file'], self.fileinfo ['package_name']
+            )
+
+            if read_data is not None and desc_cache is not None:
+               desc_cache.store ( self.fileinfo, read_data )
 
 
       self.desc_data = None
@@ -528,10 +652,78 @@ class DescriptionReader ( object ):
 # --- end of DescriptionReader ---
 
 
-def read ( package_info, logger=None ):
-   return DescriptionReader (
+def get_package_index_entry ( package_info ):
+   """Returns the entry of a package file in its repo's package index
+   (as list of text lines), or None if there's no such entry.
+
+   arguments:
+   * package_info --
+   """
+   try:
+      repo             = package_info ['origin']
+      package_filename = package_info ['package_filename']
+   except KeyError:
+      return None
+
+   if repo is None or not hasattr ( repo, 'get_package_index_entry' ):
+      return None
+   else:
+      return repo.get_package_index_entry ( package_filename )
+# --- end of get_package_index_entry (...) ---
+
+def get_usable_package_index_entry ( package_info ):
+   """Returns the entry of a package file in its repo's package index
+   if it provides all fields required for reading the DESCRIPTION data
+   from it (see DescriptionReader.INDEX_REQUIRED_FIELDS), else None.
+
+   arguments:
+   * package_info --
+   """
+   index_lines = get_package_index_entry ( package_info )
+   if (
+      index_lines is None
+      or not DescriptionReader.is_usable_index_entry ( index_lines )
+   ):
+      return None
+   else:
+      return index_lines
+# --- end of get_usable_package_index_entry (...) ---
+
+def has_package_index_entry ( package_info ):
+   """Returns True if the DESCRIPTION data of a package can (probably) be
+   read from its repo's package index, else False.
+
+   arguments:
+   * package_info --
+   """
+   return bool (
+      config.get ( 'DESCRIPTION.use_package_index', False )
+      and get_usable_package_index_entry ( package_info ) is not None
+   )
+# --- end of has_package_index_entry (...) ---
+
+def read ( package_info, logger=None, read_data=None ):
+   reader = DescriptionReader (
       package_info = package_info,
       logger       = logger or package_info.logger,
-      read_now     = True
-   ).get_desc ( run_if_unset=False )
+      read_now     = False
+   )
+   reader.run ( read_data=read_data )
+   return reader.get_desc ( run_if_unset=False )
 # --- end of read (...) ---
+
+def read_package_file ( package_file, package_name ):
+   """Reads a package file and returns its (unverified) DESCRIPTION data,
+   or None if the file could not be read.
+
+   The returned data can be passed to read() later on. This function is
+   meant to be run in worker processes.
+
+   arguments:
+   * package_file -- path to the package file
+   * package_name -- name of the package
+   """
+   return DescriptionReader (
+      None, LOGGER, read_now=False, write_desc=False
+   ).read_package_file ( package_file, package_name )
+# --- end of read_package_file (...) ---
@@ -17,7 +17,9 @@ import roverlay.fsutil
 import roverlay.hook
 import roverlay.remote.repolist
 import roverlay.stats.collector
+import roverlay.util.hashpool
 import roverlay.util.objects
+import roverlay.recipe.digeststore
 import roverlay.recipe.easylogger
 
 import roverlay.packagerules.generators.addition_control
@@ -201,6 +203,21 @@ class RuntimeEnvironment ( RuntimeEnvironmentBase ):
             incremental             = self.options ['incremental'],
             allow_write             = self.options ['write_overlay'],
             immediate_ebuild_writes = self.options ['immediate_ebuild_writes'],
+            desc_cache              = self.options ['desc_cache'],
+            rebuild_desc_cache      = self.options ['rebuild_desc_cache'],
+            stream                  = self.options ['stream'],
+            paranoid_revbump        = self.options ['paranoid_revbump'],
+            scan_index              = self.options ['scan_index'],
+            rebuild_scan_index      = self.options ['rebuild_scan_index'],
+            write_index             = self.options ['write_index'],
+            rebuild_write_index     = self.options ['rebuild_write_index'],
+            change_journal          = (
+               self.options ['change_journal']
+               or self.options ['sync_changes_only']
+            ),
+            rebuild_change_journal  = (
+               self.options ['rebuild_change_journal']
+            ),
             repo_id_map = self.get_repo_list().create_repo_identifier_map(),
          )
       return self._overlay_creator
@@ -295,6 +312,10 @@ class RuntimeEnvironment ( RuntimeEnvironmentBase ):
 
       self.stats_db_file = self.config.get ( 'STATS.dbfile', None )
 
+      roverlay.util.hashpool.set_default_digest_backend (
+         self.config.get ( 'DIGEST.backend', None )
+      )
+
       # want_logging <=> <have a command that uses hooks>
       if self.options ['want_logging']:
          roverlay.hook.setup()
@@ -322,6 +343,37 @@ class RuntimeEnvironment ( RuntimeEnvironmentBase ):
          return False
    # --- end of setup_database (...) ---
 
+   def setup_digest_store ( self ):
+      """Creates the digest store (if enabled).
+
+      The digest store is not used in paranoid revbump mode, which must not
+      trust the file stat info.
+
+      Returns True if the digest store has been created, else False.
+      """
+      if self.options ['paranoid_revbump']:
+         return False
+      elif (
+         self.options ['digest_store'] or self.options ['rebuild_digest_store']
+      ):
+         roverlay.recipe.digeststore.setup (
+            rebuild=self.options ['rebuild_digest_store']
+         )
+         return True
+      else:
+         return False
+   # --- end of setup_digest_store (...) ---
+
+   def write_digest_store ( self ):
+      """Writes the digest store (if enabled and modified)."""
+      digest_store = roverlay.recipe.digeststore.access()
+      if digest_store is not None:
+         digest_store.write()
+         return True
+      else:
+         return False
+   # --- end of write_digest_store (...) ---
+
    def write_database ( self, hook_event=True ):
       if self.stats_db_file and self.want_db_commit:
          self.stats.write_database()
@@ -196,6 +196,14 @@ class TimeStats ( RoverlayStats ):
       return item
    # --- end of end (...) ---
 
+   def add ( self, key, t_begin, t_end ):
+      """Adds a time stats item for a begin/end time pair that has been
+      measured elsewhere (e.g. in another thread)."""
+      item = TimeStatsItem ( t_begin=t_begin, t_end=t_end )
+      self._timestats [key] = item
+      return item
+   # --- end of add (...) ---
+
    def get_total ( self ):
       return float (
          sum ( filter (
@@ -56,6 +56,69 @@ class DistmapStats ( abstract.RoverlayStats ):
 # --- end of DistmapStats ---
 
 
+class DepresStats ( abstract.RoverlayStats ):
+
+   DESCRIPTION = "dependency resolution"
+
+   _MEMBERS = (
+      'cache_hits', 'cache_misses', 'parse_cache_hits', 'parse_cache_misses',
+   )
+
+   def __init__ ( self ):
+      super ( DepresStats, self ).__init__()
+      self.cache_hits         = abstract.Counter ( "cache hits" )
+      self.cache_misses       = abstract.Counter ( "cache misses" )
+      # dependency string parsing (see depenv.DepEnvCache)
+      self.parse_cache_hits   = abstract.Counter ( "parse cache hits" )
+      self.parse_cache_misses = abstract.Counter ( "parse cache misses" )
+   # --- end of __init__ (...) ---
+
+   def has_changes ( self ):
+      return False
+   # --- end of has_changes (...) ---
+
+# --- end of DepresStats ---
+
+
+class DescriptionCacheStats ( abstract.RoverlayStats ):
+
+   DESCRIPTION = "DESCRIPTION data cache"
+
+   _MEMBERS = ( 'cache_hits', 'cache_misses', )
+
+   def __init__ ( self ):
+      super ( DescriptionCacheStats, self ).__init__()
+      self.cache_hits   = abstract.Counter ( "cache hits" )
+      self.cache_misses = abstract.Counter ( "cache misses" )
+   # --- end of __init__ (...) ---
+
+   def has_changes ( self ):
+      return False
+   # --- end of has_changes (...) ---
+
+# --- end of DescriptionCacheStats ---
+
+
+class WriteIndexStats ( abstract.RoverlayStats ):
+
+   DESCRIPTION = "overlay file writes"
+
+   _MEMBERS = ( 'files_written', 'files_unchanged', )
+
+   def __init__ ( self ):
+      super ( WriteIndexStats, self ).__init__()
+      # both counters have per-filetype details (ebuild, metadata, Manifest)
+      self.files_written   = abstract.DetailedCounter ( "written" )
+      self.files_unchanged = abstract.DetailedCounter ( "unchanged" )
+   # --- end of __init__ (...) ---
+
+   def has_changes ( self ):
+      return False
+   # --- end of has_changes (...) ---
+
+# --- end of WriteIndexStats ---
+
+
 class OverlayCreationWorkerStats ( abstract.RoverlayStats ):
 
    _MEMBERS = ( 'pkg_processed', 'pkg_fail', 'pkg_success', )
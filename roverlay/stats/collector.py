@@ -20,7 +20,10 @@ class StatsCollector ( abstract.RoverlayStatsBase ):
 
    _instance = None
 
-   _MEMBERS  = ( 'time', 'repo', 'distmap', 'overlay_creation', 'overlay', )
+   _MEMBERS  = (
+      'time', 'repo', 'distmap', 'depres', 'desc_cache', 'overlay_creation',
+      'overlay', 'write_index',
+   )
 
    @classmethod
    def get_instance ( cls ):
@@ -74,7 +77,10 @@ class StatsCollector ( abstract.RoverlayStatsBase ):
 
       self.time             = abstract.TimeStats ( "misc time stats" )
       self.distmap          = base.DistmapStats()
+      self.depres           = base.DepresStats()
+      self.desc_cache       = base.DescriptionCacheStats()
       self.overlay          = base.OverlayStats()
+      self.write_index      = base.WriteIndexStats()
       self.overlay_creation = base.OverlayCreationStats()
       self.repo             = base.RepoStats()
       self.db_collector     = None
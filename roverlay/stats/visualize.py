@@ -41,6 +41,10 @@ class CreationStatsVisualizer ( StatsVisualizer ):
       pkg_success  = self.stats.overlay_creation.pkg_success
       ebuild_delta = self.stats.get_net_gain()
       revbumps     = self.stats.overlay.revbump_count
+      files_written   = self.stats.write_index.files_written
+      files_unchanged = self.stats.write_index.files_unchanged
+      parse_hits      = self.stats.depres.parse_cache_hits
+      parse_misses    = self.stats.depres.parse_cache_misses
 
       max_number_len = min (
          len ( str ( int ( k ) ) ) for k in (
@@ -96,6 +100,22 @@ class CreationStatsVisualizer ( StatsVisualizer ):
             e=ebuild_delta, r=int ( revbumps )
          )
       )
+      if files_written or files_unchanged:
+         append (
+            "{w:d} files written, {u:d} unchanged files skipped".format (
+               w=int ( files_written ), u=int ( files_unchanged )
+            )
+         )
+      if parse_hits or parse_misses:
+         append (
+            "{n:d} dependency strings parsed "
+            "({r:.2%} parse cache hits)".format (
+               n=int ( parse_misses ),
+               r=float ( int ( parse_hits ) ) / (
+                  int ( parse_hits ) + int ( parse_misses )
+               )
+            )
+         )
       append ( EMPTY_LINE )
 
       if int ( pkg_count ) != int ( pkg_queued ):
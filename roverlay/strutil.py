@@ -8,10 +8,17 @@
 
 __all__ = [ 'ascii_filter', 'bytes_try_decode', 'fix_ebuild_name',
    'pipe_lines', 'shorten_str', 'unquote', 'unquote_all', 'foreach_str',
-   'str_to_bool',
+   'str_to_bool', 'intern_str',
 ]
 
 import re
+import sys
+
+try:
+   _intern = sys.intern
+except AttributeError:
+   # python 2
+   _intern = intern
 
 _DEFAULT_ENCODINGS = ( 'utf-8', 'ascii', 'iso8859_15', 'utf-16', 'latin_1' )
 
@@ -34,6 +41,16 @@ def fix_ebuild_name ( name ):
    )
 # --- end of fix_ebuild_name (...) ---
 
+def intern_str ( s ):
+   """Returns the interned version of the given str so that equal strings
+   share one object (e.g. category and repo names).
+
+   arguments:
+   * s -- str or None
+   """
+   return None if s is None else _intern ( s )
+# --- end of intern_str (...) ---
+
 def ascii_filter ( _str, additional_filter=None ):
    """Removes all non-ascii chars from a string and returns the result.
 
@@ -12,6 +12,7 @@ __all__= [
    'get_dict_hash', 'keepenv', 'keepenv_v',
    'priosort', 'sysnop', 'getsize', 'is_vcs_dir', 'is_not_vcs_dir',
     'headtail', 'try_unlink', 'get_pwd_info', 'get_home_dir',
+   'get_file_stat_key',
 ]
 
 
@@ -310,6 +311,29 @@ def getsize ( filepath ):
    return os.stat ( filepath ).st_size
 # --- end of getsize (...) ---
 
+def get_file_stat_key ( filepath ):
+   """Returns a str that identifies the current state of a file
+   (device, inode, size and mtime in nanoseconds), or None if the file
+   cannot be stat'ed.
+
+   arguments:
+   * filepath --
+   """
+   try:
+      sb = os.stat ( filepath )
+   except OSError:
+      return None
+
+   mtime_ns = getattr ( sb, 'st_mtime_ns', None )
+   if mtime_ns is None:
+      # python < 3.3
+      mtime_ns = int ( sb.st_mtime * 1000000000 )
+
+   return "{:d},{:d},{:d},{:d}".format (
+      sb.st_dev, sb.st_ino, sb.st_size, mtime_ns
+   )
+# --- end of get_file_stat_key (...) ---
+
 def is_vcs_dir ( dirpath ):
    """Returns True if dirpath could be a directory maintained by a version
    control system, e.g. git.
@@ -24,8 +24,244 @@ else:
    HAVE_CONCURRENT_FUTURES = True
 
 
+import multiprocessing
+
 import roverlay.digest
 
+
+def _hash_file ( job ):
+   """Calculates the digests of a file (in a worker thread or process).
+
+   arguments:
+   * job -- 2-tuple ( filepath, digest types )
+   """
+   filepath, digest_types = job
+   return roverlay.digest.multihash_file ( filepath, digest_types )
+# --- end of _hash_file (...) ---
+
+
+class DigestBackend ( object ):
+   """A digest backend calculates the digests of many files ("batch").
+
+   This base class reads the files one after another
+   in the calling thread.
+   """
+
+   NAME = 'inline'
+
+   def __init__ ( self, max_workers ):
+      """Initializes a digest backend.
+
+      arguments:
+      * max_workers -- max number of worker threads/processes,
+                       None means "number of processors"
+      """
+      super ( DigestBackend, self ).__init__()
+      self.max_workers = max_workers
+   # --- end of __init__ (...) ---
+
+   def is_concurrent ( self ):
+      return False
+   # --- end of is_concurrent (...) ---
+
+   def get_executor ( self ):
+      raise NotImplementedError()
+   # --- end of get_executor (...) ---
+
+   def map_jobs ( self, exe, jobs ):
+      """Submits hash jobs to an executor and returns an iterator over
+      the results, in order.
+
+      arguments:
+      * exe  -- executor, see get_executor()
+      * jobs -- list of 2-tuples ( filepath, digest types )
+      """
+      return exe.map ( _hash_file, jobs )
+   # --- end of map_jobs (...) ---
+
+   def hash_files ( self, jobs ):
+      """Generator that calculates the digests of the given files and
+      yields one hashdict per job, in order.
+
+      arguments:
+      * jobs -- list of 2-tuples ( filepath, digest types )
+      """
+      if self.is_concurrent() and len ( jobs ) > 1:
+         with self.get_executor() as exe:
+            for hashdict in self.map_jobs ( exe, jobs ):
+               yield hashdict
+      else:
+         for job in jobs:
+            yield _hash_file ( job )
+   # --- end of hash_files (...) ---
+
+# --- end of DigestBackend ---
+
+
+class ThreadDigestBackend ( DigestBackend ):
+   """Calculates digests in worker threads.
+
+   This is suitable for hashlib digests, which release the GIL while
+   hashing, but not for pure-python implementations.
+   """
+
+   NAME = 'thread'
+
+   def is_concurrent ( self ):
+      return HAVE_CONCURRENT_FUTURES and (
+         self.max_workers is None or self.max_workers > 0
+      )
+   # --- end of is_concurrent (...) ---
+
+   def get_executor ( self ):
+      return concurrent.futures.ThreadPoolExecutor (
+         self.max_workers or multiprocessing.cpu_count()
+      )
+   # --- end of get_executor (...) ---
+
+# --- end of ThreadDigestBackend ---
+
+
+class ProcessDigestBackend ( ThreadDigestBackend ):
+   """Calculates digests in worker processes, which allows to run slow
+   (pure-python) digest implementations in parallel.
+
+   Jobs are sent to the workers in chunks, so that each worker process
+   gets about CHUNKS_PER_WORKER chunks. Falls back to threads if worker
+   processes are not supported (e.g. if /dev/shm is not available).
+   """
+
+   NAME              = 'process'
+   CHUNKS_PER_WORKER = 4
+
+   def get_executor ( self ):
+      try:
+         return concurrent.futures.ProcessPoolExecutor ( self.max_workers )
+      except ( OSError, NotImplementedError ):
+         # worker processes are not supported, use threads
+         return super ( ProcessDigestBackend, self ).get_executor()
+   # --- end of get_executor (...) ---
+
+   def get_chunksize ( self, num_jobs ):
+      """Returns the number of jobs that should be sent to a worker process
+      at once.
+
+      arguments:
+      * num_jobs --
+      """
+      num_workers = self.max_workers or multiprocessing.cpu_count()
+      return max ( 1, num_jobs // ( num_workers * self.CHUNKS_PER_WORKER ) )
+   # --- end of get_chunksize (...) ---
+
+   def map_jobs ( self, exe, jobs ):
+      return exe.map (
+         _hash_file, jobs, chunksize=self.get_chunksize ( len ( jobs ) )
+      )
+   # --- end of map_jobs (...) ---
+
+# --- end of ProcessDigestBackend ---
+
+
+class AutoDigestBackend ( ThreadDigestBackend ):
+   """Calculates digests in worker threads, except for files that need
+   slow digests (see roverlay.digest.SLOW_DIGEST_TYPES), which are
+   hashed in worker processes at the same time.
+   """
+
+   NAME = 'auto'
+
+   # min number of slow jobs required for starting worker processes
+   MIN_PROCESS_JOBS = 2
+
+   def __init__ ( self, max_workers ):
+      super ( AutoDigestBackend, self ).__init__ ( max_workers )
+      self.thread_backend  = ThreadDigestBackend ( max_workers )
+      self.process_backend = ProcessDigestBackend ( max_workers )
+   # --- end of __init__ (...) ---
+
+   def _hash_files_split ( self, proc_exe, jobs, is_slow ):
+      with proc_exe, self.thread_backend.get_executor() as thread_exe:
+         slow_results = self.process_backend.map_jobs (
+            proc_exe, [ job for job, slow in zip ( jobs, is_slow ) if slow ]
+         )
+         fast_results = self.thread_backend.map_jobs (
+            thread_exe,
+            [ job for job, slow in zip ( jobs, is_slow ) if not slow ]
+         )
+
+         for slow in is_slow:
+            yield next ( slow_results if slow else fast_results )
+   # --- end of _hash_files_split (...) ---
+
+   def hash_files ( self, jobs ):
+      slow_types = roverlay.digest.SLOW_DIGEST_TYPES
+      is_slow    = [ not slow_types.isdisjoint ( job[1] ) for job in jobs ]
+
+      if not self.is_concurrent() or sum ( is_slow ) < self.MIN_PROCESS_JOBS:
+         return self.thread_backend.hash_files ( jobs )
+      else:
+         return self._hash_files_split (
+            self.process_backend.get_executor(), jobs, is_slow
+         )
+   # --- end of hash_files (...) ---
+
+# --- end of AutoDigestBackend ---
+
+
+# map: backend name => digest backend class
+DIGEST_BACKENDS = {
+   cls.NAME: cls for cls in (
+      DigestBackend, ThreadDigestBackend,
+      ProcessDigestBackend, AutoDigestBackend,
+   )
+}
+
+DEFAULT_DIGEST_BACKEND = AutoDigestBackend.NAME
+
+def set_default_digest_backend ( name ):
+   """Sets the digest backend that is used by hash pools by default.
+
+   arguments:
+   * name -- backend name, None resets the default backend
+   """
+   global DEFAULT_DIGEST_BACKEND
+
+   if name is None:
+      DEFAULT_DIGEST_BACKEND = AutoDigestBackend.NAME
+   elif name in DIGEST_BACKENDS:
+      DEFAULT_DIGEST_BACKEND = name
+   else:
+      raise ValueError ( "unknown digest backend: {!r}".format ( name ) )
+# --- end of set_default_digest_backend (...) ---
+
+def register_digest_backend ( backend_cls, name=None ):
+   """Makes a digest backend available by name (see get_digest_backend()).
+
+   arguments:
+   * backend_cls -- digest backend class (derived from DigestBackend)
+   * name        -- backend name. Defaults to None (backend_cls.NAME)
+   """
+   DIGEST_BACKENDS [backend_cls.NAME if name is None else name] = (
+      backend_cls
+   )
+# --- end of register_digest_backend (...) ---
+
+def get_digest_backend ( name, max_workers ):
+   """Creates and returns a digest backend.
+
+   arguments:
+   * name        -- backend name, None means DEFAULT_DIGEST_BACKEND
+   * max_workers -- max number of worker threads/processes
+   """
+   backend_cls = DIGEST_BACKENDS.get (
+      DEFAULT_DIGEST_BACKEND if name is None else name
+   )
+   if backend_cls is None:
+      raise ValueError ( "unknown digest backend: {!r}".format ( name ) )
+   return backend_cls ( max_workers )
+# --- end of get_digest_backend (...) ---
+
+
 class HashFunction ( object ):
 
    def __init__ ( self, hashes ):
@@ -34,7 +270,7 @@ class HashFunction ( object ):
    # --- end of __init__ (...) ---
 
    def multihash_file ( self, filepath ):
-      return roverlay.digest.multihash_file ( filepath, self.hashes )
+      return roverlay.digest.get_file_digests ( filepath, self.hashes )
    # --- end of multihash_file (...) ---
 
    def calculate ( self, hash_job ):
@@ -65,18 +301,37 @@ class HashJob ( object ):
 
 
 class HashPool ( object ):
-   def __init__ ( self, hashes, max_workers, use_threads=None ):
+   def __init__ ( self, hashes, max_workers, use_threads=None, backend=None ):
+      """Initializes a hash pool.
+
+      arguments:
+      * hashes      -- digest types that should be calculated
+      * max_workers -- max number of worker threads/processes
+      * use_threads -- whether to use threads (True), processes (False)
+                       or the default digest backend (None).
+                       Ignored if backend is set. Defaults to None.
+      * backend     -- digest backend or backend name. Defaults to None.
+      """
       super ( HashPool, self ).__init__()
+      self.hashes      = frozenset ( hashes )
       self.hashfunc    = HashFunction ( hashes )
       self._jobs       = dict()
       self.max_workers = (
          int ( max_workers ) if max_workers is not None else max_workers
       )
 
-      if use_threads or use_threads is None:
-         self.executor_cls = concurrent.futures.ThreadPoolExecutor
+      if backend is None:
+         if use_threads is None:
+            backend = DEFAULT_DIGEST_BACKEND
+         elif use_threads:
+            backend = ThreadDigestBackend.NAME
+         else:
+            backend = ProcessDigestBackend.NAME
+
+      if isinstance ( backend, DigestBackend ):
+         self.backend = backend
       else:
-         self.executor_cls = concurrent.futures.ProcessPoolExecutor
+         self.backend = get_digest_backend ( backend, self.max_workers )
    # --- end of __init__ (...) ---
 
    def add ( self, backref, filepath, hashdict=None ):
@@ -93,49 +348,58 @@ class HashPool ( object ):
          self._jobs [backref] = HashJob ( filepath, hashdict )
    # --- end of extend_with_hashdict (...) ---
 
-   def get_executor ( self ):
-      return self.executor_cls ( self.max_workers )
-   # --- end of get_executor (...) ---
-
    def is_concurrent ( self ):
-      return HAVE_CONCURRENT_FUTURES and (
-         self.max_workers is None or self.max_workers > 0
-      )
+      return self.backend.is_concurrent()
    # --- end of is_concurrent (...) ---
 
    def run_as_completed ( self ):
-      if self.is_concurrent():
-         with self.get_executor() as exe:
-            for backref, hash_job in zip (
-               self._jobs.keys(),
-               exe.map ( self.hashfunc, self._jobs.values() )
-            ):
-               yield ( backref, hash_job.hashdict )
-      else:
-         for backref, hash_job in self._jobs.items():
-            self.hashfunc.calculate ( hash_job )
+      """Generator that calculates all missing digests and
+      yields 2-tuples ( backref, hashdict ).
+
+      Known digests are looked up in the digest store in the calling
+      thread, only files with missing digests are passed to the backend.
+      """
+      # jobs whose file has to be read,
+      #  list of 5-tuples ( backref, hash_job, requested, known, stat_key )
+      pending = list()
+      # list of 2-tuples ( filepath, missing digest types )
+      file_jobs = list()
+
+      for backref, hash_job in self._jobs.items():
+         requested = self.hashes.difference ( hash_job.hashdict )
+         if requested:
+            stat_key, known, missing = roverlay.digest.lookup_file_digests (
+               hash_job.filepath, requested
+            )
+         else:
+            known = missing = None
+
+         if missing:
+            pending.append (
+               ( backref, hash_job, requested, known, stat_key )
+            )
+            file_jobs.append ( ( hash_job.filepath, missing ) )
+         else:
+            for h in requested:
+               hash_job.hashdict [h] = known [h]
             yield ( backref, hash_job.hashdict )
+
+      for new_hashes, job_info in zip (
+         self.backend.hash_files ( file_jobs ), pending
+      ):
+         backref, hash_job, requested, known, stat_key = job_info
+         roverlay.digest.store_file_digests (
+            stat_key, hash_job.filepath, new_hashes
+         )
+         # digests that are already known (digest store) are not missing
+         for h in requested:
+            hash_job.hashdict [h] = new_hashes.get ( h ) or known [h]
+         yield ( backref, hash_job.hashdict )
    # --- end of run_as_completed (...) ---
 
    def run ( self ):
-      if self.is_concurrent():
-         with self.get_executor() as exe:
-            running_jobs =  frozenset (
-               exe.submit ( self.hashfunc, job )
-               for job in self._jobs.values()
-            )
-
-            # wait
-            for finished_job in (
-               concurrent.futures.as_completed ( running_jobs )
-            ):
-               if finished_job.exception() is not None:
-                  raise finished_job.exception()
-               elif finished_job.cancelled():
-                  break
-      else:
-         for hash_job in self._jobs.values():
-            self.hashfunc.calculate ( hash_job )
+      for backref, hashdict in self.run_as_completed():
+         pass
    # --- end of run (...) ---
 
    def reset ( self ):
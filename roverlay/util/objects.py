@@ -272,6 +272,10 @@ def not_implemented ( func=None, **kwargs ):
 
 class Referenceable ( object ):
 
+   # derived classes that declare __slots__ have to provide
+   #  '_cached_selfref' and '__weakref__'
+   __slots__ = ()
+
    CACHE_REF = False
 
    def __init__ ( self, *args, **kwargs ):
@@ -283,10 +287,8 @@ class Referenceable ( object ):
    # --- end of __init__ (...) ---
 
    def cache_ref ( self ):
-      """Creates a cached reference and sets get_ref() so that the cached ref
-      is returned (when called)."""
+      """Creates a cached reference that is returned by get_ref()."""
       self._cached_selfref = self.get_new_ref()
-      self.get_ref = self._get_cached_ref
    # --- end of cache_ref (...) ---
 
    def _get_cached_ref ( self ):
@@ -299,8 +301,11 @@ class Referenceable ( object ):
       return SafeWeakRef ( self )
    # --- end of get_new_ref (...) ---
 
-   # initially, get_ref() is get_new_ref()
-   get_ref = get_new_ref
+   def get_ref ( self ):
+      """Returns the cached reference if there is one, else a new one."""
+      ref = self._cached_selfref
+      return self.get_new_ref() if ref is None else ref
+   # --- end of get_ref (...) ---
 
 # --- end of Referenceable ---
 
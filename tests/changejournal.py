@@ -0,0 +1,197 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+import roverlay.db.changejournal
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( ChangeJournalTestCase )
+
+
+class ChangeJournalTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [
+      'unchanged', 'reverse_selfdeps', 'removed', 'fingerprint',
+      'same_size_rewrite', 'ebuild_removed', 'package_files',
+   ]
+
+   # package name => ( names of packages it depends on, failed )
+   PACKAGES = {
+      'a' : ( (),           False ),
+      'b' : ( ( 'a', ),     False ),
+      'c' : ( ( 'b', ),     False ),
+      'd' : ( ( 'e', ),     False ),
+      'e' : ( (),           True  ),
+      'f' : ( (),           False ),
+   }
+
+   def setUp ( self ):
+      self.tmpdir = tempfile.mkdtemp()
+      self.distdir = self.tmpdir + os.sep + 'distfiles'
+      self.ebuild_dir = self.tmpdir + os.sep + 'overlay'
+      self.journal_file = self.tmpdir + os.sep + 'journal'
+      os.mkdir ( self.distdir )
+      os.mkdir ( self.ebuild_dir )
+      for name in self.PACKAGES:
+         self.write_package_file ( name, name )
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def get_package_file ( self, name ):
+      return self.distdir + os.sep + name + '_1.0.tar.gz'
+   # --- end of get_package_file (...) ---
+
+   def write_package_file ( self, name, content ):
+      with open ( self.get_package_file ( name ), 'wt' ) as FH:
+         FH.write ( content )
+   # --- end of write_package_file (...) ---
+
+   def get_ebuild_file ( self, name ):
+      return self.ebuild_dir + os.sep + name + '-1.0.ebuild'
+   # --- end of get_ebuild_file (...) ---
+
+   def get_package_files ( self ):
+      return sorted (
+         self.distdir + os.sep + f for f in os.listdir ( self.distdir )
+      )
+   # --- end of get_package_files (...) ---
+
+   def run_journal ( self, fingerprint='fp', package_files=None ):
+      """Processes all package files that are not unchanged.
+      Returns the set of processed package names.
+      """
+      journal = roverlay.db.changejournal.ChangeJournal (
+         self.journal_file, journal_compression=None
+      )
+      if package_files is None:
+         package_files = self.get_package_files()
+      journal.prepare ( fingerprint, package_files )
+      self.assertEqual (
+         journal.get_changed_files(),
+         {
+            f for f in package_files
+            if os.path.isfile ( f ) and not journal.is_unchanged ( f )
+         }
+      )
+
+      processed = set()
+      for package_file in package_files:
+         if not journal.is_unchanged ( package_file ):
+            name = journal.get_package_name ( package_file )
+            processed.add ( name )
+            depnames, failed = self.PACKAGES [name]
+            if failed:
+               ebuild_file = None
+            else:
+               ebuild_file = self.get_ebuild_file ( name )
+               with open ( ebuild_file, 'wt' ) as FH:
+                  FH.write ( name )
+
+            journal.record (
+               package_file, failed, depnames, ebuild_file=ebuild_file
+            )
+
+      journal.write()
+      return processed
+   # --- end of run_journal (...) ---
+
+   def test_unchanged ( self ):
+      self.assertEqual ( self.run_journal(), set ( self.PACKAGES ) )
+      self.assertEqual ( self.run_journal(), set() )
+   # --- end of test_unchanged (...) ---
+
+   def test_reverse_selfdeps ( self ):
+      self.run_journal()
+
+      # b, c depend on a (c indirectly)
+      self.write_package_file ( 'a', 'a, modified' )
+      self.assertEqual ( self.run_journal(), { 'a', 'b', 'c' } )
+
+      # d depends on e, e failed => process e, too
+      self.write_package_file ( 'd', 'd, modified' )
+      self.assertEqual ( self.run_journal(), { 'd', 'e' } )
+   # --- end of test_reverse_selfdeps (...) ---
+
+   def test_removed ( self ):
+      self.run_journal()
+
+      os.unlink ( self.get_package_file ( 'b' ) )
+      self.write_package_file ( 'b_2.0', 'b' )
+      self.assertEqual ( self.run_journal(), { 'b', 'c' } )
+      self.assertEqual ( self.run_journal(), set() )
+   # --- end of test_removed (...) ---
+
+   def test_fingerprint ( self ):
+      self.run_journal()
+      self.assertEqual (
+         self.run_journal ( fingerprint='other' ), set ( self.PACKAGES )
+      )
+   # --- end of test_fingerprint (...) ---
+
+   def test_same_size_rewrite ( self ):
+      package_file = self.get_package_file ( 'f' )
+
+      os.utime ( package_file, ( 1000.25, 1000.25 ) )
+      self.run_journal()
+
+      # same size, same mtime second
+      self.write_package_file ( 'f', 'g' )
+      os.utime ( package_file, ( 1000.5, 1000.5 ) )
+      self.assertEqual ( self.run_journal(), { 'f' } )
+   # --- end of test_same_size_rewrite (...) ---
+
+   def test_ebuild_removed ( self ):
+      self.run_journal()
+
+      os.unlink ( self.get_ebuild_file ( 'f' ) )
+      self.assertEqual ( self.run_journal(), { 'f' } )
+
+      # wiped overlay
+      shutil.rmtree ( self.ebuild_dir )
+      os.mkdir ( self.ebuild_dir )
+      self.assertEqual ( self.run_journal(), set ( self.PACKAGES ) )
+      self.assertEqual ( self.run_journal(), set() )
+   # --- end of test_ebuild_removed (...) ---
+
+   def test_package_files ( self ):
+      def get_journal_files ( fingerprint ):
+         return roverlay.db.changejournal.ChangeJournal (
+            self.journal_file, journal_compression=None
+         ).get_package_files ( fingerprint )
+
+      self.assertIsNone ( get_journal_files ( 'fp' ) )
+      self.run_journal()
+      self.assertEqual (
+         sorted ( get_journal_files ( 'fp' ) ), self.get_package_files()
+      )
+      self.assertIsNone ( get_journal_files ( 'other' ) )
+
+      # journal files + changed files: reverse selfdeps are processed, too
+      self.write_package_file ( 'g', 'g' )
+      self.write_package_file ( 'a', 'a, modified' )
+      package_files = set ( get_journal_files ( 'fp' ) )
+      package_files.update ((
+         self.get_package_file ( 'a' ), self.get_package_file ( 'g' ),
+      ))
+      self.PACKAGES = dict ( self.PACKAGES, g=( (), False ) )
+      self.assertEqual (
+         self.run_journal ( package_files=sorted ( package_files ) ),
+         { 'a', 'b', 'c', 'g' }
+      )
+   # --- end of test_package_files (...) ---
+
+# --- end of ChangeJournalTestCase ---
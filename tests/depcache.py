@@ -0,0 +1,188 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import roverlay.errorqueue
+import roverlay.stats.base
+import roverlay.depres.deptype
+import roverlay.depres.depenv
+import roverlay.depres.depresult
+import roverlay.depres.depresolver
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( DepresResultCacheTestCase )
+
+
+class CountingRulePool ( object ):
+   """Resolves all deps whose name starts with "ok" or "self" (selfdeps)
+   and counts the number of match attempts per dep."""
+
+   priority    = 0
+   rule_weight = 0
+
+   def __init__ ( self ):
+      super ( CountingRulePool, self ).__init__()
+      self.match_count = dict()
+
+   def sort ( self ):
+      pass
+
+   def accepts ( self, dep_env ):
+      return True
+
+   def accepts_other ( self, dep_env ):
+      return False
+
+   def matches ( self, dep_env ):
+      name = dep_env.dep_str_low
+      self.match_count [name] = self.match_count.get ( name, 0 ) + 1
+
+      if name.startswith ( "ok" ) or name.startswith ( "self" ):
+         return roverlay.depres.depresult.ConstantDepResult (
+            "sci-R/" + name, 50, is_selfdep=int ( name.startswith ( "self" ) )
+         )
+      else:
+         return None
+
+# --- end of CountingRulePool ---
+
+
+class FakeDynamicPool ( object ):
+   """A dynamic rule pool that never matches, but whose reload_incremental()
+   returns the given names (None: all rules recreated)."""
+
+   priority    = 0
+   rule_weight = 0
+
+   def __init__ ( self ):
+      super ( FakeDynamicPool, self ).__init__()
+      self.changed_names = None
+
+   def accepts ( self, dep_env ):
+      return False
+
+   def reload_incremental ( self ):
+      return self.changed_names
+
+# --- end of FakeDynamicPool ---
+
+
+class DepresResultCacheTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'hit', 'key', 'selfdep_copy', 'reload', ]
+
+   MANDATORY = roverlay.depres.deptype.PKG
+   OPTIONAL  = roverlay.depres.deptype.internal
+
+   def setUp ( self ):
+      self.rule_pool = CountingRulePool()
+      self.dyn_pool  = FakeDynamicPool()
+      self.resolver  = roverlay.depres.depresolver.DependencyResolver (
+         roverlay.errorqueue.ErrorQueue(), jobcount=0
+      )
+      self.resolver.STATS = roverlay.stats.base.DepresStats()
+      self.resolver.add_rulepool ( self.rule_pool )
+      self.resolver.add_rulepool ( self.dyn_pool, pool_type=1 )
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      self.resolver.close()
+   # --- end of tearDown (...) ---
+
+   def resolve ( self, dep_str, deptype_mask=None, repo_id=None ):
+      """Resolves a single dep and returns its result (or None)."""
+      dep_env = roverlay.depres.depenv.DepEnv (
+         dep_str, self.MANDATORY if deptype_mask is None else deptype_mask
+      )
+      dep_env.repo_id = repo_id
+      if self.resolver._resolve_dep ( dep_env ):
+         return dep_env.resolved_by
+      else:
+         return None
+   # --- end of resolve (...) ---
+
+   def get_counts ( self ):
+      stats = self.resolver.STATS
+      return ( int ( stats.cache_hits ), int ( stats.cache_misses ) )
+   # --- end of get_counts (...) ---
+
+   def test_hit ( self ):
+      first = self.resolve ( "ok_a" )
+      self.assertEqual ( self.get_counts(), ( 0, 1 ) )
+
+      self.assertIs ( self.resolve ( "ok_a" ), first )
+      self.assertEqual ( self.get_counts(), ( 1, 1 ) )
+      self.assertEqual ( self.rule_pool.match_count ["ok_a"], 1 )
+
+      # unresolvable deps are not cached as resolved
+      self.assertIsNone ( self.resolve ( "no_a" ) )
+      self.assertIsNone ( self.resolve ( "no_a" ) )
+      self.assertEqual ( self.get_counts(), ( 1, 2 ) )
+   # --- end of test_hit (...) ---
+
+   def test_key ( self ):
+      first = self.resolve ( "ok_a", repo_id=1 )
+
+      # different deptype
+      self.assertEqual (
+         self.resolve ( "ok_a", deptype_mask=self.OPTIONAL, repo_id=1 ),
+         first
+      )
+      self.assertEqual ( self.get_counts(), ( 0, 2 ) )
+
+      # different repo
+      self.assertEqual ( self.resolve ( "ok_a", repo_id=2 ), first )
+      self.assertEqual ( self.get_counts(), ( 0, 3 ) )
+      self.assertEqual ( self.rule_pool.match_count ["ok_a"], 3 )
+
+      # all of them are cached now
+      self.resolve ( "ok_a", deptype_mask=self.OPTIONAL, repo_id=1 )
+      self.resolve ( "ok_a", repo_id=2 )
+      self.resolve ( "ok_a", repo_id=1 )
+      self.assertEqual ( self.get_counts(), ( 3, 3 ) )
+      self.assertEqual ( self.rule_pool.match_count ["ok_a"], 3 )
+   # --- end of test_key (...) ---
+
+   def test_selfdep_copy ( self ):
+      first  = self.resolve ( "self_a" )
+      second = self.resolve ( "self_a" )
+      self.assertEqual ( self.get_counts(), ( 1, 1 ) )
+
+      # selfdep results get modified during selfdep reduction,
+      #  so each dep gets its own copy (and the cache keeps another one)
+      cached = self.resolver._dep_resolved ["self_a"].values()
+      self.assertIsNot ( first, second )
+      for result in cached:
+         self.assertIsNot ( result, first )
+         self.assertIsNot ( result, second )
+      self.assertEqual ( first, second )
+   # --- end of test_selfdep_copy (...) ---
+
+   def test_reload ( self ):
+      self.resolve ( "ok_a" )
+      self.resolve ( "ok_b" )
+
+      # incremental reload: only deps with changed names are dropped
+      self.dyn_pool.changed_names = { "ok_a" }
+      self.resolver.reload_pools()
+      self.resolve ( "ok_a" )
+      self.resolve ( "ok_b" )
+      self.assertEqual ( self.rule_pool.match_count ["ok_a"], 2 )
+      self.assertEqual ( self.rule_pool.match_count ["ok_b"], 1 )
+
+      # full reload: all cached results are dropped
+      self.dyn_pool.changed_names = None
+      self.resolver.reload_pools()
+      self.resolve ( "ok_a" )
+      self.resolve ( "ok_b" )
+      self.assertEqual ( self.rule_pool.match_count ["ok_a"], 3 )
+      self.assertEqual ( self.rule_pool.match_count ["ok_b"], 2 )
+      self.assertEqual ( self.get_counts(), ( 1, 5 ) )
+   # --- end of test_reload (...) ---
+
+# --- end of DepresResultCacheTestCase ---
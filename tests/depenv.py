@@ -0,0 +1,130 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import threading
+
+import roverlay.stats.base
+import roverlay.depres.deptype
+import roverlay.depres.depenv
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( DepEnvCacheTestCase )
+
+
+class DepEnvCacheTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'parse', 'copies', 'hit_rate', 'bounded', 'threads', ]
+
+   DEP_STRINGS = [
+      "R (>= 3.0.0)", "methods", "utils", "Rcpp (>= 0.11.0)",
+      "GDAL library from http://www.gdal.org/",
+      "libxml2 and   zlib", "'quoted' [>= 1.0-2]",
+   ]
+
+   DEPTYPE = roverlay.depres.deptype.PKG
+
+   def new_cache ( self, max_size=None ):
+      cache = roverlay.depres.depenv.DepEnvCache ( max_size=max_size )
+      cache.stats = roverlay.stats.base.DepresStats()
+      return cache
+   # --- end of new_cache (...) ---
+
+   def get_view ( self, dep_envs ):
+      return [
+         (
+            dep_env.dep_str, dep_env.dep_str_low, dep_env.deptype_mask,
+            getattr ( dep_env, 'fuzzy', None ), dep_env.status,
+            dep_env.resolved_by,
+         ) for dep_env in dep_envs
+      ]
+   # --- end of get_view (...) ---
+
+   def test_parse ( self ):
+      cache = self.new_cache()
+      for n in range ( 2 ):
+         for dep_str in self.DEP_STRINGS:
+            self.assertEqual (
+               self.get_view ( cache.from_str ( dep_str, self.DEPTYPE ) ),
+               self.get_view ( roverlay.depres.depenv.DepEnv.from_str (
+                  dep_str, self.DEPTYPE
+               ) )
+            )
+   # --- end of test_parse (...) ---
+
+   def test_copies ( self ):
+      cache = self.new_cache()
+      env_a = cache.from_str ( "libxml2 and zlib", self.DEPTYPE )
+      env_b = cache.from_str ( "libxml2 and zlib", self.DEPTYPE )
+      self.assertEqual ( len ( env_a ), 2 )
+
+      env_a[0].set_resolved ( "dev-libs/libxml2" )
+      self.assertTrue ( env_a[0].is_resolved() )
+      self.assertFalse ( env_b[0].is_resolved() )
+      self.assertIsNone ( env_b[0].get_resolved() )
+
+      env_c = cache.from_str ( "libxml2 and zlib", self.DEPTYPE )
+      self.assertFalse ( env_c[0].is_resolved() )
+      self.assertIsNot ( env_c[0], env_a[0] )
+   # --- end of test_copies (...) ---
+
+   def test_hit_rate ( self ):
+      cache = self.new_cache()
+      self.assertEqual ( cache.get_hit_rate(), 0.0 )
+
+      for k in range ( 4 ):
+         cache.from_str ( "methods", self.DEPTYPE )
+      # same string, different deptype
+      cache.from_str ( "methods", roverlay.depres.deptype.SYS )
+
+      self.assertEqual ( int ( cache.stats.parse_cache_hits ), 3 )
+      self.assertEqual ( int ( cache.stats.parse_cache_misses ), 2 )
+      self.assertAlmostEqual ( cache.get_hit_rate(), 0.6 )
+   # --- end of test_hit_rate (...) ---
+
+   def test_bounded ( self ):
+      cache = self.new_cache ( max_size=3 )
+      for dep_str in self.DEP_STRINGS:
+         cache.from_str ( dep_str, self.DEPTYPE )
+      self.assertEqual ( len ( cache ), 3 )
+
+      # oldest entries are removed first
+      cache.from_str ( self.DEP_STRINGS[-1], self.DEPTYPE )
+      cache.from_str ( self.DEP_STRINGS[0], self.DEPTYPE )
+      self.assertEqual ( int ( cache.stats.parse_cache_hits ), 1 )
+
+      cache = self.new_cache ( max_size=0 )
+      cache.from_str ( "methods", self.DEPTYPE )
+      self.assertEqual ( len ( cache ), 0 )
+   # --- end of test_bounded (...) ---
+
+   def test_threads ( self ):
+      cache   = self.new_cache ( max_size=4 )
+      results = list()
+
+      def run():
+         for n in range ( 50 ):
+            for dep_str in self.DEP_STRINGS:
+               results.append (
+                  self.get_view ( cache.from_str ( dep_str, self.DEPTYPE ) )
+               )
+
+      threads = [ threading.Thread ( target=run ) for k in range ( 4 ) ]
+      for t in threads: t.start()
+      for t in threads: t.join()
+
+      self.assertEqual ( len ( results ), 4 * 50 * len ( self.DEP_STRINGS ) )
+      self.assertEqual (
+         int ( cache.stats.parse_cache_hits )
+         + int ( cache.stats.parse_cache_misses ),
+         len ( results )
+      )
+      self.assertLessEqual ( len ( cache ), 4 )
+   # --- end of test_threads (...) ---
+
+# --- end of DepEnvCacheTestCase ---
@@ -9,6 +9,7 @@ from __future__ import print_function
 import random
 
 import roverlay.interface.depres
+import roverlay.depres.depenv
 
 import tests.base
 import tests.interface
@@ -30,7 +31,7 @@ class DepresTestCase ( tests.interface.RoverlayInterfaceTestCase ):
       'sanity_checks',
       'visualize',
       'depres_static', 'depres_static_randomized',
-      'load_rules',
+      'load_rules', 'rule_index',
    ]
 
    DEPRES_INTERFACE = None
@@ -169,3 +170,39 @@ class DepresTestCase ( tests.interface.RoverlayInterfaceTestCase ):
       else:
          self.skipTest ( "No rule files configured." )
    # --- end of test_load_rules (...) ---
+
+   def test_rule_index ( self ):
+      # indexed rule lookup has to return the same rule as a linear search
+      for name, test_data in DEPRES_DATA.items():
+         if isinstance ( test_data, str ):
+            test_data = DEPRES_DATA [test_data]
+
+         self.depres.compile_rules()
+         self.tearDown()
+         self.depres.get_new_pool()
+         for rule_name in self.get_depres_include ( name ):
+            self.assertTrue (
+               self.depres.add_rule_list ( DEPRES_RULES [rule_name] )
+            )
+         self.assertTrue ( self.depres.compile_rules() )
+
+         pool = self.depres.get_pool()
+         for depstr, t_expected_result in test_data:
+            for dep_env in roverlay.depres.depenv.DepEnv.from_str (
+               depstr, pool.deptype_mask
+            ):
+               expected_result = None
+               for rule in pool.rules:
+                  expected_result = rule.matches ( dep_env )
+                  if expected_result:
+                     break
+               else:
+                  expected_result = None
+
+               self.assertEquals (
+                  pool.matches ( dep_env ), expected_result,
+                  "{!s}: rule index mismatch for {!r}".format (
+                     name, dep_env.dep_str
+                  )
+               )
+   # --- end of test_rule_index (...) ---
@@ -0,0 +1,171 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import threading
+
+import roverlay.errorqueue
+import roverlay.depres.deptype
+import roverlay.depres.depresult
+import roverlay.depres.depresolver
+import roverlay.depres.channels
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( DepresBatchTestCase )
+
+
+class FakeRulePool ( object ):
+   """Resolves all deps whose name starts with "ok"."""
+
+   priority    = 0
+   rule_weight = 0
+
+   def __init__ ( self, fail_on=None ):
+      super ( FakeRulePool, self ).__init__()
+      self.fail_on = fail_on
+
+   def sort ( self ):
+      pass
+
+   def accepts ( self, dep_env ):
+      return True
+
+   def accepts_other ( self, dep_env ):
+      return False
+
+   def matches ( self, dep_env ):
+      if dep_env.dep_str_low == self.fail_on:
+         raise Exception ( "rule pool failure" )
+      elif dep_env.dep_str_low.startswith ( "ok" ):
+         return roverlay.depres.depresult.ConstantDepResult (
+            "sci-R/" + dep_env.dep_str_low, 50
+         )
+      else:
+         return None
+
+# --- end of FakeRulePool ---
+
+
+class DepresBatchTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'single', 'threaded', 'greedy', 'on_error', ]
+
+   MANDATORY = roverlay.depres.deptype.PKG
+   OPTIONAL  = roverlay.depres.deptype.internal
+
+   def new_resolver ( self, jobcount, fail_on=None ):
+      err_queue = roverlay.errorqueue.ErrorQueue()
+      resolver  = roverlay.depres.depresolver.DependencyResolver (
+         err_queue, jobcount=jobcount
+      )
+      resolver.add_rulepool ( FakeRulePool ( fail_on=fail_on ) )
+      return resolver
+   # --- end of new_resolver (...) ---
+
+   def resolve ( self,
+      resolver, mandatory, optional, greedy=False, name="channel"
+   ):
+      channel_cls = (
+         roverlay.depres.channels.EbuildJobChannel if greedy
+         else roverlay.depres.channels.NonGreedyDepresChannel
+      )
+      channel = resolver.register_channel (
+         channel_cls ( resolver.err_queue, name=name )
+      )
+      try:
+         channel.add_dependencies ( mandatory, self.MANDATORY )
+         channel.add_dependencies ( optional, self.OPTIONAL )
+         return channel.satisfy_request (
+            close_if_unresolvable=False, preserve_order=True
+         )
+      finally:
+         channel.close()
+   # --- end of resolve (...) ---
+
+   def check_result ( self, result, names, unresolvable ):
+      self.assertIsNotNone ( result )
+      self.assertEqual (
+         [ str ( dep ) for dep in result[0] ],
+         [
+            ( "sci-R/" + name if name.startswith ( "ok" ) else "" )
+            for name in names
+         ]
+      )
+      self.assertEqual ( result[1], unresolvable )
+   # --- end of check_result (...) ---
+
+   def test_single ( self ):
+      resolver = self.new_resolver ( 0 )
+      try:
+         self.check_result (
+            self.resolve ( resolver, [ "ok1", "ok2" ], [ "x", "ok3" ] ),
+            [ "ok1", "ok2", "x", "ok3" ], ( "x", )
+         )
+         self.assertIsNone ( self.resolve ( resolver, [ "ok1", "y" ], [] ) )
+         self.assertEqual ( resolver._depqueue.qsize(), 0 )
+      finally:
+         resolver.close()
+   # --- end of test_single (...) ---
+
+   def test_threaded ( self ):
+      resolver = self.new_resolver ( 4 )
+      results  = dict()
+
+      def run ( k ):
+         names = [
+            ( "ok" if n % 3 else "no" ) + "_{:d}_{:d}".format ( k, n )
+            for n in range ( 30 )
+         ]
+         results [k] = ( names, self.resolve (
+            resolver, [], names, name="c{:d}".format ( k )
+         ) )
+
+      try:
+         threads = [
+            threading.Thread ( target=run, args=( k, ) ) for k in range ( 20 )
+         ]
+         for t in threads: t.start()
+         for t in threads: t.join()
+      finally:
+         resolver.close()
+
+      self.assertTrue ( resolver.err_queue.really_empty() )
+      self.assertEqual ( len ( results ), 20 )
+      for names, result in results.values():
+         self.check_result (
+            result, names,
+            tuple ( name for name in names if not name.startswith ( "ok" ) )
+         )
+   # --- end of test_threaded (...) ---
+
+   def test_greedy ( self ):
+      resolver = self.new_resolver ( 2 )
+      try:
+         self.check_result (
+            self.resolve ( resolver, [ "ok1" ], [ "x" ], greedy=True ),
+            [ "ok1", "x" ], ( "x", )
+         )
+         self.assertIsNone (
+            self.resolve ( resolver, [ "y", "ok1" ], [], greedy=True )
+         )
+      finally:
+         resolver.close()
+   # --- end of test_greedy (...) ---
+
+   def test_on_error ( self ):
+      resolver = self.new_resolver ( 2, fail_on="bad" )
+      try:
+         self.assertIsNone (
+            self.resolve ( resolver, [ "ok1", "bad", "ok2" ], [] )
+         )
+         self.assertFalse ( resolver.err_queue.really_empty() )
+      finally:
+         resolver.close()
+   # --- end of test_on_error (...) ---
+
+# --- end of DepresBatchTestCase ---
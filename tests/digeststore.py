@@ -0,0 +1,192 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import roverlay.digest
+import roverlay.db.digeststore
+import roverlay.util.hashpool
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( DigestStoreTestCase )
+
+
+class CountingMultihash ( object ):
+   """Replaces roverlay.digest.multihash_file() and records its calls."""
+
+   def __init__ ( self ):
+      super ( CountingMultihash, self ).__init__()
+      self.calls = list()
+      self.real  = roverlay.digest.multihash_file
+   # --- end of __init__ (...) ---
+
+   def __call__ ( self, filepath, digest_types, **kwargs ):
+      self.calls.append ( ( filepath, frozenset ( digest_types ) ) )
+      return self.real ( filepath, digest_types, **kwargs )
+   # --- end of __call__ (...) ---
+
+   def __enter__ ( self ):
+      roverlay.digest.multihash_file = self
+      return self
+   # --- end of __enter__ (...) ---
+
+   def __exit__ ( self, *exc_info ):
+      roverlay.digest.multihash_file = self.real
+   # --- end of __exit__ (...) ---
+
+# --- end of CountingMultihash ---
+
+
+class DigestStoreTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'single_pass', 'modified', 'persistent', 'hashpool', ]
+
+   DIGEST_TYPES = ( 'sha256', 'sha512', )
+
+   def setUp ( self ):
+      self.tmpdir     = tempfile.mkdtemp()
+      self.store_file = os.path.join ( self.tmpdir, 'digest_store.db' )
+      self.files      = list()
+      for k in range ( 3 ):
+         self.files.append ( self.write_file ( 'file{:d}'.format ( k ), k ) )
+      self.set_store()
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      roverlay.digest.set_digest_store ( None )
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def write_file ( self, name, k ):
+      filepath = os.path.join ( self.tmpdir, name )
+      with open ( filepath, 'wb' ) as fh:
+         fh.write ( name.encode ( 'ascii' ) * ( 1000 * ( k + 1 ) ) )
+      return filepath
+   # --- end of write_file (...) ---
+
+   def set_store ( self, read_now=True ):
+      self.store = roverlay.db.digeststore.DigestStore (
+         self.store_file, digest_types=self.DIGEST_TYPES, read_now=read_now
+      )
+      roverlay.digest.set_digest_store ( self.store )
+      return self.store
+   # --- end of set_store (...) ---
+
+   def get_expected ( self, filepath, digest_type ):
+      with open ( filepath, 'rb' ) as fh:
+         return hashlib.new ( digest_type, fh.read() ).hexdigest()
+   # --- end of get_expected (...) ---
+
+   def test_single_pass ( self ):
+      filepath = self.files[0]
+      with CountingMultihash() as multihash:
+         self.assertEqual (
+            roverlay.digest.get_file_digests ( filepath, ( 'md5', ) ),
+            { 'md5': self.get_expected ( filepath, 'md5' ) }
+         )
+         # the store's digest types are calculated together with md5
+         self.assertEqual (
+            multihash.calls,
+            [ ( filepath, frozenset ({ 'md5', 'sha256', 'sha512', }) ) ]
+         )
+
+         self.assertEqual (
+            roverlay.digest.get_file_digest ( filepath, 'sha512' ),
+            self.get_expected ( filepath, 'sha512' )
+         )
+         self.assertEqual (
+            roverlay.digest.get_file_digests (
+               filepath, ( 'md5', 'sha256' )
+            ),
+            {
+               'md5'    : self.get_expected ( filepath, 'md5' ),
+               'sha256' : self.get_expected ( filepath, 'sha256' ),
+            }
+         )
+         self.assertEqual ( len ( multihash.calls ), 1 )
+
+         # only missing digest types are calculated
+         roverlay.digest.get_file_digest ( filepath, 'sha1' )
+         self.assertEqual (
+            multihash.calls [-1], ( filepath, frozenset ({ 'sha1', }) )
+         )
+   # --- end of test_single_pass (...) ---
+
+   def test_modified ( self ):
+      filepath = self.files[1]
+      hardlink = filepath + '.link'
+      os.link ( filepath, hardlink )
+
+      with CountingMultihash() as multihash:
+         roverlay.digest.get_file_digest ( filepath, 'sha256' )
+         # same inode
+         roverlay.digest.get_file_digest ( hardlink, 'sha256' )
+         self.assertEqual ( len ( multihash.calls ), 1 )
+
+         # replace the file (new inode)
+         os.unlink ( filepath )
+         self.write_file ( os.path.basename ( filepath ), 5 )
+         self.assertEqual (
+            roverlay.digest.get_file_digest ( filepath, 'sha256' ),
+            self.get_expected ( filepath, 'sha256' )
+         )
+         self.assertEqual ( len ( multihash.calls ), 2 )
+   # --- end of test_modified (...) ---
+
+   def test_persistent ( self ):
+      for filepath in self.files:
+         roverlay.digest.get_file_digest ( filepath, 'sha256' )
+      self.assertEqual ( len ( self.store ), len ( self.files ) )
+      self.store.write()
+
+      os.unlink ( self.files[2] )
+      self.set_store()
+      self.assertEqual ( len ( self.store ), len ( self.files ) )
+
+      with CountingMultihash() as multihash:
+         self.assertEqual (
+            roverlay.digest.get_file_digest ( self.files[0], 'sha512' ),
+            self.get_expected ( self.files[0], 'sha512' )
+         )
+         self.assertEqual ( multihash.calls, [] )
+
+      # entries of files that do not exist anymore are not written
+      self.store.set_dirty()
+      self.store.write()
+      self.assertEqual ( len ( self.set_store() ), len ( self.files ) - 1 )
+
+      # rebuild
+      self.assertEqual ( len ( self.set_store ( read_now=False ) ), 0 )
+   # --- end of test_persistent (...) ---
+
+   def test_hashpool ( self ):
+      hash_pool = roverlay.util.hashpool.HashPool (
+         ( 'sha256', ), 2, use_threads=True
+      )
+      for filepath in self.files:
+         hash_pool.add ( filepath, filepath, None )
+
+      self.assertEqual (
+         dict ( hash_pool.run_as_completed() ),
+         {
+            filepath: { 'sha256': self.get_expected ( filepath, 'sha256' ) }
+            for filepath in self.files
+         }
+      )
+      self.assertEqual ( len ( self.store ), len ( self.files ) )
+
+      with CountingMultihash() as multihash:
+         roverlay.digest.get_file_digest ( self.files[1], 'sha512' )
+         self.assertEqual ( multihash.calls, [] )
+   # --- end of test_hashpool (...) ---
+
+# --- end of DigestStoreTestCase ---
@@ -0,0 +1,277 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import roverlay.db.distmap
+import roverlay.util.common
+
+import tests.base
+
+
+def suite():
+   return unittest.TestSuite ((
+      tests.base.make_testsuite ( SqliteDistMapTestCase ),
+      tests.base.make_testsuite ( FileStatTestCase ),
+   ))
+
+
+class FakeRepo ( object ):
+   def __init__ ( self, name ):
+      super ( FakeRepo, self ).__init__()
+      self.name = name
+
+# --- end of FakeRepo ---
+
+
+class FakePackageInfo ( object ):
+   """Provides the PackageInfo methods used by
+   check_revbump_necessary()/check_file_unchanged()."""
+
+   def __init__ ( self, distfile, package_file, repo_name, digest ):
+      super ( FakePackageInfo, self ).__init__()
+      self.distfile     = distfile
+      self.package_file = package_file
+      self.origin       = FakeRepo ( repo_name )
+      self.digest       = digest
+      self.hashdict     = dict()
+      self.hash_count   = 0
+
+   def __getitem__ ( self, key ):
+      assert key == 'origin'
+      return self.origin
+
+   def get_distmap_key ( self ):
+      return self.distfile
+
+   def get_file_stat_key ( self ):
+      return roverlay.util.common.get_file_stat_key ( self.package_file )
+
+   def make_distmap_hash ( self ):
+      self.hash_count += 1
+      return self.digest
+
+# --- end of FakePackageInfo ---
+
+
+class SqliteDistMapTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'write_read', 'remove', 'lookup', 'convert', ]
+
+   # distfile => ( repo name, repo file, digest )
+   ENTRIES = {
+      'a_1.0.tar.gz'      : ( 'CRAN', 'a_1.0.tar.gz', '0a' ),
+      'b_1.0.tar.gz'      : ( 'CRAN', 'b_1.0.tar.gz', '0b' ),
+      'c/c_1.0.tar.gz'    : ( 'BIOC', 'src/c_1.0.tar.gz', '0c' ),
+      'd_1.0.tar.gz'      : ( None, None, '0d' ),
+   }
+
+   def setUp ( self ):
+      self.tmpdir       = tempfile.mkdtemp()
+      self.sqlite_file  = self.tmpdir + os.sep + 'distmap.sqlite'
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def new_distmap ( self ):
+      return roverlay.db.distmap.SqliteDistMap (
+         self.sqlite_file, ignore_missing=True
+      )
+   # --- end of new_distmap (...) ---
+
+   def add_entries ( self, distmap ):
+      for distfile, info in self.ENTRIES.items():
+         distmap.add_entry (
+            distfile, roverlay.db.distmap.DistMapInfo ( distfile, *info )
+         )
+   # --- end of add_entries (...) ---
+
+   def check_entries ( self, distmap, entries ):
+      self.assertEqual ( len ( distmap ), len ( entries ) )
+      for distfile, info in entries.items():
+         entry = distmap.get_entry ( distfile )
+         self.assertIsNotNone ( entry )
+         self.assertEqual ( entry.get_repo_name(), info[0] )
+         self.assertEqual ( entry.get_repo_file(), info[1] )
+         self.assertEqual ( entry.digest, info[2] )
+   # --- end of check_entries (...) ---
+
+   def test_write_read ( self ):
+      distmap = self.new_distmap()
+      self.add_entries ( distmap )
+      self.assertTrue ( distmap.dirty )
+      self.assertTrue ( distmap.write() )
+      self.assertFalse ( distmap.dirty )
+      distmap.close()
+
+      distmap = self.new_distmap()
+      # entries are read on demand
+      self.assertIsNone ( distmap.get_entry ( 'x_1.0.tar.gz' ) )
+      self.check_entries ( distmap, self.ENTRIES )
+      self.assertEqual ( set ( distmap.keys() ), set ( self.ENTRIES ) )
+      distmap.close()
+   # --- end of test_write_read (...) ---
+
+   def test_remove ( self ):
+      distmap = self.new_distmap()
+      self.add_entries ( distmap )
+      distmap.write()
+      distmap.close()
+
+      distmap = self.new_distmap()
+      distmap.remove ( 'a_1.0.tar.gz' )
+      distmap.try_remove ( 'x_1.0.tar.gz' )
+      self.assertNotIn ( 'a_1.0.tar.gz', distmap )
+      self.assertRaises ( KeyError, distmap.remove, 'a_1.0.tar.gz' )
+      distmap.write()
+      distmap.close()
+
+      entries = dict ( self.ENTRIES )
+      del entries ['a_1.0.tar.gz']
+      distmap = self.new_distmap()
+      self.check_entries ( distmap, entries )
+      distmap.close()
+   # --- end of test_remove (...) ---
+
+   def test_lookup ( self ):
+      distmap = self.new_distmap()
+      self.add_entries ( distmap )
+      distmap.write()
+      distmap.close()
+
+      distmap = self.new_distmap()
+      distfile, entry = distmap.lookup ( 'BIOC', 'src/c_1.0.tar.gz' )
+      self.assertEqual ( distfile, 'c/c_1.0.tar.gz' )
+      self.assertEqual ( entry.digest, '0c' )
+      self.assertIsNone ( distmap.lookup ( 'CRAN', 'src/c_1.0.tar.gz' ) )
+
+      # unwritten changes are visible to lookup()
+      distmap.remove ( 'c/c_1.0.tar.gz' )
+      self.assertIsNone ( distmap.lookup ( 'BIOC', 'src/c_1.0.tar.gz' ) )
+      distmap.add_entry (
+         'c_1.0.tar.gz',
+         roverlay.db.distmap.DistMapInfo (
+            'c_1.0.tar.gz', 'BIOC', 'src/c_1.0.tar.gz', '1c'
+         )
+      )
+      distfile, entry = distmap.lookup ( 'BIOC', 'src/c_1.0.tar.gz' )
+      self.assertEqual ( distfile, 'c_1.0.tar.gz' )
+      self.assertEqual ( entry.digest, '1c' )
+      distmap.close()
+   # --- end of test_lookup (...) ---
+
+   def test_convert ( self ):
+      distmap_file = self.tmpdir + os.sep + 'distmap.db'
+      file_distmap = roverlay.db.distmap.FileDistMap (
+         distmap_file, distmap_compression=None, ignore_missing=True
+      )
+      self.add_entries ( file_distmap )
+      file_distmap.write()
+
+      distmap = roverlay.db.distmap.convert_file_distmap (
+         distmap_file, self.sqlite_file
+      )
+      distmap.close()
+
+      distmap = self.new_distmap()
+      self.check_entries ( distmap, self.ENTRIES )
+      distmap.close()
+   # --- end of test_convert (...) ---
+
+# --- end of SqliteDistMapTestCase ---
+
+
+class FileStatTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'unchanged', 'modified', 'paranoid', 'file_format', ]
+
+   def setUp ( self ):
+      self.tmpdir       = tempfile.mkdtemp()
+      self.package_file = self.tmpdir + os.sep + 'a_1.0.tar.gz'
+      self.distmap_file = self.tmpdir + os.sep + 'distmap.db'
+      self.write_package_file ( 'a' )
+
+      self.distmap = roverlay.db.distmap.FileDistMap (
+         self.distmap_file, distmap_compression=None, ignore_missing=True
+      )
+      self.distmap.add_entry (
+         'a_1.0.tar.gz', roverlay.db.distmap.DistMapInfo (
+            'a_1.0.tar.gz', 'CRAN', 'a_1.0.tar.gz', '0a',
+            roverlay.util.common.get_file_stat_key ( self.package_file )
+         )
+      )
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def write_package_file ( self, content ):
+      with open ( self.package_file, 'wt' ) as FH:
+         FH.write ( content )
+   # --- end of write_package_file (...) ---
+
+   def new_package_info ( self, digest ):
+      return FakePackageInfo (
+         'a_1.0.tar.gz', self.package_file, 'CRAN', digest
+      )
+   # --- end of new_package_info (...) ---
+
+   def test_unchanged ( self ):
+      p_info = self.new_package_info ( '0a' )
+      self.assertTrue ( self.distmap.check_file_unchanged ( p_info ) )
+      self.assertFalse ( self.distmap.check_revbump_necessary ( p_info ) )
+      self.assertEqual ( p_info.hash_count, 0 )
+      self.assertEqual ( p_info.hashdict ['sha256'], '0a' )
+   # --- end of test_unchanged (...) ---
+
+   def test_modified ( self ):
+      os.unlink ( self.package_file )
+      self.write_package_file ( 'a, modified' )
+
+      p_info = self.new_package_info ( '1a' )
+      self.assertFalse ( self.distmap.check_file_unchanged ( p_info ) )
+      self.assertTrue ( self.distmap.check_revbump_necessary ( p_info ) )
+      self.assertEqual ( p_info.hash_count, 1 )
+
+      # same digest, but new file => stat info gets updated
+      p_info = self.new_package_info ( '0a' )
+      self.assertFalse ( self.distmap.check_revbump_necessary ( p_info ) )
+      self.assertEqual ( p_info.hash_count, 1 )
+      self.assertTrue (
+         self.distmap.check_file_unchanged ( self.new_package_info ( '0a' ) )
+      )
+   # --- end of test_modified (...) ---
+
+   def test_paranoid ( self ):
+      self.distmap.use_file_stat = False
+      p_info = self.new_package_info ( '1a' )
+      self.assertFalse ( self.distmap.check_file_unchanged ( p_info ) )
+      self.assertTrue ( self.distmap.check_revbump_necessary ( p_info ) )
+      self.assertEqual ( p_info.hash_count, 1 )
+   # --- end of test_paranoid (...) ---
+
+   def test_file_format ( self ):
+      self.distmap.write()
+
+      distmap = roverlay.db.distmap.FileDistMap (
+         self.distmap_file, distmap_compression=None
+      )
+      self.assertEqual (
+         distmap.get_entry ( 'a_1.0.tar.gz' ).filestat,
+         roverlay.util.common.get_file_stat_key ( self.package_file )
+      )
+      self.assertTrue (
+         distmap.check_file_unchanged ( self.new_package_info ( '0a' ) )
+      )
+   # --- end of test_file_format (...) ---
+
+# --- end of FileStatTestCase ---
@@ -0,0 +1,191 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os
+import shutil
+import tempfile
+
+import roverlay.db.dirlisting
+import roverlay.remote.basicrepo
+import roverlay.remote.distscan
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( DistdirScannerTestCase )
+
+
+class DistdirScannerTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'walk', 'concurrent', 'listing_cache', 'scan_distdir', ]
+
+   FILES = [
+      'abc_1.0.tar.gz', 'README',
+      'Archive/abc/abc_0.9.tar.gz', 'Archive/abc/abc_0.8.tar.gz',
+      'Archive/xyz/xyz_0.1.tar.gz', 'Archive/empty/',
+      'contrib/3.0/def_2.1.tar.gz', 'contrib/3.0/Old/def_2.0.tar.gz',
+   ]
+
+   def setUp ( self ):
+      self.tmpdir  = tempfile.mkdtemp()
+      self.distdir = os.path.join ( self.tmpdir, 'distdir' )
+
+      for relpath in self.FILES:
+         path = os.path.join ( self.distdir, *relpath.split ( '/' ) )
+         if relpath [-1] == '/':
+            os.makedirs ( path )
+         else:
+            if not os.path.isdir ( os.path.dirname ( path ) ):
+               os.makedirs ( os.path.dirname ( path ) )
+            with open ( path, 'w' ) as fh:
+               fh.write ( relpath )
+
+      if hasattr ( os, 'symlink' ):
+         # symlinks to dirs are neither listed nor followed by os.walk()
+         os.symlink (
+            os.path.join ( self.distdir, 'Archive' ),
+            os.path.join ( self.distdir, 'contrib', 'Archive' )
+         )
+         os.symlink (
+            'abc_1.0.tar.gz', os.path.join ( self.distdir, 'link_1.0.tar.gz' )
+         )
+         os.symlink (
+            'missing', os.path.join ( self.distdir, 'broken_1.0.tar.gz' )
+         )
+
+      self.cache_file = os.path.join ( self.tmpdir, 'listing.db' )
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def get_expected_walk ( self ):
+      return [
+         ( dirpath, filenames )
+         for dirpath, dirnames, filenames in os.walk ( self.distdir )
+      ]
+   # --- end of get_expected_walk (...) ---
+
+   def get_cache ( self, read_now=True ):
+      return roverlay.db.dirlisting.DirListingCache (
+         self.cache_file, read_now=read_now
+      )
+   # --- end of get_cache (...) ---
+
+   def test_walk ( self ):
+      scanner = roverlay.remote.distscan.DistdirScanner()
+      self.assertEqual (
+         list ( scanner.walk ( self.distdir ) ), self.get_expected_walk()
+      )
+      self.assertEqual (
+         list ( scanner.walk ( os.path.join ( self.tmpdir, 'missing' ) ) ),
+         []
+      )
+   # --- end of test_walk (...) ---
+
+   def test_concurrent ( self ):
+      scanner = roverlay.remote.distscan.DistdirScanner ( jobs=3 )
+      self.assertEqual (
+         list ( scanner.walk ( self.distdir ) ), self.get_expected_walk()
+      )
+
+      # closing the generator early
+      walker = scanner.walk ( self.distdir )
+      self.assertEqual ( next ( walker ) [0], self.distdir )
+      walker.close()
+   # --- end of test_concurrent (...) ---
+
+   def test_listing_cache ( self ):
+      distscan = roverlay.remote.distscan
+      list_dir = distscan.list_dir
+      read_dirs = list()
+
+      def counting_list_dir ( dirpath ):
+         read_dirs.append ( dirpath )
+         return list_dir ( dirpath )
+
+      distscan.list_dir = counting_list_dir
+      try:
+         scanner = distscan.DistdirScanner ( listing_cache=self.get_cache() )
+         expected = self.get_expected_walk()
+         self.assertEqual ( list ( scanner.walk ( self.distdir ) ), expected )
+         self.assertEqual ( len ( read_dirs ), len ( expected ) )
+         scanner.write_cache()
+
+         # unchanged directories are not read again
+         del read_dirs[:]
+         scanner = distscan.DistdirScanner (
+            jobs=2, listing_cache=self.get_cache()
+         )
+         self.assertEqual ( len ( scanner.listing_cache ), len ( expected ) )
+         self.assertEqual ( list ( scanner.walk ( self.distdir ) ), expected )
+         self.assertEqual ( read_dirs, [] )
+
+         # modified directories are read
+         new_dir = os.path.join ( self.distdir, 'Archive', 'new' )
+         os.mkdir ( new_dir )
+         with open ( os.path.join ( new_dir, 'new_1.0.tar.gz' ), 'w' ):
+            pass
+         shutil.rmtree ( os.path.join ( self.distdir, 'Archive', 'xyz' ) )
+
+         expected = self.get_expected_walk()
+         self.assertEqual ( list ( scanner.walk ( self.distdir ) ), expected )
+         self.assertEqual (
+            sorted ( read_dirs ),
+            [ os.path.join ( self.distdir, 'Archive' ), new_dir ]
+         )
+         self.assertEqual ( len ( scanner.listing_cache ), len ( expected ) )
+      finally:
+         distscan.list_dir = list_dir
+   # --- end of test_listing_cache (...) ---
+
+   def get_packages ( self, repo, **kwargs ):
+      return [
+         ( p ['package_file'], p ['src_uri'] )
+         for p in repo.scan_distdir ( **kwargs )
+      ]
+   # --- end of get_packages (...) ---
+
+   def test_scan_distdir ( self ):
+      repo = roverlay.remote.basicrepo.BasicRepo (
+         name='scan_test', distroot=None, directory=self.distdir,
+         src_uri='http://localhost/scan_test'
+      )
+      is_package = lambda f: f.endswith ( '.tar.gz' )
+      scanner    = roverlay.remote.distscan.DistdirScanner (
+         jobs=2, listing_cache=self.get_cache ( read_now=False )
+      )
+
+      expected = [
+         os.path.join ( dirpath, filename )
+         for dirpath, filenames in self.get_expected_walk()
+         for filename in filenames if is_package ( filename )
+      ]
+      self.assertEqual (
+         list ( repo.iter_package_files ( is_package, scanner=scanner ) ),
+         expected
+      )
+
+      packages = self.get_packages ( repo, is_package=is_package )
+      self.assertEqual ( [ p[0] for p in packages ], expected )
+      self.assertIn (
+         (
+            os.path.join (
+               self.distdir, 'contrib', '3.0', 'Old', 'def_2.0.tar.gz'
+            ),
+            'http://localhost/scan_test/contrib/3.0/Old/def_2.0.tar.gz'
+         ),
+         packages
+      )
+      self.assertEqual (
+         self.get_packages ( repo, is_package=is_package, scanner=scanner ),
+         packages
+      )
+   # --- end of test_scan_distdir (...) ---
+
+# --- end of DistdirScannerTestCase ---
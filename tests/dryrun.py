@@ -0,0 +1,121 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import io
+
+import roverlay.packageinfo
+import roverlay.packagerules.dryrun
+import roverlay.packagerules.rules
+import roverlay.packagerules.abstract.rules
+import roverlay.packagerules.acceptors.stringmatch
+import roverlay.packagerules.acceptors.util
+
+import tests.base
+
+from tests.packagerules import SetCategoryAction
+
+
+def suite():
+   return tests.base.make_testsuite ( RulesDryRunTestCase )
+
+
+class RulesDryRunTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'records', 'parallel', 'diff', ]
+
+   NAMES = [ 'abc', 'abd', 'xyz', 'zoo', ]
+
+   def new_package ( self, name ):
+      p = roverlay.packageinfo.PackageInfo ( name=name )
+      p.set_direct_unsafe ( 'repo_name', 'CRAN' )
+      p.set_direct_unsafe ( 'category', 'sci-R' )
+      p.set_direct_unsafe ( 'package_filename', name + '_1.0.tar.gz' )
+      return p
+   # --- end of new_package (...) ---
+
+   def new_package_rules ( self, move_to='sci-biology' ):
+      package_rules = roverlay.packagerules.rules.PackageRules()
+
+      rule = roverlay.packagerules.abstract.rules.PackageRule()
+      rule.set_acceptor (
+         roverlay.packagerules.acceptors.stringmatch.RegexAcceptor (
+            0, roverlay.packagerules.acceptors.util.get_ebuild_name,
+            regex='^ab'
+         )
+      )
+      rule.add_action ( SetCategoryAction ( move_to ) )
+      package_rules.append_rule ( rule, prepare_rule=False )
+
+      ignore_rule = roverlay.packagerules.abstract.rules.IgnorePackageRule()
+      ignore_rule.set_acceptor (
+         roverlay.packagerules.acceptors.stringmatch.StringAcceptor (
+            0, roverlay.packagerules.acceptors.util.get_ebuild_name, 'zoo'
+         )
+      )
+      package_rules.append_rule ( ignore_rule, prepare_rule=False )
+
+      package_rules.add_trace_actions()
+      return package_rules
+   # --- end of new_package_rules (...) ---
+
+   def evaluate ( self, jobs=1, **kw ):
+      return list ( roverlay.packagerules.dryrun.evaluate (
+         self.new_package_rules ( **kw ),
+         [ self.new_package ( name ) for name in self.NAMES ],
+         jobs=jobs
+      ) )
+   # --- end of evaluate (...) ---
+
+   def test_records ( self ):
+      records = self.evaluate()
+      self.assertEqual (
+         [ record ['id'] for record in records ],
+         [ 'CRAN/' + name + '_1.0.tar.gz' for name in self.NAMES ]
+      )
+      self.assertEqual (
+         [ record ['status'] for record in records ],
+         [ 'modified', 'modified', 'unchanged', 'filtered' ]
+      )
+      self.assertEqual ( records[0]['category'], 'sci-biology' )
+      self.assertEqual ( records[0]['trace'], [] )
+      self.assertEqual ( records[0]['evars'], [] )
+   # --- end of test_records (...) ---
+
+   def test_parallel ( self ):
+      self.assertEqual ( self.evaluate ( jobs=2 ), self.evaluate ( jobs=1 ) )
+   # --- end of test_parallel (...) ---
+
+   def test_diff ( self ):
+      dryrun = roverlay.packagerules.dryrun
+
+      fh = io.StringIO()
+      dryrun.write_records ( fh, self.evaluate() )
+      fh.seek ( 0 )
+      old_records = dryrun.read_records ( fh )
+      self.assertEqual ( len ( old_records ), len ( self.NAMES ) )
+
+      self.assertEqual (
+         list ( dryrun.iter_diff ( old_records, self.evaluate() ) ), []
+      )
+
+      del old_records ['CRAN/xyz_1.0.tar.gz']
+      old_records ['CRAN/gone_1.0.tar.gz'] = { 'id': 'CRAN/gone_1.0.tar.gz' }
+      diff = list ( dryrun.iter_diff (
+         old_records, self.evaluate ( move_to='dev-R' )
+      ) )
+      self.assertEqual (
+         [ ( record ['id'], record ['diff'] ) for record in diff ],
+         [
+            ( 'CRAN/abc_1.0.tar.gz', 'changed' ),
+            ( 'CRAN/abd_1.0.tar.gz', 'changed' ),
+            ( 'CRAN/xyz_1.0.tar.gz', 'added' ),
+            ( 'CRAN/gone_1.0.tar.gz', 'removed' ),
+         ]
+      )
+      self.assertEqual ( diff[0]['category'], 'dev-R' )
+   # --- end of test_diff (...) ---
+
+# --- end of RulesDryRunTestCase ---
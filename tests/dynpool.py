@@ -0,0 +1,183 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import roverlay.util.objects
+import roverlay.packageinfo
+
+import roverlay.depres.deptype
+import roverlay.depres.depenv
+import roverlay.depres.depresolver
+import roverlay.depres.simpledeprule.dynpool
+
+import roverlay.overlay.rulegen
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( DynamicSelfdepPoolTestCase )
+
+
+class FakePackageDir ( object ):
+   """Provides the PackageDir methods used by the rule generator."""
+
+   def __init__ ( self, name, repo_names ):
+      super ( FakePackageDir, self ).__init__()
+      self.name      = name
+      self._packages = list()
+      for repo_name in repo_names:
+         p = roverlay.packageinfo.PackageInfo ( name=name )
+         if repo_name:
+            p.set_direct_unsafe ( 'repo_name', repo_name )
+         self._packages.append ( p )
+
+   def empty ( self ):
+      return not self._packages
+
+   def iter_package_info ( self ):
+      return iter ( self._packages )
+
+# --- end of FakePackageDir ---
+
+
+class FakeCategory ( object ):
+
+   def __init__ ( self ):
+      super ( FakeCategory, self ).__init__()
+      self._subdirs = dict()
+
+   def get_nonempty ( self, name ):
+      subdir = self._subdirs.get ( name, None )
+      return subdir if ( subdir and not subdir.empty() ) else None
+
+# --- end of FakeCategory ---
+
+
+class FakeOverlay ( roverlay.util.objects.Referenceable ):
+   """Provides the Overlay methods used by the rule generator."""
+
+   def __init__ ( self, default_category ):
+      super ( FakeOverlay, self ).__init__()
+      self.default_category = default_category
+      self._categories      = dict()
+      self._changed         = set()
+
+   def set_package_dir ( self, cat_name, name, repo_names ):
+      cat = self._categories.setdefault ( cat_name, FakeCategory() )
+      cat._subdirs [name] = FakePackageDir ( name, repo_names )
+      self._changed.add ( ( cat_name, name ) )
+
+   def remove_package_dir ( self, cat_name, name ):
+      del self._categories [cat_name]._subdirs [name]
+      self._changed.add ( ( cat_name, name ) )
+
+   def pop_changed_package_dirs ( self ):
+      changed = self._changed
+      self._changed = set()
+      return changed
+
+# --- end of FakeOverlay ---
+
+
+class DynamicSelfdepPoolTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'incremental', 'unchanged', 'resolver_cache', ]
+
+   REPO_ID_MAP = { 'repo_a': 1, 'repo_b': 2, }
+
+   def setUp ( self ):
+      self.overlay = FakeOverlay ( 'sci-R' )
+      self.overlay.set_package_dir ( 'sci-R', 'a', [ 'repo_a' ] )
+      self.overlay.set_package_dir ( 'sci-R', 'b', [ 'repo_a', 'repo_b' ] )
+      self.overlay.set_package_dir ( 'sci-R', 'c', [ None ] )
+      self.overlay.set_package_dir ( 'dev-R', 'a', [ 'repo_b' ] )
+   # --- end of setUp (...) ---
+
+   def new_pool ( self ):
+      return roverlay.depres.simpledeprule.dynpool.get (
+         roverlay.overlay.rulegen.DepresRuleGenerator (
+            self.overlay, repo_id_map=self.REPO_ID_MAP
+         )
+      )
+   # --- end of new_pool (...) ---
+
+   def get_rule_view ( self, pool ):
+      return [
+         ( rule.resolving_package, rule.is_selfdep )
+         for rule in pool.iter_rules()
+      ]
+   # --- end of get_rule_view (...) ---
+
+   def match ( self, pool, dep_str ):
+      result = pool.matches ( roverlay.depres.depenv.DepEnv (
+         dep_str, roverlay.depres.deptype.internal
+      ) )
+      return result.dep if result else None
+   # --- end of match (...) ---
+
+   def assert_same_as_full_reload ( self, pool ):
+      full_pool = self.new_pool()
+      full_pool.reload()
+
+      self.assertEqual (
+         self.get_rule_view ( pool ), self.get_rule_view ( full_pool )
+      )
+      self.assertEqual ( pool.rule_weight, full_pool.rule_weight )
+      self.assertEqual ( pool.get_rule_count(), full_pool.get_rule_count() )
+   # --- end of assert_same_as_full_reload (...) ---
+
+   def test_incremental ( self ):
+      pool = self.new_pool()
+      self.assertIsNone ( pool.reload_incremental() )
+      self.assertEqual ( pool.get_rule_count(), 5 )
+      self.assertEqual ( self.match ( pool, "d" ), None )
+
+      self.overlay.set_package_dir ( 'sci-R', 'd', [ 'repo_b' ] )
+      self.overlay.remove_package_dir ( 'sci-R', 'c' )
+      self.assertEqual (
+         pool.reload_incremental(), frozenset ({ 'c', 'd', })
+      )
+      self.assertEqual ( self.match ( pool, "c" ), None )
+      self.assertEqual ( self.match ( pool, "d" ), "sci-R/d" )
+      self.assert_same_as_full_reload ( pool )
+
+      self.overlay.set_package_dir ( 'dev-R', 'a', [ 'repo_a' ] )
+      self.assertEqual ( pool.reload_incremental(), frozenset ({ 'a', }) )
+      self.assert_same_as_full_reload ( pool )
+   # --- end of test_incremental (...) ---
+
+   def test_unchanged ( self ):
+      pool = self.new_pool()
+      pool.reload_incremental()
+      rules = list ( pool.iter_rules() )
+
+      # same packages -> rules are kept
+      self.overlay.set_package_dir ( 'sci-R', 'b', [ 'repo_b', 'repo_a' ] )
+      self.assertEqual ( pool.reload_incremental(), set() )
+      self.assertEqual ( len ( rules ), len ( list ( pool.iter_rules() ) ) )
+      for rule_a, rule_b in zip ( rules, pool.iter_rules() ):
+         self.assertIs ( rule_a, rule_b )
+   # --- end of test_unchanged (...) ---
+
+   def test_resolver_cache ( self ):
+      resolver = roverlay.depres.depresolver.DependencyResolver ( None )
+      pool     = self.new_pool()
+      resolver.add_rulepool ( pool, pool_type=1 )
+      resolver.reload_pools()
+
+      for dep_str in [ "d (>= 1.0)", "zzz" ]:
+         dep_env = roverlay.depres.depenv.DepEnv (
+            dep_str, roverlay.depres.deptype.internal
+         )
+         resolver._dep_unresolvable.add ( dep_env.dep_str_low )
+         resolver._add_cache_names ( dep_env )
+
+      self.overlay.set_package_dir ( 'sci-R', 'd', [ 'repo_b' ] )
+      resolver.reload_pools()
+      self.assertEqual ( resolver._dep_unresolvable, { 'zzz', } )
+   # --- end of test_resolver_cache (...) ---
+
+# --- end of DynamicSelfdepPoolTestCase ---
@@ -0,0 +1,188 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import roverlay.digest
+import roverlay.db.digeststore
+import roverlay.util.hashpool
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( HashPoolTestCase )
+
+
+class HashPoolTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [
+      'backends', 'chunksize', 'auto_backend', 'known_digests',
+      'digest_store', 'partial_digest_store',
+   ]
+
+   DIGEST_TYPES = ( 'sha256', 'sha512', )
+
+   def setUp ( self ):
+      self.tmpdir = tempfile.mkdtemp()
+      self.files  = list()
+      for k in range ( 6 ):
+         filepath = os.path.join ( self.tmpdir, 'file{:d}'.format ( k ) )
+         with open ( filepath, 'wb' ) as fh:
+            fh.write ( os.path.basename ( filepath ).encode() * 1000 * k )
+         self.files.append ( filepath )
+
+      self.slow_types = roverlay.digest.SLOW_DIGEST_TYPES
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      roverlay.digest.SLOW_DIGEST_TYPES = self.slow_types
+      roverlay.digest.set_digest_store ( None )
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def get_expected ( self, filepath, digest_types=None ):
+      with open ( filepath, 'rb' ) as fh:
+         data = fh.read()
+      return {
+         h: hashlib.new ( h, data ).hexdigest()
+         for h in ( digest_types or self.DIGEST_TYPES )
+      }
+   # --- end of get_expected (...) ---
+
+   def run_pool ( self, hashes=None, **kwargs ):
+      hash_pool = roverlay.util.hashpool.HashPool (
+         hashes or self.DIGEST_TYPES, 2, **kwargs
+      )
+      for filepath in self.files:
+         hash_pool.add ( filepath, filepath, None )
+      return dict ( hash_pool.run_as_completed() )
+   # --- end of run_pool (...) ---
+
+   def test_backends ( self ):
+      expected = { f: self.get_expected ( f ) for f in self.files }
+
+      for name in sorted ( roverlay.util.hashpool.DIGEST_BACKENDS ):
+         self.assertEqual ( self.run_pool ( backend=name ), expected )
+
+      for use_threads in ( True, False, None ):
+         self.assertEqual (
+            self.run_pool ( use_threads=use_threads ), expected
+         )
+
+      self.assertRaises (
+         ValueError, roverlay.util.hashpool.HashPool,
+         self.DIGEST_TYPES, 2, backend='undef'
+      )
+   # --- end of test_backends (...) ---
+
+   def test_chunksize ( self ):
+      backend = roverlay.util.hashpool.ProcessDigestBackend ( 2 )
+      self.assertEqual ( backend.get_chunksize ( 1 ), 1 )
+      self.assertEqual ( backend.get_chunksize ( 100 ), 12 )
+   # --- end of test_chunksize (...) ---
+
+   def test_auto_backend ( self ):
+      hashpool = roverlay.util.hashpool
+      jobs_per_backend = dict()
+
+      class RecordingAutoBackend ( hashpool.AutoDigestBackend ):
+         def __init__ ( self, max_workers ):
+            super ( RecordingAutoBackend, self ).__init__ ( max_workers )
+            for backend in ( self.thread_backend, self.process_backend ):
+               backend.map_jobs = self.wrap_map_jobs ( backend )
+
+         def wrap_map_jobs ( self, backend ):
+            def map_jobs ( exe, jobs ):
+               jobs_per_backend [backend.NAME] = [ j[0] for j in jobs ]
+               return backend.__class__.map_jobs ( backend, exe, jobs )
+            return map_jobs
+
+      # pretend that sha512 is slow
+      roverlay.digest.SLOW_DIGEST_TYPES = frozenset ({ 'sha512', })
+
+      hash_pool = hashpool.HashPool (
+         self.DIGEST_TYPES, 2, backend=RecordingAutoBackend ( 2 )
+      )
+      for k, filepath in enumerate ( self.files ):
+         hash_pool.add (
+            filepath, filepath,
+            # odd files need sha256 only
+            self.get_expected ( filepath, ( 'sha512', ) ) if k % 2 else None
+         )
+
+      self.assertEqual (
+         dict ( hash_pool.run_as_completed() ),
+         { f: self.get_expected ( f ) for f in self.files }
+      )
+      self.assertEqual (
+         jobs_per_backend,
+         { 'process': self.files[0::2], 'thread': self.files[1::2], }
+      )
+   # --- end of test_auto_backend (...) ---
+
+   def test_known_digests ( self ):
+      hashed_files = list()
+
+      class RecordingBackend ( roverlay.util.hashpool.DigestBackend ):
+         def hash_files ( self, jobs ):
+            hashed_files.extend ( j[0] for j in jobs )
+            return super ( RecordingBackend, self ).hash_files ( jobs )
+
+      hash_pool = roverlay.util.hashpool.HashPool (
+         self.DIGEST_TYPES, 2, backend=RecordingBackend ( 2 )
+      )
+      hash_pool.add ( 0, self.files[0], self.get_expected ( self.files[0] ) )
+      hash_pool.add ( 1, self.files[1], None )
+      hash_pool.run()
+
+      self.assertEqual ( hashed_files, [ self.files[1] ] )
+      self.assertEqual (
+         hash_pool.get ( 1 ), self.get_expected ( self.files[1] )
+      )
+   # --- end of test_known_digests (...) ---
+
+   def test_digest_store ( self ):
+      store = roverlay.db.digeststore.DigestStore (
+         os.path.join ( self.tmpdir, 'digest_store.db' ),
+         digest_types=self.DIGEST_TYPES, read_now=False
+      )
+      roverlay.digest.set_digest_store ( store )
+
+      # the store is updated in the main process
+      self.assertEqual (
+         self.run_pool ( ( 'sha256', ), backend='process' ),
+         { f: self.get_expected ( f, ( 'sha256', ) ) for f in self.files }
+      )
+      self.assertEqual ( len ( store ), len ( self.files ) )
+      for filepath in self.files:
+         self.assertEqual (
+            store.lookup ( filepath ) [1], self.get_expected ( filepath )
+         )
+   # --- end of test_digest_store (...) ---
+
+   def test_partial_digest_store ( self ):
+      store = roverlay.db.digeststore.DigestStore (
+         os.path.join ( self.tmpdir, 'digest_store.db' ),
+         digest_types=( 'sha256', ), read_now=False
+      )
+      roverlay.digest.set_digest_store ( store )
+
+      # the store knows sha256 only (e.g. distmap digests)
+      for filepath in self.files:
+         roverlay.digest.get_file_digest ( filepath, 'sha256' )
+
+      for backend in ( 'inline', 'process', ):
+         self.assertEqual (
+            self.run_pool ( backend=backend ),
+            { f: self.get_expected ( f ) for f in self.files }
+         )
+   # --- end of test_partial_digest_store (...) ---
+
+# --- end of HashPoolTestCase ---
@@ -0,0 +1,292 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import random
+
+import roverlay.packageinfo
+
+import roverlay.packagerules.rules
+import roverlay.packagerules.dispatch
+import roverlay.packagerules.abstract.acceptors
+import roverlay.packagerules.abstract.actions
+import roverlay.packagerules.abstract.rules
+import roverlay.packagerules.acceptors.stringmatch
+import roverlay.packagerules.acceptors.trivial
+import roverlay.packagerules.acceptors.util
+import roverlay.packagerules.actions.trace
+
+import tests.base
+
+from roverlay.packagerules.abstract.acceptors import \
+   Acceptor_AND, Acceptor_OR, Acceptor_NOR
+
+from roverlay.packagerules.acceptors.stringmatch import \
+   StringAcceptor, NocaseStringAcceptor, RegexAcceptor, ExactRegexAcceptor
+
+from roverlay.packagerules.acceptors.util import \
+   get_ebuild_name, get_repo_name, get_category
+
+
+def suite():
+   return tests.base.make_testsuite ( RuleDispatchTestCase )
+
+
+class SetCategoryAction (
+   roverlay.packagerules.abstract.actions.PackageRuleAction
+):
+
+   def __init__ ( self, category, priority=1000 ):
+      super ( SetCategoryAction, self ).__init__ ( priority=priority )
+      self.category = category
+
+   def apply_action ( self, p_info ):
+      p_info.set_direct_unsafe ( 'category', self.category )
+
+# --- end of SetCategoryAction ---
+
+
+class RuleDispatchTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'guards', 'candidates', 'modified', 'randomized', ]
+
+   NAMES      = [ 'abc', 'abd', 'xyz', 'R6', 'ggplot2', 'zoo', ]
+   REPOS      = [ 'CRAN', 'BIOC', 'omegahat', ]
+   CATEGORIES = [ 'sci-R', 'sci-biology', 'dev-R', ]
+
+   def new_package ( self, name, repo_name, category='sci-R' ):
+      p = roverlay.packageinfo.PackageInfo ( name=name )
+      p.set_direct_unsafe ( 'repo_name', repo_name )
+      p.set_direct_unsafe ( 'category', category )
+      return p
+   # --- end of new_package (...) ---
+
+   def new_rule ( self, acceptor, ident, alt_ident=None, actions=() ):
+      rule = roverlay.packagerules.abstract.rules.PackageRule()
+      rule.set_acceptor ( acceptor )
+      rule.add_action ( roverlay.packagerules.actions.trace.TraceAction (
+         ident, priority=0
+      ) )
+      for action in actions:
+         rule.add_action ( action )
+      if alt_ident is not None:
+         rule.add_alternative_action (
+            roverlay.packagerules.actions.trace.TraceAction ( alt_ident )
+         )
+      return rule
+   # --- end of new_rule (...) ---
+
+   def new_package_rules ( self, rules ):
+      package_rules = roverlay.packagerules.rules.PackageRules()
+      for rule in rules:
+         package_rules.append_rule ( rule, prepare_rule=False )
+      package_rules.prepare()
+      return package_rules
+   # --- end of new_package_rules (...) ---
+
+   def apply ( self, package_rules, p_info ):
+      p_info.modified_by_package_rules = []
+      ret = package_rules.apply_actions ( p_info )
+      return (
+         ret, tuple ( p_info.modified_by_package_rules ),
+         p_info.get ( 'category' )
+      )
+   # --- end of apply (...) ---
+
+   def drop_dispatchers ( self, package_rules ):
+      for rule in package_rules._iter_all_rules ( with_self=True ):
+         if hasattr ( rule, '_rules_dispatch' ):
+            rule._rules_dispatch     = None
+            rule._alt_rules_dispatch = None
+   # --- end of drop_dispatchers (...) ---
+
+   def combine ( self, acceptor_cls, *acceptors ):
+      combined = acceptor_cls ( 0 )
+      for acceptor in acceptors:
+         combined.add_acceptor ( acceptor )
+      return combined
+   # --- end of combine (...) ---
+
+   def test_guards ( self ):
+      get_guard = roverlay.packagerules.dispatch.get_acceptor_guard
+
+      name_acceptor = StringAcceptor ( 0, get_ebuild_name, 'abc' )
+      self.assertEqual (
+         get_guard ( name_acceptor ),
+         [ ( roverlay.packagerules.dispatch.GUARD_EXACT,
+            get_ebuild_name, 'abc' ) ]
+      )
+      self.assertIsNone ( get_guard (
+         self.combine ( Acceptor_NOR, name_acceptor )
+      ) )
+      self.assertIsNone ( get_guard (
+         self.combine (
+            Acceptor_OR, name_acceptor,
+            roverlay.packagerules.acceptors.trivial.TrueAcceptor ( 0 )
+         )
+      ) )
+
+      # AND prefers exact matches over regexes
+      self.assertEqual (
+         get_guard ( self.combine (
+            Acceptor_AND,
+            RegexAcceptor ( 0, get_category, regex='^sci' ),
+            name_acceptor
+         ) ),
+         get_guard ( name_acceptor )
+      )
+   # --- end of test_guards (...) ---
+
+   def test_candidates ( self ):
+      rules = [
+         self.new_rule ( StringAcceptor ( 0, get_ebuild_name, name ), name )
+         for name in self.NAMES
+      ]
+      rules.append ( self.new_rule (
+         NocaseStringAcceptor ( 0, get_repo_name, 'cran' ), 'cran'
+      ) )
+      rules.append ( self.new_rule (
+         RegexAcceptor ( 0, get_ebuild_name, regex='^ab' ), 'ab*'
+      ) )
+      rules.append ( self.new_rule (
+         ExactRegexAcceptor ( 0, get_ebuild_name, regex='.*2' ), '*2'
+      ) )
+      package_rules = self.new_package_rules ( rules )
+
+      dispatcher = package_rules._rules_dispatch
+      self.assertIsNotNone ( dispatcher )
+      self.assertEqual (
+         [ rule.priority for rule in dispatcher.iter_rules (
+            self.new_package ( 'abd', 'CRAN' )
+         ) ],
+         [ 1, 6, 7 ]
+      )
+      self.assertEqual (
+         self.apply ( package_rules, self.new_package ( 'ggplot2', 'BIOC' ) ),
+         ( True, ( 'ggplot2', '*2' ), 'sci-R' )
+      )
+   # --- end of test_candidates (...) ---
+
+   def test_modified ( self ):
+      rules = [
+         self.new_rule (
+            StringAcceptor ( 0, get_ebuild_name, 'abc' ), 'move',
+            actions=[ SetCategoryAction ( 'sci-biology' ) ]
+         ),
+      ] + [
+         self.new_rule (
+            StringAcceptor ( 0, get_category, category ), category
+         ) for category in self.CATEGORIES
+      ]
+      package_rules = self.new_package_rules ( rules )
+      self.assertIsNotNone ( package_rules._rules_dispatch )
+
+      self.assertEqual (
+         self.apply ( package_rules, self.new_package ( 'abc', 'CRAN' ) ),
+         ( True, ( 'move', 'sci-biology' ), 'sci-biology' )
+      )
+      self.assertEqual (
+         self.apply (
+            package_rules, self.new_package ( 'abd', 'CRAN', 'dev-R' )
+         ),
+         ( True, ( 'dev-R', ), 'dev-R' )
+      )
+   # --- end of test_modified (...) ---
+
+   def get_random_acceptor ( self, rng, depth=0 ):
+      choice = rng.randint ( 0, 9 if depth < 2 else 5 )
+      if choice == 0:
+         return StringAcceptor (
+            0, get_ebuild_name, rng.choice ( self.NAMES )
+         )
+      elif choice == 1:
+         return NocaseStringAcceptor (
+            0, get_repo_name, rng.choice ( self.REPOS ).upper()
+         )
+      elif choice == 2:
+         return StringAcceptor (
+            0, get_category, rng.choice ( self.CATEGORIES )
+         )
+      elif choice == 3:
+         return RegexAcceptor (
+            0, get_ebuild_name, regex=rng.choice ( self.NAMES )[:2]
+         )
+      elif choice == 4:
+         return ExactRegexAcceptor (
+            0, get_category, regex=rng.choice ( [ 'sci-.*', 'dev-R', '.*' ] )
+         )
+      elif choice == 5:
+         return rng.choice ( [
+            roverlay.packagerules.acceptors.trivial.TrueAcceptor ( 0 ),
+            roverlay.packagerules.acceptors.trivial.FalseAcceptor ( 0 ),
+         ] )
+      else:
+         return self.combine (
+            rng.choice ( [ Acceptor_AND, Acceptor_OR, Acceptor_NOR ] ),
+            *[
+               self.get_random_acceptor ( rng, depth + 1 )
+               for k in range ( rng.randint ( 1, 3 ) )
+            ]
+         )
+   # --- end of get_random_acceptor (...) ---
+
+   def get_random_rule ( self, rng, ident, depth=0 ):
+      if depth < 1 and rng.randint ( 0, 9 ) == 0:
+         rule = roverlay.packagerules.abstract.rules.NestedPackageRule()
+         rule.set_acceptor ( self.get_random_acceptor ( rng ) )
+         for k in range ( rng.randint ( 0, 6 ) ):
+            rule.add_rule ( self.get_random_rule (
+               rng, "{}.{:d}".format ( ident, k ), depth + 1
+            ) )
+         return rule
+
+      elif rng.randint ( 0, 29 ) == 0:
+         rule = roverlay.packagerules.abstract.rules.IgnorePackageRule()
+         rule.set_acceptor ( self.get_random_acceptor ( rng ) )
+         return rule
+
+      else:
+         actions = list()
+         if rng.randint ( 0, 4 ) == 0:
+            actions.append (
+               SetCategoryAction ( rng.choice ( self.CATEGORIES ) )
+            )
+         return self.new_rule (
+            self.get_random_acceptor ( rng ), ident,
+            alt_ident=( ident + "!" if rng.randint ( 0, 9 ) == 0 else None ),
+            actions=actions
+         )
+   # --- end of get_random_rule (...) ---
+
+   def test_randomized ( self ):
+      rng = random.Random ( 2014 )
+      for attempt in range ( 50 ):
+         rules = [
+            self.get_random_rule ( rng, str ( k ) )
+            for k in range ( rng.randint ( 0, 40 ) )
+         ]
+         compiled_rules = self.new_package_rules ( rules )
+         # rules are shared, dispatchers are attached to them
+         expected = list()
+         packages = [
+            (
+               rng.choice ( self.NAMES ), rng.choice ( self.REPOS ),
+               rng.choice ( self.CATEGORIES )
+            ) for k in range ( 20 )
+         ]
+         for args in packages:
+            expected.append (
+               self.apply ( compiled_rules, self.new_package ( *args ) )
+            )
+
+         self.drop_dispatchers ( compiled_rules )
+         for args, result in zip ( packages, expected ):
+            self.assertEqual (
+               self.apply ( compiled_rules, self.new_package ( *args ) ),
+               result
+            )
+   # --- end of test_randomized (...) ---
+
+# --- end of RuleDispatchTestCase ---
@@ -0,0 +1,273 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import gzip
+import io
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+
+import roverlay.packageinfo
+import roverlay.remote.basicrepo
+import roverlay.remote.pkgindex
+import roverlay.rpackage.descpool
+import roverlay.rpackage.descriptionreader
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( PackageIndexTestCase )
+
+
+class PackageIndexTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [
+      'parse', 'load_dir', 'reader', 'fallback', 'has_entry', 'desc_pool',
+   ]
+
+   PACKAGES_TEXT = (
+      'Package: abc\n'
+      'Version: 1.0-2\n'
+      'Depends: R (>= 2.15), zoo,\n'
+      '        xyz\n'
+      'Imports: methods\n'
+      'License: GPL-2\n'
+      'Title: A Package\n'
+      'MD5sum: 0123456789abcdef0123456789abcdef\n'
+      '\n'
+      '\n'
+      'Package: xyz\n'
+      'Version: 0.3\n'
+      'License: MIT + file LICENSE\n'
+      '\n'
+      'Comment: no package\n'
+   )
+
+   @classmethod
+   def setUpClass ( cls ):
+      super ( PackageIndexTestCase, cls ).setUpClass()
+
+      if cls.CONFIG.get_field_definition() is None:
+         # load the field definition, using a small licenses file
+         licenses_dir  = tempfile.mkdtemp()
+         licenses_file = os.path.join ( licenses_dir, 'licenses' )
+         try:
+            with open ( licenses_file, 'w' ) as fh:
+               fh.write ( 'GPL-2 MIT\n' )
+
+            for key, value in (
+               ( 'LICENSEMAP.licenses_file', licenses_file ),
+               ( 'LICENSEMAP.create_licenses_file', False ),
+               ( 'LICENSEMAP.use_portdir', False ),
+            ):
+               cls.CONFIG.inject ( key, value, suppress_log=True )
+
+            cls.CONFIG.get_loader().load_field_definition (
+               os.path.join (
+                  os.path.dirname ( os.path.dirname ( __file__ ) ),
+                  'config', 'description_fields.conf'
+               )
+            )
+         finally:
+            shutil.rmtree ( licenses_dir )
+   # --- end of setUpClass (...) ---
+
+   def setUp ( self ):
+      self.tmpdir = tempfile.mkdtemp()
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def new_repo ( self, compressed=True ):
+      if compressed:
+         with gzip.open (
+            os.path.join ( self.tmpdir, 'PACKAGES.gz' ), 'wb'
+         ) as fh:
+            fh.write ( self.PACKAGES_TEXT.encode() )
+      else:
+         with open ( os.path.join ( self.tmpdir, 'PACKAGES' ), 'w' ) as fh:
+            fh.write ( self.PACKAGES_TEXT )
+
+      return roverlay.remote.basicrepo.BasicRepo (
+         name='pkgindex_test', distroot=None, directory=self.tmpdir
+      )
+   # --- end of new_repo (...) ---
+
+   def new_reader ( self, repo, package_filename, use_package_index=True ):
+      p_info = roverlay.packageinfo.PackageInfo (
+         filename=package_filename, origin=repo
+      )
+      reader = roverlay.rpackage.descriptionreader.DescriptionReader (
+         p_info, logging.getLogger(), read_now=False, write_desc=False
+      )
+      reader.USE_PACKAGE_INDEX = use_package_index
+      return reader
+   # --- end of new_reader (...) ---
+
+   def test_parse ( self ):
+      package_index = roverlay.remote.pkgindex.PackageIndex()
+      package_index.add_lines ( self.PACKAGES_TEXT.split ( '\n' ) )
+
+      self.assertEqual ( len ( package_index ), 2 )
+      self.assertIn ( 'abc_1.0-2.tar.gz', package_index )
+      self.assertEqual (
+         package_index.get ( 'abc_1.0-2.tar.gz' )[2:4],
+         [ 'Depends: R (>= 2.15), zoo,', '        xyz' ]
+      )
+      self.assertEqual (
+         package_index.get ( 'xyz_0.3.tar.gz' ),
+         [ 'Package: xyz', 'Version: 0.3', 'License: MIT + file LICENSE' ]
+      )
+      self.assertIsNone ( package_index.get ( 'xyz_0.4.tar.gz' ) )
+
+      # write + reread
+      filepath = os.path.join ( self.tmpdir, 'PACKAGES' )
+      package_index.write_file ( filepath )
+      reread_index = roverlay.remote.pkgindex.PackageIndex()
+      reread_index.load_file ( filepath )
+      self.assertEqual ( reread_index._stanzas, package_index._stanzas )
+   # --- end of test_parse (...) ---
+
+   def test_load_dir ( self ):
+      for compressed in ( True, False ):
+         repo = self.new_repo ( compressed=compressed )
+         self.assertEqual (
+            repo.get_package_index_entry ( 'xyz_0.3.tar.gz' )[0],
+            'Package: xyz'
+         )
+         os.unlink ( os.path.join (
+            self.tmpdir, 'PACKAGES.gz' if compressed else 'PACKAGES'
+         ) )
+
+      repo = roverlay.remote.basicrepo.BasicRepo (
+         name='pkgindex_test', distroot=None, directory=self.tmpdir
+      )
+      self.assertIsNone ( repo.get_package_index_entry ( 'xyz_0.3.tar.gz' ) )
+   # --- end of test_load_dir (...) ---
+
+   def test_reader ( self ):
+      reader = self.new_reader ( self.new_repo(), 'abc_1.0-2.tar.gz' )
+      read_data = reader.read_package_index_entry()
+
+      self.assertIsNotNone ( read_data )
+      self.assertEqual ( read_data ['Title'], 'A Package' )
+      self.assertEqual (
+         read_data ['Depends'], [ 'R (>= 2.15)', 'zoo', 'xyz' ]
+      )
+      self.assertEqual ( read_data ['Imports'], [ 'methods' ] )
+
+      # the package file does not exist
+      reader.run()
+      self.assertEqual ( reader.get_desc ( run_if_unset=False ), read_data )
+   # --- end of test_reader (...) ---
+
+   def test_fallback ( self ):
+      repo = self.new_repo()
+
+      # no title
+      reader = self.new_reader ( repo, 'xyz_0.3.tar.gz' )
+      self.assertIsNone ( reader.read_package_index_entry() )
+
+      # no entry
+      reader = self.new_reader ( repo, 'zoo_1.0.tar.gz' )
+      self.assertIsNone ( reader.read_package_index_entry() )
+
+      # disabled
+      reader = self.new_reader (
+         repo, 'abc_1.0-2.tar.gz', use_package_index=False
+      )
+      reader.run()
+      self.assertIsNone ( reader.get_desc ( run_if_unset=False ) )
+   # --- end of test_fallback (...) ---
+
+   def test_has_entry ( self ):
+      descriptionreader = roverlay.rpackage.descriptionreader
+      repo = self.new_repo()
+
+      def has_entry ( package_filename ):
+         return descriptionreader.has_package_index_entry (
+            roverlay.packageinfo.PackageInfo (
+               filename=package_filename, origin=repo
+            )
+         )
+
+      self.CONFIG.inject (
+         'DESCRIPTION.use_package_index', True, suppress_log=True
+      )
+      try:
+         self.assertTrue ( has_entry ( 'abc_1.0-2.tar.gz' ) )
+         # no title, the package file has to be read
+         self.assertFalse ( has_entry ( 'xyz_0.3.tar.gz' ) )
+         self.assertFalse ( has_entry ( 'zoo_1.0.tar.gz' ) )
+      finally:
+         self.CONFIG.inject (
+            'DESCRIPTION.use_package_index', False, suppress_log=True
+         )
+
+      self.assertFalse ( has_entry ( 'abc_1.0-2.tar.gz' ) )
+   # --- end of test_has_entry (...) ---
+
+   def write_package_file ( self, name ):
+      filepath = os.path.join ( self.tmpdir, name + '_1.0.tar.gz' )
+      desc     = (
+         'Package: {0}\nVersion: 1.0\nTitle: Package {0}\n'.format ( name )
+      ).encode()
+
+      with tarfile.open ( filepath, 'w:gz' ) as tar:
+         tarinfo = tarfile.TarInfo ( name + '/DESCRIPTION' )
+         tarinfo.size = len ( desc )
+         tar.addfile ( tarinfo, io.BytesIO ( desc ) )
+      return filepath
+   # --- end of write_package_file (...) ---
+
+   def test_desc_pool ( self ):
+      descpool = roverlay.rpackage.descpool
+      if not descpool.HAVE_CONCURRENT_FUTURES:
+         self.skipTest ( "concurrent.futures is not available" )
+
+      names = [ 'pkg{:d}'.format ( k ) for k in range ( 40 ) ]
+      jobs  = {
+         name: ( self.write_package_file ( name ), name ) for name in names
+      }
+      jobs ['missing'] = (
+         os.path.join ( self.tmpdir, 'missing_1.0.tar.gz' ), 'missing'
+      )
+
+      def run_pool ( max_workers, use_threads=False ):
+         desc_pool = descpool.DescriptionPool (
+            max_workers, use_threads=use_threads
+         )
+         for backref, job in jobs.items():
+            desc_pool.add ( backref, *job )
+         return dict ( desc_pool.run_as_completed() )
+      # --- end of run_pool (...) ---
+
+      expected = run_pool ( 0 )
+      self.assertEqual ( len ( expected ), len ( jobs ) )
+      self.assertIsNone ( expected ['missing'] )
+      self.assertEqual ( expected ['pkg7'] ['Title'], 'Package pkg7' )
+
+      self.assertEqual ( run_pool ( 2, use_threads=True ), expected )
+      self.assertEqual ( run_pool ( 2 ), expected )
+
+      # worker processes must not be forked while other threads are running
+      event  = threading.Event()
+      thread = threading.Thread ( target=event.wait )
+      thread.start()
+      try:
+         self.assertRaises ( AssertionError, run_pool, 2 )
+      finally:
+         event.set()
+         thread.join()
+   # --- end of test_desc_pool (...) ---
+
+# --- end of PackageIndexTestCase ---
@@ -0,0 +1,228 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os
+import shutil
+import tempfile
+
+import roverlay.remote.basicrepo
+import roverlay.remote.changeset
+import roverlay.remote.rsync
+
+import tests.base
+
+from roverlay.remote.changeset import \
+   CHANGE_ADDED, CHANGE_UPDATED, CHANGE_DELETED
+
+
+def suite():
+   return tests.base.make_testsuite ( RepoChangesTestCase )
+
+
+def find_executable ( name ):
+   for dirpath in os.environ.get ( 'PATH', '' ).split ( os.pathsep ):
+      if dirpath and os.access ( os.path.join ( dirpath, name ), os.X_OK ):
+         return os.path.join ( dirpath, name )
+   return None
+# --- end of find_executable (...) ---
+
+
+class RepoChangesTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [
+      'itemized', 'merge', 'run_rsync', 'rsync_argv', 'scan_files', 'sync',
+   ]
+
+   ITEMIZED_OUTPUT = [
+      'cd+++++++++ Archive/',
+      '>f+++++++++ abc_1.0.tar.gz',
+      '>f.st...... xyz_0.3.tar.gz',
+      '>f..t...... Archive/abc/abc_0.9.tar.gz',
+      '.f...p..... PACKAGES',
+      'cL+++++++++ link_1.0.tar.gz',
+      '*deleting   old_0.1.tar.gz',
+      '*deleting   olddir/',
+      '',
+      'Number of files: 5 (reg: 4, dir: 1)',
+      'sent 1.23K bytes  received 4.56K bytes  11.58K bytes/sec',
+   ]
+
+   def setUp ( self ):
+      self.tmpdir = tempfile.mkdtemp()
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def get_changeset ( self, lines ):
+      parser = roverlay.remote.changeset.ItemizedParser()
+      for line in lines:
+         parser ( line )
+      return parser.changeset
+   # --- end of get_changeset (...) ---
+
+   def write_file ( self, *path_components ):
+      filepath = os.path.join ( self.tmpdir, *path_components )
+      if not os.path.isdir ( os.path.dirname ( filepath ) ):
+         os.makedirs ( os.path.dirname ( filepath ) )
+      with open ( filepath, 'w' ) as fh:
+         fh.write ( filepath )
+   # --- end of write_file (...) ---
+
+   def test_itemized ( self ):
+      changeset = self.get_changeset ( self.ITEMIZED_OUTPUT )
+      self.assertEqual (
+         list ( changeset.iter_changes() ),
+         [
+            ( CHANGE_ADDED,   'abc_1.0.tar.gz' ),
+            ( CHANGE_ADDED,   'link_1.0.tar.gz' ),
+            ( CHANGE_UPDATED, 'Archive/abc/abc_0.9.tar.gz' ),
+            ( CHANGE_UPDATED, 'PACKAGES' ),
+            ( CHANGE_UPDATED, 'xyz_0.3.tar.gz' ),
+            ( CHANGE_DELETED, 'old_0.1.tar.gz' ),
+         ]
+      )
+   # --- end of test_itemized (...) ---
+
+   def test_merge ( self ):
+      changeset = self.get_changeset ( self.ITEMIZED_OUTPUT )
+      changeset.merge ( self.get_changeset ([
+         '*deleting   abc_1.0.tar.gz',
+         '*deleting   xyz_0.3.tar.gz',
+         '>f+++++++++ old_0.1.tar.gz',
+         '>f+++++++++ new_1.0.tar.gz',
+      ]) )
+      self.assertEqual ( changeset.added, {
+         'link_1.0.tar.gz', 'new_1.0.tar.gz',
+      } )
+      self.assertEqual ( changeset.updated, {
+         'Archive/abc/abc_0.9.tar.gz', 'PACKAGES', 'old_0.1.tar.gz',
+      } )
+      self.assertEqual ( changeset.deleted, { 'xyz_0.3.tar.gz' } )
+
+      filepath = os.path.join ( self.tmpdir, 'changes', 'repo' )
+      changeset.write_file ( filepath )
+      reread = roverlay.remote.changeset.RepoChangeset()
+      reread.read_file ( filepath )
+      self.assertEqual ( reread, changeset )
+
+      roverlay.remote.changeset.RepoChangeset().write_file ( filepath )
+      reread = roverlay.remote.changeset.RepoChangeset()
+      reread.read_file ( filepath )
+      self.assertFalse ( reread )
+   # --- end of test_merge (...) ---
+
+   def test_run_rsync ( self ):
+      script = os.path.join ( self.tmpdir, 'output' )
+      with open ( script, 'w' ) as fh:
+         fh.write ( '\n'.join ( self.ITEMIZED_OUTPUT ) )
+
+      parser = roverlay.remote.changeset.ItemizedParser()
+      self.assertEqual (
+         roverlay.remote.rsync.run_rsync (
+            [ 'cat', script ], env=None, out_handler=parser
+         ),
+         os.EX_OK
+      )
+      self.assertEqual (
+         parser.changeset, self.get_changeset ( self.ITEMIZED_OUTPUT )
+      )
+   # --- end of test_run_rsync (...) ---
+
+   def test_rsync_argv ( self ):
+      is_itemized_line = roverlay.remote.changeset.is_itemized_line
+      self.assertEqual (
+         [ l for l in self.ITEMIZED_OUTPUT if not is_itemized_line ( l ) ],
+         self.ITEMIZED_OUTPUT [-3:]
+      )
+
+      repo = roverlay.remote.rsync.RsyncRepo (
+         name='changes_test', distroot=self.tmpdir,
+         src_uri='http://localhost/R', rsync_uri='rsync://localhost/R',
+         directory=os.path.join ( self.tmpdir, 'local' )
+      )
+
+      # rsync's output is captured only if changes are recorded
+      repo.changeset_file = None
+      self.assertNotIn ( '--out-format=%i %n', repo._rsync_argv() )
+
+      repo.changeset_file = os.path.join ( self.tmpdir, 'changes' )
+      self.assertIn ( '--out-format=%i %n', repo._rsync_argv() )
+   # --- end of test_rsync_argv (...) ---
+
+   def test_scan_files ( self ):
+      self.write_file ( 'abc_1.0.tar.gz' )
+      self.write_file ( 'Archive', 'abc', 'abc_0.9.tar.gz' )
+
+      repo = roverlay.remote.basicrepo.BasicRepo (
+         name='changes_test', distroot=None, directory=self.tmpdir,
+         src_uri='http://localhost/R'
+      )
+      self.assertIsNone ( repo.get_changeset() )
+
+      changeset = self.get_changeset ( self.ITEMIZED_OUTPUT )
+      packages  = list ( repo.scan_files (
+         changeset.iter_changed(),
+         is_package=lambda f: f.endswith ( '.tar.gz' )
+      ) )
+      self.assertEqual (
+         [ p ['src_uri'] for p in packages ],
+         [
+            'http://localhost/R/Archive/abc/abc_0.9.tar.gz',
+            'http://localhost/R/abc_1.0.tar.gz',
+         ]
+      )
+      self.assertEqual (
+         [ p ['package_file'] for p in packages ],
+         [
+            os.path.join ( self.tmpdir, 'Archive', 'abc', 'abc_0.9.tar.gz' ),
+            os.path.join ( self.tmpdir, 'abc_1.0.tar.gz' ),
+         ]
+      )
+   # --- end of test_scan_files (...) ---
+
+   def test_sync ( self ):
+      if find_executable ( 'rsync' ) is None:
+         self.skipTest ( "rsync is not available" )
+
+      remote_dir = os.path.join ( self.tmpdir, 'remote' )
+      self.write_file ( 'remote', 'abc_1.0.tar.gz' )
+      self.write_file ( 'remote', 'xyz_0.3.tar.gz' )
+
+      repo = roverlay.remote.rsync.RsyncRepo (
+         name='changes_test', distroot=self.tmpdir,
+         src_uri='http://localhost/R', rsync_uri=remote_dir,
+         directory=os.path.join ( self.tmpdir, 'local' ),
+         extra_opts=[ '--delete' ]
+      )
+      repo.changeset_file = os.path.join ( self.tmpdir, 'changes' )
+
+      # no changes recorded before the first commit
+      self.assertTrue ( repo.sync() )
+      self.assertIsNone ( repo.get_changeset() )
+      self.assertEqual (
+         repo._changeset.added, { 'abc_1.0.tar.gz', 'xyz_0.3.tar.gz' }
+      )
+      self.assertTrue ( repo.commit_changeset() )
+      self.assertFalse ( repo.get_changeset() )
+
+      os.unlink ( os.path.join ( remote_dir, 'abc_1.0.tar.gz' ) )
+      self.write_file ( 'remote', 'new_1.0.tar.gz' )
+      self.assertTrue ( repo.sync() )
+
+      # changes are accumulated until they are committed
+      self.write_file ( 'remote', 'zoo_1.0.tar.gz' )
+      self.assertTrue ( repo.sync() )
+
+      changeset = repo.get_changeset()
+      self.assertEqual (
+         changeset.added, { 'new_1.0.tar.gz', 'zoo_1.0.tar.gz' }
+      )
+      self.assertEqual ( changeset.deleted, { 'abc_1.0.tar.gz' } )
+   # --- end of test_sync (...) ---
+
+# --- end of RepoChangesTestCase ---
@@ -0,0 +1,184 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+from __future__ import print_function
+
+import os
+import threading
+import time
+
+import roverlay.remote.changeset
+import roverlay.remote.repolist
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( RepoListTestCase )
+
+
+class FakeRepo ( object ):
+   """A repo whose sync() waits for an event (with timeout)."""
+
+   def __init__ ( self, name, wait_for=None, sync_status=True ):
+      super ( FakeRepo, self ).__init__()
+      self.name           = name
+      self.wait_for       = wait_for
+      self.sync_status    = sync_status
+      self.sync_started   = threading.Event()
+      self.sync_count     = 0
+      self.waited_success = None
+
+   def sync ( self, sync_enabled=True ):
+      self.sync_count += 1
+      self.sync_started.set()
+      if self.wait_for is not None:
+         self.waited_success = self.wait_for.wait ( 5.0 )
+         if not self.waited_success:
+            return False
+      time.sleep ( 0.01 )
+      return self.sync_status
+
+   def ready ( self ):
+      return bool ( self.sync_status )
+
+   def scan_distdir ( self, is_package, **kwargs ):
+      yield self.name + '_pkg'
+
+# --- end of FakeRepo ---
+
+
+class FakeChangesRepo ( FakeRepo ):
+   """A repo that records changes."""
+
+   def __init__ ( self, name, changed=None, **kwargs ):
+      super ( FakeChangesRepo, self ).__init__ ( name, **kwargs )
+      self.distdir = os.sep + 'nonexistent' + os.sep + name
+      if changed is None:
+         self.changeset = None
+      else:
+         self.changeset = roverlay.remote.changeset.RepoChangeset()
+         for filename in changed:
+            self.changeset.add_change (
+               roverlay.remote.changeset.CHANGE_ADDED, filename
+            )
+
+   def get_changeset ( self ):
+      return self.changeset
+
+   def scan_files ( self, filenames, is_package=None ):
+      for filename in filenames:
+         if is_package is None or is_package (
+            self.distdir + os.sep + filename
+         ):
+            yield filename
+
+# --- end of FakeChangesRepo ---
+
+
+class RepoListTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [
+      'sync_sequential', 'sync_concurrent', 'sync_and_add', 'changed_files',
+   ]
+
+   def get_repo_list ( self, repos, sync_jobs ):
+      repo_list = roverlay.remote.repolist.RepoList (
+         distroot='/nonexistent', sync_jobs=sync_jobs
+      )
+      repo_list.repos.extend ( repos )
+      return repo_list
+   # --- end of get_repo_list (...) ---
+
+   def assert_sync_time ( self, repo_list ):
+      for repo in repo_list.repos:
+         self.assertGreater (
+            repo_list.repo_stats.sync_time [repo.name].get_delta(), 0.0
+         )
+   # --- end of assert_sync_time (...) ---
+
+   def test_sync_sequential ( self ):
+      repos = [
+         FakeRepo ( 'seq_a', sync_status=False ), FakeRepo ( 'seq_b' )
+      ]
+      repo_list = self.get_repo_list ( repos, 1 )
+      self.assertFalse ( repo_list.is_concurrent() )
+
+      self.assertFalse ( repo_list.sync ( fail_greedy=True ) )
+      self.assertEqual ( repos[1].sync_count, 0 )
+
+      self.assertFalse ( repo_list.sync() )
+      self.assertEqual ( repos[1].sync_count, 1 )
+      self.assert_sync_time ( repo_list )
+   # --- end of test_sync_sequential (...) ---
+
+   def test_sync_concurrent ( self ):
+      # repo "con_a" can only be synced while "con_b" is being synced
+      repo_b    = FakeRepo ( 'con_b' )
+      repo_a    = FakeRepo ( 'con_a', wait_for=repo_b.sync_started )
+      repo_list = self.get_repo_list ( [ repo_a, repo_b ], 2 )
+      self.assertTrue ( repo_list.is_concurrent() )
+
+      self.assertTrue ( repo_list.sync() )
+      self.assertTrue ( repo_a.waited_success )
+      self.assert_sync_time ( repo_list )
+   # --- end of test_sync_concurrent (...) ---
+
+   def test_sync_and_add ( self ):
+      # repo "add_slow" finishes after packages from "add_fast"
+      # have been added
+      fast_added = threading.Event()
+      repo_slow  = FakeRepo ( 'add_slow', wait_for=fast_added )
+      repo_fast  = FakeRepo ( 'add_fast' )
+      repo_list  = self.get_repo_list ( [ repo_slow, repo_fast ], 2 )
+
+      added = list()
+      def add_package ( p ):
+         added.append ( p )
+         if p == 'add_fast_pkg':
+            fast_added.set()
+      # --- end of add_package (...) ---
+
+      repo_list.sync_and_add ( add_package )
+      self.assertEqual ( added, [ 'add_fast_pkg', 'add_slow_pkg' ] )
+      self.assert_sync_time ( repo_list )
+   # --- end of test_sync_and_add (...) ---
+
+   def test_changed_files ( self ):
+      repo_a    = FakeChangesRepo (
+         'chg_a', changed=[ 'a_1.0.tar.gz', 'sub/b_1.0.tar.gz' ]
+      )
+      repo_b    = FakeChangesRepo ( 'chg_b', changed=[] )
+      repo_list = self.get_repo_list ( [ repo_a, repo_b ], 1 )
+
+      self.assertEqual (
+         repo_list.get_changed_files(),
+         {
+            os.path.join ( repo_a.distdir, 'a_1.0.tar.gz' ),
+            os.path.join ( repo_a.distdir, 'sub', 'b_1.0.tar.gz' ),
+         }
+      )
+
+      # only the given package files are added
+      added = list()
+      repo_list.add_packages (
+         added.append,
+         file_filter=lambda f: not f.endswith ( 'c_1.0.tar.gz' ),
+         package_files={
+            os.path.join ( repo_a.distdir, 'sub', 'b_1.0.tar.gz' ),
+            os.path.join ( repo_b.distdir, 'c_1.0.tar.gz' ),
+            os.path.join ( repo_b.distdir, 'd_1.0.tar.gz' ),
+            os.path.join ( repo_b.distdir + 'x', 'e_1.0.tar.gz' ),
+         }
+      )
+      self.assertEqual ( added, [ 'sub/b_1.0.tar.gz', 'd_1.0.tar.gz' ] )
+
+      # changes of a usable repo are unknown
+      repo_list.repos.append ( FakeChangesRepo ( 'chg_c' ) )
+      self.assertIsNone ( repo_list.get_changed_files() )
+   # --- end of test_changed_files (...) ---
+
+# --- end of RepoListTestCase ---
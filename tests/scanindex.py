@@ -0,0 +1,105 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import os
+import shutil
+import tempfile
+
+import roverlay.db.scanindex
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( ScanIndexTestCase )
+
+
+class ScanIndexTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'unchanged', 'modified', 'removed', 'rebuild', ]
+
+   # ebuild $PVR => ( repo name, distfiles )
+   EBUILDS = {
+      '1.0'    : ( 'CRAN', ( 'a_1.0.tar.gz', ) ),
+      '1.1-r1' : ( None,   ( 'a_1.1.tar.gz', 'a/a_data.tar.gz' ) ),
+      '2.0'    : ( None,   () ),
+   }
+
+   def setUp ( self ):
+      self.tmpdir     = tempfile.mkdtemp()
+      self.index_file = self.tmpdir + os.sep + 'scan_index.db'
+      for pvr in self.EBUILDS:
+         self.write_ebuild ( pvr, pvr )
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def get_ebuild_file ( self, pvr ):
+      return self.tmpdir + os.sep + 'a-' + pvr + '.ebuild'
+   # --- end of get_ebuild_file (...) ---
+
+   def write_ebuild ( self, pvr, content ):
+      with open ( self.get_ebuild_file ( pvr ), 'wt' ) as FH:
+         FH.write ( content )
+   # --- end of write_ebuild (...) ---
+
+   def run_scan ( self, rebuild=False ):
+      """Looks up all ebuilds and records those that are not indexed.
+      Returns the set of recorded ebuild versions.
+      """
+      scan_index = roverlay.db.scanindex.ScanIndex (
+         self.index_file, index_compression=None, read_now=not rebuild
+      )
+
+      parsed = set()
+      for pvr, info in self.EBUILDS.items():
+         efile = self.get_ebuild_file ( pvr )
+         if not os.path.isfile ( efile ):
+            continue
+
+         entry = scan_index.lookup ( efile, pvr )
+         if entry is None:
+            parsed.add ( pvr )
+            self.assertTrue ( scan_index.record ( efile, pvr, *info ) )
+         else:
+            self.assertEqual ( entry.repo_name, info[0] )
+            self.assertEqual ( entry.distfiles, info[1] )
+
+      scan_index.write()
+      return parsed
+   # --- end of run_scan (...) ---
+
+   def test_unchanged ( self ):
+      self.assertEqual ( self.run_scan(), set ( self.EBUILDS ) )
+      self.assertEqual ( self.run_scan(), set() )
+   # --- end of test_unchanged (...) ---
+
+   def test_modified ( self ):
+      self.run_scan()
+      self.write_ebuild ( '1.0', '1.0, modified' )
+      self.assertEqual ( self.run_scan(), { '1.0', } )
+      self.assertEqual ( self.run_scan(), set() )
+   # --- end of test_modified (...) ---
+
+   def test_removed ( self ):
+      self.run_scan()
+      os.unlink ( self.get_ebuild_file ( '2.0' ) )
+      self.assertEqual ( self.run_scan(), set() )
+
+      scan_index = roverlay.db.scanindex.ScanIndex (
+         self.index_file, index_compression=None
+      )
+      self.assertEqual ( len ( scan_index ), len ( self.EBUILDS ) - 1 )
+   # --- end of test_removed (...) ---
+
+   def test_rebuild ( self ):
+      self.run_scan()
+      self.assertEqual ( self.run_scan ( rebuild=True ), set ( self.EBUILDS ) )
+   # --- end of test_rebuild (...) ---
+
+# --- end of ScanIndexTestCase ---
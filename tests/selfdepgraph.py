@@ -0,0 +1,153 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import random
+
+import roverlay.packageinfo
+import roverlay.depres.depresult
+import roverlay.depres.selfdepgraph
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( SelfdepGraphTestCase )
+
+
+class FakeSelfdepRule ( object ):
+   is_selfdep = 1
+
+   def __init__ ( self, resolving_package ):
+      super ( FakeSelfdepRule, self ).__init__()
+      self.resolving_package = resolving_package
+
+# --- end of FakeSelfdepRule ---
+
+
+def fixed_point_reduction ( selfdeps ):
+   """The original selfdep reduction algorithm."""
+   num_removed       = 1
+   num_removed_total = 0
+   while num_removed > 0:
+      num_removed = 0
+      for selfdep in selfdeps:
+         num_removed += selfdep.do_reduce()
+      num_removed_total += num_removed
+   return num_removed_total
+# --- end of fixed_point_reduction (...) ---
+
+
+class SelfdepGraphTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'chain', 'cycle', 'dump', 'randomized', ]
+
+   def make_packages ( self, num_packages, edges ):
+      """Creates packages and linked selfdeps.
+
+      Returns a 2-tuple ( list of packages, list of selfdeps ).
+
+      arguments:
+      * num_packages --
+      * edges        -- list of ( owner index, [candidate index...] ),
+                        each entry creates one selfdep for the owner package
+                        (owner may be None: selfdep without owner)
+      """
+      packages = [
+         roverlay.packageinfo.PackageInfo ( name='p{:d}'.format ( k ) )
+         for k in range ( num_packages )
+      ]
+      owned    = [ list() for p in packages ]
+      selfdeps = list()
+
+      for owner, candidates in edges:
+         selfdep = roverlay.depres.depresult._DepResult (
+            'sci-R/p{!s}'.format ( owner ), 10,
+            FakeSelfdepRule ( 'sci-R/p{!s}'.format ( owner ) )
+         ).prepare_selfdep_reduction()
+         selfdeps.append ( selfdep )
+         if owner is not None:
+            owned [owner].append ( selfdep )
+         for index in candidates:
+            selfdep.link ( packages [index] )
+
+      for p, owned_selfdeps in zip ( packages, owned ):
+         p.init_selfdep_validate ( owned_selfdeps )
+
+      return ( packages, selfdeps )
+   # --- end of make_packages (...) ---
+
+   def check_same_result ( self, num_packages, edges ):
+      packages, selfdeps = self.make_packages ( num_packages, edges )
+      expected_removed   = fixed_point_reduction ( selfdeps )
+      expected_valid     = [ p.is_valid() for p in packages ]
+      expected_cand      = [
+         [ packages.index ( p ) for p in s.candidates ] for s in selfdeps
+      ]
+
+      packages, selfdeps = self.make_packages ( num_packages, edges )
+      graph = roverlay.depres.selfdepgraph.SelfdepGraph ( selfdeps )
+      self.assertEqual ( graph.reduce(), expected_removed )
+      self.assertEqual ( [ p.is_valid() for p in packages ], expected_valid )
+      self.assertEqual (
+         [ [ packages.index ( p ) for p in s.candidates ] for s in selfdeps ],
+         expected_cand
+      )
+      return ( packages, selfdeps, graph )
+   # --- end of check_same_result (...) ---
+
+   def test_chain ( self ):
+      # p0 -> p1 -> p2 -> (nothing)
+      #  p0 is not a candidate of any selfdep, so its status is not
+      #  updated during reduction (same as before)
+      packages, selfdeps, graph = self.check_same_result (
+         3, [ ( 0, [ 1 ] ), ( 1, [ 2 ] ), ( 2, [] ) ]
+      )
+      self.assertEqual (
+         [ p.is_valid() for p in packages ], [ True, False, False ]
+      )
+      self.assertFalse ( packages[0].has_valid_selfdeps() )
+      self.assertEqual (
+         list ( graph.get_dependents ( selfdeps[2] ) ), [ selfdeps[1] ]
+      )
+   # --- end of test_chain (...) ---
+
+   def test_cycle ( self ):
+      # p0 <-> p1 is satisfiable, p2 depends on p3 (unsatisfiable)
+      packages, selfdeps, graph = self.check_same_result (
+         4, [ ( 0, [ 1 ] ), ( 1, [ 0 ] ), ( 2, [ 3, 0 ] ), ( 3, [] ) ]
+      )
+      self.assertEqual (
+         [ p.is_valid() for p in packages ], [ True, True, True, False ]
+      )
+   # --- end of test_cycle (...) ---
+
+   def test_dump ( self ):
+      packages, selfdeps, graph = self.check_same_result (
+         2, [ ( 0, [ 1 ] ), ( 1, [] ) ]
+      )
+      lines = list ( graph.iter_dump_lines() )
+      self.assertIn ( "selfdep sci-R/p1 (satisfiable=False)", lines )
+      self.assertIn ( "  dependent sci-R/p0", lines )
+   # --- end of test_dump (...) ---
+
+   def test_randomized ( self ):
+      rng = random.Random ( 2014 )
+      for attempt in range ( 200 ):
+         num_packages = rng.randint ( 1, 15 )
+         edges        = list()
+         for k in range ( rng.randint ( 0, 2 * num_packages ) ):
+            owner = rng.choice ( [ None ] + list ( range ( num_packages ) ) )
+            edges.append ( (
+               owner,
+               rng.sample (
+                  range ( num_packages ),
+                  rng.randint ( 0, min ( 2, num_packages ) )
+               )
+            ) )
+         self.check_same_result ( num_packages, edges )
+   # --- end of test_randomized (...) ---
+
+# --- end of SelfdepGraphTestCase ---
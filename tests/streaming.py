@@ -0,0 +1,171 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import filecmp
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+
+import roverlay.overlay.creator
+import roverlay.overlay.pkgdir.base
+import roverlay.overlay.pkgdir.distroot.static
+import roverlay.remote.basicrepo
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( StreamingTestCase )
+
+
+class StreamingTestCase ( tests.base.RoverlayTestCase ):
+   """Creates the same overlay in streaming mode and in batch mode."""
+
+   TESTSUITE = [ 'stream_batch', ]
+
+   # package name => extra DESCRIPTION lines
+   PACKAGES = {
+      'a' : '',
+      'b' : 'Depends: R (>= 2.15.0)\n',
+      'c' : 'License: GPL-2\n',
+   }
+
+   # config entries that get modified by this test case
+   CONFIG_KEYS = (
+      'OVERLAY.dir', 'CACHEDIR.root', 'OVERLAY.DISTDIR.root',
+      'EBUILD.jobcount', 'LICENSEMAP.licenses_file',
+      'LICENSEMAP.use_portage_licenses', 'LOG.FILE.unresolvable',
+   )
+
+   def setUp ( self ):
+      self.tmpdir     = tempfile.mkdtemp()
+      self.old_config = dict (
+         ( key, self.CONFIG.get ( key ) ) for key in self.CONFIG_KEYS
+      )
+
+      distdir = self.tmpdir + os.sep + 'distfiles' + os.sep + 'test'
+      os.makedirs ( distdir )
+      for name, desc in self.PACKAGES.items():
+         self.write_package_file ( distdir, name, desc )
+
+      if self.CONFIG.get_field_definition() is None:
+         licenses_file = self.tmpdir + os.sep + 'licenses'
+         with open ( licenses_file, 'w' ) as fh:
+            fh.write ( 'GPL-2\nMIT\n' )
+         self.inject ( 'LICENSEMAP.licenses_file', licenses_file )
+         self.inject ( 'LICENSEMAP.use_portage_licenses', False )
+         self.CONFIG.get_loader().load_field_definition (
+            self.CONFIG.get_or_fail ( 'DESCRIPTION.field_definition_file' )
+         )
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      for key, value in self.old_config.items():
+         self.inject ( key, value )
+      self.reset_static_objects()
+      shutil.rmtree ( self.tmpdir )
+   # --- end of tearDown (...) ---
+
+   def inject ( self, key, value ):
+      self.CONFIG.inject ( key, value, suppress_log=True )
+   # --- end of inject (...) ---
+
+   def reset_static_objects ( self ):
+      """Drops the distroot and the package dir class, both get
+      recreated using the current config."""
+      roverlay.overlay.pkgdir.distroot.static._distroot_instance = None
+      roverlay.overlay.pkgdir.base._package_dir_class            = None
+   # --- end of reset_static_objects (...) ---
+
+   def write_package_file ( self, distdir, name, desc ):
+      data = (
+         'Package: {name}\nVersion: 1.0\nTitle: {name}\n'
+         'Description: package {name}\n{desc}'.format ( name=name, desc=desc )
+      ).encode ( 'utf-8' )
+
+      with tarfile.open (
+         distdir + os.sep + name + '_1.0.tar.gz', 'w:gz'
+      ) as tarball:
+         tarinfo      = tarfile.TarInfo ( name + '/DESCRIPTION' )
+         tarinfo.size = len ( data )
+         tarball.addfile ( tarinfo, io.BytesIO ( data ) )
+   # --- end of write_package_file (...) ---
+
+   def create_overlay ( self, name, stream ):
+      """Creates an overlay and returns its directory.
+
+      arguments:
+      * name   -- name of the subdir in self.tmpdir
+      * stream -- whether to enable streaming mode
+      """
+      root = self.tmpdir + os.sep + name
+      self.inject ( 'OVERLAY.dir', root + os.sep + 'overlay' )
+      self.inject ( 'CACHEDIR.root', root + os.sep + 'cache' )
+      self.inject ( 'OVERLAY.DISTDIR.root', root + os.sep + 'mirror' )
+      self.inject (
+         'LOG.FILE.unresolvable', root + os.sep + 'dep_unresolvable.log'
+      )
+      # streaming mode requires worker threads
+      self.inject ( 'EBUILD.jobcount', 2 )
+      self.reset_static_objects()
+
+      repo = roverlay.remote.basicrepo.BasicRepo (
+         'test', self.tmpdir + os.sep + 'distfiles'
+      )
+      creator = roverlay.overlay.creator.OverlayCreator (
+         skip_manifest=False, incremental=False,
+         immediate_ebuild_writes=False, desc_cache=False, stream=stream,
+      )
+      self.assertEqual ( creator.is_streaming(), stream )
+      self.assertEqual ( creator.start_streaming(), stream )
+
+      for package_info in repo.scan_distdir():
+         creator.add_package ( package_info )
+      creator.discard_postponed()
+      creator.release_package_rules()
+
+      creator.run ( close_when_done=True, max_passno=2 )
+      creator.write_overlay()
+      return root + os.sep + 'overlay'
+   # --- end of create_overlay (...) ---
+
+   def iter_files ( self, root ):
+      """Generator that yields the paths of all files in the given directory,
+      relative to that directory."""
+      for dirpath, dirnames, filenames in os.walk ( root ):
+         for filename in filenames:
+            yield os.path.relpath ( dirpath + os.sep + filename, root )
+   # --- end of iter_files (...) ---
+
+   def test_stream_batch ( self ):
+      batch_root  = self.create_overlay ( 'batch', stream=False )
+      stream_root = self.create_overlay ( 'stream', stream=True )
+
+      files = sorted ( self.iter_files ( batch_root ) )
+      self.assertEqual ( files, sorted ( self.iter_files ( stream_root ) ) )
+
+      # all packages made it into the overlay, and each package dir has
+      #  a Manifest file
+      ebuild_files = [ f for f in files if f.endswith ( '.ebuild' ) ]
+      self.assertEqual (
+         sorted ( os.path.basename ( f ) for f in ebuild_files ),
+         sorted ( name + '-1.0.ebuild' for name in self.PACKAGES )
+      )
+      for ebuild_file in ebuild_files:
+         self.assertIn (
+            os.path.dirname ( ebuild_file ) + os.sep + 'Manifest', files
+         )
+
+      match, mismatch, errors = filecmp.cmpfiles (
+         batch_root, stream_root, files, shallow=False
+      )
+      self.assertEqual ( mismatch, [] )
+      self.assertEqual ( errors, [] )
+   # --- end of test_stream_batch (...) ---
+
+# --- end of StreamingTestCase ---
@@ -0,0 +1,330 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+from __future__ import print_function
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+try:
+   import http.server as _httpserver
+except ImportError:
+   # python 2
+   import BaseHTTPServer as _basehttpserver
+   import SimpleHTTPServer as _simplehttpserver
+
+   class _httpserver ( object ):
+      HTTPServer               = _basehttpserver.HTTPServer
+      SimpleHTTPRequestHandler = _simplehttpserver.SimpleHTTPRequestHandler
+
+try:
+   import socketserver
+except ImportError:
+   # python 2
+   import SocketServer as socketserver
+
+
+import roverlay.db.digeststore
+import roverlay.digest
+import roverlay.remote.websync
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( WebsyncTestCase )
+
+
+class RequestLog ( object ):
+
+   def __init__ ( self ):
+      super ( RequestLog, self ).__init__()
+      self.lock        = threading.Lock()
+      self.requests    = list()
+      self.connections = set()
+
+   def add ( self, method, path, client_address ):
+      with self.lock:
+         self.requests.append ( ( method, path ) )
+         self.connections.add ( client_address )
+
+   def clear ( self ):
+      with self.lock:
+         self.requests [:] = []
+         self.connections.clear()
+
+   def count ( self, method ):
+      return sum ( 1 for m, p in self.requests if m == method )
+
+# --- end of RequestLog ---
+
+
+class ThreadingHTTPServer (
+   socketserver.ThreadingMixIn, _httpserver.HTTPServer
+):
+   daemon_threads = True
+
+
+def make_request_handler ( root, request_log ):
+
+   class RequestHandler ( _httpserver.SimpleHTTPRequestHandler ):
+      # keep-alive
+      protocol_version = 'HTTP/1.1'
+
+      extensions_map = dict (
+         _httpserver.SimpleHTTPRequestHandler.extensions_map
+      )
+      extensions_map [''] = 'text/plain'
+
+      def translate_path ( self, path ):
+         return os.path.join (
+            root, path.lstrip ( '/' ).split ( '?', 1 )[0]
+         )
+
+      def log_message ( self, *args ):
+         pass
+
+      def do_GET ( self ):
+         request_log.add ( 'GET', self.path, self.client_address )
+         return _httpserver.SimpleHTTPRequestHandler.do_GET ( self )
+
+      def do_HEAD ( self ):
+         request_log.add ( 'HEAD', self.path, self.client_address )
+         return _httpserver.SimpleHTTPRequestHandler.do_HEAD ( self )
+
+   return RequestHandler
+# --- end of make_request_handler (...) ---
+
+
+class WebsyncTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [
+      'fetch_all', 'refetch_skipped', 'size_check',
+      'refetch_modified', 'concurrent', 'digest_store',
+   ]
+
+   PACKAGES = {
+      'pkgA' : ( '1.0', b'A' * 20000 ),
+      'pkgB' : ( '0.2-1', b'B' * 100 ),
+      'pkgC' : ( '3.1', b'C' * 9000 ),
+   }
+
+   @classmethod
+   def setUpClass ( cls ):
+      super ( WebsyncTestCase, cls ).setUpClass()
+      roverlay.remote.websync.VERBOSE = False
+
+      cls.TMPDIR      = tempfile.mkdtemp()
+      cls.REMOTE_DIR  = os.path.join ( cls.TMPDIR, 'remote' )
+      cls.REQUEST_LOG = RequestLog()
+
+      os.mkdir ( cls.REMOTE_DIR )
+      for name in cls.PACKAGES:
+         cls.write_remote_package ( name, update_list=False )
+      cls.write_package_list()
+
+      cls.SERVER = ThreadingHTTPServer (
+         ( '127.0.0.1', 0 ),
+         make_request_handler ( cls.REMOTE_DIR, cls.REQUEST_LOG )
+      )
+      cls.SERVER_THREAD = threading.Thread (
+         target=cls.SERVER.serve_forever
+      )
+      cls.SERVER_THREAD.daemon = True
+      cls.SERVER_THREAD.start()
+
+      cls.SRC_URI = 'http://127.0.0.1:{:d}'.format (
+         cls.SERVER.server_address[1]
+      )
+   # --- end of setUpClass (...) ---
+
+   @classmethod
+   def tearDownClass ( cls ):
+      cls.SERVER.shutdown()
+      cls.SERVER.server_close()
+      shutil.rmtree ( cls.TMPDIR )
+   # --- end of tearDownClass (...) ---
+
+   @classmethod
+   def write_remote_package ( cls, name, data=None, update_list=True ):
+      if data is None:
+         data = cls.PACKAGES [name][1]
+
+      with open (
+         os.path.join ( cls.REMOTE_DIR, cls.get_package_file ( name ) ), 'wb'
+      ) as fh:
+         fh.write ( data )
+
+      if update_list:
+         cls.write_package_list()
+   # --- end of write_remote_package (...) ---
+
+   @classmethod
+   def write_package_list ( cls ):
+      with open ( os.path.join ( cls.REMOTE_DIR, 'PACKAGES' ), 'w' ) as fh:
+         for pkg_name in sorted ( cls.PACKAGES ):
+            with open (
+               os.path.join (
+                  cls.REMOTE_DIR, cls.get_package_file ( pkg_name )
+               ), 'rb'
+            ) as pkg_fh:
+               md5sum = hashlib.md5 ( pkg_fh.read() ).hexdigest()
+
+            fh.write (
+               'Package: {name}\nVersion: {ver}\nMD5sum: {md5}\n\n'.format (
+                  name=pkg_name, ver=cls.PACKAGES [pkg_name][0], md5=md5sum
+               )
+            )
+   # --- end of write_package_list (...) ---
+
+   @classmethod
+   def get_package_file ( cls, name ):
+      return '{}_{}.tar.gz'.format ( name, cls.PACKAGES [name][0] )
+   # --- end of get_package_file (...) ---
+
+   def setUp ( self ):
+      self.distroot = tempfile.mkdtemp ( dir=self.TMPDIR )
+      self.REQUEST_LOG.clear()
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      shutil.rmtree ( self.distroot )
+      for name in self.PACKAGES:
+         self.write_remote_package ( name, update_list=False )
+      self.write_package_list()
+   # --- end of tearDown (...) ---
+
+   def get_repo ( self, digest_type='md5', max_jobs=1 ):
+      return roverlay.remote.websync.WebsyncRepo (
+         name         = 'websync_test',
+         distroot     = self.distroot,
+         src_uri      = self.SRC_URI,
+         pkglist_file = 'PACKAGES',
+         digest_type  = digest_type,
+         max_jobs     = max_jobs,
+      )
+   # --- end of get_repo (...) ---
+
+   def assert_distfiles ( self, repo ):
+      for name in self.PACKAGES:
+         pkg_file = self.get_package_file ( name )
+
+         with open ( os.path.join ( repo.distdir, pkg_file ), 'rb' ) as fh:
+            local_data = fh.read()
+
+         with open ( os.path.join ( self.REMOTE_DIR, pkg_file ), 'rb' ) as fh:
+            self.assertEqual ( fh.read(), local_data )
+   # --- end of assert_distfiles (...) ---
+
+   def test_fetch_all ( self ):
+      repo = self.get_repo()
+      self.assertTrue ( repo.sync() )
+      self.assert_distfiles ( repo )
+
+      # PACKAGES + one GET per package, using a single connection
+      self.assertEqual (
+         self.REQUEST_LOG.count ( 'GET' ), 1 + len ( self.PACKAGES )
+      )
+      self.assertEqual ( len ( self.REQUEST_LOG.connections ), 1 )
+
+      # the package list entries are kept
+      self.assertEqual (
+         repo.get_package_index_entry ( self.get_package_file ( 'pkgB' ) )[:2],
+         [ 'Package: pkgB', 'Version: 0.2-1' ]
+      )
+   # --- end of test_fetch_all (...) ---
+
+   def test_refetch_skipped ( self ):
+      self.assertTrue ( self.get_repo().sync() )
+      self.REQUEST_LOG.clear()
+
+      # all files exist locally and have the expected digest,
+      # only the package list has to be fetched
+      repo = self.get_repo()
+      self.assertTrue ( repo.sync() )
+      self.assert_distfiles ( repo )
+      self.assertEqual (
+         self.REQUEST_LOG.requests, [ ( 'GET', '/PACKAGES' ) ]
+      )
+   # --- end of test_refetch_skipped (...) ---
+
+   def test_size_check ( self ):
+      self.assertTrue ( self.get_repo ( digest_type=None ).sync() )
+      self.REQUEST_LOG.clear()
+
+      # no digest verification -> HEAD requests
+      repo = self.get_repo ( digest_type=None )
+      self.assertTrue ( repo.sync() )
+      self.assertEqual ( self.REQUEST_LOG.count ( 'GET' ), 1 )
+      self.assertEqual (
+         self.REQUEST_LOG.count ( 'HEAD' ), len ( self.PACKAGES )
+      )
+   # --- end of test_size_check (...) ---
+
+   def test_refetch_modified ( self ):
+      repo = self.get_repo()
+      self.assertTrue ( repo.sync() )
+
+      distfile = os.path.join (
+         repo.distdir, self.get_package_file ( 'pkgB' )
+      )
+      linkfile = distfile + '.link'
+      os.link ( distfile, linkfile )
+
+      self.write_remote_package ( 'pkgB', b'b' * 100 )
+      self.REQUEST_LOG.clear()
+
+      repo = self.get_repo()
+      self.assertTrue ( repo.sync() )
+      self.assert_distfiles ( repo )
+      self.assertEqual ( self.REQUEST_LOG.count ( 'GET' ), 2 )
+
+      # hardlinks are kept intact (file gets unlinked before writing)
+      with open ( linkfile, 'rb' ) as fh:
+         self.assertEqual ( fh.read(), self.PACKAGES ['pkgB'][1] )
+   # --- end of test_refetch_modified (...) ---
+
+   def test_concurrent ( self ):
+      repo = self.get_repo ( max_jobs=3 )
+      self.assertTrue ( repo.is_concurrent() )
+      self.assertTrue ( repo.sync() )
+      self.assert_distfiles ( repo )
+      self.assertEqual (
+         self.REQUEST_LOG.count ( 'GET' ), 1 + len ( self.PACKAGES )
+      )
+   # --- end of test_concurrent (...) ---
+
+   def test_digest_store ( self ):
+      digest_store = roverlay.db.digeststore.DigestStore (
+         os.path.join ( self.distroot, 'digest_store.db' ),
+         digest_types=( 'sha256', ), read_now=False
+      )
+      roverlay.digest.set_digest_store ( digest_store )
+      try:
+         repo = self.get_repo()
+         self.assertTrue ( repo.sync() )
+
+         # digests have been calculated while downloading
+         for name in self.PACKAGES:
+            distfile = os.path.join (
+               repo.distdir, self.get_package_file ( name )
+            )
+            with open ( distfile, 'rb' ) as fh:
+               data = fh.read()
+
+            stat_key, hashdict = digest_store.lookup ( distfile )
+            self.assertEqual ( hashdict, {
+               'md5'    : hashlib.md5 ( data ).hexdigest(),
+               'sha256' : hashlib.sha256 ( data ).hexdigest(),
+            } )
+      finally:
+         roverlay.digest.set_digest_store ( None )
+   # --- end of test_digest_store (...) ---
+
+# --- end of WebsyncTestCase ---
@@ -0,0 +1,310 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import logging
+import os
+import shutil
+import tempfile
+
+import roverlay.db.writeindex
+import roverlay.overlay.root
+import roverlay.overlay.pkgdir.base
+import roverlay.overlay.pkgdir.packagedir_base
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( WriteIndexTestCase )
+
+
+class FakePackageInfo ( object ):
+   """Provides the PackageInfo methods used for writing a package dir."""
+
+   def __init__ ( self, ebuild, package_file, hashed ):
+      super ( FakePackageInfo, self ).__init__()
+      self._info    = dict ( ebuild=ebuild, package_file=package_file )
+      self.hashed   = hashed
+      self.hashdict = dict()
+
+   def __getitem__ ( self, key ):
+      return self._info.get ( key )
+
+   def get ( self, key, fallback_value=None, do_fallback=False ):
+      return self._info.get ( key, fallback_value )
+
+   def has ( self, *keys ):
+      return all ( self._info.get ( k ) is not None for k in keys )
+
+   def update_now ( self, remove_auto=None, **info ):
+      self._info.update ( info )
+
+   def make_distmap_hash ( self ):
+      self.hashed.append ( self._info ['package_file'] )
+
+# --- end of FakePackageInfo ---
+
+
+class FakeDistMap ( object ):
+   """A distmap that knows all package files as unchanged."""
+
+   def check_file_unchanged ( self, package_info, info=None ):
+      return True
+
+# --- end of FakeDistMap ---
+
+
+class FakeMetadataJob ( object ):
+
+   last_write_skipped = True
+
+   def update ( self, package_info ):
+      pass
+
+   def empty ( self ):
+      return False
+
+   def write ( self, write_index=None ):
+      return True
+
+# --- end of FakeMetadataJob ---
+
+
+class ManifestRecordingPackageDir (
+   roverlay.overlay.pkgdir.packagedir_base.PackageDirBase
+):
+   """A package dir that records Manifest writes."""
+
+   DISTROOT    = None
+   DISTMAP     = FakeDistMap()
+   WRITE_INDEX = None
+
+   def __init__ ( self, directory, manifest_writes ):
+      super ( ManifestRecordingPackageDir, self ).__init__ (
+         name='a', logger=logging.getLogger ( 'tests' ),
+         directory=directory, get_header=lambda: None,
+         runtime_incremental=False, parent=None
+      )
+      self._metadata       = FakeMetadataJob()
+      self.manifest_writes = manifest_writes
+
+   def _write_manifest ( self, pkgs_for_manifest ):
+      self.manifest_writes.append ( len ( pkgs_for_manifest ) )
+      return True
+
+# --- end of ManifestRecordingPackageDir ---
+
+
+class PrehashRecordingPackageDir ( ManifestRecordingPackageDir ):
+   """A package dir whose package files are listed in the Manifest."""
+
+   HASH_TYPES          = frozenset ({ 'md5', 'sha256', })
+   MANIFEST_THREADSAFE = True
+
+# --- end of PrehashRecordingPackageDir ---
+
+
+class FakeDistroot ( object ):
+
+   def finalize ( self ):
+      pass
+
+# --- end of FakeDistroot ---
+
+
+class PrehashOverlay ( roverlay.overlay.root.Overlay ):
+   """An overlay that neither initializes its directory nor the distroot."""
+
+   def __init__ ( self, directory ):
+      super ( PrehashOverlay, self ).__init__ (
+         name='x', logger=logging.getLogger ( 'tests' ),
+         directory=directory, default_category='sci-R',
+         eclass_files=None, ebuild_header=None, eapi=5,
+         write_allowed=True, incremental=False, skip_manifest=False,
+         additions_dir=None, rsuggests_flags=set(),
+      )
+
+   def _init_overlay ( self, reimport_eclass, minimal=False ):
+      pass
+
+   def access_distroot ( self ):
+      return FakeDistroot()
+
+# --- end of PrehashOverlay ---
+
+
+class WriteIndexTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [
+      'unchanged', 'modified', 'external_change', 'persistent',
+      'packagedir_manifest', 'overlay_prehash',
+   ]
+
+   def setUp ( self ):
+      self.tmpdir     = tempfile.mkdtemp()
+      self.index_file = self.tmpdir + os.sep + 'write_index.db'
+      self.filepath   = self.tmpdir + os.sep + 'a-1.0.ebuild'
+      self.stats      = roverlay.db.writeindex.WriteIndex.STATS
+      self.stats.reset()
+   # --- end of setUp (...) ---
+
+   def tearDown ( self ):
+      shutil.rmtree ( self.tmpdir )
+      self.stats.reset()
+   # --- end of tearDown (...) ---
+
+   def new_index ( self ):
+      return roverlay.db.writeindex.WriteIndex (
+         self.index_file, index_compression=None
+      )
+   # --- end of new_index (...) ---
+
+   def read_file ( self ):
+      with open ( self.filepath, 'r' ) as fh:
+         return fh.read()
+   # --- end of read_file (...) ---
+
+   def test_unchanged ( self ):
+      write_index = self.new_index()
+      self.assertTrue (
+         write_index.write_file ( self.filepath, 'a', 'ebuild' )
+      )
+      mtime = os.stat ( self.filepath ).st_mtime
+      self.assertFalse (
+         write_index.write_file ( self.filepath, 'a', 'ebuild' )
+      )
+      self.assertEqual ( os.stat ( self.filepath ).st_mtime, mtime )
+
+      self.assertEqual ( int ( self.stats.files_written ), 1 )
+      self.assertEqual ( int ( self.stats.files_unchanged ), 1 )
+      self.assertEqual ( self.stats.files_unchanged.get ( 'ebuild' ), 1 )
+   # --- end of test_unchanged (...) ---
+
+   def test_modified ( self ):
+      write_index = self.new_index()
+      write_index.write_file ( self.filepath, 'a', 'ebuild' )
+      self.assertTrue (
+         write_index.write_file ( self.filepath, 'b', 'ebuild' )
+      )
+      self.assertEqual ( self.read_file(), 'b' )
+   # --- end of test_modified (...) ---
+
+   def test_external_change ( self ):
+      write_index = self.new_index()
+      write_index.write_file ( self.filepath, 'a', 'ebuild' )
+
+      # file modified by someone else
+      os.unlink ( self.filepath )
+      with open ( self.filepath, 'w' ) as fh:
+         fh.write ( 'a, patched' )
+
+      self.assertTrue (
+         write_index.write_file ( self.filepath, 'a', 'ebuild' )
+      )
+      self.assertEqual ( self.read_file(), 'a' )
+   # --- end of test_external_change (...) ---
+
+   def test_persistent ( self ):
+      write_index = self.new_index()
+      write_index.write_file ( self.filepath, 'a', 'metadata' )
+      write_index.write_file (
+         self.tmpdir + os.sep + 'removed', 'x', 'metadata'
+      )
+      os.unlink ( self.tmpdir + os.sep + 'removed' )
+      self.assertTrue ( write_index.write() )
+
+      write_index = self.new_index()
+      self.assertEqual ( len ( write_index ), 1 )
+      self.assertFalse (
+         write_index.write_file ( self.filepath, 'a', 'metadata' )
+      )
+   # --- end of test_persistent (...) ---
+
+   def test_packagedir_manifest ( self ):
+      manifest_writes = list()
+      hashed          = list()
+      pkgdir_path     = self.tmpdir + os.sep + 'a'
+      package_file    = self.tmpdir + os.sep + 'a_1.0.tar.gz'
+
+      def write_package_dir ( ebuild ):
+         # new package dir object for each run
+         pkgdir = ManifestRecordingPackageDir ( pkgdir_path, manifest_writes )
+         pkgdir._packages ['1.0'] = FakePackageInfo (
+            ebuild, package_file, hashed
+         )
+         pkgdir.new_ebuild()
+         self.assertTrue (
+            pkgdir.write (
+               additions_dir=None, write_metadata=False, cleanup=False
+            )
+         )
+      # --- end of write_package_dir (...) ---
+
+      ManifestRecordingPackageDir.WRITE_INDEX = self.new_index()
+      try:
+         write_package_dir ( 'ebuild' )
+         self.assertEqual ( manifest_writes, [ 1 ] )
+         self.assertEqual ( hashed, [ package_file ] )
+
+         # identical ebuild: neither Manifest nor hashing
+         write_package_dir ( 'ebuild' )
+         self.assertEqual ( manifest_writes, [ 1 ] )
+         self.assertEqual ( hashed, [ package_file ] )
+
+         write_package_dir ( 'modified ebuild' )
+         self.assertEqual ( manifest_writes, [ 1, 1 ] )
+
+         # without write index
+         ManifestRecordingPackageDir.WRITE_INDEX = None
+         write_package_dir ( 'modified ebuild' )
+         self.assertEqual ( manifest_writes, [ 1, 1, 1 ] )
+      finally:
+         ManifestRecordingPackageDir.WRITE_INDEX = None
+   # --- end of test_packagedir_manifest (...) ---
+
+   def test_overlay_prehash ( self ):
+      manifest_writes = list()
+      package_file    = self.tmpdir + os.sep + 'a_1.0.tar.gz'
+      pkgdir_cls      = PrehashRecordingPackageDir
+
+      with open ( package_file, 'w' ) as fh:
+         fh.write ( 'package file' )
+
+      def write_overlay ( ebuild ):
+         # new overlay object for each run
+         overlay = PrehashOverlay ( self.tmpdir )
+         pkgdir  = pkgdir_cls (
+            self.tmpdir + os.sep + 'sci-R' + os.sep + 'a', manifest_writes
+         )
+         p_info  = FakePackageInfo ( ebuild, package_file, list() )
+         pkgdir._packages ['1.0'] = p_info
+         overlay._get_category ( 'sci-R' )._subdirs ['a'] = pkgdir
+         pkgdir.new_ebuild()
+         overlay.write()
+         return p_info
+      # --- end of write_overlay (...) ---
+
+      old_pkgdir_cls = roverlay.overlay.pkgdir.base._package_dir_class
+      roverlay.overlay.pkgdir.base._package_dir_class = pkgdir_cls
+      pkgdir_cls.WRITE_INDEX = self.new_index()
+      try:
+         # the package file has been hashed before writing the Manifest
+         p_info = write_overlay ( 'ebuild' )
+         self.assertEqual ( manifest_writes, [ 1 ] )
+         self.assertEqual (
+            frozenset ( p_info.hashdict ), pkgdir_cls.HASH_TYPES
+         )
+
+         # identical ebuild: neither Manifest nor hashing
+         p_info = write_overlay ( 'ebuild' )
+         self.assertEqual ( manifest_writes, [ 1 ] )
+         self.assertEqual ( p_info.hashdict, {} )
+      finally:
+         roverlay.overlay.pkgdir.base._package_dir_class = old_pkgdir_cls
+         pkgdir_cls.WRITE_INDEX = None
+   # --- end of test_overlay_prehash (...) ---
+
+# --- end of WriteIndexTestCase ---
@@ -0,0 +1,112 @@
+# R overlay --
+# -*- coding: utf-8 -*-
+# Copyright (C) 2014 André Erdmann <dywi@mailerd.de>
+# Distributed under the terms of the GNU General Public License;
+# either version 2 of the License, or (at your option) any later version.
+
+import logging
+import threading
+
+import roverlay.stats.base
+import roverlay.overlay.writequeue
+
+import tests.base
+
+
+def suite():
+   return tests.base.make_testsuite ( WriteSchedulerTestCase )
+
+
+class FakeAdditionsDir ( object ):
+   def get_obj_subdir ( self, obj ):
+      return None
+# --- end of FakeAdditionsDir ---
+
+
+class FakePackageDir ( object ):
+   """Provides the PackageDir methods used by the write scheduler."""
+
+   def __init__ ( self, name, num_ebuilds, fail=False ):
+      super ( FakePackageDir, self ).__init__()
+      self.name        = name
+      self.num_ebuilds = num_ebuilds
+      self.fail        = fail
+      self.written     = []
+
+   def write ( self, additions_dir, stats, **write_kw ):
+      if self.fail:
+         raise IOError ( "cannot write {}".format ( self.name ) )
+      self.written.append ( ( threading.current_thread(), write_kw ) )
+
+   def iter_packages_with_efile ( self ):
+      return range ( self.num_ebuilds )
+
+# --- end of FakePackageDir ---
+
+
+class WriteSchedulerTestCase ( tests.base.RoverlayTestCase ):
+
+   TESTSUITE = [ 'write', 'single_job', 'manifest_only', 'reraise', ]
+
+   WRITE_KW = { 'overwrite_ebuilds': False, 'cautious': True, }
+
+   def setUp ( self ):
+      self.stats  = roverlay.stats.base.OverlayStats()
+      self.logger = logging.getLogger ( self.__class__.__name__ )
+      self.logger.disabled = True
+   # --- end of setUp (...) ---
+
+   def new_scheduler ( self, max_jobs, package_dirs ):
+      scheduler = roverlay.overlay.writequeue.WriteScheduler (
+         self.logger, self.stats, max_jobs
+      )
+      additions_dir = FakeAdditionsDir()
+      for pkgdir in package_dirs:
+         scheduler.add ( pkgdir, additions_dir )
+      return scheduler
+   # --- end of new_scheduler (...) ---
+
+   def test_write ( self ):
+      package_dirs = [ FakePackageDir ( str ( k ), k ) for k in range ( 20 ) ]
+      scheduler    = self.new_scheduler ( 3, package_dirs )
+      self.assertEqual ( len ( scheduler ), 20 )
+      scheduler.run ( self.WRITE_KW )
+
+      for pkgdir in package_dirs:
+         self.assertEqual ( len ( pkgdir.written ), 1 )
+         self.assertEqual ( pkgdir.written[0][1], self.WRITE_KW )
+
+      self.assertEqual ( int ( self.stats.ebuild_count ), sum ( range ( 20 ) ) )
+      self.assertEqual ( len ( scheduler ), 0 )
+   # --- end of test_write (...) ---
+
+   def test_single_job ( self ):
+      package_dirs = [ FakePackageDir ( str ( k ), 1 ) for k in range ( 3 ) ]
+      self.new_scheduler ( 1, package_dirs ).run ( self.WRITE_KW )
+
+      for pkgdir in package_dirs:
+         self.assertIs ( pkgdir.written[0][0], threading.current_thread() )
+      self.assertEqual ( int ( self.stats.ebuild_count ), 3 )
+   # --- end of test_single_job (...) ---
+
+   def test_manifest_only ( self ):
+      # ebuilds are counted when writing them, not when writing Manifests
+      package_dirs = [ FakePackageDir ( str ( k ), 2 ) for k in range ( 3 ) ]
+      self.new_scheduler ( 2, package_dirs ).run ( self.WRITE_KW )
+      self.new_scheduler ( 2, package_dirs ).run (
+         dict ( write_ebuilds=False, write_metadata=False, cleanup=False )
+      )
+
+      for pkgdir in package_dirs:
+         self.assertEqual ( len ( pkgdir.written ), 2 )
+      self.assertEqual ( int ( self.stats.ebuild_count ), 6 )
+   # --- end of test_manifest_only (...) ---
+
+   def test_reraise ( self ):
+      package_dirs = [ FakePackageDir ( str ( k ), 1 ) for k in range ( 5 ) ]
+      package_dirs.append ( FakePackageDir ( 'x', 1, fail=True ) )
+      scheduler = self.new_scheduler ( 2, package_dirs )
+      self.assertRaises ( IOError, scheduler.run, self.WRITE_KW )
+   # --- end of test_reraise (...) ---
+
+# --- end of WriteSchedulerTestCase ---